@@ -0,0 +1,36 @@
+"""order_search_index: indice di ricerca denormalizzato degli ordini (FULLTEXT ngram)
+
+Revision ID: 20261016_0001
+Revises: 20260622_0001
+Create Date: 2026-10-16
+
+Dopo l'upgrade popolare l'indice con `python scripts/rebuild_order_search_index.py`.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20261016_0001"
+down_revision: Union[str, None] = "20260622_0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_search_index",
+        sa.Column("id_order", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("search_text", sa.Text(), nullable=False),
+        sa.Column("date_upd", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id_order"),
+    )
+    if op.get_bind().dialect.name == "mysql":
+        op.execute("CREATE FULLTEXT INDEX ft_order_search_text ON order_search_index (search_text) WITH PARSER ngram")
+    else:
+        op.create_index("ft_order_search_text", "order_search_index", ["search_text"])
+
+
+def downgrade() -> None:
+    op.drop_index("ft_order_search_text", table_name="order_search_index")
+    op.drop_table("order_search_index")
@@ -0,0 +1,27 @@
+"""shipments.next_poll_at: pianificazione persistente del polling tracking
+
+Revision ID: 20261016_0002
+Revises: 20261016_0001
+Create Date: 2026-10-16
+
+Le spedizioni esistenti partono con next_poll_at NULL e vengono interrogate al primo ciclo.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20261016_0002"
+down_revision: Union[str, None] = "20261016_0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("shipments", sa.Column("next_poll_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_shipments_next_poll_at", "shipments", ["next_poll_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_shipments_next_poll_at", table_name="shipments")
+    op.drop_column("shipments", "next_poll_at")
@@ -0,0 +1,51 @@
+"""corrispettivi_daily_rollup: aggregati giornalieri materializzati dei corrispettivi
+
+Revision ID: 20261016_0003
+Revises: 20261016_0002
+Create Date: 2026-10-16
+
+Le tabelle partono vuote: i giorni passati vengono materializzati alla prima lettura.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20261016_0003"
+down_revision: Union[str, None] = "20261016_0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "corrispettivi_daily_rollup",
+        sa.Column("id_rollup", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("country_iso", sa.String(length=5), nullable=False, server_default=""),
+        sa.Column("id_tax", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("bucket", sa.String(length=32), nullable=False),
+        sa.Column("total_with_tax", sa.Numeric(15, 5), nullable=False, server_default="0"),
+        sa.Column("total_net", sa.Numeric(15, 5), nullable=False, server_default="0"),
+        sa.Column("products_with_tax", sa.Numeric(15, 5), nullable=False, server_default="0"),
+        sa.Column("products_net", sa.Numeric(15, 5), nullable=False, server_default="0"),
+        sa.Column("doc_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("id_rollup"),
+        sa.UniqueConstraint("day", "country_iso", "id_tax", "bucket", name="uq_corrispettivi_rollup_key"),
+    )
+    op.create_index("ix_corrispettivi_daily_rollup_id_rollup", "corrispettivi_daily_rollup", ["id_rollup"])
+    op.create_index("ix_corrispettivi_daily_rollup_day", "corrispettivi_daily_rollup", ["day"])
+    op.create_table(
+        "corrispettivi_rollup_days",
+        sa.Column("day", sa.Date(), autoincrement=False, nullable=False),
+        sa.Column("locked", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("date_upd", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("day"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("corrispettivi_rollup_days")
+    op.drop_index("ix_corrispettivi_daily_rollup_day", table_name="corrispettivi_daily_rollup")
+    op.drop_index("ix_corrispettivi_daily_rollup_id_rollup", table_name="corrispettivi_daily_rollup")
+    op.drop_table("corrispettivi_daily_rollup")
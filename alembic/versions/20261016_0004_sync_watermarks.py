@@ -0,0 +1,39 @@
+"""sync_watermarks: watermark date_upd per la sincronizzazione incrementale
+
+Revision ID: 20261016_0004
+Revises: 20261016_0003
+Create Date: 2026-10-16
+
+Tabella vuota: la prima sync di ogni entità usa il filtro per ID e registra il watermark.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20261016_0004"
+down_revision: Union[str, None] = "20261016_0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sync_watermarks",
+        sa.Column("id_sync_watermark", sa.Integer(), nullable=False),
+        sa.Column("id_store", sa.Integer(), nullable=False),
+        sa.Column("entity", sa.String(length=32), nullable=False),
+        sa.Column("last_date_upd", sa.DateTime(), nullable=True),
+        sa.Column("date_upd", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["id_store"], ["stores.id_store"]),
+        sa.PrimaryKeyConstraint("id_sync_watermark"),
+        sa.UniqueConstraint("id_store", "entity", name="uq_sync_watermarks_store_entity"),
+    )
+    op.create_index("ix_sync_watermarks_id_sync_watermark", "sync_watermarks", ["id_sync_watermark"])
+    op.create_index("ix_sync_watermarks_id_store", "sync_watermarks", ["id_store"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sync_watermarks_id_store", table_name="sync_watermarks")
+    op.drop_index("ix_sync_watermarks_id_sync_watermark", table_name="sync_watermarks")
+    op.drop_table("sync_watermarks")
@@ -0,0 +1,59 @@
+"""Indici univoci (id_store, id_origin) per gli upsert bulk ON DUPLICATE KEY UPDATE
+
+Revision ID: 20261016_0005
+Revises: 20261016_0004
+Create Date: 2026-10-16
+
+Solo MySQL. id_origin = 0 indica record creati localmente (preventivi, DDT, ...),
+quindi l'indice è su una colonna generata virtuale id_origin_key = NULLIF(id_origin, 0):
+più NULL sono ammessi. Le tabelle con chiavi (id_store, id_origin) già duplicate
+vengono saltate con un avviso: BaseRepository.upsert_by_origin usa allora il
+percorso select/update senza ON DUPLICATE KEY. Rilanciare la migrazione (downgrade
++ upgrade) dopo aver rimosso i duplicati.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20261016_0005"
+down_revision: Union[str, None] = "20261016_0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("customers", "addresses", "products", "orders", "brands", "categories", "carriers")
+
+
+def _index_exists(bind, table: str, name: str) -> bool:
+    return any(index["name"] == name for index in sa.inspect(bind).get_indexes(table))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "mysql":
+        return
+    for table in TABLES:
+        duplicate = bind.execute(sa.text(
+            f"SELECT id_store, id_origin FROM {table} WHERE id_origin IS NOT NULL AND id_origin <> 0 "
+            "GROUP BY id_store, id_origin HAVING COUNT(*) > 1 LIMIT 1"
+        )).first()
+        if duplicate is not None:
+            print(
+                f"WARNING: {table} has duplicate (id_store, id_origin) = {tuple(duplicate)}: "
+                f"uq_{table}_store_origin not created"
+            )
+            continue
+        op.execute(
+            f"ALTER TABLE {table} "
+            "ADD COLUMN id_origin_key INT GENERATED ALWAYS AS (NULLIF(id_origin, 0)) VIRTUAL, "
+            f"ADD UNIQUE INDEX uq_{table}_store_origin (id_store, id_origin_key)"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "mysql":
+        return
+    for table in TABLES:
+        if _index_exists(bind, table, f"uq_{table}_store_origin"):
+            op.execute(f"ALTER TABLE {table} DROP INDEX uq_{table}_store_origin, DROP COLUMN id_origin_key")
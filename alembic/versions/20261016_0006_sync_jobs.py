@@ -0,0 +1,54 @@
+"""sync_jobs: avanzamento e checkpoint delle sincronizzazioni e-commerce
+
+Revision ID: 20261016_0006
+Revises: 20261016_0005
+Create Date: 2026-10-16
+
+Tabella vuota: i job vengono creati dagli endpoint /api/v1/sync/prestashop.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20261016_0006"
+down_revision: Union[str, None] = "20261016_0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sync_jobs",
+        sa.Column("id_sync_job", sa.Integer(), nullable=False),
+        sa.Column("id_store", sa.Integer(), nullable=False),
+        sa.Column("sync_type", sa.String(length=16), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("phase", sa.String(length=64), nullable=True),
+        sa.Column("entity", sa.String(length=64), nullable=True),
+        sa.Column("last_id", sa.Integer(), nullable=True),
+        sa.Column("checkpoint_date_upd", sa.DateTime(), nullable=True),
+        sa.Column("completed_entities", sa.Text(), nullable=True),
+        sa.Column("pages", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("fetched", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("processed", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("rows_per_second", sa.Float(), nullable=True),
+        sa.Column("errors", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), server_default="1", nullable=False),
+        sa.Column("started_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["id_store"], ["stores.id_store"]),
+        sa.PrimaryKeyConstraint("id_sync_job"),
+    )
+    op.create_index("ix_sync_jobs_id_sync_job", "sync_jobs", ["id_sync_job"])
+    op.create_index("ix_sync_jobs_id_store", "sync_jobs", ["id_store"])
+    op.create_index("ix_sync_jobs_status", "sync_jobs", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sync_jobs_status", table_name="sync_jobs")
+    op.drop_index("ix_sync_jobs_id_store", table_name="sync_jobs")
+    op.drop_index("ix_sync_jobs_id_sync_job", table_name="sync_jobs")
+    op.drop_table("sync_jobs")
@@ -0,0 +1,37 @@
+"""corrispettivi_rollup_days: built e version per la materializzazione concorrente
+
+Revision ID: 20261016_0007
+Revises: 20261016_0006
+Create Date: 2026-10-16
+
+Le righe esistenti sono giorni già materializzati (built = 1).
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "20261016_0007"
+down_revision: Union[str, None] = "20261016_0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "corrispettivi_rollup_days",
+        sa.Column("built", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.add_column(
+        "corrispettivi_rollup_days",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute("UPDATE corrispettivi_rollup_days SET built = 1")
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM corrispettivi_daily_rollup WHERE day IN "
+               "(SELECT day FROM corrispettivi_rollup_days WHERE built = 0)")
+    op.execute("DELETE FROM corrispettivi_rollup_days WHERE built = 0")
+    op.drop_column("corrispettivi_rollup_days", "version")
+    op.drop_column("corrispettivi_rollup_days", "built")
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Ricostruzione completa dell'indice di ricerca ordini (order_search_index).
+
+Da eseguire dopo la migrazione 20261016_0001 (backfill) o per riallineare
+l'indice dopo scritture SQL eseguite fuori dall'applicazione.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database import SessionLocal
+from src.repository.order_search_index_repository import OrderSearchIndexRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ricostruisce order_search_index")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Ordini per blocco (default: 1000)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        written = OrderSearchIndexRepository(db, chunk_size=args.batch_size).rebuild_all()
+        print(f"Indice ricerca ordini ricostruito: {written} ordini in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
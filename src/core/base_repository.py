@@ -1,15 +1,47 @@
 """
 Base Repository implementation seguendo SRP e OCP
 """
-from typing import Generic, TypeVar, Optional, List, Dict, Any, Type, Union
+import logging
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Generic, TypeVar, Optional, List, Dict, Any, Sequence, Type, Union
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, inspect, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from src.core.interfaces import IRepository
 from src.core.exceptions import NotFoundException, InfrastructureException
+from src.core.settings import get_bulk_write_settings
+
+logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 K = TypeVar('K')
 
+# Tabelle con indice univoco (id_store, NULLIF(id_origin, 0)) creato dalla migrazione
+# 20261016_0005: {(url del DB, tabella): presente}
+_ORIGIN_UNIQUE_KEYS: Dict[tuple, bool] = {}
+
+
+def origin_unique_key_name(table_name: str) -> str:
+    return f"uq_{table_name}_store_origin"
+
+
+@dataclass
+class UpsertResult:
+    """Esito di un upsert per (id_store, id_origin)"""
+    inserted: int = 0
+    # Righe esistenti con almeno un campo di `update_fields` effettivamente cambiato
+    updated: int = 0
+    updated_ids: List[Any] = field(default_factory=list)
+    # id_origin -> chiave primaria delle righe inserite
+    inserted_ids: Dict[Any, Any] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return round((self.inserted + self.updated) / self.elapsed, 1) if self.elapsed else 0.0
+
 class BaseRepository(Generic[T, K], IRepository[T, K]):
     """Repository base con implementazioni comuni seguendo DRY e SRP"""
     
@@ -173,6 +205,157 @@ class BaseRepository(Generic[T, K], IRepository[T, K]):
         
         return total_inserted
     
+    def upsert_by_origin(
+        self,
+        rows: List[Dict[str, Any]],
+        id_store: Optional[int] = None,
+        update_fields: Sequence[str] = (),
+        batch_size: Optional[int] = None
+    ) -> UpsertResult:
+        """
+        Scrittura bulk per (id_store, id_origin), condivisa da sync e-commerce e import CSV.
+
+        Le righe già presenti aggiornano solo `update_fields` (vuoto = solo inserimento
+        delle nuove) e solo se almeno uno di quei valori è diverso da quello salvato:
+        `updated`/`updated_ids` contano le sole righe cambiate. Le righe senza id_origin vengono sempre inserite. `id_store`, se
+        indicato, vale per tutte le righe; altrimenti si usa quello di ogni riga. Con più
+        righe per la stessa chiave vale l'ultima.
+
+        Su MySQL con l'indice univoco uq_<tabella>_store_origin ogni batch è un solo
+        INSERT ... ON DUPLICATE KEY UPDATE multi-riga; altrimenti, e per le righe con
+        id_store NULL (che l'indice non deduplica), UPDATE per chiave primaria + INSERT
+        multi-riga. Commit a ogni batch.
+
+        Returns:
+            UpsertResult con conteggi, id delle righe inserite e righe/s
+        """
+        started = time.monotonic()
+        batch_size = batch_size or get_bulk_write_settings().bulk_upsert_batch_size
+        model = self._model_class
+        pk = inspect(model).primary_key[0]
+        result = UpsertResult()
+
+        # Raggruppa per store; chiave = id_origin (None/0 = riga senza origine)
+        by_store: Dict[Any, Dict[Any, Dict[str, Any]]] = {}
+        without_origin: List[Dict[str, Any]] = []
+        for row in rows:
+            if id_store is not None:
+                row = {**row, 'id_store': id_store}
+            if row.get('id_origin'):
+                by_store.setdefault(row.get('id_store'), {})[row['id_origin']] = row
+            else:
+                without_origin.append(row)
+
+        native = self._has_origin_unique_key()
+        try:
+            for store, by_origin in by_store.items():
+                store_filter = model.id_store == store if store is not None else model.id_store.is_(None)
+                origins = list(by_origin)
+                for i in range(0, len(origins), batch_size):
+                    batch = origins[i:i + batch_size]
+                    stored_rows = self._session.execute(
+                        select(model.id_origin, pk, *[getattr(model, name) for name in update_fields])
+                        .where(store_filter, model.id_origin.in_(batch))
+                    ).all()
+                    existing = {row[0]: row[1] for row in stored_rows}
+                    new_origins = [origin for origin in batch if origin not in existing]
+                    # Solo le righe esistenti con valori diversi vengono riscritte
+                    changed = {
+                        row[0]: row[1] for row in stored_rows
+                        if self._row_changed(by_origin[row[0]], update_fields, row[2:])
+                    }
+
+                    # Con id_store NULL l'indice univoco non deduplica (NULL distinti): percorso portabile
+                    if native and store is not None:
+                        to_write = new_origins + list(changed)
+                        if to_write:
+                            self._upsert_native([by_origin[origin] for origin in to_write], update_fields)
+                    else:
+                        self._upsert_portable(by_origin, changed, new_origins, update_fields, pk)
+
+                    result.updated += len(changed)
+                    result.updated_ids.extend(changed.values())
+                    if new_origins:
+                        result.inserted += len(new_origins)
+                        result.inserted_ids.update(self._session.execute(
+                            select(model.id_origin, pk).where(store_filter, model.id_origin.in_(new_origins))
+                        ).all())
+                    self._session.commit()
+
+            for i in range(0, len(without_origin), batch_size):
+                self._session.execute(insert(model), without_origin[i:i + batch_size])
+                result.inserted += len(without_origin[i:i + batch_size])
+                self._session.commit()
+        except Exception as e:
+            self._session.rollback()
+            raise InfrastructureException(f"Database error upserting {model.__name__}: {str(e)}")
+
+        result.elapsed = time.monotonic() - started
+        logger.info(
+            "%s upsert: %s inserted, %s updated in %.2fs (%s rows/s, %s)",
+            model.__tablename__, result.inserted, result.updated, result.elapsed,
+            result.rows_per_second, "on duplicate key" if native else "select/update",
+        )
+        return result
+
+    def _upsert_native(self, batch: List[Dict[str, Any]], update_fields: Sequence[str]) -> None:
+        """Un INSERT ... ON DUPLICATE KEY UPDATE multi-riga (MySQL)"""
+        statement = mysql_insert(self._model_class.__table__).values(batch)
+        # Nessun campo da aggiornare: assegnazione neutra, le righe esistenti restano invariate
+        updates = {name: statement.inserted[name] for name in update_fields} or {'id_origin': statement.inserted.id_origin}
+        self._session.execute(statement.on_duplicate_key_update(updates))
+
+    def _upsert_portable(self, by_origin, changed, new_origins, update_fields, pk) -> None:
+        """UPDATE per chiave primaria delle righe esistenti cambiate e INSERT multi-riga delle nuove"""
+        if update_fields and changed:
+            self._session.execute(update(self._model_class), [
+                {pk.key: id_, **{name: by_origin[origin][name] for name in update_fields if name in by_origin[origin]}}
+                for origin, id_ in changed.items()
+            ])
+        if new_origins:
+            self._session.execute(insert(self._model_class), [by_origin[origin] for origin in new_origins])
+
+    @staticmethod
+    def _row_changed(row: Dict[str, Any], update_fields: Sequence[str], stored: Sequence[Any]) -> bool:
+        """True se almeno un campo di `update_fields` presente in `row` differisce dal valore salvato"""
+        return any(
+            name in row and BaseRepository._value_changed(value, row[name])
+            for name, value in zip(update_fields, stored)
+        )
+
+    @staticmethod
+    def _value_changed(stored: Any, value: Any) -> bool:
+        if stored == value:
+            return False
+        if stored is None or value is None:
+            return True
+        if isinstance(stored, bool) or isinstance(value, bool):
+            return bool(stored) != bool(value)
+        # Numeric letti come Decimal, valori in arrivo come float/str (es. 12.3 vs 12.30000)
+        if isinstance(stored, (int, float, Decimal)) and isinstance(value, (int, float, Decimal, str)):
+            try:
+                return Decimal(str(stored)) != Decimal(str(value))
+            except InvalidOperation:
+                return True
+        return True
+
+    def _has_origin_unique_key(self) -> bool:
+        bind = self._session.get_bind()
+        if bind.dialect.name != 'mysql':
+            return False
+        table_name = self._model_class.__tablename__
+        key = (str(bind.engine.url), table_name)
+        if key not in _ORIGIN_UNIQUE_KEYS:
+            try:
+                indexes = inspect(bind).get_indexes(table_name)
+                _ORIGIN_UNIQUE_KEYS[key] = any(
+                    index['name'] == origin_unique_key_name(table_name) and index.get('unique') for index in indexes
+                )
+            except Exception as e:
+                logger.warning("Cannot inspect indexes of %s: %s", table_name, e)
+                _ORIGIN_UNIQUE_KEYS[key] = False
+        return _ORIGIN_UNIQUE_KEYS[key]
+
     def _apply_filters(self, query, filters: Dict[str, Any]):
         """Applica filtri alla query"""
         for field_name, value in filters.items():
@@ -3,14 +3,17 @@ Multilayer cache manager for ECommerceManagerAPI
 """
 
 import asyncio
+import fnmatch
 import hashlib
 import json
 import logging
 import time
 from contextlib import asynccontextmanager
-from typing import Any, Dict, List, Optional, Union, Callable
+from typing import Any, Awaitable, Dict, List, Optional, Set, Union, Callable
 from datetime import datetime, timedelta
 
+import uuid
+
 import orjson
 from cachetools import TTLCache
 import redis.asyncio as aioredis
@@ -25,6 +28,81 @@ class CacheError(Exception):
     pass
 
 
+# Namespace versionati: le chiavi includono la versione corrente del namespace,
+# l'invalidazione incrementa il contatore (O(1)) invece di cercare le chiavi.
+# Di default le famiglie lista/conteggio invalidate dagli hook post-commit.
+_versioned_namespaces: Set[str] = {
+    "orders:list", "orders:count",
+    "order_details:list", "order_packages:list",
+    "customers:list", "customers:count",
+    "addresses:list",
+    "products:list", "products:count",
+    "quotes:list", "quotes:count",
+}
+
+# Famiglie di chiavi per entità ("order:{tenant}:{id}"): ogni chiave scritta viene
+# aggiunta al tag "famiglia:id", così "order:*:{id}" si invalida senza SCAN.
+_tagged_families: Set[str] = {
+    "order", "orders:history", "customer", "address", "product", "quote",
+}
+
+_WILDCARDS = "*?["
+
+
+def register_versioned_namespace(namespace: str) -> None:
+    """Registra un namespace (es. "orders:list") come invalidabile per versione."""
+    _versioned_namespaces.add(namespace)
+
+
+def get_versioned_namespaces() -> Set[str]:
+    """Namespace registrati come versionati"""
+    return set(_versioned_namespaces)
+
+
+def register_tagged_family(family: str) -> None:
+    """Registra una famiglia di chiavi per entità (es. "order") come invalidabile per tag."""
+    _tagged_families.add(family)
+
+
+def namespace_for_key(key: str) -> Optional[str]:
+    """
+    Namespace versionato che copre chiave o pattern (es. "orders:list:user_1:*" -> "orders:list").
+
+    Se più namespace corrispondono viene scelto il più specifico.
+    """
+    matches = [
+        ns for ns in _versioned_namespaces
+        if key == ns or key.startswith(f"{ns}:")
+    ]
+    return max(matches, key=len) if matches else None
+
+
+def tag_for_key(key: str) -> Optional[str]:
+    """
+    Tag dell'entità di una chiave o pattern per entità (es. "order:*:42" -> "order:42").
+
+    Serve almeno un segmento (tenant) tra famiglia e id; l'id non può contenere wildcard.
+    """
+    entity_id = key.rsplit(":", 1)[-1]
+    if not entity_id or any(c in entity_id for c in _WILDCARDS):
+        return None
+    matches = [
+        family for family in _tagged_families
+        if key.startswith(f"{family}:") and key.count(":") > family.count(":") + 1
+    ]
+    return f"{max(matches, key=len)}:{entity_id}" if matches else None
+
+
+class _KeyLock:
+    """Lock per chiave con conteggio degli utilizzatori (rimosso quando non serve più)."""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
 class CacheManager:
     """
     Multilayer cache manager with Redis + in-memory support
@@ -34,7 +112,17 @@ class CacheManager:
         self.settings = get_cache_settings()
         self._redis_client: Optional[aioredis.Redis] = None
         self._memory_cache: Optional[TTLCache] = None
-        self._lock_cache: Dict[str, asyncio.Lock] = {}
+        # Lock single-flight per chiave: esistono solo finché qualcuno li usa
+        self._lock_cache: Dict[str, _KeyLock] = {}
+        # Caricamenti in corso per chiave (request coalescing) e refresh SWR in background
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Versioni dei namespace: memo locale (fonte di verità su Redis quando disponibile)
+        self._namespace_versions: Dict[str, int] = {}
+        # Coerenza L1 tra processi (modalità hybrid): canale Redis pub/sub di invalidazione
+        self._instance_id = uuid.uuid4().hex
+        self._invalidation_channel = f"{self.settings.cache_key_salt}:cache:invalidate"
+        self._pubsub_task: Optional[asyncio.Task] = None
+        self._l1_coherent = False
         self._circuit_breaker = CircuitBreaker(
             error_threshold=self.settings.cache_error_threshold,
             recovery_timeout=self.settings.cache_recovery_timeout
@@ -50,7 +138,7 @@ class CacheManager:
         if self.settings.cache_backend in ["memory", "hybrid"]:
             self._memory_cache = TTLCache(
                 maxsize=self.settings.cache_max_mem_items,
-                ttl=self.settings.cache_default_ttl
+                ttl=self.settings.cache_memory_ttl or self.settings.cache_default_ttl
             )
             logger.info(f"Memory cache initialized with {self.settings.cache_max_mem_items} max items")
         
@@ -75,9 +163,21 @@ class CacheManager:
                 self._redis_client = None
                 if self.settings.cache_backend == "redis":
                     self.settings.cache_backend = "memory"
+        
+        # L1 + Redis: ascolta le invalidazioni degli altri worker
+        if (self._redis_client and self._memory_cache is not None
+                and self.settings.cache_l1_pubsub_enabled):
+            self._pubsub_task = asyncio.create_task(self._listen_invalidations())
     
     async def close(self) -> None:
         """Close cache connections"""
+        if self._pubsub_task:
+            self._pubsub_task.cancel()
+            try:
+                await self._pubsub_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._pubsub_task = None
         if self._redis_client:
             await self._redis_client.close()
         logger.info("Cache connections closed")
@@ -97,6 +197,16 @@ class CacheManager:
         
         return key
     
+    def _l1_active(self) -> bool:
+        """
+        L1 in memoria utilizzabile: sempre con backend "memory", in modalità hybrid
+        solo mentre il canale di invalidazione è sottoscritto (altrimenti gli altri
+        worker non potrebbero invalidarlo).
+        """
+        if self._memory_cache is None:
+            return False
+        return self.settings.cache_backend == "memory" or self._l1_coherent
+    
     def _get_ttl(self, ttl: Optional[int] = None, preset: Optional[str] = None) -> int:
         """Get TTL value from preset or parameter"""
         if ttl is not None:
@@ -112,7 +222,7 @@ class CacheManager:
             
         try:
             with self._circuit_breaker:
-                if layer in ["auto", "memory", "hybrid"] and self._memory_cache:
+                if layer in ["auto", "memory", "hybrid"] and self._l1_active():
                     # Try memory cache first
                     value = self._memory_cache.get(key)
                     if value is not None:
@@ -132,7 +242,7 @@ class CacheManager:
                         logger.debug(f"Redis cache hit: {key}")
                         
                         # Populate memory cache if available
-                        if self._memory_cache and layer in ["auto", "hybrid"]:
+                        if self._l1_active() and layer in ["auto", "hybrid"]:
                             self._memory_cache[key] = serialized
                         
                         return value
@@ -163,7 +273,7 @@ class CacheManager:
                 success = True
                 
                 # Set in memory cache
-                if layer in ["auto", "memory", "hybrid"] and self._memory_cache:
+                if layer in ["auto", "memory", "hybrid"] and self._l1_active():
                     try:
                         self._memory_cache[key] = serialized
                         logger.debug(f"Memory cache set: {key} -> {len(serialized)} bytes")
@@ -175,11 +285,16 @@ class CacheManager:
                 if layer in ["auto", "redis", "hybrid"] and self._redis_client:
                     try:
                         await self._redis_client.setex(key, ttl_seconds, serialized)
+                        tag = tag_for_key(key)
+                        if tag:
+                            # Le entry di una famiglia condividono il TTL: il set scade con loro
+                            await self._redis_client.sadd(self._tag_key(tag), key)
+                            await self._redis_client.expire(self._tag_key(tag), ttl_seconds)
                         logger.info(f"Cache SET for key: {key} (TTL: {ttl_seconds}s)")
                     except Exception as e:
                         logger.error(f"Redis cache set error for {key}: {e}")
                         success = False
-                elif layer in ["auto", "memory"] and self._memory_cache:
+                elif layer in ["auto", "memory"] and self._l1_active():
                     # If only memory cache, log here
                     logger.info(f"Cache SET for key: {key} (TTL: {ttl_seconds}s)")
                 
@@ -199,13 +314,16 @@ class CacheManager:
             success = True
             
             # Delete from memory cache
-            if layer in ["auto", "memory", "hybrid"] and self._memory_cache:
+            if layer in ["auto", "memory", "hybrid"] and self._memory_cache is not None:
                 self._memory_cache.pop(key, None)
             
             # Delete from Redis cache
             if layer in ["auto", "redis", "hybrid"] and self._redis_client:
                 await self._redis_client.delete(key)
             
+            # Gli altri worker rimuovono la chiave dal proprio L1
+            await self._publish_invalidation("delete", key=key)
+            
             logger.debug(f"Cache delete: {key}")
             return success
             
@@ -213,55 +331,240 @@ class CacheManager:
             logger.error(f"Cache delete error for key {key}: {e}")
             return False
     
+    def _namespace_version_key(self, namespace: str) -> str:
+        return f"{self.settings.cache_key_salt}:nsver:{namespace}"
+
+    async def get_namespace_version(self, namespace: str) -> int:
+        """
+        Versione corrente del namespace (0 se mai invalidato).
+
+        Con il canale di invalidazione attivo la versione già nota è aggiornata
+        via pub/sub e non serve rileggerla da Redis a ogni lettura.
+        """
+        if self._l1_coherent and namespace in self._namespace_versions:
+            return self._namespace_versions[namespace]
+        if self._redis_client:
+            try:
+                value = await self._redis_client.get(self._namespace_version_key(namespace))
+                version = int(value) if value else 0
+                self._namespace_versions[namespace] = version
+                return version
+            except Exception as e:
+                logger.error(f"Namespace version read error for {namespace}: {e}")
+        return self._namespace_versions.get(namespace, 0)
+
+    async def versioned_key(self, key: str, namespace: str) -> str:
+        """Chiave effettiva di una entry appartenente a un namespace versionato"""
+        version = await self.get_namespace_version(namespace)
+        return f"{key}|v{version}"
+
+    async def invalidate_namespace(self, namespace: str) -> int:
+        """
+        Invalida tutte le entry del namespace incrementando atomicamente la sua versione.
+
+        Le entry precedenti non vengono cancellate: diventano irraggiungibili e
+        scadono per TTL (Redis) o LRU/TTL (memoria).
+        """
+        version = None
+        if self._redis_client:
+            try:
+                version = int(await self._redis_client.incr(self._namespace_version_key(namespace)))
+            except Exception as e:
+                logger.error(f"Namespace version bump error for {namespace}: {e}")
+        if version is None:
+            version = self._namespace_versions.get(namespace, 0) + 1
+        self._namespace_versions[namespace] = version
+        await self._publish_invalidation("namespace", namespace=namespace, version=version)
+        logger.info(f"Cache namespace invalidated: {namespace} -> v{version}")
+        return version
+
+    def namespace_for_pattern(self, pattern: str) -> Optional[str]:
+        """Namespace versionato che copre il pattern (vedi `namespace_for_key`)"""
+        return namespace_for_key(pattern)
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.settings.cache_key_salt}:tag:{tag}"
+
+    async def invalidate_tag(self, tag: str, pattern: str, layer: str = "auto") -> int:
+        """
+        Elimina le chiavi registrate sotto il tag dell'entità (es. "order:42").
+
+        Il set del tag viene letto e rimosso nella stessa transazione: le chiavi
+        scritte dopo finiscono in un set nuovo. L'L1 viene ripulito con il pattern,
+        sulle sole chiavi locali come in `delete_pattern`.
+        """
+        total_deleted = 0
+        if layer in ["auto", "redis", "hybrid"] and self._redis_client:
+            try:
+                async with self._redis_client.pipeline(transaction=True) as pipe:
+                    pipe.smembers(self._tag_key(tag))
+                    pipe.unlink(self._tag_key(tag))
+                    members, _ = await pipe.execute()
+                if members:
+                    total_deleted += await self._redis_client.unlink(*members)
+            except Exception as e:
+                logger.error(f"Cache tag invalidation error for {tag}: {e}")
+        
+        if layer in ["auto", "memory", "hybrid"] and self._memory_cache:
+            total_deleted += self._evict_memory_pattern(pattern)
+        
+        await self._publish_invalidation("pattern", pattern=pattern)
+        logger.debug(f"Cache tag invalidated: {tag} ({total_deleted} keys)")
+        return total_deleted
+
+    async def invalidate(self, pattern: str, layer: str = "auto") -> int:
+        """
+        Invalida le chiavi descritte dal pattern.
+
+        Se il pattern ricade in un namespace versionato basta incrementarne la
+        versione; se descrive una famiglia per entità ("order:*:42") si eliminano
+        le chiavi del tag. Solo gli altri pattern ricadono su `delete_pattern`
+        (SCAN). Restituisce il numero di chiavi eliminate (0 per l'invalidazione
+        per versione).
+        """
+        if not self.settings.cache_enabled:
+            return 0
+        namespace = self.namespace_for_pattern(pattern)
+        if namespace:
+            await self.invalidate_namespace(namespace)
+            return 0
+        if not any(c in pattern for c in _WILDCARDS):
+            await self.delete(pattern, layer)
+            return 1
+        tag = tag_for_key(pattern)
+        if tag:
+            return await self.invalidate_tag(tag, pattern, layer)
+        return await self.delete_pattern(pattern, layer)
+
     async def delete_pattern(self, pattern: str, layer: str = "auto") -> int:
-        """Delete keys matching pattern"""
+        """
+        Delete keys matching pattern (fallback: scansione incrementale).
+
+        Redis: SCAN a blocchi di `cache_scan_batch_size` + UNLINK, senza bloccare il
+        server come KEYS. Le chiavi di versione dei namespace non vengono mai
+        rimosse (una versione già usata potrebbe ricomparire).
+        """
         if not self.settings.cache_enabled:
             return 0
         
         total_deleted = 0
+        batch_size = self.settings.cache_scan_batch_size
+        version_prefix = f"{self.settings.cache_key_salt}:nsver:".encode()
         
         # Delete from Redis cache
         if layer in ["auto", "redis", "hybrid"] and self._redis_client:
             try:
-                keys = await self._redis_client.keys(pattern)
-                if keys:
-                    deleted = await self._redis_client.delete(*keys)
-                    logger.info(f"Deleted {deleted} keys from Redis matching pattern: {pattern}")
-                    total_deleted += deleted
+                batch = []
+                async for key in self._redis_client.scan_iter(match=pattern, count=batch_size):
+                    raw_key = key if isinstance(key, bytes) else str(key).encode()
+                    if raw_key.startswith(version_prefix):
+                        continue
+                    batch.append(key)
+                    if len(batch) >= batch_size:
+                        total_deleted += await self._redis_client.unlink(*batch)
+                        batch = []
+                if batch:
+                    total_deleted += await self._redis_client.unlink(*batch)
+                if total_deleted:
+                    logger.info(f"Deleted {total_deleted} keys from Redis matching pattern: {pattern}")
             except Exception as e:
                 logger.error(f"Cache delete pattern error for {pattern}: {e}")
         
-        # Delete from memory cache (limited support - only exact matches or prefix matches)
+        # Delete from memory cache (scansione delle sole chiavi locali, limitate da maxsize)
         if layer in ["auto", "memory", "hybrid"] and self._memory_cache:
             try:
-                # TTLCache doesn't support pattern matching, so we try to match common patterns
-                # Convert Redis pattern to Python regex-like matching
-                import re
-                # Convert Redis pattern (*) to regex
-                regex_pattern = pattern.replace("*", ".*")
-                regex = re.compile(f"^{regex_pattern}$")
-                
-                # Get all keys from memory cache (this is a limitation of TTLCache)
-                # We can only iterate if we have access to the internal dict
-                keys_to_delete = []
-                if hasattr(self._memory_cache, 'data'):
-                    # TTLCache stores data in .data attribute
-                    for key in list(self._memory_cache.data.keys()):
-                        if regex.match(key):
-                            keys_to_delete.append(key)
-                
-                # Delete matched keys
-                for key in keys_to_delete:
-                    self._memory_cache.pop(key, None)
-                    total_deleted += 1
-                
-                if keys_to_delete:
-                    logger.info(f"Deleted {len(keys_to_delete)} keys from memory cache matching pattern: {pattern}")
+                deleted = self._evict_memory_pattern(pattern)
+                total_deleted += deleted
+                if deleted:
+                    logger.info(f"Deleted {deleted} keys from memory cache matching pattern: {pattern}")
             except Exception as e:
                 logger.error(f"Memory cache delete pattern error for {pattern}: {e}")
-            
+        
+        await self._publish_invalidation("pattern", pattern=pattern)
         return total_deleted
     
+    async def clear_memory(self) -> None:
+        """Svuota l'L1 di questo processo e di tutti gli altri worker"""
+        if self._memory_cache is not None:
+            self._memory_cache.clear()
+        await self._publish_invalidation("clear")
+    
+    def _evict_memory_pattern(self, pattern: str) -> int:
+        keys_to_delete = [
+            key for key in list(self._memory_cache.keys())
+            if isinstance(key, str) and fnmatch.fnmatchcase(key, pattern)
+        ]
+        for key in keys_to_delete:
+            self._memory_cache.pop(key, None)
+        return len(keys_to_delete)
+    
+    async def _publish_invalidation(self, op: str, **payload) -> None:
+        """Pubblica un'invalidazione sul canale L1 (solo se più livelli sono attivi)"""
+        if not (self._redis_client and self._memory_cache is not None
+                and self.settings.cache_l1_pubsub_enabled):
+            return
+        message = {"op": op, "origin": self._instance_id, **payload}
+        try:
+            await self._redis_client.publish(self._invalidation_channel, orjson.dumps(message))
+        except Exception as e:
+            logger.error(f"Cache invalidation publish error ({op}): {e}")
+    
+    def _apply_remote_invalidation(self, data: bytes) -> None:
+        """Applica all'L1 locale un'invalidazione ricevuta da un altro worker"""
+        try:
+            message = orjson.loads(data)
+        except Exception:
+            logger.warning("Messaggio di invalidazione cache non valido")
+            return
+        if message.get("origin") == self._instance_id:
+            return
+        
+        op = message.get("op")
+        if op == "namespace":
+            namespace = message["namespace"]
+            self._namespace_versions[namespace] = max(
+                self._namespace_versions.get(namespace, 0), int(message["version"])
+            )
+            return
+        if self._memory_cache is None:
+            return
+        if op == "delete":
+            self._memory_cache.pop(message["key"], None)
+        elif op == "pattern":
+            self._evict_memory_pattern(message["pattern"])
+        elif op == "clear":
+            self._memory_cache.clear()
+    
+    def _reset_local_state(self) -> None:
+        """Senza canale non si possono escludere invalidazioni perse: riparte da L1 vuoto"""
+        self._l1_coherent = False
+        self._namespace_versions.clear()
+        if self._memory_cache is not None:
+            self._memory_cache.clear()
+    
+    async def _listen_invalidations(self) -> None:
+        """Sottoscrizione al canale di invalidazione con riconnessione automatica"""
+        while True:
+            pubsub = self._redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self._invalidation_channel)
+                self._l1_coherent = True
+                logger.info(f"L1 cache invalidation channel subscribed: {self._invalidation_channel}")
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_remote_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"L1 cache invalidation channel error: {e}")
+            finally:
+                self._reset_local_state()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(self.settings.cache_pubsub_reconnect_delay)
+    
     async def try_acquire_lock(self, key: str, ttl: int = 60) -> bool:
         """Try to acquire distributed lock"""
         if not self._redis_client:
@@ -297,19 +600,60 @@ class CacheManager:
     @asynccontextmanager
     async def single_flight(self, key: str, ttl: int = 60):
         """Single-flight context manager to prevent duplicate operations"""
-        # Process-level lock
-        if key not in self._lock_cache:
-            self._lock_cache[key] = asyncio.Lock()
+        # Process-level lock (rimosso dall'indice quando l'ultimo utilizzatore esce)
+        key_lock = self._lock_cache.get(key)
+        if key_lock is None:
+            key_lock = self._lock_cache[key] = _KeyLock()
+        key_lock.users += 1
         
-        async with self._lock_cache[key]:
-            # Try distributed lock
-            if await self.try_acquire_lock(key, ttl):
-                try:
-                    yield True  # Lock acquired
-                finally:
-                    await self.release_lock(key)
-            else:
-                yield False  # Another instance is handling this
+        try:
+            async with key_lock.lock:
+                # Try distributed lock
+                if await self.try_acquire_lock(key, ttl):
+                    try:
+                        yield True  # Lock acquired
+                    finally:
+                        await self.release_lock(key)
+                else:
+                    yield False  # Another instance is handling this
+        finally:
+            key_lock.users -= 1
+            if key_lock.users == 0 and self._lock_cache.get(key) is key_lock:
+                del self._lock_cache[key]
+    
+    def _start_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Avvia (o riusa) il caricamento in corso per la chiave"""
+        task = self._inflight.get(key)
+        if task is not None:
+            return task
+        task = asyncio.ensure_future(loader())
+        self._inflight[key] = task
+        
+        def _done(t: asyncio.Task) -> None:
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+            if not t.cancelled() and t.exception() is not None:
+                logger.debug(f"Cache load failed for {key}: {t.exception()}")
+        
+        task.add_done_callback(_done)
+        return task
+    
+    async def coalesce(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Request coalescing: le chiamate concorrenti sulla stessa chiave condividono
+        un unico caricamento (un solo accesso al DB per i miss simultanei).
+        
+        Il caricamento non viene annullato se il chiamante che l'ha avviato viene
+        cancellato: gli altri in attesa ricevono comunque il risultato.
+        """
+        return await asyncio.shield(self._start_load(key, loader))
+    
+    def refresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]]) -> bool:
+        """Avvia un refresh in background se non ce n'è già uno in corso per la chiave"""
+        if key in self._inflight:
+            return False
+        self._start_load(key, loader)
+        return True
     
     def _serialize(self, value: Any) -> bytes:
         """Serialize value to bytes"""
@@ -355,14 +699,17 @@ class CacheManager:
         stats = {
             "enabled": self.settings.cache_enabled,
             "backend": self.settings.cache_backend,
-            "circuit_breaker": self._circuit_breaker.get_status()
+            "circuit_breaker": self._circuit_breaker.get_status(),
+            "inflight_loads": len(self._inflight),
+            "single_flight_locks": len(self._lock_cache)
         }
         
-        if self._memory_cache:
+        if self._memory_cache is not None:
             stats["memory"] = {
                 "size": len(self._memory_cache),
                 "max_size": self._memory_cache.maxsize,
-                "ttl": self._memory_cache.ttl
+                "ttl": self._memory_cache.ttl,
+                "l1_coherent": self._l1_coherent
             }
         
         if self._redis_client:
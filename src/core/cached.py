@@ -6,12 +6,13 @@ import asyncio
 import hashlib
 import inspect
 import logging
+import time
 from functools import wraps
-from typing import Any, Callable, Dict, Optional, Union, List
+from typing import Any, AsyncContextManager, Callable, Dict, Optional, Tuple, Union, List
 from datetime import datetime
 
-from .cache import get_cache_manager, CacheError
-from .settings import get_cache_settings, TTL_PRESETS
+from .cache import get_cache_manager, register_versioned_namespace, namespace_for_key, CacheError
+from .settings import get_cache_settings, TTL_PRESETS, STALE_TTL_PRESETS
 
 logger = logging.getLogger(__name__)
 
@@ -22,9 +23,11 @@ def cached(
     key: Optional[Union[str, Callable]] = None,
     layer: str = "auto",
     stale_ttl: Optional[int] = None,
+    background_refresh: Union[bool, Callable[[tuple, dict], AsyncContextManager[Tuple[tuple, dict]]]] = False,
     single_flight: bool = False,
     skip_cache: bool = False,
     tenant_from_user: bool = True,
+    namespace: Optional[str] = None,
     **kwargs
 ):
     """
@@ -35,10 +38,23 @@ def cached(
         preset: TTL preset name (from TTL_PRESETS)
         key: Cache key template or function to generate key
         layer: Cache layer ("auto", "memory", "redis")
-        stale_ttl: TTL for stale-while-revalidate pattern
-        single_flight: Prevent concurrent execution of same key
+        stale_ttl: Finestra (secondi) in cui, scaduto il TTL, il valore viene ancora
+            servito mentre un solo task in background lo ricalcola. Default: da
+            STALE_TTL_PRESETS per il preset indicato (nessuna finestra se assente).
+            Attiva solo con `background_refresh`
+        background_refresh: Come eseguire il ricalcolo in background della finestra
+            stale. False (default): nessuno stale-while-revalidate, perché il refresh
+            sopravvive alla richiesta e non può usarne la sessione DB. True: la
+            funzione non dipende da risorse della richiesta e viene richiamata con gli
+            stessi argomenti. Callable (args, kwargs) -> async context manager che
+            restituisce (args, kwargs) per il refresh, es. `self` legato a una sessione
+            propria, chiusa a fine refresh
+        single_flight: Oltre al coalescing in-process, serializza il calcolo tra istanze (lock Redis)
         skip_cache: Skip cache for this call (useful for testing)
         tenant_from_user: Extract tenant from user context
+        namespace: Namespace versionato della chiave (es. "orders:list"): l'invalidazione
+            di pattern che ricadono nel namespace incrementa la versione (O(1)).
+            Default: il namespace registrato che copre la chiave, se esiste
         **kwargs: Additional parameters for key generation
     
     Examples:
@@ -46,7 +62,7 @@ def cached(
         async def get_customer(customer_id: int):
             pass
         
-        @cached(preset="orders_list", key="orders:list:{tenant}:{qhash}")
+        @cached(preset="orders_list", key="orders:list:{tenant}:{qhash}", namespace="orders:list")
         async def get_orders_list(tenant: str, filters: dict):
             pass
     """
@@ -54,6 +70,8 @@ def cached(
     def decorator(func: Callable) -> Callable:
         if not inspect.iscoroutinefunction(func):
             raise ValueError("cached decorator only works with async functions")
+        if namespace:
+            register_versioned_namespace(namespace)
         
         @wraps(func)
         async def wrapper(*args, **func_kwargs):
@@ -71,44 +89,49 @@ def cached(
                 return await func(*args, **func_kwargs)
             
             cache_manager = await get_cache_manager()
+            key_namespace = namespace or namespace_for_key(cache_key)
+            if key_namespace:
+                cache_key = await cache_manager.versioned_key(cache_key, key_namespace)
             
-            # Single-flight pattern
-            if single_flight:
-                async with cache_manager.single_flight(cache_key):
-                    # Check cache after acquiring lock
-                    cached_result = await cache_manager.get(cache_key, layer)
-                    if cached_result is not None:
-                        logger.info(f"Single-flight cache HIT for {func.__name__} with key: {cache_key}")
-                        return cached_result
-                    
-                    # Execute function
-                    result = await func(*args, **func_kwargs)
-                    await cache_manager.set(cache_key, result, ttl, preset, layer)
-                    return result
+            fresh_ttl = cache_manager._get_ttl(ttl, preset)
+            stale_window = None
+            if background_refresh:
+                stale_window = stale_ttl if stale_ttl is not None else STALE_TTL_PRESETS.get(preset)
             
-            # Stale-while-revalidate pattern
-            if stale_ttl:
-                return await _stale_while_revalidate(
-                    cache_manager, cache_key, func, args, func_kwargs, 
-                    ttl, preset, layer, stale_ttl
+            async def load(call_args: tuple = args, call_kwargs: dict = func_kwargs):
+                if single_flight:
+                    # Lock distribuito: un'altra istanza potrebbe aver appena popolato la chiave
+                    async with cache_manager.single_flight(cache_key):
+                        cached_result = await _get_cached_value(cache_manager, cache_key, layer, stale_window)
+                        if cached_result is not _MISS:
+                            return cached_result
+                        return await _load_and_store(
+                            cache_manager, cache_key, func, call_args, call_kwargs, fresh_ttl, layer, stale_window
+                        )
+                return await _load_and_store(
+                    cache_manager, cache_key, func, call_args, call_kwargs, fresh_ttl, layer, stale_window
                 )
             
-            # Standard read-through pattern
+            async def refresh():
+                if background_refresh is True:
+                    return await load()
+                # Argomenti propri del refresh: mai la sessione della richiesta, già chiusa o in uso
+                async with background_refresh(args, func_kwargs) as (refresh_args, refresh_kwargs):
+                    return await load(refresh_args, refresh_kwargs)
+            
             try:
-                # Try to get from cache
+                # Stale-while-revalidate pattern
+                if stale_window:
+                    return await _stale_while_revalidate(cache_manager, cache_key, load, refresh, layer)
+                
+                # Read-through con request coalescing sui miss
                 cached_result = await cache_manager.get(cache_key, layer)
                 if cached_result is not None:
                     logger.info(f"Cache HIT for {func.__name__} with key: {cache_key}")
                     return cached_result
                 
-                # Cache miss - execute function
                 logger.info(f"Cache MISS for {func.__name__} with key: {cache_key}")
-                result = await func(*args, **func_kwargs)
-                
-                # Store in cache
-                await cache_manager.set(cache_key, result, ttl, preset, layer)
-                
-                return result
+                return await cache_manager.coalesce(cache_key, load)
                 
             except CacheError as e:
                 logger.error(f"Cache error in {func.__name__}: {e}")
@@ -125,62 +148,62 @@ def cached(
     return decorator
 
 
-async def _stale_while_revalidate(
-    cache_manager, cache_key: str, func: Callable, args: tuple, 
-    func_kwargs: dict, ttl: Optional[int], preset: Optional[str], 
-    layer: str, stale_ttl: int
+# Sentinella per distinguere un miss da un valore in cache
+_MISS = object()
+
+
+def _swr_entry(value: Any, fresh_ttl: int) -> Dict[str, Any]:
+    """Envelope SWR: valore + istante fino al quale è considerato fresco"""
+    return {"__swr__": 1, "value": value, "fresh_until": time.time() + fresh_ttl}
+
+
+def _is_swr_entry(entry: Any) -> bool:
+    return isinstance(entry, dict) and entry.get("__swr__") == 1 and "fresh_until" in entry
+
+
+async def _get_cached_value(cache_manager, cache_key: str, layer: str, stale_window: Optional[int]) -> Any:
+    """Valore in cache (fresco o stale) oppure _MISS"""
+    entry = await cache_manager.get(cache_key, layer)
+    if entry is None:
+        return _MISS
+    if stale_window:
+        return entry["value"] if _is_swr_entry(entry) else _MISS
+    return entry
+
+
+async def _load_and_store(
+    cache_manager, cache_key: str, func: Callable, args: tuple, func_kwargs: dict,
+    fresh_ttl: int, layer: str, stale_window: Optional[int]
 ):
-    """Implement stale-while-revalidate pattern"""
-    
-    # Try to get fresh value
-    fresh_result = await cache_manager.get(cache_key, layer)
-    if fresh_result is not None:
-        logger.info(f"Fresh cache HIT: {cache_key}")
-        return fresh_result
-    
-    # Try to get stale value
-    stale_key = f"stale:{cache_key}"
-    stale_result = await cache_manager.get(stale_key, layer)
-    
-    # Start background refresh if we have stale data
-    if stale_result is not None:
-        logger.info(f"Serving stale data: {cache_key} -> Background refresh started")
-        # Schedule background refresh
-        asyncio.create_task(_background_refresh(
-            cache_manager, cache_key, stale_key, func, args, func_kwargs, 
-            ttl, preset, layer, stale_ttl
-        ))
-        return stale_result
-    
-    # No cache data - execute synchronously
-    logger.info(f"Cache MISS (SWR): {cache_key} -> Executing function")
+    """Esegue la funzione e salva il risultato (in envelope SWR se c'è una finestra stale)"""
     result = await func(*args, **func_kwargs)
-    
-    # Store both fresh and stale
-    await cache_manager.set(cache_key, result, ttl, preset, layer)
-    await cache_manager.set(stale_key, result, stale_ttl, layer=layer)
-    
+    if stale_window:
+        # La entry resta in cache per fresh + stale; la freschezza è nell'envelope
+        await cache_manager.set(cache_key, _swr_entry(result, fresh_ttl), fresh_ttl + stale_window, layer=layer)
+    else:
+        await cache_manager.set(cache_key, result, fresh_ttl, layer=layer)
     return result
 
 
-async def _background_refresh(
-    cache_manager, cache_key: str, stale_key: str, func: Callable, 
-    args: tuple, func_kwargs: dict, ttl: Optional[int], preset: Optional[str], 
-    layer: str, stale_ttl: int
-):
-    """Background refresh for stale-while-revalidate"""
-    try:
-        logger.debug(f"Background refresh: {cache_key}")
-        result = await func(*args, **func_kwargs)
-        
-        # Update both fresh and stale cache
-        await cache_manager.set(cache_key, result, ttl, preset, layer)
-        await cache_manager.set(stale_key, result, stale_ttl, layer=layer)
-        
-        logger.debug(f"Background refresh completed: {cache_key}")
+async def _stale_while_revalidate(cache_manager, cache_key: str, load: Callable, refresh: Callable, layer: str):
+    """
+    Stale-while-revalidate: entry fresca -> restituita; entry scaduta ma nella
+    finestra stale -> restituita subito e ricalcolata da un solo task in background
+    (`refresh`, con risorse proprie); nessuna entry -> caricamento sincrono
+    condiviso tra le richieste concorrenti.
+    """
+    entry = await cache_manager.get(cache_key, layer)
+    if _is_swr_entry(entry):
+        if time.time() < entry["fresh_until"]:
+            logger.info(f"Fresh cache HIT: {cache_key}")
+            return entry["value"]
         
-    except Exception as e:
-        logger.error(f"Background refresh failed for {cache_key}: {e}")
+        if cache_manager.refresh_in_background(cache_key, refresh):
+            logger.info(f"Serving stale data: {cache_key} -> Background refresh started")
+        return entry["value"]
+    
+    logger.info(f"Cache MISS (SWR): {cache_key} -> Executing function")
+    return await cache_manager.coalesce(cache_key, load)
 
 
 def _generate_cache_key(
@@ -319,9 +342,9 @@ async def _invalidate_function_cache(
 # Utility functions for manual cache operations
 
 async def invalidate_pattern(pattern: str, layer: str = "auto") -> int:
-    """Invalidate all keys matching pattern"""
+    """Invalidate all keys matching pattern (per versione se il pattern è in un namespace versionato)"""
     cache_manager = await get_cache_manager()
-    return await cache_manager.delete_pattern(pattern, layer)
+    return await cache_manager.invalidate(pattern, layer)
 
 
 async def invalidate_entity(entity_type: str, entity_id: Union[int, str], tenant: Optional[str] = None) -> int:
@@ -373,12 +396,12 @@ class CacheContext:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if exc_type is None and self.patterns:  # Only invalidate on success
             for pattern in self.patterns:
-                await self.cache_manager.delete_pattern(pattern)
+                await self.cache_manager.invalidate(pattern)
     
     async def invalidate(self, pattern: str):
         """Invalidate cache pattern"""
         if self.cache_manager:
-            await self.cache_manager.delete_pattern(pattern)
+            await self.cache_manager.invalidate(pattern)
 
 
 # Decorator for cache invalidation on commit
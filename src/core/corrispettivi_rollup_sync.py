@@ -0,0 +1,183 @@
+"""
+Invalidazione del rollup giornaliero dei corrispettivi (corrispettivi_daily_rollup).
+
+I listener di sessione raccolgono in `after_flush` ordini, righe, spedizioni,
+indirizzi, ricevute e documenti fiscali i cui campi entrano negli aggregati; in
+`before_commit` risalgono ai giorni interessati (data ordine, emissione ricevute,
+data resi) e li rimuovono dal rollup nella stessa transazione. I giorni rimossi
+vengono ricalcolati alla prima lettura (CorrispettivoRollupRepository.ensure_days);
+i giorni di periodi chiusi (`locked`) non vengono toccati.
+
+I percorsi bulk che scrivono con `bulk_save_objects`/SQL raw (import CSV,
+sincronizzazione PrestaShop) devono chiamare `queue_corrispettivi_rollup_refresh`
+prima del commit.
+"""
+import logging
+from datetime import date, datetime, timezone
+from typing import Iterable, Optional, Set
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from src.models.address import Address
+from src.models.fiscal_document import FiscalDocument
+from src.models.fiscal_document_detail import FiscalDocumentDetail
+from src.models.order import Order
+from src.models.order_detail import OrderDetail
+from src.models.ricevuta import Ricevuta
+from src.models.shipping import Shipping
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "corrispettivi_rollup_pending"
+ROME = ZoneInfo("Europe/Rome")
+
+# Attributi che entrano negli aggregati corrispettivi, per entità
+_ROLLUP_ATTRIBUTES = {
+    Order: (
+        "date_add", "is_payed", "id_address_delivery", "id_shipping",
+        "total_price_with_tax", "total_price_net",
+        "products_total_price_with_tax", "products_total_price_net",
+    ),
+    OrderDetail: ("id_order", "id_order_document", "id_tax", "total_price_with_tax"),
+    Shipping: ("id_tax", "price_tax_incl"),
+    Address: ("id_country",),
+    Ricevuta: ("id_order", "stato", "data_emissione"),
+    FiscalDocument: (
+        "id_order", "document_type", "date_add", "includes_shipping",
+        "total_price_with_tax", "total_price_net",
+        "products_total_price_with_tax", "products_total_price_net",
+    ),
+    FiscalDocumentDetail: ("id_fiscal_document", "id_tax", "total_price_with_tax"),
+}
+
+# Attributi data il cui valore precedente individua un giorno da invalidare
+_DATE_ATTRIBUTES = {
+    Order: "date_add",
+    Ricevuta: "data_emissione",
+    FiscalDocument: "date_add",
+}
+
+_registered = False
+
+
+def rollup_days_for(value: Optional[datetime]) -> Set[date]:
+    """
+    Giorni del rollup toccati da un datetime UTC naive.
+
+    Il giorno corrispettivi è quello Europe/Rome (CONVERT_TZ), con fallback sulla
+    data UTC: si invalidano entrambi.
+    """
+    if value is None:
+        return set()
+    if not isinstance(value, datetime):
+        return {value}
+    local_day = value.replace(tzinfo=timezone.utc).astimezone(ROME).date()
+    return {value.date(), local_day}
+
+
+def _pending(session: Session) -> dict:
+    return session.info.setdefault(_PENDING_KEY, {
+        "orders": set(), "fiscal_documents": set(), "shippings": set(),
+        "addresses": set(), "days": set(),
+    })
+
+
+def queue_corrispettivi_rollup_refresh(
+    session: Session, order_ids: Iterable[int] = (), *, address_ids: Iterable[int] = ()
+) -> None:
+    """
+    Accoda l'invalidazione dei giorni degli ordini indicati (eseguita al commit).
+
+    `address_ids`: indirizzi il cui paese è cambiato senza passare dall'ORM
+    (UPDATE Core / ON DUPLICATE KEY); si invalidano i giorni degli ordini
+    consegnati a quegli indirizzi.
+    """
+    pending = _pending(session)
+    pending["orders"].update(i for i in order_ids if i)
+    pending["addresses"].update(i for i in address_ids if i)
+
+
+def _has_rollup_changes(obj) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in _ROLLUP_ATTRIBUTES[type(obj)])
+
+
+def _collect(pending: dict, obj, *, deleted: bool = False) -> None:
+    state = inspect(obj)
+    date_attribute = _DATE_ATTRIBUTES.get(type(obj))
+    if date_attribute:
+        # Giorno precedente (data modificata) o giorno del record cancellato
+        values = [getattr(obj, date_attribute)] if deleted else state.attrs[date_attribute].history.deleted
+        for value in values:
+            pending["days"] |= rollup_days_for(value)
+
+    if isinstance(obj, Order):
+        pending["orders"].add(obj.id_order)
+    elif isinstance(obj, (OrderDetail, Ricevuta, FiscalDocument)):
+        pending["orders"].add(obj.id_order)
+        # Record spostato su un altro ordine: invalida anche il precedente
+        previous = state.attrs.id_order.history.deleted
+        pending["orders"].update(i for i in previous if i)
+        if isinstance(obj, FiscalDocument):
+            pending["fiscal_documents"].add(obj.id_fiscal_document)
+    elif isinstance(obj, FiscalDocumentDetail):
+        pending["fiscal_documents"].add(obj.id_fiscal_document)
+    elif isinstance(obj, Shipping):
+        pending["shippings"].add(obj.id_shipping)
+    elif isinstance(obj, Address):
+        pending["addresses"].add(obj.id_address)
+
+
+def _on_after_flush(session: Session, flush_context) -> None:
+    changed = [obj for obj in session.new if type(obj) in _ROLLUP_ATTRIBUTES]
+    changed += [
+        obj for obj in session.dirty
+        if type(obj) in _ROLLUP_ATTRIBUTES and _has_rollup_changes(obj)
+    ]
+    removed = [obj for obj in session.deleted if type(obj) in _ROLLUP_ATTRIBUTES]
+    if not (changed or removed):
+        return
+    pending = _pending(session)
+    for obj in changed:
+        _collect(pending, obj)
+    for obj in removed:
+        _collect(pending, obj, deleted=True)
+
+
+def _on_before_commit(session: Session) -> None:
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    # Import locale: il repository importa i modelli, questo modulo è importato dai repository
+    from src.repository.corrispettivo_rollup_repository import CorrispettivoRollupRepository
+
+    repository = CorrispettivoRollupRepository(session)
+    days = set(pending["days"])
+    for value in repository.resolve_document_datetimes(
+        order_ids=pending["orders"],
+        fiscal_document_ids=pending["fiscal_documents"],
+        shipping_ids=pending["shippings"],
+        address_ids=pending["addresses"],
+    ):
+        days |= rollup_days_for(value)
+    if days:
+        repository.invalidate_days(days)
+
+
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_corrispettivi_rollup_listeners() -> None:
+    """Registra i listener di sessione del rollup corrispettivi (idempotente)."""
+    global _registered
+    if _registered:
+        return
+    event.listen(Session, "after_flush", _on_after_flush)
+    event.listen(Session, "before_commit", _on_before_commit)
+    event.listen(Session, "after_rollback", _on_after_rollback)
+    _registered = True
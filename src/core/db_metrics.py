@@ -0,0 +1,243 @@
+"""
+Metriche del connection pool e delle query database (esposte su /metrics)
+"""
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Bucket (secondi) per l'attesa di checkout dal pool
+CHECKOUT_WAIT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bucket per numero di query per richiesta HTTP
+REQUEST_QUERY_COUNT_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# Bucket (secondi) per il tempo DB totale per richiesta HTTP
+REQUEST_QUERY_TIME_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Istogramma cumulativo in stile Prometheus (thread-safe)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counts = list(self._counts)
+            total_sum, total_count = self._sum, self._count
+        cumulative = []
+        running = 0
+        for bound, c in zip(list(self.buckets) + [float("inf")], counts):
+            running += c
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "sum": total_sum, "count": total_count}
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        snap = self.snapshot()
+        sep = "," if labels else ""
+        lines = []
+        for bound, value in snap["buckets"]:
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {value}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {snap['sum']}")
+        lines.append(f"{name}_count{suffix} {snap['count']}")
+        return lines
+
+
+class RequestDbStats:
+    """Contatori DB della richiesta HTTP corrente (numero query e tempo totale)."""
+
+    __slots__ = ("query_count", "query_time")
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+
+
+_current_request_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("db_request_stats", default=None)
+
+
+class DatabaseMetrics:
+    """Collettore delle metriche di pool e query per gli engine instrumentati."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines: Dict[str, Engine] = {}
+        self._checkout_wait: Dict[str, Histogram] = {}
+        self._checkout_timeouts: Dict[str, int] = {}
+        self._queries_total: Dict[str, int] = {}
+        self._query_seconds_total: Dict[str, float] = {}
+        self.request_query_count = Histogram(REQUEST_QUERY_COUNT_BUCKETS)
+        self.request_query_time = Histogram(REQUEST_QUERY_TIME_BUCKETS)
+
+    def register_engine(self, label: str, engine: Engine) -> None:
+        with self._lock:
+            self._engines[label] = engine
+            self._checkout_wait.setdefault(label, Histogram(CHECKOUT_WAIT_BUCKETS))
+            self._checkout_timeouts.setdefault(label, 0)
+            self._queries_total.setdefault(label, 0)
+            self._query_seconds_total.setdefault(label, 0.0)
+
+    def record_checkout_wait(self, label: str, seconds: float, timed_out: bool = False) -> None:
+        histogram = self._checkout_wait.get(label)
+        if histogram is None:
+            return
+        histogram.observe(seconds)
+        if timed_out:
+            with self._lock:
+                self._checkout_timeouts[label] += 1
+
+    def record_query(self, label: str, seconds: float) -> None:
+        with self._lock:
+            self._queries_total[label] = self._queries_total.get(label, 0) + 1
+            self._query_seconds_total[label] = self._query_seconds_total.get(label, 0.0) + seconds
+        stats = _current_request_stats.get()
+        if stats is not None:
+            stats.query_count += 1
+            stats.query_time += seconds
+
+    def record_request(self, stats: RequestDbStats) -> None:
+        self.request_query_count.observe(stats.query_count)
+        self.request_query_time.observe(stats.query_time)
+
+    def pool_status(self) -> Dict[str, Dict[str, int]]:
+        """Stato live dei pool (solo pool a coda: QueuePool/AsyncAdaptedQueuePool)."""
+        status = {}
+        for label, engine in list(self._engines.items()):
+            pool = engine.pool
+            if not isinstance(pool, QueuePool):
+                continue
+            status[label] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            }
+        return status
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "pools": self.pool_status(),
+            "checkout_wait": {label: h.snapshot() for label, h in self._checkout_wait.items()},
+            "checkout_timeouts": dict(self._checkout_timeouts),
+            "queries_total": dict(self._queries_total),
+            "query_seconds_total": dict(self._query_seconds_total),
+            "request_query_count": self.request_query_count.snapshot(),
+            "request_query_seconds": self.request_query_time.snapshot(),
+        }
+
+    def render_prometheus(self) -> List[str]:
+        lines: List[str] = []
+        for label, values in self.pool_status().items():
+            lines.append(f'db_pool_size{{engine="{label}"}} {values["size"]}')
+            lines.append(f'db_pool_checked_out{{engine="{label}"}} {values["checked_out"]}')
+            lines.append(f'db_pool_checked_in{{engine="{label}"}} {values["checked_in"]}')
+            lines.append(f'db_pool_overflow{{engine="{label}"}} {values["overflow"]}')
+        for label, histogram in self._checkout_wait.items():
+            lines.extend(histogram.render("db_pool_checkout_wait_seconds", f'engine="{label}"'))
+            lines.append(f'db_pool_checkout_timeouts_total{{engine="{label}"}} {self._checkout_timeouts[label]}')
+        for label, total in self._queries_total.items():
+            lines.append(f'db_queries_total{{engine="{label}"}} {total}')
+            lines.append(f'db_query_seconds_total{{engine="{label}"}} {self._query_seconds_total[label]}')
+        lines.extend(self.request_query_count.render("db_request_queries"))
+        lines.extend(self.request_query_time.render("db_request_query_seconds"))
+        return lines
+
+
+_db_metrics: Optional[DatabaseMetrics] = None
+
+
+def get_db_metrics() -> DatabaseMetrics:
+    """Restituisce il collettore globale delle metriche DB."""
+    global _db_metrics
+    if _db_metrics is None:
+        _db_metrics = DatabaseMetrics()
+    return _db_metrics
+
+
+class _CheckoutTimingMixin:
+    """Misura il tempo di attesa per ottenere una connessione dal pool."""
+
+    metrics_label: str = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            # Pool esaurito oltre pool_timeout
+            get_db_metrics().record_checkout_wait(self.metrics_label, time.perf_counter() - start, timed_out=True)
+            raise
+        get_db_metrics().record_checkout_wait(self.metrics_label, time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    """QueuePool con misurazione dell'attesa di checkout (engine sincrono)."""
+
+    metrics_label = "sync"
+
+
+class InstrumentedAsyncAdaptedQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool con misurazione dell'attesa di checkout (engine async)."""
+
+    metrics_label = "async"
+
+
+def instrument_engine(engine: Engine, label: str) -> None:
+    """
+    Registra l'engine nel collettore e aggancia i listener di timing delle query.
+
+    Per un AsyncEngine passare `async_engine.sync_engine`.
+    """
+    metrics = get_db_metrics()
+    metrics.register_engine(label, engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("_query_start_times")
+        if start_times:
+            metrics.record_query(label, time.perf_counter() - start_times.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None:
+            start_times = conn.info.get("_query_start_times")
+            if start_times:
+                start_times.pop()
+
+
+def start_request_tracking() -> Tuple[RequestDbStats, object]:
+    """Avvia il conteggio query/tempo DB per la richiesta corrente."""
+    stats = RequestDbStats()
+    token = _current_request_stats.set(stats)
+    return stats, token
+
+
+def finish_request_tracking(stats: RequestDbStats, token: object) -> None:
+    """Chiude il conteggio della richiesta e lo registra negli istogrammi."""
+    _current_request_stats.reset(token)
+    get_db_metrics().record_request(stats)
@@ -0,0 +1,84 @@
+"""
+Registry dei client HTTP condivisi per le integrazioni esterne.
+
+Un ``httpx.AsyncClient`` persistente per integrazione (fedex, brt, dhl, fatturapa, ...):
+le chiamate riusano connessioni già aperte (keep-alive, HTTP/2 se disponibile) invece di
+pagare DNS + TCP + TLS a ogni richiesta. I client vengono chiusi nel lifespan di main.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import weakref
+from typing import Dict, Optional
+
+import httpx
+
+from .settings import get_http_client_settings
+
+logger = logging.getLogger(__name__)
+
+# Client per event loop: un AsyncClient non può essere usato fuori dal loop che ha
+# aperto le sue connessioni (es. asyncio.run nei dispatch sincroni degli eventi).
+_clients_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 richiede il pacchetto opzionale "h2"."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    settings = get_http_client_settings()
+    http2 = settings.http_client_http2 and _http2_available()
+    logger.debug(f"Creazione client HTTP condiviso '{name}' (http2={http2})")
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            settings.http_client_timeout,
+            connect=settings.http_client_connect_timeout,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.http_client_max_connections,
+            max_keepalive_connections=settings.http_client_max_keepalive_connections,
+            keepalive_expiry=settings.http_client_keepalive_expiry,
+        ),
+        http2=http2,
+    )
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """
+    Restituisce il client HTTP condiviso dell'integrazione ``name``.
+
+    Il client non va chiuso dal chiamante (niente ``async with``); timeout diversi
+    dal default si passano per singola richiesta (``client.post(..., timeout=45.0)``).
+    """
+    loop = asyncio.get_running_loop()
+    clients = _clients_by_loop.setdefault(loop, {})
+    client = clients.get(name)
+    if client is None or client.is_closed:
+        client = _build_client(name)
+        clients[name] = client
+    return client
+
+
+async def close_http_clients(name: Optional[str] = None) -> None:
+    """Chiude i client del loop corrente (tutti, o solo quello di ``name``)."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    clients = _clients_by_loop.get(loop)
+    if not clients:
+        return
+    names = [name] if name is not None else list(clients.keys())
+    for client_name in names:
+        client = clients.pop(client_name, None)
+        if client is None:
+            continue
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Errore chiusura client HTTP '{client_name}': {e}")
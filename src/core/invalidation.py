@@ -56,7 +56,7 @@ class CacheInvalidationManager:
             
             for pattern in patterns:
                 try:
-                    deleted = await self._cache_manager.delete_pattern(pattern)
+                    deleted = await self._cache_manager.invalidate(pattern)
                     logger.debug(f"Invalidated {deleted} keys matching pattern: {pattern}")
                 except Exception as e:
                     logger.error(f"Error invalidating pattern {pattern}: {e}")
@@ -309,17 +309,14 @@ async def invalidate_all_cache():
     """Invalidate all cache (use with caution)"""
     cache_manager = await get_cache_manager()
     
-    # Get all keys and delete them
+    # Delete all keys (SCAN a blocchi, le versioni dei namespace restano)
     if cache_manager._redis_client:
-        keys = await cache_manager._redis_client.keys("*")
-        if keys:
-            await cache_manager._redis_client.delete(*keys)
-            logger.info(f"Invalidated {len(keys)} cache keys")
+        deleted = await cache_manager.delete_pattern("*", layer="redis")
+        logger.info(f"Invalidated {deleted} cache keys")
     
-    # Clear memory cache
-    if cache_manager._memory_cache:
-        cache_manager._memory_cache.clear()
-        logger.info("Cleared memory cache")
+    # Clear memory cache (anche negli altri worker)
+    await cache_manager.clear_memory()
+    logger.info("Cleared memory cache")
 
 
 async def invalidate_tenant_cache(tenant: str):
@@ -333,7 +330,7 @@ async def invalidate_tenant_cache(tenant: str):
     total_deleted = 0
     
     for pattern in patterns:
-        deleted = await cache_manager.delete_pattern(pattern)
+        deleted = await cache_manager.invalidate(pattern)
         total_deleted += deleted
     
     logger.info(f"Invalidated {total_deleted} cache keys for tenant: {tenant}")
@@ -351,7 +348,7 @@ async def invalidate_user_cache(user_id: str):
     total_deleted = 0
     
     for pattern in patterns:
-        deleted = await cache_manager.delete_pattern(pattern)
+        deleted = await cache_manager.invalidate(pattern)
         total_deleted += deleted
     
     logger.info(f"Invalidated {total_deleted} cache keys for user: {user_id}")
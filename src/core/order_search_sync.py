@@ -0,0 +1,157 @@
+"""
+Sincronizzazione dell'indice di ricerca ordini (order_search_index).
+
+I listener di sessione raccolgono in `after_flush` gli ordini il cui testo
+indicizzato può essere cambiato (ordine, righe ordine, indirizzo, cliente,
+spedizione, pagamento, prodotto) e in `before_commit` aggiornano le righe
+indice nella stessa transazione, così indice e dati restano coerenti.
+
+I percorsi bulk che scrivono con `bulk_insert_mappings`/Core (import CSV,
+sincronizzazione PrestaShop) non passano dalla unit of work: devono chiamare
+`queue_order_search_refresh` prima del commit.
+"""
+import logging
+from typing import Iterable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from src.models.address import Address
+from src.models.customer import Customer
+from src.models.order import Order
+from src.models.order_detail import OrderDetail
+from src.models.payment import Payment
+from src.models.product import Product
+from src.models.shipping import Shipping
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "order_search_pending"
+# Limite di sicurezza ai giri flush/refresh in before_commit
+_MAX_REFRESH_ROUNDS = 5
+
+# Attributi che contribuiscono al testo indicizzato, per entità
+_INDEXED_ATTRIBUTES = {
+    Order: ("reference", "internal_reference", "id_address_delivery", "id_customer", "id_payment", "id_shipping"),
+    OrderDetail: ("id_order", "id_product"),
+    Address: ("firstname", "lastname", "address1", "postcode", "vat", "pec", "sdi"),
+    Customer: ("firstname", "lastname", "email"),
+    Shipping: ("tracking",),
+    Payment: ("name",),
+    Product: ("name",),
+}
+
+_registered = False
+
+
+def _pending(session: Session) -> dict:
+    return session.info.setdefault(_PENDING_KEY, {
+        "orders": set(), "deleted": set(), "addresses": set(), "customers": set(),
+        "shippings": set(), "payments": set(), "products": set(),
+    })
+
+
+def _has_indexed_changes(obj) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in _INDEXED_ATTRIBUTES[type(obj)])
+
+
+def queue_order_search_refresh(session: Session, order_ids: Iterable[int]) -> None:
+    """Accoda il ricalcolo dell'indice per gli ordini indicati (eseguito al commit)."""
+    _pending(session)["orders"].update(i for i in order_ids if i)
+
+
+
+def queue_order_search_related_refresh(session: Session, entity: str, ids: Iterable[int]) -> None:
+    """
+    Accoda il ricalcolo dell'indice per gli ordini collegati a entità aggiornate in bulk.
+
+    `entity`: "addresses", "customers", "shippings", "payments" o "products".
+    """
+    _pending(session)[entity].update(i for i in ids if i)
+
+def _on_after_flush(session: Session, flush_context) -> None:
+    pending = None
+    changed = [obj for obj in session.new if type(obj) in _INDEXED_ATTRIBUTES]
+    changed += [
+        obj for obj in session.dirty
+        if type(obj) in _INDEXED_ATTRIBUTES and _has_indexed_changes(obj)
+    ]
+    for obj in changed:
+        pending = pending or _pending(session)
+        if isinstance(obj, Order):
+            pending["orders"].add(obj.id_order)
+        elif isinstance(obj, OrderDetail):
+            pending["orders"].add(obj.id_order)
+            # Riga spostata su un altro ordine: aggiorna anche il precedente
+            previous = inspect(obj).attrs.id_order.history.deleted
+            pending["orders"].update(i for i in previous if i)
+        elif isinstance(obj, Address):
+            pending["addresses"].add(obj.id_address)
+        elif isinstance(obj, Customer):
+            pending["customers"].add(obj.id_customer)
+        elif isinstance(obj, Shipping):
+            pending["shippings"].add(obj.id_shipping)
+        elif isinstance(obj, Payment):
+            pending["payments"].add(obj.id_payment)
+        elif isinstance(obj, Product):
+            pending["products"].add(obj.id_product)
+
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            pending = pending or _pending(session)
+            pending["deleted"].add(obj.id_order)
+        elif isinstance(obj, OrderDetail):
+            pending = pending or _pending(session)
+            pending["orders"].add(obj.id_order)
+
+
+def _on_before_commit(session: Session) -> None:
+    if _PENDING_KEY not in session.info:
+        # Nessuna modifica raccolta finora: basta un flush per scoprire quelle ancora pendenti
+        if not (session.new or session.dirty or session.deleted):
+            return
+    # Import locale: order_search_index_repository importa i modelli, questo modulo è importato dai repository
+    from src.repository.order_search_index_repository import OrderSearchIndexRepository
+
+    for _ in range(_MAX_REFRESH_ROUNDS):
+        session.flush()
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        repository = OrderSearchIndexRepository(session)
+        order_ids = set(pending["orders"])
+        order_ids |= repository.resolve_order_ids(
+            address_ids=pending["addresses"],
+            customer_ids=pending["customers"],
+            shipping_ids=pending["shippings"],
+            payment_ids=pending["payments"],
+            product_ids=pending["products"],
+        )
+        order_ids -= pending["deleted"]
+        if pending["deleted"]:
+            repository.delete(pending["deleted"])
+        if order_ids:
+            repository.refresh(order_ids)
+    logger.warning("order_search_index: modifiche ancora pendenti dopo %s giri di refresh", _MAX_REFRESH_ROUNDS)
+
+
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_order_search_index_listeners() -> None:
+    """
+    Registra i listener di sessione per l'indice di ricerca ordini.
+
+    Idempotente: può essere chiamata sia all'import dei repository sia allo startup.
+    I listener sono registrati sulla classe `Session`, quindi valgono anche per
+    le `AsyncSession` (che delegano a una `Session` sincrona).
+    """
+    global _registered
+    if _registered:
+        return
+    event.listen(Session, "after_flush", _on_after_flush)
+    event.listen(Session, "before_commit", _on_before_commit)
+    event.listen(Session, "after_rollback", _on_after_rollback)
+    _registered = True
@@ -0,0 +1,39 @@
+"""
+Rate limiting asincrono (token bucket) per le chiamate verso API esterne.
+"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket: ``rate`` token al secondo, fino a ``capacity`` accumulabili (burst).
+
+    ``acquire`` attende finché non ci sono token sufficienti; più coroutine possono
+    condividere lo stesso bucket (le attese vengono servite in ordine).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate e capacity devono essere positivi")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Consuma ``tokens`` token (al massimo ``capacity``), attendendo se necessario."""
+        tokens = min(float(tokens), self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
@@ -3,7 +3,7 @@ Cache configuration settings for ECommerceManagerAPI
 """
 
 import os
-from typing import Optional
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from functools import lru_cache
@@ -33,6 +33,15 @@ class CacheSettings(BaseSettings):
     # Memory cache configuration
     cache_max_mem_items: int = Field(default=1000, env="CACHE_MAX_MEM_ITEMS")
     cache_max_value_size: int = Field(default=1048576, env="CACHE_MAX_VALUE_SIZE")  # 1MB
+    # TTL dell'L1 in memoria (0 = cache_default_ttl); con il canale pub/sub può superare il default
+    cache_memory_ttl: int = Field(default=0, env="CACHE_MEMORY_TTL")
+    
+    # Coerenza L1 tra worker (hybrid): invalidazioni propagate via Redis pub/sub
+    cache_l1_pubsub_enabled: bool = Field(default=True, env="CACHE_L1_PUBSUB_ENABLED")
+    cache_pubsub_reconnect_delay: float = Field(default=1.0, env="CACHE_PUBSUB_RECONNECT_DELAY")
+    
+    # Invalidazione per pattern (fallback): chiavi per iterazione SCAN/UNLINK
+    cache_scan_batch_size: int = Field(default=500, env="CACHE_SCAN_BATCH_SIZE")
     
     # Security
     cache_key_salt: str = Field(default="ecommerce-cache-salt", env="CACHE_KEY_SALT")
@@ -82,12 +91,32 @@ class CarrierIntegrationSettings(BaseSettings):
     # FEDEX Integration settings
     fedex_base_url_prod: str = Field(default="https://apis.fedex.com", env="FEDEX_BASE_URL_PROD")
     fedex_base_url_sandbox: str = Field(default="https://apis-sandbox.fedex.com", env="FEDEX_BASE_URL_SANDBOX")
-    
+
+    # Creazione massiva spedizioni: ordini in parallelo (ognuno con la sua sessione DB)
+    bulk_shipment_max_concurrency: int = Field(default=8, env="BULK_SHIPMENT_MAX_CONCURRENCY")
+    bulk_shipment_carrier_concurrency: int = Field(default=4, env="BULK_SHIPMENT_CARRIER_CONCURRENCY")
+    bulk_shipment_carrier_limits: str = Field(
+        default="",
+        env="BULK_SHIPMENT_CARRIER_LIMITS",
+        description="Limiti per tipo corriere, es. BRT=2,FEDEX=6 (default: bulk_shipment_carrier_concurrency)",
+    )
+    bulk_shipment_job_ttl: int = Field(default=3600, env="BULK_SHIPMENT_JOB_TTL")
+
     class Config:
         env_file = ".env"
         case_sensitive = False
         extra = "ignore"
 
+    def get_carrier_concurrency(self, carrier_type: Optional[str]) -> int:
+        """Chiamate contemporanee consentite verso una singola CarrierApi del tipo indicato"""
+        limits: Dict[str, int] = {}
+        for part in self.bulk_shipment_carrier_limits.split(","):
+            name, _, value = part.partition("=")
+            if name.strip() and value.strip().isdigit():
+                limits[name.strip().upper()] = int(value.strip())
+        limit = limits.get((carrier_type or "").upper(), self.bulk_shipment_carrier_concurrency)
+        return max(1, limit)
+
 
 @lru_cache()
 def get_carrier_integration_settings() -> CarrierIntegrationSettings:
@@ -95,6 +124,163 @@ def get_carrier_integration_settings() -> CarrierIntegrationSettings:
     return CarrierIntegrationSettings()
 
 
+class HttpClientSettings(BaseSettings):
+    """Pool dei client HTTP condivisi verso le integrazioni esterne (corrieri, FatturaPA)"""
+
+    http_client_timeout: float = Field(default=30.0, env="HTTP_CLIENT_TIMEOUT")
+    http_client_connect_timeout: float = Field(default=10.0, env="HTTP_CLIENT_CONNECT_TIMEOUT")
+    # Limiti per client: ogni integrazione ha il suo client, quindi di fatto per host
+    http_client_max_connections: int = Field(default=50, env="HTTP_CLIENT_MAX_CONNECTIONS")
+    http_client_max_keepalive_connections: int = Field(default=20, env="HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS")
+    http_client_keepalive_expiry: float = Field(default=30.0, env="HTTP_CLIENT_KEEPALIVE_EXPIRY")
+    # HTTP/2 attivo solo se il pacchetto "h2" è installato (altrimenti HTTP/1.1)
+    http_client_http2: bool = Field(default=True, env="HTTP_CLIENT_HTTP2")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = False
+        extra = "ignore"
+
+
+@lru_cache()
+def get_http_client_settings() -> HttpClientSettings:
+    """Get cached HTTP client settings instance"""
+    return HttpClientSettings()
+
+
+class PdfRenderSettings(BaseSettings):
+    """Rendering PDF fuori dall'event loop e cache su disco dei PDF generati"""
+
+    # Processi del pool di rendering (0 = thread pool, es. ambienti senza multiprocessing)
+    pdf_render_workers: int = Field(default=2, env="PDF_RENDER_WORKERS")
+    # Cache content-addressed: chiave = tipo + id documento + hash dei dati + lingua
+    pdf_cache_enabled: bool = Field(default=True, env="PDF_CACHE_ENABLED")
+    pdf_cache_dir: str = Field(default="media/pdf_cache", env="PDF_CACHE_DIR")
+    # Export massivo: rendering in corso contemporaneamente (0 = 2 x pdf_render_workers) e limiti documenti
+    pdf_bulk_concurrency: int = Field(default=0, env="PDF_BULK_CONCURRENCY")
+    pdf_bulk_max_documents: int = Field(default=1000, env="PDF_BULK_MAX_DOCUMENTS")
+    # Il PDF unico resta in memoria fino al salvataggio (pypdf): limite più basso dello ZIP
+    pdf_bulk_merge_max_documents: int = Field(default=300, env="PDF_BULK_MERGE_MAX_DOCUMENTS")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = False
+        extra = "ignore"
+
+
+@lru_cache()
+def get_pdf_render_settings() -> PdfRenderSettings:
+    """Get cached PDF render settings instance"""
+    return PdfRenderSettings()
+
+
+class ImageIngestSettings(BaseSettings):
+    """Acquisizione asincrona delle immagini prodotto dall'e-commerce"""
+
+    # Processi per ridimensionamento/encoding JPEG (0 = thread pool)
+    image_ingest_workers: int = Field(default=2, env="IMAGE_INGEST_WORKERS")
+    # Download contemporanei e connessioni aperte verso l'e-commerce
+    image_download_concurrency: int = Field(default=50, env="IMAGE_DOWNLOAD_CONCURRENCY")
+    image_download_timeout: float = Field(default=10.0, env="IMAGE_DOWNLOAD_TIMEOUT")
+    image_download_retries: int = Field(default=2, env="IMAGE_DOWNLOAD_RETRIES")
+    # Manifest per piattaforma: URL sorgente, hash, ETag/Last-Modified delle immagini salvate
+    image_manifest_dir: str = Field(default="media/image_manifest", env="IMAGE_MANIFEST_DIR")
+    # true = richiesta condizionale anche per immagini già presenti con URL invariato
+    image_revalidate: bool = Field(default=False, env="IMAGE_REVALIDATE")
+    # Derivati responsive generati all'acquisizione: misure nome=LxH e formati in ordine di preferenza
+    image_derivatives_enabled: bool = Field(default=True, env="IMAGE_DERIVATIVES_ENABLED")
+    image_derivative_sizes: str = Field(
+        default="thumb=150x150,list=400x300,detail=1200x900", env="IMAGE_DERIVATIVE_SIZES"
+    )
+    image_derivative_formats: str = Field(default="avif,webp,jpeg", env="IMAGE_DERIVATIVE_FORMATS")
+    image_derivative_quality: int = Field(default=80, env="IMAGE_DERIVATIVE_QUALITY")
+    # Misura servita ai client che accettano AVIF/WebP quando la richiesta non indica `size`
+    image_default_size: str = Field(default="list", env="IMAGE_DEFAULT_SIZE")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = False
+        extra = "ignore"
+
+
+@lru_cache()
+def get_image_ingest_settings() -> ImageIngestSettings:
+    """Get cached image ingest settings instance"""
+    return ImageIngestSettings()
+
+
+class CsvImportSettings(BaseSettings):
+    """Import CSV in streaming con job in background"""
+
+    # Secondi di conservazione dei job terminati (background=true)
+    csv_import_job_ttl: int = Field(default=3600, env="CSV_IMPORT_JOB_TTL")
+    # Cartella per gli upload in attesa di import (vuoto = temp di sistema)
+    csv_import_spool_dir: str = Field(default="", env="CSV_IMPORT_SPOOL_DIR")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = False
+        extra = "ignore"
+
+
+@lru_cache()
+def get_csv_import_settings() -> CsvImportSettings:
+    """Get cached CSV import settings instance"""
+    return CsvImportSettings()
+
+
+class PrestaShopSyncSettings(BaseSettings):
+    """Sincronizzazione PrestaShop a pagine (pipeline download/insert)"""
+
+    # Ampiezza iniziale della pagina (intervallo di ID, filter[id]=[a,b])
+    prestashop_sync_page_size: int = Field(default=5000, env="PRESTASHOP_SYNC_PAGE_SIZE")
+    # Limiti della pagina adattiva e tempo di risposta obiettivo per richiesta
+    prestashop_sync_min_page_size: int = Field(default=100, env="PRESTASHOP_SYNC_MIN_PAGE_SIZE")
+    prestashop_sync_max_page_size: int = Field(default=10000, env="PRESTASHOP_SYNC_MAX_PAGE_SIZE")
+    prestashop_sync_target_seconds: float = Field(default=3.0, env="PRESTASHOP_SYNC_TARGET_SECONDS")
+    # Richieste di pagina contemporanee verso il webservice
+    prestashop_sync_pages_in_flight: int = Field(default=4, env="PRESTASHOP_SYNC_PAGES_IN_FLIGHT")
+    # Errori consecutivi oltre i quali il download di una risorsa si interrompe
+    prestashop_sync_max_consecutive_errors: int = Field(default=10, env="PRESTASHOP_SYNC_MAX_CONSECUTIVE_ERRORS")
+    # Pagine scaricate in anticipo in attesa di insert (memoria ~ pagine x page_size)
+    prestashop_sync_prefetch_pages: int = Field(default=2, env="PRESTASHOP_SYNC_PREFETCH_PAGES")
+    # Pausa prima di ogni richiesta al webservice (secondi, 0 = nessuna)
+    prestashop_request_delay: float = Field(default=0.0, env="PRESTASHOP_REQUEST_DELAY")
+    # Job di sync (sync_jobs): heartbeat, job senza heartbeat considerati orfani, ripresa all'avvio
+    prestashop_sync_job_heartbeat_seconds: float = Field(default=30.0, env="PRESTASHOP_SYNC_JOB_HEARTBEAT_SECONDS")
+    prestashop_sync_job_stale_seconds: float = Field(default=600.0, env="PRESTASHOP_SYNC_JOB_STALE_SECONDS")
+    prestashop_sync_resume_on_startup: bool = Field(default=True, env="PRESTASHOP_SYNC_RESUME_ON_STARTUP")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = False
+        extra = "ignore"
+
+
+@lru_cache()
+def get_prestashop_sync_settings() -> PrestaShopSyncSettings:
+    """Get cached PrestaShop sync settings instance"""
+    return PrestaShopSyncSettings()
+
+
+class BulkWriteSettings(BaseSettings):
+    """Scritture bulk per (id_store, id_origin): sync e-commerce e import CSV"""
+
+    # Righe per singolo INSERT ... ON DUPLICATE KEY UPDATE (e commit)
+    bulk_upsert_batch_size: int = Field(default=1000, env="BULK_UPSERT_BATCH_SIZE")
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = False
+        extra = "ignore"
+
+
+@lru_cache()
+def get_bulk_write_settings() -> BulkWriteSettings:
+    """Get cached bulk write settings instance"""
+    return BulkWriteSettings()
+
+
 class FastLdvSettings(BaseSettings):
     """FastLDV warehouse app integration settings."""
 
@@ -172,3 +358,15 @@ TTL_PRESETS = {
     # Events
     "events_list": 2592000,     # 30 giorni (mensile) - lista eventi disponibili
 }
+
+# Finestre stale-while-revalidate per preset (secondi oltre il TTL di TTL_PRESETS):
+# scaduto il TTL il valore viene ancora servito mentre un solo task lo ricalcola.
+# Valgono solo per le funzioni con `background_refresh` in @cached: i repository
+# legati alla sessione della richiesta (lookup) non ricalcolano in background.
+# I preset non elencati non usano SWR (a meno di stale_ttl esplicito in @cached).
+STALE_TTL_PRESETS = {
+    "init_static": 86400,       # 1 giorno
+    "init_dynamic": 3600,       # 1 ora
+    "init_full": 300,           # 5 minuti
+    "events_list": 86400,       # 1 giorno
+}
@@ -1,19 +1,82 @@
 """
 Cached StaticFiles per servire file statici con cache headers
 """
+import hashlib
+import os
+import re
+import stat
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from urllib.parse import parse_qs
+
+import anyio
+from starlette.datastructures import Headers
 from starlette.exceptions import HTTPException
-from starlette.responses import Response
+from starlette.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.staticfiles import NotModifiedResponse
 from starlette.types import Receive, Scope, Send
 
+from src.core.settings import get_image_ingest_settings
+from src.services.media.image_derivatives import derivative_filename, negotiate_derivatives
+
 # Path RELATIVO alla directory montata (es. "media") per il placeholder immagini prodotto.
 # Convenzione: mount su "media", placeholder in "media/product_images/fallback/...".
 FALLBACK_PRODUCT_IMAGE_REL_PATH = "product_images/fallback/product_not_found.jpg"
 PRODUCT_IMAGES_PREFIX = "product_images/"
+# Immagine prodotto "storica" per cui esistono derivati (product_{id}.{size}.{ext})
+PRODUCT_IMAGE_PATTERN = re.compile(r"^product_images/[^/]+/product_\d+\.jpg$")
+
+# ETag forte = hash del contenuto, calcolato una volta per (path, mtime, size)
+# nel thread di lookup_path (mai sull'event loop)
+STRONG_ETAG_MAX_BYTES = 8 * 1024 * 1024
+_ETAG_CACHE_SIZE = 4096
+_etag_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_etag_lock = threading.Lock()
+
+
+def _etag_key(full_path: str, stat_result: os.stat_result) -> Tuple[str, int, int]:
+    return (str(full_path), stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def cached_strong_etag(full_path: str, stat_result: os.stat_result) -> Optional[str]:
+    """ETag forte già calcolato per il file, senza leggerlo (None se assente)."""
+    key = _etag_key(full_path, stat_result)
+    with _etag_lock:
+        etag = _etag_cache.get(key)
+        if etag is not None:
+            _etag_cache.move_to_end(key)
+        return etag
+
+
+def strong_etag(full_path: str, stat_result: os.stat_result) -> Optional[str]:
+    """
+    ETag forte dal contenuto del file (None oltre STRONG_ETAG_MAX_BYTES).
+
+    Legge l'intero file: da chiamare fuori dall'event loop.
+    """
+    if stat_result.st_size > STRONG_ETAG_MAX_BYTES:
+        return None
+    etag = cached_strong_etag(full_path, stat_result)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(full_path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(65536), b""):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()[:32]}"'
+        with _etag_lock:
+            _etag_cache[_etag_key(full_path, stat_result)] = etag
+            if len(_etag_cache) > _ETAG_CACHE_SIZE:
+                _etag_cache.popitem(last=False)
+    return etag
 
 
 class CachedStaticFiles(StaticFiles):
-    """StaticFiles con cache headers e fallback automatico per immagini prodotto."""
+    """
+    StaticFiles con cache headers, ETag forti, derivati responsive e fallback
+    automatico per immagini prodotto.
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -28,6 +91,12 @@ class CachedStaticFiles(StaticFiles):
         l'ecommerce sorgente).
         """
         normalized = path.replace("\\", "/").lstrip("/")
+        if scope["method"] in ("GET", "HEAD") and PRODUCT_IMAGE_PATTERN.match(normalized):
+            # La risposta dipende da Accept anche quando si serve il file storico
+            scope["_static_vary_accept"] = True
+            response = await self._derivative_response(normalized, scope)
+            if response is not None:
+                return response
         try:
             return await super().get_response(path, scope)
         except HTTPException as exc:
@@ -49,6 +118,50 @@ class CachedStaticFiles(StaticFiles):
                 return response
             raise
 
+    async def _derivative_response(self, normalized: str, scope: Scope) -> Optional[Response]:
+        """
+        Derivato dell'immagine prodotto scelto da `?size=thumb|list|detail` e `Accept`
+        (AVIF/WebP se accettati, altrimenti JPEG). None se non richiesto o non ancora
+        generato: si serve il file storico.
+        """
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        size = (query.get("size") or [None])[0]
+        accept = Headers(scope=scope).get("accept", "")
+        for suffix in negotiate_derivatives(size, accept, get_image_ingest_settings()):
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, derivative_filename(normalized, suffix)
+            )
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                return self.file_response(full_path, stat_result, scope)
+        return None
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        """
+        Come StaticFiles.lookup_path (eseguito da StaticFiles in un worker thread),
+        calcolando qui l'ETag forte del file trovato: file_response lo legge dalla cache.
+        """
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result and stat.S_ISREG(stat_result.st_mode):
+            strong_etag(full_path, stat_result)
+        return full_path, stat_result
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        """Come StaticFiles.file_response, con ETag forte prima del controllo If-None-Match."""
+        request_headers = Headers(scope=scope)
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        etag = cached_strong_etag(full_path, stat_result)
+        if etag:
+            response.headers["etag"] = etag
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Override per aggiungere cache headers alle risposte 2xx."""
 
@@ -67,6 +180,9 @@ class CachedStaticFiles(StaticFiles):
                     headers[b"cache-control"] = b"public, max-age=31536000, immutable"
                     headers[b"expires"] = b"Thu, 31 Dec 2025 23:59:59 GMT"
 
+                if scope.get("_static_vary_accept"):
+                    headers[b"vary"] = b"Accept"
+
                 if b"etag" not in headers:
                     etag = f'"{hash(scope.get("path", ""))}"'.encode()
                     headers[b"etag"] = etag
@@ -1,14 +1,58 @@
+from typing import AsyncIterator, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 from dotenv import load_dotenv
 
+from src.core.db_metrics import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, instrument_engine
+
 load_dotenv()
 SQLALCHEMY_DATABASE_URL = \
     f'mysql+pymysql://{os.environ.get("DATABASE_MAIN_USER")}:{os.environ.get("DATABASE_MAIN_PASSWORD")}@{os.environ.get("DATABASE_MAIN_ADDRESS")}:{os.environ.get("DATABASE_MAIN_PORT")}/{os.environ.get("DATABASE_MAIN_NAME")}'
 
+# Stesso DB, driver asincrono (aiomysql) per i path di lettura async
+ASYNC_SQLALCHEMY_DATABASE_URL = \
+    f'mysql+aiomysql://{os.environ.get("DATABASE_MAIN_USER")}:{os.environ.get("DATABASE_MAIN_PASSWORD")}@{os.environ.get("DATABASE_MAIN_ADDRESS")}:{os.environ.get("DATABASE_MAIN_PORT")}/{os.environ.get("DATABASE_MAIN_NAME")}'
+
+
+def _env_int(name: str, default: int) -> int:
+    """Legge un intero da variabile d'ambiente, con fallback su default se assente o non valido."""
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Legge un booleano da variabile d'ambiente (true/1/yes)."""
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("true", "1", "yes")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+# Pool configurabile via env (sync PrestaShop, polling tracking e API condividono il pool):
+#   DATABASE_POOL_SIZE (default 10)
+#   DATABASE_MAX_OVERFLOW (default 20)
+#   DATABASE_POOL_RECYCLE secondi (default 1800, < wait_timeout MySQL: evita "server has gone away")
+#   DATABASE_POOL_TIMEOUT secondi (default 30)
+#   DATABASE_POOL_PRE_PING (default true)
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=_env_int("DATABASE_POOL_SIZE", 10),
+    max_overflow=_env_int("DATABASE_MAX_OVERFLOW", 20),
+    pool_recycle=_env_int("DATABASE_POOL_RECYCLE", 1800),
+    pool_timeout=_env_int("DATABASE_POOL_TIMEOUT", 30),
+    pool_pre_ping=_env_bool("DATABASE_POOL_PRE_PING", True),
+)
+# Metriche pool/query esposte su /metrics
+instrument_engine(engine, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -31,3 +75,73 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ============================================================================
+# Async engine (creato lazy al primo utilizzo)
+# ============================================================================
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Restituisce l'engine async globale, creandolo al primo utilizzo.
+
+    Il pool è configurabile via env:
+        DATABASE_ASYNC_POOL_SIZE (default 10)
+        DATABASE_ASYNC_MAX_OVERFLOW (default 20)
+        DATABASE_ASYNC_POOL_RECYCLE secondi (default 1800)
+        DATABASE_ASYNC_POOL_TIMEOUT secondi (default 30)
+        DATABASE_ASYNC_POOL_PRE_PING (default true)
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            ASYNC_SQLALCHEMY_DATABASE_URL,
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            pool_size=_env_int("DATABASE_ASYNC_POOL_SIZE", 10),
+            max_overflow=_env_int("DATABASE_ASYNC_MAX_OVERFLOW", 20),
+            pool_recycle=_env_int("DATABASE_ASYNC_POOL_RECYCLE", 1800),
+            pool_timeout=_env_int("DATABASE_ASYNC_POOL_TIMEOUT", 30),
+            pool_pre_ping=_env_bool("DATABASE_ASYNC_POOL_PRE_PING", True),
+        )
+        instrument_engine(_async_engine.sync_engine, "async")
+    return _async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Restituisce la factory di AsyncSession legata all'engine async globale."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(),
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_session_factory
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+        Generatore di sessione database asincrona.
+
+        Da usare come dipendenza FastAPI negli endpoint `async def` di sola lettura
+        ad alto traffico: le query non bloccano l'event loop di uvicorn.
+
+        Yields:
+            AsyncSession: Una sessione asincrona di SQLAlchemy aperta.
+    """
+    async with get_async_session_factory()() as session:
+        yield session
+
+
+async def dispose_async_engine() -> None:
+    """Chiude il pool dell'engine async (shutdown applicazione)."""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
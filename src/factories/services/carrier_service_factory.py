@@ -46,9 +46,31 @@ class CarrierServiceFactory:
                 {"id_carrier_api": id_carrier_api}
             )
         
+        return self.get_shipment_service_for_type(carrier.carrier_type, db, id_carrier_api)
+    
+    def get_shipment_service_for_type(
+        self,
+        carrier_type: CarrierTypeEnum,
+        db: Session,
+        id_carrier_api: Optional[int] = None
+    ) -> IShipmentService:
+        """
+        Get the shipment service for an already known carrier_type (no carrier lookup)
+        
+        Args:
+            carrier_type: Carrier type of the CarrierApi
+            db: Database session
+            id_carrier_api: Optional Carrier API ID (error details only)
+            
+        Returns:
+            IShipmentService implementation for the carrier type
+            
+        Raises:
+            BusinessRuleException: If carrier_type is not supported
+        """
         # Resolve service based on carrier_type
         # TODO: automatizzare in base a carriertypeenum
-        if carrier.carrier_type == CarrierTypeEnum.DHL:
+        if carrier_type == CarrierTypeEnum.DHL:
             from src.services.interfaces.dhl_shipment_service_interface import IDhlShipmentService
             service = self.container.resolve_with_session(IDhlShipmentService, db)
             if not isinstance(service, IShipmentService):
@@ -58,7 +80,7 @@ class CarrierServiceFactory:
                 )
             return service
             
-        elif carrier.carrier_type == CarrierTypeEnum.BRT:
+        elif carrier_type == CarrierTypeEnum.BRT:
             from src.services.interfaces.brt_shipment_service_interface import IBrtShipmentService
             service = self.container.resolve_with_session(IBrtShipmentService, db)
             if not isinstance(service, IShipmentService):
@@ -68,7 +90,7 @@ class CarrierServiceFactory:
                 )
             return service
             
-        elif carrier.carrier_type == CarrierTypeEnum.FEDEX:
+        elif carrier_type == CarrierTypeEnum.FEDEX:
             from src.services.interfaces.fedex_shipment_service_interface import IFedexShipmentService
             service = self.container.resolve_with_session(IFedexShipmentService, db)
             if not isinstance(service, IShipmentService):
@@ -79,9 +101,9 @@ class CarrierServiceFactory:
             return service
         else:
             raise BusinessRuleException(
-                f"Unsupported carrier type: {carrier.carrier_type}",
+                f"Unsupported carrier type: {carrier_type}",
                 ErrorCode.BUSINESS_RULE_VIOLATION,
-                {"carrier_type": carrier.carrier_type.value, "id_carrier_api": id_carrier_api}
+                {"carrier_type": carrier_type.value, "id_carrier_api": id_carrier_api}
             )
     
     def get_tracking_service(self, id_carrier_api: int, db: Session) -> ITrackingService:
@@ -242,12 +242,33 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     except Exception as e:
         print(f"⚠ Tracking polling warning: {e}")
     
+    try:
+        from src.core.order_search_sync import register_order_search_index_listeners
+        register_order_search_index_listeners()
+    except Exception as e:
+        print(f"⚠ Order search index listeners warning: {e}")
+
+    try:
+        from src.core.corrispettivi_rollup_sync import register_corrispettivi_rollup_listeners
+        register_corrispettivi_rollup_listeners()
+    except Exception as e:
+        print(f"⚠ Corrispettivi rollup listeners warning: {e}")
+
     try:
         from src.core.diagnostics.order_state_audit import setup_order_state_audit
         setup_order_state_audit()
     except Exception as e:
         print(f"⚠ Order state audit setup warning: {e}")
 
+    # Job di sync interrotti (deploy/riavvio): ripresa dal checkpoint
+    try:
+        from src.routers.sync import resume_interrupted_sync_jobs
+        resumed_sync_jobs = await resume_interrupted_sync_jobs()
+        if resumed_sync_jobs:
+            print(f"✓ Resumed interrupted sync jobs: {resumed_sync_jobs}")
+    except Exception as e:
+        print(f"⚠ Sync jobs resume warning: {e}")
+
     print("✅ Startup completed\n")
     
     yield
@@ -255,6 +276,15 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     # ========== SHUTDOWN ==========
     print("\n🛑 Shutting down Elettronew API...")
     
+    # Job di sync in corso: interrotti, ripresi al prossimo avvio
+    try:
+        from src.routers.sync import interrupt_active_sync_jobs
+        interrupted_sync_jobs = interrupt_active_sync_jobs()
+        if interrupted_sync_jobs:
+            print(f"✓ Sync jobs marked as interrupted: {interrupted_sync_jobs}")
+    except Exception as e:
+        print(f"⚠ Sync jobs shutdown warning: {e}")
+    
     # Ferma tutte le background tasks
     for task_name in list(_background_tasks.keys()):
         await stop_background_task(task_name)
@@ -266,6 +296,38 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     except Exception as e:
         print(f"⚠ Cache cleanup warning: {e}")
     
+    # Chiudi client HTTP condivisi (corrieri, FatturaPA)
+    try:
+        from src.core.http_clients import close_http_clients
+        await close_http_clients()
+        print("✓ HTTP clients closed")
+    except Exception as e:
+        print(f"⚠ HTTP clients cleanup warning: {e}")
+    
+    # Chiudi pool di rendering PDF
+    try:
+        from src.services.pdf.render_pool import shutdown_pdf_executor
+        shutdown_pdf_executor()
+        print("✓ PDF render pool closed")
+    except Exception as e:
+        print(f"⚠ PDF render pool cleanup warning: {e}")
+
+    # Chiudi pool di encoding immagini
+    try:
+        from src.services.media.image_ingest import shutdown_image_executor
+        shutdown_image_executor()
+        print("✓ Image ingest pool closed")
+    except Exception as e:
+        print(f"⚠ Image ingest pool cleanup warning: {e}")
+    
+    # Chiudi pool engine async
+    try:
+        from src.database import dispose_async_engine
+        await dispose_async_engine()
+        print("✓ Async database engine disposed")
+    except Exception as e:
+        print(f"⚠ Async engine cleanup warning: {e}")
+    
     print("✅ Shutdown completed\n")
 
 
@@ -710,6 +772,10 @@ async def metrics():
             clients = redis_stats["connected_clients"]
             prometheus_metrics.append(f"redis_connected_clients {clients}")
         
+        # Pool connessioni DB e tempi query (checkout wait, in uso, overflow, query per richiesta)
+        from src.core.db_metrics import get_db_metrics
+        prometheus_metrics.extend(get_db_metrics().render_prometheus())
+        
         return "\n".join(prometheus_metrics)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Metrics error: {str(e)}")
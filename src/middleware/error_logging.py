@@ -9,6 +9,8 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response as StarletteResponse
 
+from src.core.db_metrics import finish_request_tracking, start_request_tracking
+
 logger = logging.getLogger(__name__)
 
 class ErrorLoggingMiddleware(BaseHTTPMiddleware):
@@ -102,6 +104,8 @@ class PerformanceLoggingMiddleware(BaseHTTPMiddleware):
         """Monitora le performance delle richieste"""
         
         start_time = time.time()
+        # Conteggio query/tempo DB della richiesta (istogrammi esposti su /metrics)
+        db_stats, db_token = start_request_tracking()
         
         try:
             response = await call_next(request)
@@ -117,6 +121,8 @@ class PerformanceLoggingMiddleware(BaseHTTPMiddleware):
                         "process_time": process_time,
                         "threshold": self.slow_request_threshold,
                         "status_code": response.status_code,
+                        "db_query_count": db_stats.query_count,
+                        "db_query_time": db_stats.query_time,
                     }
                 )
             
@@ -138,6 +144,8 @@ class PerformanceLoggingMiddleware(BaseHTTPMiddleware):
             )
             
             raise exc
+        finally:
+            finish_request_tracking(db_stats, db_token)
 
 class SecurityLoggingMiddleware(BaseHTTPMiddleware):
     """
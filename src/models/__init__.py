@@ -38,6 +38,10 @@ from .platform_state_trigger import PlatformStateTrigger
 from .store import Store
 from .company_fiscal_info import CompanyFiscalInfo
 from .ecommerce_order_state import EcommerceOrderState
+from .order_search_index import OrderSearchIndex
+from .corrispettivo_rollup import CorrispettivoRollup, CorrispettivoRollupDay
+from .sync_watermark import SyncWatermark
+from .sync_job import SyncJob
 
 
 
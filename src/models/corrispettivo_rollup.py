@@ -0,0 +1,59 @@
+"""
+Model per il rollup giornaliero dei corrispettivi (aggregati materializzati).
+"""
+from sqlalchemy import Boolean, Column, Date, DateTime, Integer, Numeric, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from src.database import Base
+
+
+class CorrispettivoRollup(Base):
+    """
+    Aggregato di un giorno per paese di consegna, aliquota e bucket.
+
+    Bucket:
+    - `sales_products`, `sales_shipping`, `returns_products`, `returns_shipping`:
+      importo ivato per aliquota (matrice riepilogo), in `total_with_tax`;
+    - `gross_sales_base`, `gross_sales_imputazione`, `gross_returns`: totali
+      documento (id_tax = 0) per il riepilogo giornaliero;
+    - `order_count`, `return_count`: conteggi in `doc_count` (id_tax = 0).
+
+    `country_iso` vuoto = ordine senza paese di consegna. Mantenuto da
+    src.core.corrispettivi_rollup_sync (invalidazione) e CorrispettivoRollupRepository.
+    """
+
+    __tablename__ = "corrispettivi_daily_rollup"
+    __table_args__ = (
+        UniqueConstraint("day", "country_iso", "id_tax", "bucket", name="uq_corrispettivi_rollup_key"),
+    )
+
+    id_rollup = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    country_iso = Column(String(5), nullable=False, default="")
+    id_tax = Column(Integer, nullable=False, default=0)
+    bucket = Column(String(32), nullable=False)
+    total_with_tax = Column(Numeric(15, 5), nullable=False, default=0)
+    total_net = Column(Numeric(15, 5), nullable=False, default=0)
+    products_with_tax = Column(Numeric(15, 5), nullable=False, default=0)
+    products_net = Column(Numeric(15, 5), nullable=False, default=0)
+    doc_count = Column(Integer, nullable=False, default=0)
+
+
+class CorrispettivoRollupDay(Base):
+    """
+    Giorno materializzato in corrispettivi_daily_rollup.
+
+    Un giorno senza riga o con `built` falso non è (più) aggiornato e viene
+    ricalcolato alla prima lettura. `version` è incrementata a ogni invalidazione:
+    chi materializza il giorno scrive le righe solo se non è cambiata durante il
+    calcolo. `locked` = periodo chiuso: le modifiche successive ai documenti non
+    invalidano più il giorno.
+    """
+
+    __tablename__ = "corrispettivi_rollup_days"
+
+    day = Column(Date, primary_key=True, autoincrement=False)
+    locked = Column(Boolean, nullable=False, default=False)
+    built = Column(Boolean, nullable=False, default=False)
+    version = Column(Integer, nullable=False, default=0)
+    date_upd = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -0,0 +1,33 @@
+"""
+Model per OrderSearchIndex - Indice di ricerca denormalizzato degli ordini
+"""
+from sqlalchemy import Column, Integer, Text, DateTime, Index
+from sqlalchemy.sql import func
+from src.database import Base
+
+
+class OrderSearchIndex(Base):
+    """
+    Una riga per ordine con il testo ricercabile (minuscolo) di ordine, indirizzo di
+    consegna, cliente, pagamento, prodotti e tracking.
+
+    Sostituisce le LEFT JOIN multiple + DISTINCT della ricerca rapida ordini.
+    Mantenuto da src.core.order_search_sync (scritture ORM e import bulk).
+    """
+
+    __tablename__ = "order_search_index"
+
+    # Nessuna FK: la riga viene rimossa dal listener alla cancellazione dell'ordine
+    id_order = Column(Integer, primary_key=True, autoincrement=False)
+    search_text = Column(Text, nullable=False, default="")
+    date_upd = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # FULLTEXT con parser ngram su MySQL (match su sottostringhe, anche senza spazi)
+        Index(
+            "ft_order_search_text",
+            "search_text",
+            mysql_prefix="FULLTEXT",
+            mysql_with_parser="ngram",
+        ),
+    )
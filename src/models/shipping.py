@@ -20,5 +20,7 @@ class Shipping(Base):
     customs_value = Column(Numeric(10, 5), default=None)
     shipping_message = Column(Text)
     date_add = Column(DateTime, default=datetime.now)
+    # Prossimo polling tracking pianificato (NULL = da interrogare al prossimo ciclo)
+    next_poll_at = Column(DateTime, default=None, index=True)
 
     orders = relationship("Order", back_populates="shipments")
@@ -0,0 +1,41 @@
+"""
+Model dei job di sincronizzazione e-commerce (avanzamento e checkpoint).
+"""
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy.sql import func
+
+from src.database import Base
+
+
+class SyncJob(Base):
+    """
+    Stato persistente di una sincronizzazione e-commerce.
+
+    Fase ed entità correnti, ultimo ID elaborato dell'entità (checkpoint), conteggi,
+    throughput ed errori. Un job interrotto (riavvio o deploy) riprende dalle entità
+    non completate e, per quella in corso, dagli ID successivi al checkpoint.
+    `heartbeat_at` è aggiornato a ogni pagina: un job `running` senza heartbeat
+    recente appartiene a un processo terminato e può essere ripreso.
+    """
+
+    __tablename__ = "sync_jobs"
+
+    id_sync_job = Column(Integer, primary_key=True, index=True)
+    id_store = Column(Integer, ForeignKey('stores.id_store'), nullable=False, index=True)
+    sync_type = Column(String(16), nullable=False)  # incremental | full
+    status = Column(String(16), nullable=False, index=True)  # running | completed | failed | interrupted
+    phase = Column(String(64), nullable=True)
+    entity = Column(String(64), nullable=True)
+    last_id = Column(Integer, nullable=True)  # ultimo ID remoto elaborato dell'entità corrente
+    checkpoint_date_upd = Column(DateTime, nullable=True)  # date_upd remoto annotato a inizio entità
+    completed_entities = Column(Text, nullable=True)  # entità completate, separate da virgola
+    pages = Column(Integer, nullable=False, default=0)
+    fetched = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    rows_per_second = Column(Float, nullable=True)
+    errors = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=1)
+    started_at = Column(DateTime, default=func.now())
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
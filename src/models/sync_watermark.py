@@ -0,0 +1,28 @@
+"""
+Model per i watermark della sincronizzazione incrementale e-commerce.
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from src.database import Base
+
+
+class SyncWatermark(Base):
+    """
+    Ultimo `date_upd` importato per entità e store.
+
+    La sync incrementale chiede al webservice solo i record con `date_upd`
+    successivo al watermark (nuovi e modificati) e li applica in upsert. Il
+    watermark avanza solo a fine sync riuscita dell'entità.
+    """
+
+    __tablename__ = "sync_watermarks"
+    __table_args__ = (
+        UniqueConstraint("id_store", "entity", name="uq_sync_watermarks_store_entity"),
+    )
+
+    id_sync_watermark = Column(Integer, primary_key=True, index=True)
+    id_store = Column(Integer, ForeignKey('stores.id_store'), nullable=False, index=True)
+    entity = Column(String(32), nullable=False)
+    last_date_upd = Column(DateTime, nullable=True)
+    date_upd = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -180,37 +180,7 @@ class AddressRepository(BaseRepository[Address, int], IAddressRepository):
         if not data_list:
             return 0
         
-        try:
-            # Get existing (id_origin, id_store) pairs to avoid duplicates
-            origin_ids = [data.id_origin for data in data_list if data.id_origin]
-            
-            if origin_ids:
-                from sqlalchemy import and_
-                query = self._session.query(Address.id_origin).filter(Address.id_origin.in_(origin_ids))
-                if id_store:
-                    query = query.filter(Address.id_store == id_store)
-                existing_addresses = query.all()
-                existing_origins = {a.id_origin for a in existing_addresses}
-            else:
-                existing_origins = set()
-            
-            # Filter new addresses
-            new_addresses_data = [data for data in data_list if data.id_origin not in existing_origins]
-            
-            if not new_addresses_data:
-                return 0
-            
-            # Batch insert
-            total_inserted = 0
-            for i in range(0, len(new_addresses_data), batch_size):
-                batch = new_addresses_data[i:i + batch_size]
-                addresses = [Address(**a.model_dump()) for a in batch]
-                self._session.bulk_save_objects(addresses)
-                total_inserted += len(addresses)
-            
-            self._session.commit()
-            return total_inserted
-            
-        except Exception as e:
-            self._session.rollback()
-            raise InfrastructureException(f"Database error bulk creating addresses: {str(e)}")
+        # Solo nuovi indirizzi: quelli già presenti per (id_store, id_origin) restano invariati
+        return self.upsert_by_origin(
+            [data.model_dump() for data in data_list], id_store, batch_size=batch_size
+        ).inserted
@@ -24,7 +24,7 @@ class CachedOrderRepository(OrderRepository):
         super().__init__(session)
         self.settings = get_cache_settings()
     
-    @cached(preset="orders_list", key="orders:list:{tenant}:{qhash}")
+    @cached(preset="orders_list", key="orders:list:{tenant}:{qhash}", namespace="orders:list")
     async def get_all_cached(self, tenant: str, **filters) -> List[Order]:
         """Cached version of get_all"""
         return self.get_all(**filters)
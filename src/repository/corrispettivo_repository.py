@@ -17,8 +17,13 @@ from src.models.order_detail import OrderDetail
 from src.models.ricevuta import Ricevuta, RicevutaStato
 from src.models.shipping import Shipping
 from src.models.tax import Tax
+from src.core.corrispettivi_rollup_sync import register_corrispettivi_rollup_listeners
 from src.services.corrispettivi.aggregation import MovementRow, decimal_or_zero
 
+# Il rollup giornaliero è invalidato dai listener di sessione: devono essere attivi
+# ovunque si leggano i corrispettivi (anche fuori dall'app, es. script/test)
+register_corrispettivi_rollup_listeners()
+
 
 class CorrispettivoRepository:
     TIMEZONE = "Europe/Rome"
@@ -535,6 +540,46 @@ class CorrispettivoRepository:
         )
         return codes
 
+    def list_period_country_codes(self, start_date: date, end_date: date) -> List[str]:
+        """Paesi di consegna (ISO maiuscolo) degli ordini con vendite, resi o ricevute nel periodo."""
+        country_iso = func.upper(Country.iso_code)
+        order_day = self._order_day_expr()
+        return_day = self._local_day_expr(FiscalDocument.date_add)
+        emission_day = self._ricevuta_emission_day_expr()
+
+        def _countries(query):
+            return (
+                query.join(Address, Order.id_address_delivery == Address.id_address)
+                .join(Country, Address.id_country == Country.id_country)
+                .distinct()
+            )
+
+        parts = [
+            _countries(
+                self._session.query(country_iso)
+                .select_from(Order)
+                .filter(order_day >= start_date, order_day <= end_date)
+            ),
+            _countries(
+                self._session.query(country_iso)
+                .select_from(FiscalDocument)
+                .join(Order, FiscalDocument.id_order == Order.id_order)
+                .filter(
+                    FiscalDocument.document_type == "return",
+                    return_day >= start_date,
+                    return_day <= end_date,
+                )
+            ),
+            _countries(
+                self._session.query(country_iso)
+                .select_from(Ricevuta)
+                .join(Order, Ricevuta.id_order == Order.id_order)
+                .filter(emission_day >= start_date, emission_day <= end_date)
+            ),
+        ]
+        codes = {code for query in parts for (code,) in query.all() if code}
+        return sorted(codes)
+
     def fetch_daily_counts(
         self,
         year: int,
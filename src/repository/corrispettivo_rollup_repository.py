@@ -0,0 +1,398 @@
+"""
+Repository del rollup giornaliero dei corrispettivi (corrispettivi_daily_rollup).
+
+I giorni mancanti vengono materializzati dalle stesse query live di
+CorrispettivoRepository, eseguite una volta per mese e ripartite per giorno,
+poi letti con query indicizzate su `day`. Le scritture su ordini, ricevute e
+documenti fiscali lo invalidano (src.core.corrispettivi_rollup_sync).
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.models.corrispettivo_rollup import CorrispettivoRollup, CorrispettivoRollupDay
+from src.models.fiscal_document import FiscalDocument
+from src.models.order import Order
+from src.models.ricevuta import Ricevuta
+from src.repository.corrispettivo_repository import CorrispettivoRepository
+from src.services.corrispettivi.aggregation import MovementRow, decimal_or_zero
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SALES_PRODUCTS = "sales_products"
+BUCKET_SALES_SHIPPING = "sales_shipping"
+BUCKET_RETURNS_PRODUCTS = "returns_products"
+BUCKET_RETURNS_SHIPPING = "returns_shipping"
+BUCKET_GROSS_SALES_BASE = "gross_sales_base"
+BUCKET_GROSS_SALES_IMPUTAZIONE = "gross_sales_imputazione"
+BUCKET_GROSS_RETURNS = "gross_returns"
+BUCKET_ORDER_COUNT = "order_count"
+BUCKET_RETURN_COUNT = "return_count"
+
+MOVEMENT_BUCKETS = (
+    BUCKET_SALES_PRODUCTS,
+    BUCKET_SALES_SHIPPING,
+    BUCKET_RETURNS_PRODUCTS,
+    BUCKET_RETURNS_SHIPPING,
+)
+GROSS_BUCKETS = (BUCKET_GROSS_SALES_BASE, BUCKET_GROSS_SALES_IMPUTAZIONE, BUCKET_GROSS_RETURNS)
+COUNT_BUCKETS = (BUCKET_ORDER_COUNT, BUCKET_RETURN_COUNT)
+
+_MEASURES = ("total_with_tax", "total_net", "products_with_tax", "products_net")
+
+RollupKey = Tuple[str, int, str]
+
+
+class CorrispettivoRollupRepository:
+    def __init__(self, session: Session, chunk_size: int = 1000):
+        self._session = session
+        self._chunk_size = chunk_size
+
+    # ------------------------------------------------------------------ lettura
+
+    def get_day_states(self, days: Iterable[date]) -> Dict[date, bool]:
+        """Giorni materializzati tra quelli indicati → flag locked."""
+        days = list(days)
+        if not days:
+            return {}
+        rows = self._session.execute(
+            select(CorrispettivoRollupDay.day, CorrispettivoRollupDay.locked).where(
+                CorrispettivoRollupDay.day.in_(days),
+                CorrispettivoRollupDay.built.is_(True),
+            )
+        ).all()
+        return {row.day: bool(row.locked) for row in rows}
+
+    def _rows(
+        self,
+        days: Sequence[date],
+        buckets: Sequence[str],
+        country_iso: Optional[str],
+    ) -> List[CorrispettivoRollup]:
+        if not days:
+            return []
+        query = self._session.query(CorrispettivoRollup).filter(
+            CorrispettivoRollup.day.in_(list(days)),
+            CorrispettivoRollup.bucket.in_(buckets),
+        )
+        if country_iso:
+            query = query.filter(CorrispettivoRollup.country_iso == country_iso.upper())
+        return query.all()
+
+    def fetch_movements(
+        self, days: Sequence[date], country_iso: Optional[str] = None
+    ) -> List[MovementRow]:
+        """Come CorrispettivoRepository.fetch_movements, un movimento per riga di rollup."""
+        movements: List[MovementRow] = []
+        for row in self._rows(days, MOVEMENT_BUCKETS, country_iso):
+            amount = decimal_or_zero(row.total_with_tax)
+            is_sales = row.bucket in (BUCKET_SALES_PRODUCTS, BUCKET_SALES_SHIPPING)
+            movements.append(
+                MovementRow(
+                    movement_date=row.day,
+                    country_iso=row.country_iso or None,
+                    id_tax=row.id_tax,
+                    sales_amount=amount if is_sales else Decimal("0"),
+                    returns_amount=Decimal("0") if is_sales else amount,
+                    is_shipping=row.bucket in (BUCKET_SALES_SHIPPING, BUCKET_RETURNS_SHIPPING),
+                )
+            )
+        return movements
+
+    def fetch_daily_gross_totals(
+        self, days: Sequence[date], country_iso: Optional[str] = None
+    ) -> dict:
+        """Stessa struttura di CorrispettivoRepository.fetch_daily_gross_totals."""
+        empty = CorrispettivoRepository._empty_gross_bucket
+        add = CorrispettivoRepository._add_gross_bucket
+        result: dict = {}
+        for row in self._rows(days, GROSS_BUCKETS, country_iso):
+            gross = CorrispettivoRepository._gross_bucket_from_row(row)
+            day_data = result.setdefault(row.day, {})
+            if row.bucket == BUCKET_GROSS_RETURNS:
+                add(day_data.setdefault("returns", empty()), gross)
+                continue
+            breakdown = day_data.setdefault(
+                "sales_breakdown",
+                {"base": empty(), "ricevute_decurtazione": empty(), "ricevute_imputazione": empty()},
+            )
+            component = "base" if row.bucket == BUCKET_GROSS_SALES_BASE else "ricevute_imputazione"
+            add(breakdown[component], gross)
+            add(day_data.setdefault("sales", empty()), gross)
+        return result
+
+    def fetch_daily_counts(
+        self, days: Sequence[date], country_iso: Optional[str] = None
+    ) -> Dict[date, Tuple[int, int]]:
+        counts: Dict[date, Tuple[int, int]] = {}
+        for row in self._rows(days, COUNT_BUCKETS, country_iso):
+            order_count, return_count = counts.get(row.day, (0, 0))
+            if row.bucket == BUCKET_ORDER_COUNT:
+                order_count += row.doc_count
+            else:
+                return_count += row.doc_count
+            counts[row.day] = (order_count, return_count)
+        return counts
+
+    # --------------------------------------------------------- materializzazione
+
+    def ensure_days(self, days: Iterable[date], source: CorrispettivoRepository) -> None:
+        """
+        Materializza (e committa) i giorni indicati non ancora presenti nel rollup.
+
+        1. Inserisce (e committa) una riga `built = 0` per i giorni senza riga: da qui
+           le invalidazioni concorrenti ne incrementano `version`.
+        2. In una nuova transazione legge le versioni e calcola i giorni con le query live.
+        3. Rilegge le versioni con SELECT FOR UPDATE e scrive solo i giorni non
+           invalidati nel frattempo; gli altri restano da ricalcolare.
+        """
+        days = sorted(set(days))
+        built = self.get_day_states(days)
+        missing = [day for day in days if day not in built]
+        if not missing:
+            return
+        self._insert_day_placeholders(missing)
+
+        versions = self._day_versions(missing)
+        if not versions:
+            return
+        rows_by_day: Dict[date, List[dict]] = {}
+        pending = sorted(versions)
+        for (year, month), month_days in groupby(pending, key=lambda day: (day.year, day.month)):
+            rows_by_day.update(self.compute_days(year, month, list(month_days), source))
+
+        current = self._day_versions(pending, for_update=True)
+        fresh = [day for day in pending if current.get(day) == versions[day]]
+        if len(fresh) < len(pending):
+            logger.info(
+                "corrispettivi_rollup: giorni invalidati durante il calcolo, non salvati: %s",
+                ", ".join(day.isoformat() for day in pending if day not in fresh),
+            )
+        if fresh:
+            self._session.execute(delete(CorrispettivoRollup).where(CorrispettivoRollup.day.in_(fresh)))
+            rows = [row for day in fresh for row in rows_by_day[day]]
+            if rows:
+                self._session.execute(insert(CorrispettivoRollup), rows)
+            self._session.execute(
+                update(CorrispettivoRollupDay)
+                .where(CorrispettivoRollupDay.day.in_(fresh))
+                .values(built=True)
+            )
+        self._session.commit()
+
+    def _insert_day_placeholders(self, days: List[date]) -> None:
+        """Righe `built = 0` per i giorni senza riga; il commit chiude la transazione corrente."""
+        existing = set(self._session.execute(
+            select(CorrispettivoRollupDay.day).where(CorrispettivoRollupDay.day.in_(days))
+        ).scalars())
+        new_days = [day for day in days if day not in existing]
+        try:
+            if new_days:
+                self._session.execute(
+                    insert(CorrispettivoRollupDay),
+                    [{"day": day, "locked": False, "built": False, "version": 0} for day in new_days],
+                )
+            self._session.commit()
+        except IntegrityError:
+            # Stesso giorno inserito in parallelo da un'altra richiesta
+            self._session.rollback()
+            logger.info("corrispettivi_rollup: giorni già inseriti da un'altra transazione")
+
+    def _day_versions(self, days: Sequence[date], for_update: bool = False) -> Dict[date, int]:
+        """Versione dei giorni indicati non ancora materializzati."""
+        query = select(CorrispettivoRollupDay.day, CorrispettivoRollupDay.version).where(
+            CorrispettivoRollupDay.day.in_(list(days)),
+            CorrispettivoRollupDay.built.is_(False),
+        )
+        if for_update:
+            query = query.with_for_update()
+        return {row.day: row.version for row in self._session.execute(query)}
+
+    @staticmethod
+    def _add(rows: Dict[RollupKey, dict], day: date, key: RollupKey, **values) -> None:
+        country_iso, id_tax, bucket = key
+        row = rows.setdefault(key, {
+            "day": day, "country_iso": country_iso, "id_tax": id_tax, "bucket": bucket,
+            **{measure: Decimal("0") for measure in _MEASURES}, "doc_count": 0,
+        })
+        for name, value in values.items():
+            row[name] += value
+
+    def compute_days(
+        self, year: int, month: int, days: Sequence[date], source: CorrispettivoRepository
+    ) -> Dict[date, List[dict]]:
+        """
+        Righe di rollup dei giorni indicati (stesso mese) calcolate con le query live.
+
+        Le query live filtrano il giorno con espressioni non indicizzabili
+        (convert_tz/DATE): ognuna viene eseguita una volta sul mese e le righe,
+        già raggruppate per giorno, vengono ripartite sui giorni richiesti.
+        """
+        rows: Dict[date, Dict[RollupKey, dict]] = {day: {} for day in days}
+
+        for movement in source.fetch_movements(year, month):
+            day_rows = rows.get(movement.movement_date)
+            if day_rows is None:
+                continue
+            country = (movement.country_iso or "").upper()
+            kind = "shipping" if movement.is_shipping else "products"
+            if movement.sales_amount:
+                self._add(day_rows, movement.movement_date, (country, movement.id_tax or 0, f"sales_{kind}"),
+                          total_with_tax=movement.sales_amount)
+            if movement.returns_amount:
+                self._add(day_rows, movement.movement_date, (country, movement.id_tax or 0, f"returns_{kind}"),
+                          total_with_tax=movement.returns_amount)
+
+        # Totali documento e conteggi: le query live non raggruppano per paese, si
+        # filtrano paese per paese; il residuo (ordini senza paese) va su country_iso ""
+        all_documents = self._document_totals(year, month, source, None)
+        by_country = {
+            country: self._document_totals(year, month, source, country)
+            for country in source.list_period_country_codes(min(days), max(days))
+        }
+
+        for day, day_rows in rows.items():
+            all_totals, all_counts = all_documents.get(day, ({}, (0, 0)))
+            residual = {bucket: dict(values) for bucket, values in all_totals.items()}
+            residual_counts = list(all_counts)
+            seen: Set[str] = set()
+            for country, documents in by_country.items():
+                totals, counts = documents.get(day, ({}, (0, 0)))
+                for bucket, values in totals.items():
+                    self._add(day_rows, day, (country, 0, bucket), **values)
+                    seen.add(bucket)
+                    for measure in _MEASURES:
+                        residual.setdefault(bucket, dict.fromkeys(_MEASURES, Decimal("0")))[measure] -= values[measure]
+                for index, bucket in enumerate(COUNT_BUCKETS):
+                    residual_counts[index] -= counts[index]
+                    if counts[index]:
+                        self._add(day_rows, day, (country, 0, bucket), doc_count=counts[index])
+
+            for bucket, values in residual.items():
+                if any(values.values()) or bucket not in seen:
+                    self._add(day_rows, day, ("", 0, bucket), **values)
+            for index, bucket in enumerate(COUNT_BUCKETS):
+                if residual_counts[index]:
+                    self._add(day_rows, day, ("", 0, bucket), doc_count=residual_counts[index])
+
+        return {day: list(day_rows.values()) for day, day_rows in rows.items()}
+
+    @staticmethod
+    def _document_totals(
+        year: int, month: int, source: CorrispettivoRepository, country_iso: Optional[str]
+    ) -> Dict[date, Tuple[Dict[str, dict], Tuple[int, int]]]:
+        """Totali documento per bucket e conteggi (ordini, resi) per giorno del mese."""
+        filters = {"delivery_country_iso": country_iso} if country_iso else None
+        gross_by_day = source.fetch_daily_gross_totals(year, month, filters)
+        counts_by_day = source.fetch_daily_counts(year, month, filters)
+
+        result: Dict[date, Tuple[Dict[str, dict], Tuple[int, int]]] = {}
+        for day in set(gross_by_day) | set(counts_by_day):
+            gross = gross_by_day.get(day, {})
+            totals: Dict[str, dict] = {}
+            sources = []
+            if "sales_breakdown" in gross:
+                sources.append((BUCKET_GROSS_SALES_BASE, gross["sales_breakdown"]["base"]))
+                sources.append((BUCKET_GROSS_SALES_IMPUTAZIONE, gross["sales_breakdown"]["ricevute_imputazione"]))
+            if "returns" in gross:
+                sources.append((BUCKET_GROSS_RETURNS, gross["returns"]))
+            for bucket, values in sources:
+                totals[bucket] = {measure: decimal_or_zero(values.get(measure)) for measure in _MEASURES}
+            result[day] = (totals, counts_by_day.get(day, (0, 0)))
+        return result
+
+    # ------------------------------------------------------------ manutenzione
+
+    def resolve_document_datetimes(
+        self,
+        *,
+        order_ids: Iterable[int] = (),
+        fiscal_document_ids: Iterable[int] = (),
+        shipping_ids: Iterable[int] = (),
+        address_ids: Iterable[int] = (),
+    ) -> List[datetime]:
+        """
+        Date (UTC naive) che collocano gli ordini indicati nei corrispettivi:
+        data ordine, emissione delle ricevute e data dei resi.
+        """
+        order_set = {i for i in order_ids if i}
+        lookups = (
+            (FiscalDocument.id_fiscal_document, FiscalDocument.id_order, fiscal_document_ids),
+            (Order.id_shipping, Order.id_order, shipping_ids),
+            (Order.id_address_delivery, Order.id_order, address_ids),
+        )
+        for key_column, order_column, ids in lookups:
+            for chunk in self._chunks({i for i in ids if i}):
+                order_set.update(
+                    self._session.execute(select(order_column).where(key_column.in_(chunk))).scalars()
+                )
+
+        values: List[datetime] = []
+        for chunk in self._chunks(order_set):
+            values += self._session.execute(
+                select(Order.date_add).where(Order.id_order.in_(chunk))
+            ).scalars().all()
+            values += self._session.execute(
+                select(Ricevuta.data_emissione).where(Ricevuta.id_order.in_(chunk))
+            ).scalars().all()
+            values += self._session.execute(
+                select(FiscalDocument.date_add).where(
+                    FiscalDocument.id_order.in_(chunk),
+                    FiscalDocument.document_type == "return",
+                )
+            ).scalars().all()
+        return values
+
+    def invalidate_days(self, days: Iterable[date]) -> int:
+        """
+        Rimuove dal rollup i giorni non bloccati (ricalcolati alla prossima lettura).
+
+        La riga del giorno resta con `built = 0` e `version` incrementata, così un
+        calcolo concorrente iniziato prima di questa modifica non viene salvato.
+        """
+        days = sorted(set(days))
+        if not days:
+            return 0
+        locked = set(self._session.execute(
+            select(CorrispettivoRollupDay.day).where(
+                CorrispettivoRollupDay.day.in_(days),
+                CorrispettivoRollupDay.locked.is_(True),
+            )
+        ).scalars())
+        if locked:
+            logger.warning(
+                "corrispettivi_rollup: modifiche su giorni chiusi non applicate al rollup: %s",
+                ", ".join(day.isoformat() for day in sorted(locked)),
+            )
+        to_remove = [day for day in days if day not in locked]
+        if not to_remove:
+            return 0
+        self._session.execute(delete(CorrispettivoRollup).where(CorrispettivoRollup.day.in_(to_remove)))
+        result = self._session.execute(
+            update(CorrispettivoRollupDay)
+            .where(CorrispettivoRollupDay.day.in_(to_remove))
+            .values(built=False, version=CorrispettivoRollupDay.version + 1)
+        )
+        return result.rowcount or 0
+
+    def set_locked(self, days: Iterable[date], locked: bool) -> None:
+        days = list(days)
+        if days:
+            self._session.execute(
+                update(CorrispettivoRollupDay)
+                .where(CorrispettivoRollupDay.day.in_(days))
+                .values(locked=locked)
+            )
+
+    def _chunks(self, ids: Set[int]):
+        ordered = sorted(ids)
+        for start in range(0, len(ordered), self._chunk_size):
+            yield ordered[start:start + self._chunk_size]
@@ -1,6 +1,6 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session, aliased, joinedload
-from sqlalchemy import Result, and_, or_, desc, func
+from typing import Iterator, List, Optional, Dict, Any
+from sqlalchemy.orm import Session, aliased, defer, joinedload
+from sqlalchemy import Result, Row, and_, or_, asc, desc, func
 from datetime import datetime
 from decimal import Decimal, ROUND_HALF_UP
 import math
@@ -23,12 +23,16 @@ from src.services.core.tool import (
     resolve_return_unit_prices,
 )
 from src.core.base_repository import BaseRepository
+from src.services.core.cursor_pagination import decode_cursor, keyset_condition, next_cursor_for
 from src.repository.interfaces.fiscal_document_repository_interface import IFiscalDocumentRepository
 from src.repository.tax_repository import TaxRepository
 from src.services.media.image_service import ImageService
 
 
 class FiscalDocumentRepository(BaseRepository[FiscalDocument, int], IFiscalDocumentRepository):
+    # Ordinamento della lista (date_add DESC, id ASC) codificato nei cursori keyset
+    LIST_CURSOR_ORDER_BY = "date_add"
+
     def __init__(self, session: Session):
         super().__init__(session, FiscalDocument)
         self._tax_repository = TaxRepository(session)
@@ -815,6 +819,7 @@ class FiscalDocumentRepository(BaseRepository[FiscalDocument, int], IFiscalDocum
         delivery_country_iso: Optional[str] = None,
         date_add_from: Optional[datetime] = None,
         date_add_to: Optional[datetime] = None,
+        after: Optional[str] = None,
     ) -> List[FiscalDocument]:
         """
         Recupera lista documenti fiscali con filtri
@@ -828,20 +833,33 @@ class FiscalDocumentRepository(BaseRepository[FiscalDocument, int], IFiscalDocum
             delivery_country_iso: ISO paese consegna ordine collegato
             date_add_from: Data emissione minima (inclusiva)
             date_add_to: Data emissione massima (inclusiva, fine giornata)
+            after: Cursore keyset (vedi build_next_cursor); se presente `skip` è ignorato
         """
-        return (
-            self._build_fiscal_documents_list_query(
-                document_type=document_type,
-                is_electronic=is_electronic,
-                status=status,
-                delivery_country_iso=delivery_country_iso,
-                date_add_from=date_add_from,
-                date_add_to=date_add_to,
+        query = self._build_fiscal_documents_list_query(
+            document_type=document_type,
+            is_electronic=is_electronic,
+            status=status,
+            delivery_country_iso=delivery_country_iso,
+            date_add_from=date_add_from,
+            date_add_to=date_add_to,
+        ).order_by(desc(FiscalDocument.date_add), asc(FiscalDocument.id_fiscal_document))
+
+        if after:
+            sort_value, last_id = decode_cursor(after, self.LIST_CURSOR_ORDER_BY, "desc")
+            query = query.filter(
+                keyset_condition(
+                    FiscalDocument.date_add, FiscalDocument.id_fiscal_document, "desc", sort_value, last_id
+                )
             )
-            .order_by(desc(FiscalDocument.date_add))
-            .offset(skip)
-            .limit(limit)
-            .all()
+        else:
+            query = query.offset(skip)
+
+        return query.limit(limit).all()
+
+    def build_next_cursor(self, documents: List[FiscalDocument], limit: int) -> Optional[str]:
+        """Cursore `after` per la pagina successiva (None se la pagina non è piena)."""
+        return next_cursor_for(
+            documents, limit, self.LIST_CURSOR_ORDER_BY, "desc", "date_add", "id_fiscal_document"
         )
 
     def _build_fiscal_document_export_query(
@@ -967,6 +985,40 @@ class FiscalDocumentRepository(BaseRepository[FiscalDocument, int], IFiscalDocum
             .all()
         )
     
+    def iter_invoices_for_export(
+        self,
+        batch_size: int = 500,
+        document_type: str = "invoice",
+        is_electronic: Optional[bool] = None,
+        status: Optional[str] = None,
+        id_order: Optional[int] = None,
+        id_customer: Optional[int] = None,
+        delivery_country_iso: Optional[str] = None,
+        date_add_from: Optional[datetime] = None,
+        date_add_to: Optional[datetime] = None,
+    ) -> Iterator[Row]:
+        """
+        Come list_invoices_for_export ma letto a blocchi di batch_size (yield_per), senza
+        caricare xml_content: per export grandi la memoria non cresce con il numero di righe.
+        Durante l'iterazione non vanno eseguite altre query sulla stessa sessione.
+        """
+        query = (
+            self._build_fiscal_document_export_query(
+                document_type=document_type,
+                is_electronic=is_electronic,
+                status=status,
+                id_order=id_order,
+                id_customer=id_customer,
+                delivery_country_iso=delivery_country_iso,
+                date_add_from=date_add_from,
+                date_add_to=date_add_to,
+            )
+            .options(defer(FiscalDocument.xml_content))
+            .order_by(desc(FiscalDocument.date_add))
+            .yield_per(batch_size)
+        )
+        yield from query
+
     def update_fiscal_document_status(
         self, 
         id_fiscal_document: int, 
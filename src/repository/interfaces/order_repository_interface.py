@@ -2,7 +2,7 @@
 Interfaccia per Order Repository seguendo ISP
 """
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.engine import Row
 from src.models.order import Order
 from src.models.order_detail import OrderDetail
@@ -146,6 +146,11 @@ class IOrderRepository(ABC):
         """Recupera l'ID della spedizione associata a un ordine"""
         pass
     
+    @abstractmethod
+    def get_shipping_carrier_map(self, order_ids: List[int]) -> Dict[int, Tuple[Optional[int], Optional[int]]]:
+        """Mappa id_order -> (id_shipping, id_carrier_api) per più ordini in una query"""
+        pass
+    
     @abstractmethod
     def set_multishipping(self, order_id: int, value: int) -> bool:
         """Imposta il flag is_multishipping per un ordine"""
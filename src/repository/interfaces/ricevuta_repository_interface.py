@@ -1,7 +1,7 @@
 """Interfaccia repository ricevute."""
 from abc import abstractmethod
 from datetime import date
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 from src.core.interfaces import IRepository
 from src.models.ricevuta import Ricevuta
@@ -23,6 +23,20 @@ class IRicevutaRepository(IRepository[Ricevuta, int]):
         """Lista paginata con filtri."""
         pass
 
+    @abstractmethod
+    def iter_filtered(
+        self,
+        *,
+        id_order: Optional[int] = None,
+        id_customer: Optional[int] = None,
+        stato: Optional[str] = None,
+        data_emissione_from: Optional[date] = None,
+        data_emissione_to: Optional[date] = None,
+        batch_size: int = 500,
+    ) -> Iterator[List[Ricevuta]]:
+        """Stessi filtri e ordinamento di list_filtered, a blocchi di batch_size (export)."""
+        pass
+
     @abstractmethod
     def get_next_numero(self, anno: int) -> int:
         """Prossimo numero progressivo per l'anno (con lock riga max)."""
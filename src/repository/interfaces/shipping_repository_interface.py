@@ -2,7 +2,8 @@
 Interfaccia per Shipping Repository seguendo ISP
 """
 from abc import abstractmethod
-from typing import Optional, List, Union
+from datetime import datetime
+from typing import Dict, Optional, List, Set, Union
 from sqlalchemy.engine import Row
 from src.core.interfaces import IRepository
 from src.models.shipping import Shipping
@@ -41,6 +42,11 @@ class IShippingRepository(IRepository[Shipping, int]):
         """Update id_shipping_state by tracking. Returns affected rows count."""
         pass
 
+    @abstractmethod
+    def bulk_update_states_by_tracking(self, updates: List[Dict]) -> List[Dict]:
+        """Aggiorna in blocco gli stati per tracking; restituisce le sole spedizioni cambiate"""
+        pass
+
     @abstractmethod
     def get_weight(self, id_shipping: int) -> Optional[float]:
         """Recupera il peso di una spedizione"""
@@ -71,6 +77,26 @@ class IShippingRepository(IRepository[Shipping, int]):
         """Verifica se una spedizione ha eventi in shipments_history"""
         pass
     
+    @abstractmethod
+    def get_shipments_due_for_polling(self, now: datetime, exclude_states: Optional[List[int]] = None) -> List[Row]:
+        """Spedizioni con tracking il cui next_poll_at è scaduto (o mai pianificato)"""
+        pass
+    
+    @abstractmethod
+    def get_shipping_ids_with_events(self, id_shippings: List[int]) -> Set[int]:
+        """Sottoinsieme di id_shipping con almeno un evento in shipments_history"""
+        pass
+    
+    @abstractmethod
+    def schedule_next_polls(self, next_poll_at_by_id: Dict[int, datetime]) -> None:
+        """Aggiorna next_poll_at per più spedizioni in un'unica transazione"""
+        pass
+    
+    @abstractmethod
+    def get_next_scheduled_poll(self, exclude_states: Optional[List[int]] = None) -> Optional[datetime]:
+        """Primo next_poll_at pianificato tra le spedizioni da interrogare"""
+        pass
+    
     @abstractmethod
     def get_carrier_id_by_tracking(self, tracking: str) -> Optional[int]:
         """Recupera id_carrier_api da Shipping usando il tracking number"""
@@ -8,6 +8,8 @@ from src.models.order_detail import OrderDetail
 from src.repository.interfaces.order_detail_repository_interface import IOrderDetailRepository
 from src.core.base_repository import BaseRepository
 from src.core.exceptions import InfrastructureException
+from src.core.corrispettivi_rollup_sync import queue_corrispettivi_rollup_refresh
+from src.core.order_search_sync import queue_order_search_refresh
 from src.models.order_document import OrderDocument
 from src.schemas.order_detail_schema import OrderDetailSchema
 
@@ -261,7 +263,12 @@ class OrderDetailRepository(BaseRepository[OrderDetail, int], IOrderDetailReposi
                 details = [OrderDetail(**d.model_dump()) for d in batch]
                 self._session.bulk_save_objects(details)
                 total_inserted += len(details)
-            
+
+            # bulk_save_objects non passa dai listener: accoda indice di ricerca e rollup corrispettivi
+            touched_orders = {d.id_order for d in data_list}
+            queue_order_search_refresh(self._session, touched_orders)
+            queue_corrispettivi_rollup_refresh(self._session, touched_orders)
+
             self._session.commit()
             return total_inserted
             
@@ -1,12 +1,13 @@
 # Standard library imports
 import logging
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 
 # Third-party imports
 from fastapi import HTTPException
 from sqlalchemy import asc, desc, func, select, or_, String, and_, text
 from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload, selectinload
 
 # Local application imports - Core
@@ -20,11 +21,12 @@ from src.services.core.tool import (
     get_tax_percentage_by_address_delivery_id
 )
 from src.services import QueryUtils
+from src.services.core.cursor_pagination import decode_cursor, keyset_condition, next_cursor_for
 from src.services.routers.order_document_service import OrderDocumentService
 
 from src.models.order_package import OrderPackage
 # Local application imports - Models
-from ..models import Order, OrderState, Shipping, Address
+from ..models import Order, OrderState, Shipping, Address, Lang, Sectional, ShippingState
 from ..models.order import ViesStatus
 from ..models.shipments_history import ShipmentsHistory
 from ..models.shipment_document import ShipmentDocument
@@ -52,6 +54,7 @@ from .customer_repository import CustomerRepository
 from .lang_repository import LangRepository
 from .order_detail_repository import OrderDetailRepository
 from .order_package_repository import OrderPackageRepository
+from .order_search_index_repository import OrderSearchIndexRepository
 from .order_state_repository import OrderStateRepository
 from .payment_repository import PaymentRepository
 from .platform_repository import PlatformRepository
@@ -62,12 +65,18 @@ from .tax_repository import TaxRepository
 from .app_configuration_repository import AppConfigurationRepository
 
 from src.core.exceptions import InfrastructureException
+from src.core.corrispettivi_rollup_sync import queue_corrispettivi_rollup_refresh
+from src.core.order_search_sync import queue_order_search_refresh, register_order_search_index_listeners
 # Local application imports - Interfaces
 from ..repository.interfaces.order_repository_interface import IOrderRepository
 
 
 logger = logging.getLogger(__name__)
 
+# La ricerca rapida legge order_search_index: i listener che lo mantengono devono
+# essere attivi ovunque si usi questa repository (anche fuori dall'app, es. script/test)
+register_order_search_index_listeners()
+
 
 class OrderRepository(BaseRepository[Order, int], IOrderRepository):
     # Whitelist colonne ordinabili da API.
@@ -128,6 +137,152 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
             ),
         )
 
+    def _apply_list_filters(self,
+                            stmt,
+                            orders_ids: Optional[str] = None,
+                            customers_ids: Optional[str] = None,
+                            order_states_ids: Optional[str] = None,
+                            shipping_states_ids: Optional[str] = None,
+                            delivery_countries_ids: Optional[str] = None,
+                            store_ids: Optional[str] = "1",
+                            platforms_ids: Optional[str] = None,
+                            payments_ids: Optional[str] = None,
+                            ecommerce_states_ids: Optional[str] = None,
+                            search: Optional[str] = None,
+                            is_payed: Optional[bool] = None,
+                            is_invoice_requested: Optional[bool] = None,
+                            has_invoice: Optional[bool] = None,
+                            vies_status: Optional[str] = None,
+                            date_from: Optional[str] = None,
+                            date_to: Optional[str] = None):
+        """
+        Applica i filtri comuni a lista e conteggio ordini.
+
+        Lavora su uno statement `select()` (SQLAlchemy 2.0): lo stesso statement è
+        eseguibile sia con `Session` (get_all/get_count) sia con `AsyncSession`
+        (get_all_async/get_count_async).
+        """
+        try:
+            # Filtri per ID
+            if orders_ids:
+                stmt = QueryUtils.filter_by_id(stmt, Order, 'id_order', orders_ids)
+            if customers_ids:
+                stmt = QueryUtils.filter_by_id(stmt, Order, 'id_customer', customers_ids)
+            if order_states_ids:
+                stmt = QueryUtils.filter_by_id(stmt, Order, 'id_order_state', order_states_ids)
+            if ecommerce_states_ids:
+                stmt = QueryUtils.filter_by_id(stmt, Order, 'id_ecommerce_state', ecommerce_states_ids)
+            if store_ids:
+                stmt = QueryUtils.filter_by_id(stmt, Order, 'id_store', store_ids)
+            if platforms_ids:
+                stmt = QueryUtils.filter_by_id(stmt, Order, 'id_platform', platforms_ids)
+            if payments_ids:
+                stmt = QueryUtils.filter_by_id(stmt, Order, 'id_payment', payments_ids)
+            if shipping_states_ids:
+                ids = QueryUtils.parse_int_list(shipping_states_ids)
+                stmt = stmt.join(Shipping, Order.id_shipping == Shipping.id_shipping)
+                stmt = stmt.filter(Shipping.id_shipping_state.in_(ids))
+            if delivery_countries_ids:
+                ids = QueryUtils.parse_int_list(delivery_countries_ids)
+                stmt = stmt.join(Address, Order.id_address_delivery == Address.id_address)
+                stmt = stmt.filter(Address.id_country.in_(ids))
+
+            # Ricerca rapida sull'indice denormalizzato (nessun JOIN, nessun DISTINCT)
+            if search:
+                stmt = stmt.filter(OrderSearchIndexRepository(self.session).search_condition(search))
+
+            # Filtri booleani
+            if is_payed is not None:
+                stmt = stmt.filter(Order.is_payed == is_payed)
+            if is_invoice_requested is not None:
+                stmt = stmt.filter(Order.is_invoice_requested == is_invoice_requested)
+            if has_invoice is not None:
+                invoice_exists = select(FiscalDocument.id_fiscal_document).where(
+                    FiscalDocument.id_order == Order.id_order,
+                    FiscalDocument.document_type == 'invoice'
+                ).exists()
+                stmt = stmt.filter(invoice_exists if has_invoice else ~invoice_exists)
+            stmt = self._apply_vies_status_filter(stmt, vies_status)
+
+            # Filtri per data
+            if date_from:
+                stmt = stmt.filter(Order.date_add >= date_from)
+            if date_to:
+                stmt = stmt.filter(Order.date_add <= date_to)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Parametri di ricerca non validi")
+
+        return stmt
+
+    def _normalize_sort(self, order_by: str, order_direction: str):
+        """Validazione whitelist (difesa in profondità: il router già valida via Literal/normalize)."""
+        order_by_key = order_by if order_by in self.ALLOWED_ORDER_BY_FIELDS else "id_order"
+        order_direction_key = order_direction.lower() if isinstance(order_direction, str) else "desc"
+        if order_direction_key not in self.ALLOWED_ORDER_DIRECTIONS:
+            order_direction_key = "desc"
+        return order_by_key, order_direction_key
+
+    def _build_list_statement(self,
+                              page: int = 1,
+                              limit: int = 10,
+                              order_by: str = "id_order",
+                              order_direction: str = "desc",
+                              after: Optional[str] = None,
+                              **filters):
+        """
+        Costruisce lo statement paginato della lista ordini (vedi get_all).
+
+        Con `after` (cursore opaco) usa la paginazione keyset sullo stesso
+        ordinamento `order_by, id_order ASC` al posto di OFFSET.
+        """
+        order_by_key, order_direction_key = self._normalize_sort(order_by, order_direction)
+        sort_column = self.ALLOWED_ORDER_BY_FIELDS[order_by_key]
+        primary_sort = desc(sort_column) if order_direction_key == "desc" else asc(sort_column)
+
+        # joinedload di carrier e stato e-commerce: evita N+1 in formatted_output
+        # (e lazy load non ammessi sugli oggetti caricati da AsyncSession)
+        stmt = select(Order).options(
+            joinedload(Order.carrier),
+            joinedload(Order.ecommerce_order_state)
+        )
+        stmt = self._apply_list_filters(stmt, **filters)
+
+        # ORDER BY principale + tie-breaker stabile `id_order ASC` (paginazione deterministica
+        # anche quando si ordina per una data e ci sono timestamp identici).
+        # Quando si ordina già per id_order il tie-breaker è ridondante ma non dannoso.
+        stmt = stmt.order_by(primary_sort, asc(Order.id_order))
+        if after:
+            sort_value, last_id = decode_cursor(after, order_by_key, order_direction_key)
+            return stmt.filter(
+                keyset_condition(sort_column, Order.id_order, order_direction_key, sort_value, last_id)
+            ).limit(limit)
+        return stmt.offset(QueryUtils.get_offset(limit, page)).limit(limit)
+
+    def build_next_cursor(self, orders: List[Order], limit: int,
+                          order_by: str = "id_order", order_direction: str = "desc") -> Optional[str]:
+        """Cursore `after` per la pagina successiva (None se la pagina non è piena)."""
+        order_by_key, order_direction_key = self._normalize_sort(order_by, order_direction)
+        return next_cursor_for(orders, limit, order_by_key, order_direction_key, order_by_key, "id_order")
+
+    def _build_count_statement(self, **filters):
+        """Costruisce lo statement di conteggio con gli stessi filtri della lista."""
+        stmt = select(func.count(Order.id_order)).select_from(Order)
+        return self._apply_list_filters(stmt, **filters)
+
+    @staticmethod
+    def _invoiced_order_ids_statement(order_ids: List[int]):
+        """Statement che restituisce gli id_order (tra quelli dati) con almeno una fattura."""
+        return select(FiscalDocument.id_order).where(
+            FiscalDocument.id_order.in_(order_ids),
+            FiscalDocument.document_type == 'invoice'
+        ).distinct()
+
+    @staticmethod
+    def _mark_has_invoice(orders: List[Order], invoiced_ids: set) -> None:
+        """Imposta il flag pre-calcolato _has_invoice usato da formatted_output."""
+        for o in orders:
+            o._has_invoice = o.id_order in invoiced_ids
+
     def get_all(self,
                 orders_ids: Optional[str] = None,
                 customers_ids: Optional[str] = None,
@@ -149,7 +304,8 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
                 page: int = 1,
                 limit: int = 10,
                 order_by: str = "id_order",
-                order_direction: str = "desc"
+                order_direction: str = "desc",
+                after: Optional[str] = None
                 ):
         """
         Recupera tutti gli ordini con filtri opzionali.
@@ -160,98 +316,47 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
                              A parità di valore viene sempre applicato `id_order ASC` come
                              tie-breaker per garantire un ordine deterministico (necessario
                              per la paginazione stabile, soprattutto quando `order_by` è una data).
+            after: cursore opaco (vedi build_next_cursor). Se presente `page` viene ignorato
+                   e la pagina è letta in keyset, senza OFFSET.
         """
-        # Validazione whitelist (difesa in profondità: il router già valida via Literal/normalize)
-        order_by_key = order_by if order_by in self.ALLOWED_ORDER_BY_FIELDS else "id_order"
-        order_direction_key = order_direction.lower() if isinstance(order_direction, str) else "desc"
-        if order_direction_key not in self.ALLOWED_ORDER_DIRECTIONS:
-            order_direction_key = "desc"
-        sort_column = self.ALLOWED_ORDER_BY_FIELDS[order_by_key]
-        primary_sort = desc(sort_column) if order_direction_key == "desc" else asc(sort_column)
-        # Usa joinedload per caricare carrier ed evitare N+1 queries
-        query = self.session.query(Order).options(joinedload(Order.carrier))
-        
-        # LEFT JOINs per la ricerca rapida (solo se necessario)
-        needs_search_joins = search is not None
-        if needs_search_joins:
-            query = query.outerjoin(Address, Order.id_address_delivery == Address.id_address)
-            query = query.outerjoin(Customer, Order.id_customer == Customer.id_customer)
-            query = query.outerjoin(Payment, Order.id_payment == Payment.id_payment)
-            query = query.outerjoin(Shipping, Order.id_shipping == Shipping.id_shipping)
-            query = query.outerjoin(OrderDetailModel, Order.id_order == OrderDetailModel.id_order)
-            query = query.outerjoin(Product, OrderDetailModel.id_product == Product.id_product)
-        
-        try:
-            # Filtri per ID
-            if orders_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_order', orders_ids)
-            if customers_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_customer', customers_ids)
-            if order_states_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_order_state', order_states_ids)
-            if ecommerce_states_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_ecommerce_state', ecommerce_states_ids)
-            if store_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_store', store_ids)
-            if platforms_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_platform', platforms_ids)
-            if payments_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_payment', payments_ids)
-            if shipping_states_ids:
-                ids = QueryUtils.parse_int_list(shipping_states_ids)
-                if not needs_search_joins:
-                    query = query.join(Shipping, Order.id_shipping == Shipping.id_shipping)
-                query = query.filter(Shipping.id_shipping_state.in_(ids))
-            if delivery_countries_ids:
-                ids = QueryUtils.parse_int_list(delivery_countries_ids)
-                if not needs_search_joins:
-                    query = query.join(Address, Order.id_address_delivery == Address.id_address)
-                query = query.filter(Address.id_country.in_(ids))
-            
-            # Filtri booleani
-            if is_payed is not None:
-                query = query.filter(Order.is_payed == is_payed)
-            if is_invoice_requested is not None:
-                query = query.filter(Order.is_invoice_requested == is_invoice_requested)
-            if has_invoice is not None:
-                invoice_exists = self.session.query(FiscalDocument.id_fiscal_document).filter(
-                    FiscalDocument.id_order == Order.id_order,
-                    FiscalDocument.document_type == 'invoice'
-                ).exists()
-                query = query.filter(invoice_exists if has_invoice else ~invoice_exists)
-            query = self._apply_vies_status_filter(query, vies_status)
-            
-            # Filtri per data (se implementati)
-            if date_from:
-                query = query.filter(Order.date_add >= date_from)
-            if date_to:
-                query = query.filter(Order.date_add <= date_to)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Parametri di ricerca non validi")
-        
-        # Usa distinct per evitare duplicati quando ci sono JOINs multipli (es. OrderDetail)
-        if needs_search_joins:
-            query = query.distinct()
-        
-        # ORDER BY principale + tie-breaker stabile `id_order ASC` (paginazione deterministica
-        # anche quando si ordina per una data e ci sono timestamp identici).
-        # Quando si ordina già per id_order il tie-breaker è ridondante ma non dannoso.
-        order_by_clause = [primary_sort, asc(Order.id_order)]
-        orders_result = query.order_by(*order_by_clause).offset(QueryUtils.get_offset(limit, page)).limit(limit).all()
-        
+        stmt = self._build_list_statement(
+            page=page, limit=limit, order_by=order_by, order_direction=order_direction, after=after,
+            orders_ids=orders_ids, customers_ids=customers_ids, order_states_ids=order_states_ids,
+            shipping_states_ids=shipping_states_ids, delivery_countries_ids=delivery_countries_ids,
+            store_ids=store_ids, platforms_ids=platforms_ids, payments_ids=payments_ids,
+            ecommerce_states_ids=ecommerce_states_ids, search=search, is_payed=is_payed,
+            is_invoice_requested=is_invoice_requested, has_invoice=has_invoice,
+            vies_status=vies_status, date_from=date_from, date_to=date_to
+        )
+        orders_result = list(self.session.execute(stmt).scalars().all())
+
         # Pre-calcola has_invoice in batch per evitare N+1 in formatted_output
         if orders_result:
             order_ids = [o.id_order for o in orders_result]
             invoiced_ids = {
-                row[0]
-                for row in self.session.query(FiscalDocument.id_order).filter(
-                    FiscalDocument.id_order.in_(order_ids),
-                    FiscalDocument.document_type == 'invoice'
-                ).distinct().all()
+                row[0] for row in self.session.execute(self._invoiced_order_ids_statement(order_ids)).all()
             }
-            for o in orders_result:
-                o._has_invoice = o.id_order in invoiced_ids
-        
+            self._mark_has_invoice(orders_result, invoiced_ids)
+
+        return orders_result
+
+    async def get_all_async(self, async_session: AsyncSession, **params) -> List[Order]:
+        """
+        Variante asincrona di get_all (stessi parametri), eseguita su AsyncSession.
+
+        Non blocca l'event loop durante le query: usata dalla lista ordini.
+        Gli oggetti restituiti hanno carrier, stato e-commerce e _has_invoice già
+        valorizzati, quindi sono utilizzabili da formatted_output senza lazy load.
+        """
+        params.pop("show_details", None)
+        stmt = self._build_list_statement(**params)
+        orders_result = list((await async_session.execute(stmt)).scalars().all())
+
+        if orders_result:
+            order_ids = [o.id_order for o in orders_result]
+            rows = (await async_session.execute(self._invoiced_order_ids_statement(order_ids))).all()
+            self._mark_has_invoice(orders_result, {row[0] for row in rows})
+
         return orders_result
 
     def get_count(self,
@@ -275,107 +380,20 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
         """
         Conta il numero totale di ordini con i filtri applicati
         """
-        # Usa distinct count se ci sono JOINs che possono creare duplicati
-        if search is not None:
-            query = self.session.query(func.count(func.distinct(Order.id_order)))
-        else:
-            query = self.session.query(func.count(Order.id_order))
-        
-        # LEFT JOINs per la ricerca rapida (solo se necessario)
-        needs_search_joins = search is not None
-        if needs_search_joins:
-            query = query.outerjoin(Address, Order.id_address_delivery == Address.id_address)
-            query = query.outerjoin(Customer, Order.id_customer == Customer.id_customer)
-            query = query.outerjoin(Payment, Order.id_payment == Payment.id_payment)
-            query = query.outerjoin(Shipping, Order.id_shipping == Shipping.id_shipping)
-            query = query.outerjoin(OrderDetailModel, Order.id_order == OrderDetailModel.id_order)
-            query = query.outerjoin(Product, OrderDetailModel.id_product == Product.id_product)
-        
-        try:
-            # Applica gli stessi filtri di get_all
-            if orders_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_order', orders_ids)
-            if customers_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_customer', customers_ids)
-            if order_states_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_order_state', order_states_ids)
-            if ecommerce_states_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_ecommerce_state', ecommerce_states_ids)
-            if store_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_store', store_ids)
-            if platforms_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_platform', platforms_ids)
-            if payments_ids:
-                query = QueryUtils.filter_by_id(query, Order, 'id_payment', payments_ids)
-            if shipping_states_ids:
-                ids = QueryUtils.parse_int_list(shipping_states_ids)
-                if not needs_search_joins:
-                    query = query.join(Shipping, Order.id_shipping == Shipping.id_shipping)
-                query = query.filter(Shipping.id_shipping_state.in_(ids))
-            if delivery_countries_ids:
-                ids = QueryUtils.parse_int_list(delivery_countries_ids)
-                if not needs_search_joins:
-                    query = query.join(Address, Order.id_address_delivery == Address.id_address)
-                query = query.filter(Address.id_country.in_(ids))
-            
-            # Ricerca rapida
-            if search:
-                search_conditions = []
-                search_lower = f"%{search.lower()}%"
-                
-                # Address fields (gestisce NULL con coalesce)
-                search_conditions.append(func.cast(func.coalesce(Address.id_address, 0), String).ilike(search_lower))
-                search_conditions.append(func.coalesce(Address.firstname, '').ilike(search_lower))
-                search_conditions.append(func.coalesce(Address.lastname, '').ilike(search_lower))
-                search_conditions.append(func.coalesce(Address.address1, '').ilike(search_lower))
-                search_conditions.append(func.coalesce(Address.postcode, '').ilike(search_lower))
-                search_conditions.append(func.coalesce(Address.vat, '').ilike(search_lower))
-                search_conditions.append(func.coalesce(Address.pec, '').ilike(search_lower))
-                search_conditions.append(func.coalesce(Address.sdi, '').ilike(search_lower))
-                
-                # Customer fields
-                search_conditions.append(func.coalesce(Customer.firstname, '').ilike(search_lower))
-                search_conditions.append(func.coalesce(Customer.lastname, '').ilike(search_lower))
-                search_conditions.append(func.coalesce(Customer.email, '').ilike(search_lower))
-                
-                # Order fields
-                search_conditions.append(func.coalesce(Order.reference, '').ilike(search_lower))
-                search_conditions.append(func.coalesce(Order.internal_reference, '').ilike(search_lower))
-                
-                # Payment fields
-                search_conditions.append(func.coalesce(Payment.name, '').ilike(search_lower))
-                
-                # Product fields
-                search_conditions.append(func.coalesce(Product.name, '').ilike(search_lower))
-                
-                # Shipping fields
-                search_conditions.append(func.coalesce(Shipping.tracking, '').ilike(search_lower))
-                
-                query = query.filter(or_(*search_conditions))
-            
-            # Filtri booleani
-            if is_payed is not None:
-                query = query.filter(Order.is_payed == is_payed)
-            if is_invoice_requested is not None:
-                query = query.filter(Order.is_invoice_requested == is_invoice_requested)
-            if has_invoice is not None:
-                invoice_exists = self.session.query(FiscalDocument.id_fiscal_document).filter(
-                    FiscalDocument.id_order == Order.id_order,
-                    FiscalDocument.document_type == 'invoice'
-                ).exists()
-                query = query.filter(invoice_exists if has_invoice else ~invoice_exists)
-            query = self._apply_vies_status_filter(query, vies_status)
-            
-            # Filtri per data
-            if date_from:
-                query = query.filter(Order.date_add >= date_from)
-            if date_to:
-                query = query.filter(Order.date_add <= date_to)
-                
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Parametri di ricerca non validi")
-        
-        return query.scalar() or 0
+        stmt = self._build_count_statement(
+            orders_ids=orders_ids, customers_ids=customers_ids, order_states_ids=order_states_ids,
+            shipping_states_ids=shipping_states_ids, delivery_countries_ids=delivery_countries_ids,
+            store_ids=store_ids, platforms_ids=platforms_ids, payments_ids=payments_ids,
+            ecommerce_states_ids=ecommerce_states_ids, search=search, is_payed=is_payed,
+            is_invoice_requested=is_invoice_requested, has_invoice=has_invoice,
+            vies_status=vies_status, date_from=date_from, date_to=date_to
+        )
+        return self.session.execute(stmt).scalar() or 0
+
+    async def get_count_async(self, async_session: AsyncSession, **filters) -> int:
+        """Variante asincrona di get_count (stessi parametri), eseguita su AsyncSession."""
+        stmt = self._build_count_statement(**filters)
+        return (await async_session.execute(stmt)).scalar() or 0
 
     def get_by_id(self, _id: int) -> Order:
         """Recupera un ordine per ID con eager loading di ecommerce_order_state"""
@@ -1194,58 +1212,112 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
         if not data_list:
             return 0
         
-        try:  
-            # Get existing (id_origin, id_store) pairs
-            origin_ids = [data.id_origin for data in data_list if hasattr(data, 'id_origin') and data.id_origin]
-            
-            if origin_ids:
-                placeholders = ','.join([f':id_{i}' for i in range(len(origin_ids))])
-                params = {f'id_{i}': origin for i, origin in enumerate(origin_ids)}
-                if id_store:
-                    params['id_store'] = id_store
-                    query = text(f"SELECT id_origin FROM orders WHERE id_origin IN ({placeholders}) AND id_store = :id_store")
-                else:
-                    query = text(f"SELECT id_origin FROM orders WHERE id_origin IN ({placeholders})")
-                result = self.session.execute(query, params)
-                existing_origins = {row[0] for row in result}
-            else:
-                existing_origins = set()
-            
-            # Filter new orders
-            new_orders_data = [data for data in data_list if hasattr(data, 'id_origin') and data.id_origin not in existing_origins]
-            
-            if not new_orders_data:
-                return 0
-            
-            # Batch insert
-            total_inserted = 0
-            for i in range(0, len(new_orders_data), batch_size):
-                batch = new_orders_data[i:i + batch_size]
-                orders = [Order(**o.model_dump() if hasattr(o, 'model_dump') else o) for o in batch]
-                self.session.bulk_save_objects(orders)
-                total_inserted += len(orders)
-            
+        # Solo nuovi ordini: quelli già presenti per (id_store, id_origin) restano invariati
+        result = self.upsert_by_origin(
+            [o.model_dump() if hasattr(o, 'model_dump') else o for o in data_list], id_store, batch_size=batch_size
+        )
+        
+        # Insert Core: non passa dai listener, accoda indice di ricerca e rollup corrispettivi
+        new_order_ids = list(result.inserted_ids.values())
+        if new_order_ids:
+            queue_order_search_refresh(self.session, new_order_ids)
+            queue_corrispettivi_rollup_refresh(self.session, new_order_ids)
             self.session.commit()
-            return total_inserted
-            
-        except Exception as e:
-            self.session.rollback()
-            raise InfrastructureException(f"Database error bulk creating orders: {str(e)}")
+        return result.inserted
 
     def formatted_output(self, order: Order, show_details: bool = False, include_order_history: bool = True):
         """
-        Formatta l'output di un ordine con le relazioni popolate tramite query separate
+        Formatta l'output di un ordine con le relazioni popolate
         
         Args:
             order: Oggetto Order da formattare
             show_details: Se True, include dettagli completi delle relazioni
             include_order_history: Se True, include order_history nella risposta (default: True)
         """
+        return self.formatted_output_batch(
+            [order], show_details=show_details, include_order_history=include_order_history
+        )[0]
+
+    def formatted_output_batch(self,
+                               orders: List[Order],
+                               show_details: bool = False,
+                               include_order_history: bool = True) -> List[dict]:
+        """
+        Formatta una pagina di ordini caricando le relazioni in batch.
+
+        Ogni tipo di entità referenziata (indirizzi, clienti, lingue, spedizioni,
+        sezionali, pagamenti, stati, dettagli, packages, cronologia) viene letto con
+        una sola query `IN (...)` per l'intera pagina: O(relazioni) round trip
+        invece di O(righe × relazioni). L'output è identico a formatted_output.
+
+        Args:
+            orders: Ordini da formattare (ordine preservato)
+            show_details: Se True, include dettagli completi delle relazioni
+            include_order_history: Se True, include order_history nella risposta (default: True)
+        """
+        if not orders:
+            return []
+
+        order_ids = [o.id_order for o in orders if o.id_order]
+
+        # has_invoice: pre-calcolato da get_all, altrimenti una sola query per tutti i mancanti
+        missing_invoice_ids = [o.id_order for o in orders if getattr(o, '_has_invoice', None) is None]
+        invoiced_ids = set()
+        if missing_invoice_ids:
+            invoiced_ids = {
+                row[0] for row in self.session.execute(self._invoiced_order_ids_statement(missing_invoice_ids)).all()
+            }
+
+        order_states = self._load_by_ids(OrderState, OrderState.id_order_state,
+                                         {o.id_order_state for o in orders})
+        packages_by_order = self._load_packages_by_order(order_ids)
+        history_by_order = self._load_history_by_order(order_ids) if include_order_history else {}
+
+        # Lookup usati solo con show_details
+        addresses, customers, langs, shippings = {}, {}, {}, {}
+        carriers_api, shipping_states, taxes = {}, {}, {}
+        sectionals, payments, details_by_order, images_map = {}, {}, {}, {}
+        if show_details:
+            addresses = self._load_by_ids(
+                Address, Address.id_address,
+                {o.id_address_delivery for o in orders} | {o.id_address_invoice for o in orders},
+                joinedload(Address.country)
+            )
+            customers = self._load_by_ids(Customer, Customer.id_customer, {o.id_customer for o in orders})
+            langs = self._load_by_ids(Lang, Lang.id_lang, {c.id_lang for c in customers.values()})
+            shippings = self._load_by_ids(Shipping, Shipping.id_shipping, {o.id_shipping for o in orders})
+            carriers_api = self._load_by_ids(CarrierApi, CarrierApi.id_carrier_api,
+                                             {s.id_carrier_api for s in shippings.values()})
+            shipping_states = self._load_by_ids(ShippingState, ShippingState.id_shipping_state,
+                                                {s.id_shipping_state for s in shippings.values()})
+            taxes = self._load_by_ids(Tax, Tax.id_tax, {s.id_tax for s in shippings.values()})
+            sectionals = self._load_by_ids(Sectional, Sectional.id_sectional, {o.id_sectional for o in orders})
+            payments = self._load_by_ids(Payment, Payment.id_payment, {o.id_payment for o in orders})
+
+            if order_ids:
+                for detail in self.session.query(OrderDetailModel).filter(
+                    OrderDetailModel.id_order.in_(order_ids)
+                ).order_by(OrderDetailModel.id_order_detail).all():
+                    details_by_order.setdefault(detail.id_order, []).append(detail)
+
+            # Recupera immagini prodotti in batch (performance optimization)
+            product_ids = {
+                d.id_product for details in details_by_order.values() for d in details if d.id_product
+            }
+            if product_ids:
+                products = self.session.query(Product.id_product, Product.img_url).filter(
+                    Product.id_product.in_(product_ids)
+                ).all()
+                from src.services.media.image_service import ImageService
+                fallback_img_url = ImageService.FALLBACK_IMG_URL
+                images_map = {
+                    product.id_product: product.img_url if product.img_url else fallback_img_url
+                    for product in products
+                }
+
         # Helper per formattare gli indirizzi
         def format_address(address_id):
-            if not address_id:
-                return None
-            address = self.address_repository.get_by_id(address_id)
+            address = addresses.get(address_id) if address_id else None
             if not address:
                 return None
             return {
@@ -1275,22 +1347,19 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
         
         # Helper per formattare il customer
         def format_customer(customer_id):
-            if not customer_id:
-                return None
-            customer = self.customer_repository.get_by_id(customer_id)
+            customer = customers.get(customer_id) if customer_id else None
             if not customer:
                 return None
             
-            # Recupera i dati della lingua
+            # Dati della lingua
             lang = None
-            if customer.id_lang:
-                lang_obj = self.lang_repository.get_by_id(customer.id_lang)
-                if lang_obj:
-                    lang = {
-                        "id_lang": lang_obj.id_lang,
-                        "name": lang_obj.name,
-                        "iso_code": lang_obj.iso_code
-                    }
+            lang_obj = langs.get(customer.id_lang) if customer.id_lang else None
+            if lang_obj:
+                lang = {
+                    "id_lang": lang_obj.id_lang,
+                    "name": lang_obj.name,
+                    "iso_code": lang_obj.iso_code
+                }
             
             return {
                 "id_customer": customer.id_customer,
@@ -1304,43 +1373,35 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
         
         # Helper per formattare lo shipping
         def format_shipping(shipping_id):
-            if not shipping_id:
-                return None
-            shipping = self.shipping_repository.get_by_id(shipping_id)
+            shipping = shippings.get(shipping_id) if shipping_id else None
             if not shipping:
                 return None
             
-            # Recupera i dati del carrier_api
             carrier_api = None
-            if shipping.id_carrier_api:
-                carrier_api_obj = self.api_carrier_repository.get_by_id(shipping.id_carrier_api)
-                if carrier_api_obj:
-                    carrier_api = {
-                        "id_carrier_api": carrier_api_obj.id_carrier_api,
-                        "name": carrier_api_obj.name
-                    }
+            carrier_api_obj = carriers_api.get(shipping.id_carrier_api) if shipping.id_carrier_api else None
+            if carrier_api_obj:
+                carrier_api = {
+                    "id_carrier_api": carrier_api_obj.id_carrier_api,
+                    "name": carrier_api_obj.name
+                }
             
-            # Recupera i dati dello shipping_state
             shipping_state = None
-            if shipping.id_shipping_state:
-                shipping_state_obj = self.shipping_state_repository.get_by_id(shipping.id_shipping_state)
-                if shipping_state_obj:
-                    shipping_state = {
-                        "id_shipping_state": shipping_state_obj.id_shipping_state,
-                        "name": shipping_state_obj.name
-                    }
+            shipping_state_obj = shipping_states.get(shipping.id_shipping_state) if shipping.id_shipping_state else None
+            if shipping_state_obj:
+                shipping_state = {
+                    "id_shipping_state": shipping_state_obj.id_shipping_state,
+                    "name": shipping_state_obj.name
+                }
             
-            # Recupera i dati della tax
             tax = None
-            if shipping.id_tax:
-                tax_obj = self.tax_repository.get_by_id(shipping.id_tax)
-                if tax_obj:
-                    tax = {
-                        "id_tax": tax_obj.id_tax,
-                        "code": tax_obj.code,
-                        "percentage": tax_obj.percentage,
-                        "name": tax_obj.name
-                    }
+            tax_obj = taxes.get(shipping.id_tax) if shipping.id_tax else None
+            if tax_obj:
+                tax = {
+                    "id_tax": tax_obj.id_tax,
+                    "code": tax_obj.code,
+                    "percentage": tax_obj.percentage,
+                    "name": tax_obj.name
+                }
             
             return {
                 "id_shipping": shipping.id_shipping,
@@ -1356,9 +1417,7 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
         
         # Helper per formattare il sectional
         def format_sectional(sectional_id):
-            if not sectional_id:
-                return None
-            sectional = self.sectional_repository.get_by_id(sectional_id)
+            sectional = sectionals.get(sectional_id) if sectional_id else None
             if not sectional:
                 return None
             return {
@@ -1368,9 +1427,7 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
         
         # Helper per formattare l'order state corrente
         def format_order_state(order_state_id):
-            if not order_state_id:
-                return None
-            order_state = self.order_state_repository.get_by_id(order_state_id)
+            order_state = order_states.get(order_state_id) if order_state_id else None
             if not order_state:
                 return None
             return {
@@ -1378,71 +1435,11 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
                 "name": order_state.name
             }
         
-        # Helper per formattare gli order states
-        def format_order_states(order_id):
-            if not order_id:
-                return None
-            # Recupera gli order states per questo ordine con date_add
-            order_states = self.session.query(OrderState, orders_history.c.date_add).join(
-                orders_history, OrderState.id_order_state == orders_history.c.id_order_state
-            ).filter(orders_history.c.id_order == order_id).all()
-            
-            if not order_states:
-                return None
-            return [{
-                "id_order_state": state.id_order_state,
-                "name": state.name,
-                "date": date_add
-            } for state, date_add in order_states]
-        
-        # Helper per formattare l'order history
-        def format_order_history(order_id):
-            """Formatta la cronologia ordine con order_state.name e order_history.date_add"""
-            if not order_id:
-                return []
-            # Recupera gli order states per questo ordine con date_add
-            history_records = self.session.query(
-                OrderState.name,
-                orders_history.c.date_add
-            ).join(
-                orders_history, OrderState.id_order_state == orders_history.c.id_order_state
-            ).filter(
-                orders_history.c.id_order == order_id
-            ).order_by(
-                orders_history.c.date_add
-            ).all()
-            
-            if not history_records:
-                return []
-            
-            return [{
-                "name": name,
-                "date_add": format_datetime_ddmmyyyy_hhmmss(date_add) if date_add else None
-            } for name, date_add in history_records]
-        
         # Helper per formattare i dettagli dell'ordine
         def format_order_details(order_id):
-            if not order_id:
-                return []
-            order_details = self.order_detail_repository.get_by_order_id(order_id)
+            order_details = details_by_order.get(order_id) if order_id else None
             if not order_details:
                 return []
-            
-            # Recupera immagini prodotti in batch (performance optimization)
-            product_ids = [detail.id_product for detail in order_details if detail.id_product]
-            images_map = {}
-            if product_ids:
-                products = self.session.query(Product.id_product, Product.img_url).filter(
-                    Product.id_product.in_(product_ids)
-                ).all()
-                from src.services.media.image_service import ImageService
-                fallback_img_url = ImageService.FALLBACK_IMG_URL
-                images_map = {
-                    product.id_product: product.img_url if product.img_url else fallback_img_url
-                    for product in products
-                }
-            
-            # Formatta output con img_url
             return [
                 self.order_detail_repository.formatted_output(
                     detail, 
@@ -1451,22 +1448,9 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
                 for detail in order_details
             ]
         
-        # Helper per formattare la piattaforma
-        def format_platform(platform_id):
-            if not platform_id:
-                return None
-            platform = self.platform_repository.get_by_id(platform_id)
-            if not platform:
-                return None
-            return {
-                "name": platform.name
-            }
-        
         # Helper per formattare il pagamento
         def format_payment(payment_id):
-            if not payment_id:
-                return None
-            payment = self.payment_repository.get_by_id(payment_id)
+            payment = payments.get(payment_id) if payment_id else None
             if not payment:
                 return None
             return {
@@ -1474,70 +1458,6 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
                 "name": payment.name
             }
         
-        # Helper per formattare i packages dell'ordine
-        def format_order_packages(order_id):
-            if not order_id:
-                return []
-            
-            # 1. Packages collegati direttamente all'ordine (spedizione classica)
-            packages_from_order = self.session.query(
-                OrderPackage.id_order_package,
-                OrderPackage.id_order,
-                OrderPackage.id_order_document,
-                OrderPackage.height,
-                OrderPackage.width,
-                OrderPackage.depth,
-                OrderPackage.length,
-                OrderPackage.weight,
-                OrderPackage.value
-            ).filter(
-                OrderPackage.id_order == order_id
-            ).all()
-            
-            # 2. Packages collegati a OrderDocument di tipo "shipping" (multispedizione)
-            packages_from_documents = self.session.query(
-                OrderPackage.id_order_package,
-                OrderPackage.id_order,
-                OrderPackage.id_order_document,
-                OrderPackage.height,
-                OrderPackage.width,
-                OrderPackage.depth,
-                OrderPackage.length,
-                OrderPackage.weight,
-                OrderPackage.value
-            ).join(
-                OrderDocument,
-                OrderPackage.id_order_document == OrderDocument.id_order_document
-            ).filter(
-                OrderDocument.id_order == order_id,
-                OrderDocument.type_document == "shipping"
-            ).all()
-            
-            # 3. Unisci i risultati (rimuovi duplicati se necessario usando set di id_order_package)
-            all_packages_dict = {}
-            for pkg in packages_from_order:
-                all_packages_dict[pkg.id_order_package] = pkg
-            for pkg in packages_from_documents:
-                all_packages_dict[pkg.id_order_package] = pkg
-            
-            all_packages = list(all_packages_dict.values())
-            
-            if not all_packages:
-                return []
-            
-            # 4. Formatta la risposta includendo id_order e id_order_document
-            return [{
-                "id_order_package": pkg.id_order_package,
-                "id_order": pkg.id_order,
-                "id_order_document": pkg.id_order_document,
-                "height": float(pkg.height) if pkg.height else None,
-                "width": float(pkg.width) if pkg.width else None,
-                "depth": float(pkg.depth) if pkg.depth else None,
-                "length": float(pkg.length) if pkg.length else None,
-                "weight": float(pkg.weight) if pkg.weight else None,
-                "value": float(pkg.value) if pkg.value else None
-            } for pkg in all_packages]
-        
         # Helper per formattare lo stato e-commerce
         def format_ecommerce_order_state(order):
             """Formatta lo stato e-commerce usando la relationship già caricata"""
@@ -1562,101 +1482,188 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
                     "name": order.carrier.name
                 }
             return None
-        
-        # Base response con campi essenziali
-        response = {
-            "id_order": order.id_order,
-            "id_origin": order.id_origin,
-            "internal_reference": order.internal_reference,
-            "id_address_delivery": order.id_address_delivery,
-            "id_address_invoice": order.id_address_invoice,
-            "id_customer": order.id_customer,
-            "id_platform": order.id_platform,
-            "id_store": order.id_store,
-            "id_payment": order.id_payment,
-            "id_shipping": order.id_shipping,
-            "id_sectional": order.id_sectional,
-            "id_order_state": order.id_order_state,
-            "order_state": format_order_state(order.id_order_state),
-            "is_invoice_requested": order.is_invoice_requested,
-            "vies_status": order.vies_status.value if order.vies_status else None,
-            "is_payed": order.is_payed,
-            "payment_date": order.payment_date,
-            "payment_due_date": order.payment_due_date,
-            "total_weight": order.total_weight,
-            "total_price_with_tax": order.total_price_with_tax,
-            "total_price_net": order.total_price_net,
-            "products_total_price_net": order.products_total_price_net,
-            "products_total_price_with_tax": order.products_total_price_with_tax,
-            "total_discounts": order.total_discounts,
-            "cash_on_delivery": order.cash_on_delivery,
-            "insured_value": order.insured_value,
-            "privacy_note": order.privacy_note,
-            "general_note": order.general_note,
-            "delivery_date": order.delivery_date,
-            "date_add": order.date_add,
-            "is_multishipping": order.is_multishipping or 0,
-            "ecommerce_id_state": order.id_ecommerce_state or None,
-            "ecommerce_reference": order.reference or None,
-            "ecommerce_order_state": format_ecommerce_order_state(order) or None,
-            "ecommerce_carrier": format_ecommerce_carrier(order) or None,
-            "has_invoice": self._resolve_has_invoice(order)
-        }
-        
-        # Aggiungi order_packages anche per la lista ordini
-        response["order_packages"] = format_order_packages(order.id_order)
-        
-        # Aggiungi order_history solo se richiesto
-        if include_order_history:
-            response["order_history"] = format_order_history(order.id_order)
-        
-        # Se show_details è True, aggiungi le relazioni popolate
-        if show_details:
-            # Rimuovi i campi ID duplicati (usa pop con default per evitare errori)
-            response.pop("id_address_delivery", None)
-            response.pop("id_address_invoice", None)
-            response.pop("id_customer", None)
-            response.pop("id_store", None)
-            response.pop("id_payment", None)
-            response.pop("id_shipping", None)
-            response.pop("id_sectional", None)
-            response.pop("id_order_state", None)
-            response.update({
-                "address_delivery": format_address(order.id_address_delivery),
-                "address_invoice": format_address(order.id_address_invoice),
-                "customer": format_customer(order.id_customer),
-                # store non incluso nella risposta - è solo un dato DB
-                "payment": format_payment(order.id_payment),
-                "shipping": format_shipping(order.id_shipping),
-                "sectional": format_sectional(order.id_sectional),
+
+        results = []
+        for order in orders:
+            # Base response con campi essenziali
+            response = {
+                "id_order": order.id_order,
+                "id_origin": order.id_origin,
+                "internal_reference": order.internal_reference,
+                "id_address_delivery": order.id_address_delivery,
+                "id_address_invoice": order.id_address_invoice,
+                "id_customer": order.id_customer,
+                "id_platform": order.id_platform,
+                "id_store": order.id_store,
+                "id_payment": order.id_payment,
+                "id_shipping": order.id_shipping,
+                "id_sectional": order.id_sectional,
+                "id_order_state": order.id_order_state,
                 "order_state": format_order_state(order.id_order_state),
-                "order_details": format_order_details(order.id_order),
-                # order_packages già incluso nella risposta base, non serve includerlo di nuovo
-                "ecommerce_order_state": format_ecommerce_order_state(order)
-            })
+                "is_invoice_requested": order.is_invoice_requested,
+                "vies_status": order.vies_status.value if order.vies_status else None,
+                "is_payed": order.is_payed,
+                "payment_date": order.payment_date,
+                "payment_due_date": order.payment_due_date,
+                "total_weight": order.total_weight,
+                "total_price_with_tax": order.total_price_with_tax,
+                "total_price_net": order.total_price_net,
+                "products_total_price_net": order.products_total_price_net,
+                "products_total_price_with_tax": order.products_total_price_with_tax,
+                "total_discounts": order.total_discounts,
+                "cash_on_delivery": order.cash_on_delivery,
+                "insured_value": order.insured_value,
+                "privacy_note": order.privacy_note,
+                "general_note": order.general_note,
+                "delivery_date": order.delivery_date,
+                "date_add": order.date_add,
+                "is_multishipping": order.is_multishipping or 0,
+                "ecommerce_id_state": order.id_ecommerce_state or None,
+                "ecommerce_reference": order.reference or None,
+                "ecommerce_order_state": format_ecommerce_order_state(order) or None,
+                "ecommerce_carrier": format_ecommerce_carrier(order) or None,
+                "has_invoice": self._resolve_has_invoice(order, invoiced_ids)
+            }
+            
+            # Aggiungi order_packages anche per la lista ordini
+            response["order_packages"] = packages_by_order.get(order.id_order, [])
+            
+            # Aggiungi order_history solo se richiesto
+            if include_order_history:
+                response["order_history"] = history_by_order.get(order.id_order, [])
             
-            # Se is_multishipping=1, aggiungi lista multishippings
-            if order.is_multishipping == 1:
-                response["multishippings"] = self._get_multishippings(order.id_order)
+            # Se show_details è True, aggiungi le relazioni popolate
+            if show_details:
+                # Rimuovi i campi ID duplicati (usa pop con default per evitare errori)
+                response.pop("id_address_delivery", None)
+                response.pop("id_address_invoice", None)
+                response.pop("id_customer", None)
+                response.pop("id_store", None)
+                response.pop("id_payment", None)
+                response.pop("id_shipping", None)
+                response.pop("id_sectional", None)
+                response.pop("id_order_state", None)
+                response.update({
+                    "address_delivery": format_address(order.id_address_delivery),
+                    "address_invoice": format_address(order.id_address_invoice),
+                    "customer": format_customer(order.id_customer),
+                    # store non incluso nella risposta - è solo un dato DB
+                    "payment": format_payment(order.id_payment),
+                    "shipping": format_shipping(order.id_shipping),
+                    "sectional": format_sectional(order.id_sectional),
+                    "order_state": format_order_state(order.id_order_state),
+                    "order_details": format_order_details(order.id_order),
+                    # order_packages già incluso nella risposta base, non serve includerlo di nuovo
+                    "ecommerce_order_state": format_ecommerce_order_state(order)
+                })
+                
+                # Se is_multishipping=1, aggiungi lista multishippings
+                if order.is_multishipping == 1:
+                    response["multishippings"] = self._get_multishippings(order.id_order)
 
-        
-        return response
+            results.append(response)
+
+        return results
+
+    def _load_by_ids(self, model, id_column, ids, *options) -> dict:
+        """Carica le entità con una sola query IN e le indicizza per ID (ID nulli/0 ignorati)."""
+        ids = {i for i in ids if i}
+        if not ids:
+            return {}
+        query = self.session.query(model)
+        if options:
+            query = query.options(*options)
+        return {getattr(entity, id_column.key): entity for entity in query.filter(id_column.in_(ids)).all()}
+
+    def _load_packages_by_order(self, order_ids: List[int]) -> dict:
+        """
+        Packages per ordine: collegati direttamente all'ordine (spedizione classica)
+        o a OrderDocument di tipo "shipping" (multispedizione), senza duplicati.
+        """
+        if not order_ids:
+            return {}
+        package_columns = (
+            OrderPackage.id_order_package,
+            OrderPackage.id_order,
+            OrderPackage.id_order_document,
+            OrderPackage.height,
+            OrderPackage.width,
+            OrderPackage.depth,
+            OrderPackage.length,
+            OrderPackage.weight,
+            OrderPackage.value
+        )
+        packages_from_order = self.session.query(
+            *package_columns, OrderPackage.id_order.label("owner_id_order")
+        ).filter(
+            OrderPackage.id_order.in_(order_ids)
+        ).all()
+        packages_from_documents = self.session.query(
+            *package_columns, OrderDocument.id_order.label("owner_id_order")
+        ).join(
+            OrderDocument,
+            OrderPackage.id_order_document == OrderDocument.id_order_document
+        ).filter(
+            OrderDocument.id_order.in_(order_ids),
+            OrderDocument.type_document == "shipping"
+        ).all()
+
+        # Unisci i risultati per ordine (dedup per id_order_package)
+        grouped: dict = {}
+        for pkg in list(packages_from_order) + list(packages_from_documents):
+            grouped.setdefault(pkg.owner_id_order, {})[pkg.id_order_package] = pkg
+
+        return {
+            owner_id: [{
+                "id_order_package": pkg.id_order_package,
+                "id_order": pkg.id_order,
+                "id_order_document": pkg.id_order_document,
+                "height": float(pkg.height) if pkg.height else None,
+                "width": float(pkg.width) if pkg.width else None,
+                "depth": float(pkg.depth) if pkg.depth else None,
+                "length": float(pkg.length) if pkg.length else None,
+                "weight": float(pkg.weight) if pkg.weight else None,
+                "value": float(pkg.value) if pkg.value else None
+            } for pkg in packages.values()]
+            for owner_id, packages in grouped.items()
+        }
+
+    def _load_history_by_order(self, order_ids: List[int]) -> dict:
+        """Cronologia ordine (order_state.name, order_history.date_add) per ordine, in ordine di data."""
+        if not order_ids:
+            return {}
+        history_records = self.session.query(
+            orders_history.c.id_order,
+            OrderState.name,
+            orders_history.c.date_add
+        ).join(
+            orders_history, OrderState.id_order_state == orders_history.c.id_order_state
+        ).filter(
+            orders_history.c.id_order.in_(order_ids)
+        ).order_by(
+            orders_history.c.date_add
+        ).all()
+
+        grouped: dict = {}
+        for id_order, name, date_add in history_records:
+            grouped.setdefault(id_order, []).append({
+                "name": name,
+                "date_add": format_datetime_ddmmyyyy_hhmmss(date_add) if date_add else None
+            })
+        return grouped
     
-    def _resolve_has_invoice(self, order: Order) -> bool:
+    @staticmethod
+    def _resolve_has_invoice(order: Order, invoiced_ids: set) -> bool:
         """Restituisce il flag derivato has_invoice per un ordine.
 
         Usa il valore pre-calcolato in batch da get_all (attributo _has_invoice)
-        se presente, altrimenti esegue una EXISTS query mirata.
+        se presente, altrimenti l'insieme di ordini fatturati caricato da
+        formatted_output_batch.
         """
         cached = getattr(order, '_has_invoice', None)
         if cached is not None:
             return bool(cached)
-        return self.session.query(
-            self.session.query(FiscalDocument.id_fiscal_document).filter(
-                FiscalDocument.id_order == order.id_order,
-                FiscalDocument.document_type == 'invoice'
-            ).exists()
-        ).scalar() or False
+        return order.id_order in invoiced_ids
     
     def _get_multishippings(self, order_id: int) -> List[dict]:
         """
@@ -1817,6 +1824,28 @@ class OrderRepository(BaseRepository[Order, int], IOrderRepository):
         result = self.session.execute(stmt)
         return result.scalar_one_or_none()
     
+    def get_shipping_carrier_map(self, order_ids: List[int]) -> Dict[int, Tuple[Optional[int], Optional[int]]]:
+        """
+        Recupera id_shipping e id_carrier_api di più ordini con una sola query.
+        
+        Args:
+            order_ids: Lista di ID ordine
+            
+        Returns:
+            Dict id_order -> (id_shipping, id_carrier_api); gli ordini inesistenti non compaiono
+        """
+        if not order_ids:
+            return {}
+        stmt = (
+            select(Order.id_order, Order.id_shipping, Shipping.id_carrier_api)
+            .outerjoin(Shipping, Shipping.id_shipping == Order.id_shipping)
+            .where(Order.id_order.in_(set(order_ids)))
+        )
+        return {
+            row.id_order: (row.id_shipping, row.id_carrier_api)
+            for row in self.session.execute(stmt)
+        }
+    
     def set_multishipping(self, order_id: int, value: int) -> bool:
         """
         Imposta il flag is_multishipping per un ordine.
@@ -0,0 +1,187 @@
+"""
+Repository per l'indice di ricerca denormalizzato degli ordini (order_search_index)
+"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+from src.models.address import Address
+from src.models.customer import Customer
+from src.models.order import Order
+from src.models.order_detail import OrderDetail
+from src.models.order_search_index import OrderSearchIndex
+from src.models.payment import Payment
+from src.models.product import Product
+from src.models.shipping import Shipping
+
+# Lunghezza minima del termine per usare MATCH ... AGAINST (ngram_token_size di default = 2)
+FULLTEXT_MIN_TERM_LENGTH = 2
+
+
+class OrderSearchIndexRepository:
+    """
+    Mantiene e interroga `order_search_index`.
+
+    Il testo indicizzato contiene gli stessi campi della ricerca rapida ordini:
+    ordine (reference, internal_reference), indirizzo di consegna (id, nome, cognome,
+    indirizzo, CAP, P.IVA, PEC, SDI), cliente (nome, cognome, email), pagamento,
+    nomi prodotto e tracking spedizione.
+    """
+
+    def __init__(self, session: Session, chunk_size: int = 1000):
+        self.session = session
+        self.chunk_size = chunk_size
+
+    # ------------------------------------------------------------------ lettura
+
+    def search_condition(self, search: str):
+        """
+        Condizione su `Order.id_order` per la ricerca rapida.
+
+        Su MySQL usa l'indice FULLTEXT ngram (ricerca per frase); altrimenti, o per
+        termini più corti del token ngram, LIKE sulla sola tabella indice.
+        """
+        term = search.strip().lower()
+        bind = self.session.get_bind()
+        if bind.dialect.name == "mysql" and len(term) >= FULLTEXT_MIN_TERM_LENGTH:
+            phrase = '"' + term.replace('"', " ") + '"'
+            condition = OrderSearchIndex.search_text.match(phrase)
+        else:
+            condition = OrderSearchIndex.search_text.like(f"%{term}%")
+        return Order.id_order.in_(select(OrderSearchIndex.id_order).where(condition))
+
+    # ------------------------------------------------------------ manutenzione
+
+    def build_search_texts(self, order_ids: Iterable[int]) -> Dict[int, str]:
+        """Costruisce il testo di ricerca per gli ordini indicati (una query per entità)."""
+        ids = sorted({i for i in order_ids if i})
+        if not ids:
+            return {}
+
+        orders = self.session.execute(
+            select(
+                Order.id_order, Order.reference, Order.internal_reference, Order.id_address_delivery,
+                Order.id_customer, Order.id_payment, Order.id_shipping
+            ).where(Order.id_order.in_(ids))
+        ).all()
+        if not orders:
+            return {}
+
+        address_ids = {o.id_address_delivery for o in orders if o.id_address_delivery}
+        customer_ids = {o.id_customer for o in orders if o.id_customer}
+        payment_ids = {o.id_payment for o in orders if o.id_payment}
+        shipping_ids = {o.id_shipping for o in orders if o.id_shipping}
+
+        addresses = {
+            row.id_address: row for row in self.session.execute(
+                select(
+                    Address.id_address, Address.firstname, Address.lastname, Address.address1,
+                    Address.postcode, Address.vat, Address.pec, Address.sdi
+                ).where(Address.id_address.in_(address_ids))
+            ).all()
+        } if address_ids else {}
+        customers = {
+            row.id_customer: row for row in self.session.execute(
+                select(Customer.id_customer, Customer.firstname, Customer.lastname, Customer.email)
+                .where(Customer.id_customer.in_(customer_ids))
+            ).all()
+        } if customer_ids else {}
+        payments = dict(self.session.execute(
+            select(Payment.id_payment, Payment.name).where(Payment.id_payment.in_(payment_ids))
+        ).all()) if payment_ids else {}
+        trackings = dict(self.session.execute(
+            select(Shipping.id_shipping, Shipping.tracking).where(Shipping.id_shipping.in_(shipping_ids))
+        ).all()) if shipping_ids else {}
+
+        product_names: Dict[int, List[str]] = {}
+        for id_order, name in self.session.execute(
+            select(OrderDetail.id_order, Product.name)
+            .join(Product, OrderDetail.id_product == Product.id_product)
+            .where(OrderDetail.id_order.in_(ids))
+        ).all():
+            if name:
+                product_names.setdefault(id_order, []).append(name)
+
+        texts = {}
+        for o in orders:
+            parts = [o.reference, o.internal_reference]
+            address = addresses.get(o.id_address_delivery)
+            if address:
+                parts += [
+                    str(address.id_address), address.firstname, address.lastname, address.address1,
+                    address.postcode, address.vat, address.pec, address.sdi
+                ]
+            customer = customers.get(o.id_customer)
+            if customer:
+                parts += [customer.firstname, customer.lastname, customer.email]
+            parts.append(payments.get(o.id_payment))
+            parts.append(trackings.get(o.id_shipping))
+            parts += product_names.get(o.id_order, [])
+            texts[o.id_order] = " ".join(str(p) for p in parts if p).lower()
+        return texts
+
+    def refresh(self, order_ids: Iterable[int]) -> int:
+        """Ricalcola le righe indice degli ordini indicati (a blocchi). Restituisce le righe scritte."""
+        ids = sorted({i for i in order_ids if i})
+        written = 0
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start:start + self.chunk_size]
+            texts = self.build_search_texts(chunk)
+            self.session.execute(delete(OrderSearchIndex).where(OrderSearchIndex.id_order.in_(chunk)))
+            if texts:
+                self.session.execute(
+                    insert(OrderSearchIndex),
+                    [{"id_order": id_order, "search_text": text} for id_order, text in texts.items()]
+                )
+                written += len(texts)
+        return written
+
+    def delete(self, order_ids: Iterable[int]) -> None:
+        """Rimuove le righe indice degli ordini cancellati."""
+        ids = sorted({i for i in order_ids if i})
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start:start + self.chunk_size]
+            self.session.execute(delete(OrderSearchIndex).where(OrderSearchIndex.id_order.in_(chunk)))
+
+    def resolve_order_ids(self,
+                          address_ids: Optional[Iterable[int]] = None,
+                          customer_ids: Optional[Iterable[int]] = None,
+                          shipping_ids: Optional[Iterable[int]] = None,
+                          payment_ids: Optional[Iterable[int]] = None,
+                          product_ids: Optional[Iterable[int]] = None) -> set:
+        """Ordini il cui testo indicizzato dipende dalle entità collegate modificate."""
+        columns = (
+            (Order.id_address_delivery, address_ids),
+            (Order.id_customer, customer_ids),
+            (Order.id_shipping, shipping_ids),
+            (Order.id_payment, payment_ids),
+        )
+        conditions = []
+        for column, values in columns:
+            values = {i for i in (values or []) if i}
+            if values:
+                conditions.append(column.in_(values))
+        product_ids = {i for i in (product_ids or []) if i}
+        if product_ids:
+            conditions.append(Order.id_order.in_(
+                select(OrderDetail.id_order).where(OrderDetail.id_product.in_(product_ids))
+            ))
+        if not conditions:
+            return set()
+        return set(self.session.execute(select(Order.id_order).where(or_(*conditions))).scalars().all())
+
+    def rebuild_all(self) -> int:
+        """Ricostruisce l'intero indice (backfill), scorrendo gli ordini per id a blocchi."""
+        total = 0
+        last_id = 0
+        while True:
+            chunk = self.session.execute(
+                select(Order.id_order).where(Order.id_order > last_id)
+                .order_by(Order.id_order).limit(self.chunk_size)
+            ).scalars().all()
+            if not chunk:
+                return total
+            total += self.refresh(chunk)
+            self.session.commit()
+            last_id = chunk[-1]
@@ -13,6 +13,7 @@ from src.models.sectional import Sectional
 from src.models.product import Product
 from src.repository.shipping_repository import ShippingRepository
 from src.services.core.query_utils import QueryUtils
+from src.services.core.cursor_pagination import decode_cursor, keyset_condition, next_cursor_for
 from src.services.routers.order_document_service import OrderDocumentService
 from src.schemas.preventivo_schema import (
     PreventivoCreateSchema, 
@@ -258,9 +259,10 @@ class PreventivoRepository:
         sectionals_ids: Optional[str] = None,
         payments_ids: Optional[str] = None,
         date_from: Optional[str] = None,
-        date_to: Optional[str] = None
+        date_to: Optional[str] = None,
+        after: Optional[str] = None
     ) -> List[OrderDocument]:
-        """Recupera lista preventivi con filtri"""
+        """Recupera lista preventivi con filtri (keyset su id_order_document DESC se `after` è presente)"""
         
         query = self.db.query(OrderDocument).filter(
             OrderDocument.type_document == "preventivo"
@@ -294,7 +296,20 @@ class PreventivoRepository:
         except ValueError:
             raise HTTPException(status_code=400, detail="Parametri di ricerca non validi")
         
-        return query.order_by(OrderDocument.id_order_document.desc()).offset(skip).limit(limit).all()
+        query = query.order_by(OrderDocument.id_order_document.desc())
+        if after:
+            _, last_id = decode_cursor(after, "id_order_document", "desc")
+            query = query.filter(keyset_condition(
+                OrderDocument.id_order_document, OrderDocument.id_order_document, "desc", last_id, last_id
+            ))
+        else:
+            query = query.offset(skip)
+        return query.limit(limit).all()
+
+    @staticmethod
+    def build_next_cursor(preventivi: list, limit: int) -> Optional[str]:
+        """Cursore `after` per la pagina successiva (None se la pagina non è piena)."""
+        return next_cursor_for(preventivi, limit, "id_order_document", "desc", "id_order_document", "id_order_document")
     
     def get_preventivi_stats(
         self,
@@ -112,58 +112,32 @@ class ProductRepository(BaseRepository[Product, int], IProductRepository):
                 f"Database error retrieving products for image sync: {str(e)}"
             )
 
+    @staticmethod
+    def to_row(data: ProductSchema) -> Dict[str, Any]:
+        """Riga products da ProductSchema (FK a 0 -> NULL, default per i numerici)"""
+        return {
+            'id_origin': data.id_origin if data.id_origin and data.id_origin > 0 else 0,
+            'id_category': data.id_category if data.id_category and data.id_category > 0 else None,
+            'id_brand': data.id_brand if data.id_brand and data.id_brand > 0 else None,
+            'id_store': data.id_store,
+            'img_url': data.img_url,
+            'name': data.name,
+            'sku': data.sku,
+            'reference': data.reference,
+            'type': data.type,
+            'weight': data.weight,
+            'depth': data.depth,
+            'height': data.height,
+            'width': data.width,
+            'price': data.price if data.price is not None else 0.0,
+            'quantity': data.quantity if data.quantity is not None else 0,
+            'purchase_price': data.purchase_price if data.purchase_price is not None else 0.0,
+            'minimal_quantity': data.minimal_quantity if data.minimal_quantity is not None else 0
+        }
+
     def bulk_create(self, data_list: list[ProductSchema], batch_size: int = 1000):
-        """Bulk insert products for better performance"""
-        # Get existing origin IDs to avoid duplicates
-        origin_ids = [str(data.id_origin) for data in data_list]
-        existing_products = self._session.query(Product).filter(Product.id_origin.in_(origin_ids)).all()
-        existing_origin_ids = {str(product.id_origin) for product in existing_products}
-        
-        # Filter out existing products
-        new_products_data = [data for data in data_list if str(data.id_origin) not in existing_origin_ids]
-        
-        if not new_products_data:
-            return 0
-        
-        # Process in batches
-        total_inserted = 0
-        for i in range(0, len(new_products_data), batch_size):
-            batch = new_products_data[i:i + batch_size]
-            products = []
-            
-            for data in batch:
-                # Converti 0 a None per le foreign key se necessario
-                id_category = data.id_category if data.id_category and data.id_category > 0 else None
-                id_brand = data.id_brand if data.id_brand and data.id_brand > 0 else None
-                
-                product = Product(
-                    id_origin=data.id_origin if data.id_origin and data.id_origin > 0 else 0,
-                    id_category=id_category,
-                    id_brand=id_brand,
-                    id_store=data.id_store,
-                    img_url=data.img_url,
-                    name=data.name,
-                    sku=data.sku,
-                    reference=data.reference,
-                    type=data.type,
-                    weight=data.weight,
-                    depth=data.depth,
-                    height=data.height,
-                    width=data.width,
-                    price=data.price if data.price is not None else 0.0,
-                    quantity=data.quantity if data.quantity is not None else 0,
-                    purchase_price=data.purchase_price if data.purchase_price is not None else 0.0,
-                    minimal_quantity=data.minimal_quantity if data.minimal_quantity is not None else 0
-                )
-                products.append(product)
-            
-            self._session.bulk_save_objects(products)
-            total_inserted += len(products)
-            
-            # Commit every batch
-            self._session.commit()
-            
-        return total_inserted
+        """Bulk insert dei prodotti nuovi per (id_store, id_origin); gli esistenti restano invariati"""
+        return self.upsert_by_origin([self.to_row(data) for data in data_list], batch_size=batch_size).inserted
 
     def create(self, data: ProductSchema):
         # Crea il prodotto usando i campi specifici
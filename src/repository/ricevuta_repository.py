@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 from sqlalchemy import desc, func
 from sqlalchemy.orm import Session
@@ -18,6 +18,40 @@ class RicevutaRepository(BaseRepository[Ricevuta, int], IRicevutaRepository):
     def __init__(self, session: Session):
         super().__init__(session, Ricevuta)
 
+    def _filtered_query(
+        self,
+        *,
+        id_order: Optional[int] = None,
+        id_customer: Optional[int] = None,
+        stato: Optional[str] = None,
+        data_emissione_from: Optional[date] = None,
+        data_emissione_to: Optional[date] = None,
+    ):
+        query = self._session.query(Ricevuta)
+
+        if id_order is not None:
+            query = query.filter(Ricevuta.id_order == id_order)
+        if id_customer is not None:
+            query = query.filter(Ricevuta.id_customer == id_customer)
+        if stato is not None:
+            query = query.filter(Ricevuta.stato == stato)
+        if data_emissione_from is not None:
+            query = query.filter(
+                Ricevuta.data_emissione >= utc_naive_start_of_day(data_emissione_from)
+            )
+        if data_emissione_to is not None:
+            query = query.filter(
+                Ricevuta.data_emissione <= utc_naive_end_of_day(data_emissione_to)
+            )
+        return query
+
+    @staticmethod
+    def _ordered(query):
+        return query.order_by(
+            desc(Ricevuta.data_emissione),
+            desc(Ricevuta.numero),
+        )
+
     def list_filtered(
         self,
         *,
@@ -30,40 +64,55 @@ class RicevutaRepository(BaseRepository[Ricevuta, int], IRicevutaRepository):
         limit: int = 20,
     ) -> Tuple[List[Ricevuta], int]:
         try:
-            query = self._session.query(Ricevuta)
-
-            if id_order is not None:
-                query = query.filter(Ricevuta.id_order == id_order)
-            if id_customer is not None:
-                query = query.filter(Ricevuta.id_customer == id_customer)
-            if stato is not None:
-                query = query.filter(Ricevuta.stato == stato)
-            if data_emissione_from is not None:
-                query = query.filter(
-                    Ricevuta.data_emissione >= utc_naive_start_of_day(data_emissione_from)
-                )
-            if data_emissione_to is not None:
-                query = query.filter(
-                    Ricevuta.data_emissione <= utc_naive_end_of_day(data_emissione_to)
-                )
-
+            query = self._filtered_query(
+                id_order=id_order,
+                id_customer=id_customer,
+                stato=stato,
+                data_emissione_from=data_emissione_from,
+                data_emissione_to=data_emissione_to,
+            )
             total = query.count()
             offset = self.get_offset(limit, page)
-            rows = (
-                query.order_by(
-                    desc(Ricevuta.data_emissione),
-                    desc(Ricevuta.numero),
-                )
-                .offset(offset)
-                .limit(limit)
-                .all()
-            )
+            rows = self._ordered(query).offset(offset).limit(limit).all()
             return rows, total
         except Exception as exc:
             raise InfrastructureException(
                 f"Database error listing Ricevuta: {exc}"
             ) from exc
 
+    def iter_filtered(
+        self,
+        *,
+        id_order: Optional[int] = None,
+        id_customer: Optional[int] = None,
+        stato: Optional[str] = None,
+        data_emissione_from: Optional[date] = None,
+        data_emissione_to: Optional[date] = None,
+        batch_size: int = 500,
+    ) -> Iterator[List[Ricevuta]]:
+        query = self._ordered(
+            self._filtered_query(
+                id_order=id_order,
+                id_customer=id_customer,
+                stato=stato,
+                data_emissione_from=data_emissione_from,
+                data_emissione_to=data_emissione_to,
+            )
+        )
+        offset = 0
+        while True:
+            try:
+                rows = query.offset(offset).limit(batch_size).all()
+            except Exception as exc:
+                raise InfrastructureException(
+                    f"Database error listing Ricevuta: {exc}"
+                ) from exc
+            if rows:
+                yield rows
+            if len(rows) < batch_size:
+                return
+            offset += batch_size
+
     def get_next_numero(self, anno: int) -> int:
         """Numerazione annuale con SELECT FOR UPDATE sul max dell'anno."""
         try:
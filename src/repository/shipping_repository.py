@@ -1,7 +1,8 @@
 """
 Shipping Repository rifattorizzato seguendo SOLID
 """
-from typing import Optional, List, Union
+from datetime import datetime
+from typing import Dict, Optional, List, Set, Union
 from sqlalchemy.orm import Session, noload
 from sqlalchemy import func, desc, select, update
 from sqlalchemy.engine import Row
@@ -257,7 +258,95 @@ class ShippingRepository(BaseRepository[Shipping, int], IShippingRepository):
         except Exception as e:
             self._session.rollback()
             raise InfrastructureException(f"Errore aggiornamento stato spedizione: {str(e)}")
-    
+
+    def bulk_update_states_by_tracking(self, updates: List[Dict]) -> List[Dict]:
+        """
+        Versione massiva di update_state_by_tracking: risolve le spedizioni per tracking
+        con una query, aggiorna gli stati cambiati con un unico UPDATE ... CASE e inserisce
+        lo storico con executemany, tutto in una sola transazione.
+
+        Args:
+            updates: Lista di dict con tracking, state_id, event_code, event_description
+
+        Returns:
+            Lista delle sole spedizioni cambiate: id_shipping, tracking, old_state_id,
+            new_state_id, id_order, id_store (id_order/id_store None se senza ordine)
+        """
+        from sqlalchemy import case, insert
+        from src.models.shipments_history import ShipmentsHistory
+
+        by_tracking = {u["tracking"]: u for u in updates if u.get("tracking") and u.get("state_id")}
+        if not by_tracking:
+            return []
+
+        try:
+            trackings = list(by_tracking.keys())
+            rows = []
+            for i in range(0, len(trackings), 1000):
+                rows.extend(self._session.execute(
+                    select(Shipping.id_shipping, Shipping.tracking, Shipping.id_shipping_state)
+                    .where(Shipping.tracking.in_(trackings[i:i + 1000]))
+                ).all())
+
+            # Solo le righe con stato effettivamente diverso
+            changes = [
+                {
+                    "id_shipping": row.id_shipping,
+                    "tracking": row.tracking,
+                    "old_state_id": row.id_shipping_state,
+                    "new_state_id": by_tracking[row.tracking]["state_id"],
+                }
+                for row in rows
+                if row.id_shipping_state != by_tracking[row.tracking]["state_id"]
+            ]
+            if not changes:
+                return []
+
+            now = datetime.now()
+            for i in range(0, len(changes), 1000):
+                chunk = changes[i:i + 1000]
+                self._session.execute(
+                    update(Shipping)
+                    .where(Shipping.id_shipping.in_([c["id_shipping"] for c in chunk]))
+                    .values(id_shipping_state=case(
+                        {c["id_shipping"]: c["new_state_id"] for c in chunk},
+                        value=Shipping.id_shipping
+                    ))
+                    .execution_options(synchronize_session=False)
+                )
+            self._session.execute(insert(ShipmentsHistory), [
+                {
+                    "id_shipping": c["id_shipping"],
+                    "id_shipping_state": c["new_state_id"],
+                    "id_shipping_state_previous": c["old_state_id"],
+                    "tracking_event_code": by_tracking[c["tracking"]].get("event_code"),
+                    "tracking_event_description": by_tracking[c["tracking"]].get("event_description"),
+                    "changed_at": now,
+                }
+                for c in changes
+            ])
+
+            # Ordine e store per gli eventi di cambio stato
+            changed_ids = [c["id_shipping"] for c in changes]
+            orders = {}
+            for i in range(0, len(changed_ids), 1000):
+                for row in self._session.execute(
+                    select(Order.id_shipping, Order.id_order, Order.id_store)
+                    .where(Order.id_shipping.in_(changed_ids[i:i + 1000]))
+                ).all():
+                    orders.setdefault(row.id_shipping, row)
+
+            self._session.commit()
+        except Exception as e:
+            self._session.rollback()
+            raise InfrastructureException(f"Errore aggiornamento massivo stati spedizione: {str(e)}")
+
+        for c in changes:
+            order = orders.get(c["id_shipping"])
+            c["id_order"] = order.id_order if order else None
+            c["id_store"] = order.id_store if order else None
+        return changes
+
     def update_shipping_to_cancelled_state(self, id_shipping: int) -> None:
         """Imposta lo stato della shipping a 11 (Annullato)"""
         try:
@@ -366,32 +455,11 @@ class ShippingRepository(BaseRepository[Shipping, int], IShippingRepository):
         Returns:
             Lista di Row objects con solo i campi essenziali
         """
-        from src.models.carrier_api import CarrierApi
-        
         try:
-            # Stati finali di default
-            if exclude_states is None:
-                exclude_states = [1, 8, 11, 13] # Stati finali esclusi dal polling
-            
-            stmt = select(
-                Shipping.id_shipping,
-                Shipping.tracking,
-                Shipping.id_carrier_api
-            ).join(
-                CarrierApi, Shipping.id_carrier_api == CarrierApi.id_carrier_api
-            ).where(
-                Shipping.tracking.isnot(None),
-                Shipping.tracking != '',
-                CarrierApi.is_active == True
+            stmt = self._pollable_shipments_stmt(
+                (Shipping.id_shipping, Shipping.tracking, Shipping.id_carrier_api),
+                exclude_states
             )
-            
-            # Escludi stati finali
-            if exclude_states:
-                stmt = stmt.where(
-                    (Shipping.id_shipping_state.is_(None)) | 
-                    (~Shipping.id_shipping_state.in_(exclude_states))
-                )
-            
             result = self._session.execute(stmt).all()
             return list(result)
         except Exception as e:
@@ -422,6 +490,118 @@ class ShippingRepository(BaseRepository[Shipping, int], IShippingRepository):
         except Exception as e:
             raise InfrastructureException(f"Database error checking tracking events: {str(e)}")
     
+    def _pollable_shipments_stmt(self, columns, exclude_states: Optional[List[int]]):
+        """Select sulle spedizioni con tracking di carrier attivi, esclusi gli stati finali."""
+        from src.models.carrier_api import CarrierApi
+        
+        if exclude_states is None:
+            exclude_states = [1, 8, 11, 13]  # Stati finali esclusi dal polling
+        
+        stmt = select(*columns).join(
+            CarrierApi, Shipping.id_carrier_api == CarrierApi.id_carrier_api
+        ).where(
+            Shipping.tracking.isnot(None),
+            Shipping.tracking != '',
+            CarrierApi.is_active == True
+        )
+        if exclude_states:
+            stmt = stmt.where(
+                (Shipping.id_shipping_state.is_(None)) |
+                (~Shipping.id_shipping_state.in_(exclude_states))
+            )
+        return stmt
+    
+    def get_shipments_due_for_polling(self, now: datetime, exclude_states: Optional[List[int]] = None) -> List[Row]:
+        """
+        Recupera le spedizioni da interrogare ora: next_poll_at NULL o scaduto.
+        Include carrier_type per evitare la lookup del carrier per ogni gruppo.
+        
+        Args:
+            now: Istante di riferimento
+            exclude_states: Lista di id_shipping_state da escludere (default: [1, 8, 11, 13])
+            
+        Returns:
+            Lista di Row (id_shipping, tracking, id_carrier_api, carrier_type), prima le mai pianificate
+        """
+        from src.models.carrier_api import CarrierApi
+        
+        try:
+            stmt = self._pollable_shipments_stmt(
+                (Shipping.id_shipping, Shipping.tracking, Shipping.id_carrier_api, CarrierApi.carrier_type),
+                exclude_states
+            ).where(
+                (Shipping.next_poll_at.is_(None)) | (Shipping.next_poll_at <= now)
+            ).order_by(Shipping.next_poll_at.is_(None).desc(), Shipping.next_poll_at)
+            return list(self._session.execute(stmt).all())
+        except Exception as e:
+            raise InfrastructureException(f"Database error retrieving shipments due for polling: {str(e)}")
+    
+    def get_shipping_ids_with_events(self, id_shippings: List[int]) -> Set[int]:
+        """
+        Prefetch della presenza eventi: restituisce gli id_shipping (tra quelli passati)
+        con almeno un record in shipments_history. Sostituisce has_tracking_events per lotti.
+        
+        Args:
+            id_shippings: Lista di ID spedizione
+            
+        Returns:
+            Set di id_shipping con eventi
+        """
+        from src.models.shipments_history import ShipmentsHistory
+        
+        try:
+            ids = list(set(id_shippings))
+            found: Set[int] = set()
+            for start in range(0, len(ids), 1000):
+                chunk = ids[start:start + 1000]
+                stmt = select(ShipmentsHistory.id_shipping).where(
+                    ShipmentsHistory.id_shipping.in_(chunk)
+                ).distinct()
+                found.update(self._session.execute(stmt).scalars().all())
+            return found
+        except Exception as e:
+            raise InfrastructureException(f"Database error checking tracking events: {str(e)}")
+    
+    def schedule_next_polls(self, next_poll_at_by_id: Dict[int, datetime]) -> None:
+        """
+        Aggiorna next_poll_at per più spedizioni: un UPDATE per istante distinto,
+        un solo commit. Il poller calcola gli istanti dall'inizio del ciclo, quindi i
+        valori distinti sono tanti quanti gli intervalli di polling usati.
+        
+        Args:
+            next_poll_at_by_id: Dict id_shipping -> prossimo polling
+        """
+        if not next_poll_at_by_id:
+            return
+        ids_by_time: Dict[datetime, List[int]] = {}
+        for id_shipping, next_poll_at in next_poll_at_by_id.items():
+            ids_by_time.setdefault(next_poll_at, []).append(id_shipping)
+        try:
+            for next_poll_at, ids in ids_by_time.items():
+                for start in range(0, len(ids), 1000):
+                    self._session.execute(
+                        update(Shipping)
+                        .where(Shipping.id_shipping.in_(ids[start:start + 1000]))
+                        .values(next_poll_at=next_poll_at)
+                    )
+            self._session.commit()
+        except Exception as e:
+            self._session.rollback()
+            raise InfrastructureException(f"Database error scheduling tracking polls: {str(e)}")
+    
+    def get_next_scheduled_poll(self, exclude_states: Optional[List[int]] = None) -> Optional[datetime]:
+        """
+        Primo next_poll_at tra le spedizioni da interrogare (None se non ce ne sono).
+        
+        Args:
+            exclude_states: Lista di id_shipping_state da escludere (default: [1, 8, 11, 13])
+        """
+        try:
+            stmt = self._pollable_shipments_stmt((func.min(Shipping.next_poll_at),), exclude_states)
+            return self._session.execute(stmt).scalar()
+        except Exception as e:
+            raise InfrastructureException(f"Database error retrieving next tracking poll: {str(e)}")
+    
     def get_carrier_id_by_tracking(self, tracking: str) -> Optional[int]:
         """
         Recupera id_carrier_api da Shipping usando il tracking number.
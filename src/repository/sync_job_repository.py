@@ -0,0 +1,156 @@
+"""
+Repository dei job di sincronizzazione e-commerce (sync_jobs).
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from src.models.store import Store
+from src.models.sync_job import SyncJob
+
+# Stati da cui un job può essere ripreso (oltre a `running` senza heartbeat recente).
+# Un job `failed` non si riprende: saltando le entità completate (clienti, indirizzi)
+# gli ordini nuovi verrebbero importati senza le dipendenze.
+RESUMABLE_STATUSES = ('interrupted',)
+
+
+class SyncJobRepository:
+    def __init__(self, session: Session):
+        self._session = session
+
+    def create(self, id_store: int, sync_type: str) -> SyncJob:
+        now = datetime.now()
+        job = SyncJob(
+            id_store=id_store,
+            sync_type=sync_type,
+            status='running',
+            pages=0,
+            fetched=0,
+            processed=0,
+            errors=0,
+            attempts=1,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        self._session.add(job)
+        self._session.commit()
+        return job
+
+    def lock_store(self, id_store: int) -> None:
+        """
+        SELECT FOR UPDATE sulla riga dello store: serializza l'avvio dei job dello
+        stesso store fino al commit della transazione corrente.
+        """
+        self._session.execute(
+            select(Store.id_store).where(Store.id_store == id_store).with_for_update()
+        )
+
+    def get_by_id(self, id_sync_job: int) -> Optional[SyncJob]:
+        return self._session.get(SyncJob, id_sync_job)
+
+    def get_latest(self, id_store: Optional[int] = None, limit: int = 20) -> List[SyncJob]:
+        query = select(SyncJob).order_by(SyncJob.id_sync_job.desc()).limit(limit)
+        if id_store is not None:
+            query = query.where(SyncJob.id_store == id_store)
+        return list(self._session.execute(query).scalars())
+
+    def get_running(self, id_store: int, stale_before: datetime) -> Optional[SyncJob]:
+        """Job in esecuzione per lo store con heartbeat successivo a `stale_before`"""
+        return self._session.execute(
+            select(SyncJob)
+            .where(
+                SyncJob.id_store == id_store,
+                SyncJob.status == 'running',
+                SyncJob.heartbeat_at >= stale_before,
+            )
+            .order_by(SyncJob.id_sync_job.desc())
+            .limit(1)
+        ).scalar_one_or_none()
+
+    def get_resumable(self, id_store: int, sync_type: str, stale_before: datetime) -> Optional[SyncJob]:
+        """Ultimo job dello store per `sync_type`, se interrotto o senza heartbeat recente"""
+        job = self._session.execute(
+            select(SyncJob)
+            .where(SyncJob.id_store == id_store, SyncJob.sync_type == sync_type)
+            .order_by(SyncJob.id_sync_job.desc())
+            .limit(1)
+        ).scalar_one_or_none()
+        if job is not None and self._is_resumable(job, stale_before):
+            return job
+        return None
+
+    def get_abandoned(self, stale_before: datetime) -> List[SyncJob]:
+        """Job `running` o `interrupted` rimasti senza processo (avvio applicazione)"""
+        return list(self._session.execute(
+            select(SyncJob)
+            .where(self._abandoned_clause(stale_before))
+            .order_by(SyncJob.id_sync_job)
+        ).scalars())
+
+    def claim(self, id_sync_job: int, stale_before: datetime) -> bool:
+        """
+        Riporta il job in `running` se riprendibile, in un solo UPDATE condizionale:
+        con più processi (worker, repliche) un solo chiamante ottiene il job.
+        """
+        result = self._session.execute(
+            update(SyncJob)
+            .where(
+                SyncJob.id_sync_job == id_sync_job,
+                or_(SyncJob.status.in_(RESUMABLE_STATUSES), self._stale_clause(stale_before)),
+            )
+            .values(
+                status='running',
+                attempts=SyncJob.attempts + 1,
+                heartbeat_at=datetime.now(),
+                finished_at=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        self._session.commit()
+        return result.rowcount == 1
+
+    def touch(self, id_sync_job: int) -> None:
+        """Aggiorna l'heartbeat del job"""
+        self._session.execute(
+            update(SyncJob)
+            .where(SyncJob.id_sync_job == id_sync_job)
+            .values(heartbeat_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        self._session.commit()
+
+    def mark_interrupted(self, ids: List[int]) -> None:
+        """Segna come interrotti i job ancora in esecuzione (arresto dell'applicazione)"""
+        if not ids:
+            return
+        self._session.execute(
+            update(SyncJob)
+            .where(SyncJob.id_sync_job.in_(ids), SyncJob.status == 'running')
+            .values(status='interrupted', heartbeat_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        self._session.commit()
+
+    def save(self, job: SyncJob) -> None:
+        self._session.commit()
+
+    @staticmethod
+    def _stale_clause(stale_before: datetime):
+        return and_(
+            SyncJob.status == 'running',
+            or_(SyncJob.heartbeat_at.is_(None), SyncJob.heartbeat_at < stale_before),
+        )
+
+    @classmethod
+    def _abandoned_clause(cls, stale_before: datetime):
+        return or_(SyncJob.status == 'interrupted', cls._stale_clause(stale_before))
+
+    @staticmethod
+    def _is_resumable(job: SyncJob, stale_before: datetime) -> bool:
+        if job.status in RESUMABLE_STATUSES:
+            return True
+        return job.status == 'running' and (job.heartbeat_at is None or job.heartbeat_at < stale_before)
@@ -0,0 +1,41 @@
+"""
+Repository dei watermark della sincronizzazione incrementale (sync_watermarks).
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.models.sync_watermark import SyncWatermark
+
+
+class SyncWatermarkRepository:
+    def __init__(self, session: Session):
+        self._session = session
+
+    def get_watermark(self, id_store: int, entity: str) -> Optional[datetime]:
+        return self._session.execute(
+            select(SyncWatermark.last_date_upd).where(
+                SyncWatermark.id_store == id_store, SyncWatermark.entity == entity
+            )
+        ).scalar_one_or_none()
+
+    def get_all(self, id_store: int) -> Dict[str, Optional[datetime]]:
+        rows = self._session.execute(
+            select(SyncWatermark.entity, SyncWatermark.last_date_upd).where(SyncWatermark.id_store == id_store)
+        )
+        return {entity: last_date_upd for entity, last_date_upd in rows}
+
+    def advance(self, id_store: int, entity: str, last_date_upd: datetime) -> None:
+        """Sposta in avanti il watermark (mai indietro) e conferma."""
+        watermark = self._session.execute(
+            select(SyncWatermark).where(SyncWatermark.id_store == id_store, SyncWatermark.entity == entity)
+        ).scalar_one_or_none()
+        if watermark is None:
+            self._session.add(SyncWatermark(id_store=id_store, entity=entity, last_date_upd=last_date_upd))
+        elif watermark.last_date_upd is None or last_date_upd > watermark.last_date_upd:
+            watermark.last_date_upd = last_date_upd
+        self._session.commit()
@@ -1,4 +1,3 @@
-from io import BytesIO
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
@@ -11,6 +10,7 @@ from src.schemas.corrispettivo_schema import (
     CorrispettivoExportRequestSchema,
     CorrispettivoFiltersSchema,
     CorrispettivoListResponseSchema,
+    CorrispettivoPeriodLockResponseSchema,
     CorrispettivoRiepilogoResponseSchema,
     validate_corrispettivo_day,
 )
@@ -27,6 +27,7 @@ router = APIRouter(
 user_dependency = Depends(get_current_user)
 db_dependency = Depends(get_db)
 read_permission = Depends(require_permission("fiscal_documents", "read"))
+update_permission = Depends(require_permission("fiscal_documents", "update"))
 
 
 def get_corrispettivo_service(db: Session = db_dependency) -> CorrispettivoService:
@@ -183,10 +184,10 @@ async def export_corrispettivi_registri(
     Genera ZIP con `registro.xlsx` consolidato (matrice aliquote) e `registro_{ISO}.xlsx` per paese consegna.
     Con `filters.day` valorizzato: un solo giorno del mese e filename `Registro_YYYY-MM-DD.zip`.
     """
-    zip_bytes = service.build_export_zip(request)
+    content = service.iter_export_zip(request)
     filename = service.export_zip_filename(request)
     return StreamingResponse(
-        BytesIO(zip_bytes),
+        content,
         media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
@@ -251,10 +252,47 @@ async def export_corrispettivi_giorno(
 ):
     """Genera ZIP `Registro_YYYY-MM-DD.zip` con Excel corrispettivo del singolo giorno."""
     export_request = request.to_export_request()
-    zip_bytes = service.build_export_zip(export_request)
+    content = service.iter_export_zip(export_request)
     filename = service.export_zip_filename(export_request)
     return StreamingResponse(
-        BytesIO(zip_bytes),
+        content,
         media_type="application/zip",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+@router.put(
+    "/chiusura",
+    response_model=CorrispettivoPeriodLockResponseSchema,
+    status_code=status.HTTP_200_OK,
+)
+@check_authentication
+async def lock_corrispettivi_period(
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    user: dict = user_dependency,
+    _: None = update_permission,
+    service: CorrispettivoService = Depends(get_corrispettivo_service),
+):
+    """
+    Chiude il mese: i totali giornalieri restano quelli materializzati, anche se
+    ordini o documenti del periodo vengono modificati in seguito.
+    """
+    return service.set_period_locked(year, month, True)
+
+
+@router.delete(
+    "/chiusura",
+    response_model=CorrispettivoPeriodLockResponseSchema,
+    status_code=status.HTTP_200_OK,
+)
+@check_authentication
+async def unlock_corrispettivi_period(
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    user: dict = user_dependency,
+    _: None = update_permission,
+    service: CorrispettivoService = Depends(get_corrispettivo_service),
+):
+    """Riapre il mese: i giorni vengono ricalcolati dalle query live alla prossima lettura."""
+    return service.set_period_locked(year, month, False)
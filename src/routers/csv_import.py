@@ -3,13 +3,14 @@ CSV Import Router
 
 Endpoints per import dati da file CSV con validazione e batch processing.
 """
-from fastapi import APIRouter, Depends, UploadFile, File, Query, Path, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Query, Path, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional
 from io import StringIO
 
 from src.database import get_db
 from src.core.dependencies import db_dependency
+from src.services.csv_import.csv_import_job import create_csv_import_job, get_csv_import_job, spool_upload
 from src.services.csv_import.csv_import_service import CSVImportService
 from src.services.csv_import.entity_mapper import EntityMapper
 from src.services.csv_import.dependency_resolver import DependencyResolver
@@ -26,17 +27,20 @@ router = APIRouter(
 @router.post(
     "/csv",
     status_code=status.HTTP_200_OK,
-    response_description="CSV import completed"
+    response_description="CSV import completed",
+    responses={202: {"description": "Job di import avviato (background=true)"}},
 )
 @check_authentication
 async def import_csv(
     db: db_dependency,
+    background_tasks: BackgroundTasks,
     user: dict = Depends(get_current_user),
     file: UploadFile = File(..., description="CSV file to import"),
     entity_type: str = Query(..., description="Entity type: products, customers, addresses, brands, categories, carriers, countries, languages, payments, orders, order_details"),
     id_store: Optional[int] = Query(None, description="Store ID (optional)"),
     batch_size: int = Query(1000, ge=100, le=10000, description="Batch size for insert (100-10000)"),
     validate_only: bool = Query(False, description="If true, only validate without importing"),
+    background: bool = Query(False, description="If true, stream the file in chunks in background and return 202 with job_id"),
     _: None = Depends(require_permission("settings", "create")),
 ):
     """
@@ -74,6 +78,13 @@ async def import_csv(
     - All-or-nothing: if any row fails validation, no rows are imported
     - Returns detailed errors with row numbers and field names
     
+    **background=true** (file grandi):
+    - L'upload viene salvato su disco e letto in streaming, a blocchi di `batch_size`
+      righe (mapping, validazione e insert per blocco): memoria costante
+    - Tutto-o-niente con una transazione unica e un SAVEPOINT per blocco
+    - Risposta 202 con `job_id`; avanzamento ed esito da `GET /csv/jobs/{job_id}`
+      (status: running, completed, rejected = errori di validazione, failed)
+    
     **Dependencies**:
     - System auto-detects required dependencies
     - Example: to import products, categories and brands must exist
@@ -88,12 +99,20 @@ async def import_csv(
             {"filename": file.filename}
         )
     
-    # Read file content
-    content = await file.read()
-    
     # Initialize service
     import_service = CSVImportService(db)
     
+    if background:
+        # Errori immediati (entity type, dipendenze) prima di accettare il file
+        import_service.check_preconditions(entity_type, id_store)
+        file_path = await spool_upload(file)
+        job = create_csv_import_job(file_path, entity_type, id_store, batch_size, validate_only)
+        background_tasks.add_task(job.run)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job.to_dict())
+    
+    # Read file content
+    content = await file.read()
+    
     # Execute import
     result = await import_service.import_entity(
         file_content=content,
@@ -106,6 +125,29 @@ async def import_csv(
     return result.to_dict()
 
 
+@router.get(
+    "/csv/jobs/{job_id}",
+    status_code=status.HTTP_200_OK
+)
+@check_authentication
+async def get_csv_import_job_status(
+    job_id: str = Path(..., description="ID del job di import"),
+    user: dict = Depends(get_current_user),
+    _: None = Depends(require_permission("settings", "read")),
+):
+    """
+    Stato di un import CSV avviato con background=true.
+    
+    `progress` è la percentuale del file letta; a fine job `result` contiene lo
+    stesso riepilogo dell'import sincrono (righe, errori, tempi).
+    """
+    job = get_csv_import_job(job_id)
+    if job is None:
+        from src.core.exceptions import NotFoundException
+        raise NotFoundException("CSVImportJob", None, {"job_id": job_id})
+    return job.to_dict()
+
+
 @router.get(
     "/templates/{entity_type}",
     status_code=status.HTTP_200_OK,
@@ -18,6 +18,8 @@ from src.schemas.ddt_schema import (
     DDTGenerateResponseSchema
 )
 from src.schemas.preventivo_schema import ArticoloPreventivoUpdateSchema
+from src.schemas.pdf_export_schema import OrderDocumentBulkPdfRequestSchema
+from src.services.pdf.bulk_pdf_export import bulk_pdf_streaming_response, get_bulk_max_documents
 from fastapi.responses import StreamingResponse
 from io import BytesIO
 from .dependencies import LIMIT_DEFAULT, MAX_LIMIT
@@ -300,6 +302,43 @@ async def generate_ddt_from_order(
     return result
 
 
+@router.post("/pdf/bulk",
+             status_code=status.HTTP_200_OK,
+             summary="Export PDF massivo DDT",
+             description="Genera i PDF di più DDT (ids o filtri lista) in un unico ZIP in streaming o in un PDF unito",
+             response_description="ZIP o PDF con i DDT selezionati")
+@check_authentication
+async def export_ddt_pdf_bulk(
+    request: OrderDocumentBulkPdfRequestSchema = Body(...),
+    user: dict = user_dependency,
+    db: Session = db_dependency,
+    _: None = Depends(require_permission("ddt", "read")),
+):
+    """
+    Export PDF massivo DDT.
+    
+    **Selezione:**
+    - `ids`: lista esplicita di DDT (ordine mantenuto)
+    - `filters`: stessi filtri di `GET /api/v1/ddt/` (search, sectionals_ids, payments_ids, date_from, date_to)
+    
+    **Formato (`format`):**
+    - `zip` (default): un file `DDT-{document_number}.pdf` per documento, inviato man mano che è pronto;
+      i DDT non generabili sono elencati in `errori.txt`
+    - `pdf`: unico PDF con un segnalibro per DDT; errori conteggiati nell'header `X-Bulk-Pdf-Failed`
+    """
+    service = get_ddt_service(db)
+    document_ids = service.get_bulk_pdf_ids(request, get_bulk_max_documents(request.format))
+
+    return await bulk_pdf_streaming_response(
+        document_ids,
+        request.format,
+        lambda session: DDTService(session).prepare_ddt_pdf_job,
+        db,
+        label="ddt",
+        duplicate_prefix="DDT",
+    )
+
+
 @router.get("/pdf/{id_order_document}",
             status_code=status.HTTP_200_OK,
             summary="Genera PDF DDT",
@@ -333,7 +372,7 @@ async def generate_ddt_pdf(
         )
 
     try:
-        pdf_content = service.generate_ddt_pdf(id_order_document)
+        pdf_content = await service.generate_ddt_pdf(id_order_document)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
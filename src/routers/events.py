@@ -204,7 +204,7 @@ async def uninstall_event_plugin(
     response_description="Lista di tutti gli eventi disponibili nell'applicazione",
 )
 @check_authentication
-@cached(preset="events_list", key="events:list")
+@cached(preset="events_list", key="events:list", background_refresh=True)  # nessuna risorsa della richiesta
 async def get_events_list(
     user: dict = Depends(get_current_user),
     _: None = Depends(require_permission("settings", "read")),
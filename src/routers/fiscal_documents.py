@@ -1,9 +1,9 @@
+from functools import partial
 from typing import List, Optional, Union
 from datetime import date, datetime, time
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from io import BytesIO
 
 from src.database import get_db
 from src.services.routers.auth_service import get_current_user, require_permission
@@ -25,8 +25,13 @@ from src.schemas.fiscal_document_schema import (
     FiscalDocumentDetailResponseSchema,
     InvoiceExportFormatSchema,
     InvoiceExportFiltersSchema,
+    FiscalDocumentBulkPdfRequestSchema,
+)
+from src.services.pdf.bulk_pdf_export import bulk_pdf_streaming_response, get_bulk_max_documents
+from src.services.pdf.fiscal_document_pdf_builder import (
+    build_fiscal_document_pdf_buffer,
+    prepare_fiscal_document_pdf_job,
 )
-from src.services.pdf.fiscal_document_pdf_builder import build_fiscal_document_pdf_buffer
 
 router = APIRouter(prefix="/api/v1/fiscal_documents", tags=["Fiscal Documents"])
 
@@ -135,7 +140,7 @@ async def export_invoices(
     """
     Export massivo fatture o note di credito.
 
-    - **xlsx**: tabella riepilogativa (max 5000 righe). Filtri opzionali: status,
+    - **xlsx**: tabella riepilogativa (max 100000 righe, generata in streaming). Filtri opzionali: status,
       is_electronic, id_order, id_customer, delivery_country_iso, date_add_from/to.
     - **xml**: ZIP FatturaPA (max 5000). **Solo filtri** `date_add_from`, `date_add_to`,
       `delivery_country_iso` (paese consegna). Status ed altri filtri query sono **ignorati**.
@@ -143,7 +148,7 @@ async def export_invoices(
 
     Parametro **`document_type`**: `invoice` (default) o `credit_note`.
 
-    PDF singolo: `GET /{id_fiscal_document}/pdf` (non disponibile in bulk).
+    PDF singolo: `GET /{id_fiscal_document}/pdf`; PDF massivo: `POST /pdf/bulk`.
 
     Matrice completa XML/PDF/export: `docs/FATTURAPA.md` §6.
     """
@@ -162,7 +167,7 @@ async def export_invoices(
     )
 
     return StreamingResponse(
-        BytesIO(content),
+        content,
         media_type=media_type,
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
@@ -496,6 +501,11 @@ async def get_fiscal_documents(
     ),
     date_add_from: Optional[date] = Query(None, description="Data emissione da (YYYY-MM-DD)"),
     date_add_to: Optional[date] = Query(None, description="Data emissione a (YYYY-MM-DD)"),
+    after: Optional[str] = Query(
+        None,
+        description="Cursore `next_cursor` della pagina precedente: paginazione keyset, `page` ignorato",
+    ),
+    with_total: bool = Query(True, description="Se false salta il conteggio totale (`total` = null)"),
     user: dict = user_dependency,
     db: Session = db_dependency,
     _: None = Depends(require_permission("fiscal_documents", "read")),
@@ -509,6 +519,10 @@ async def get_fiscal_documents(
     - `status`: pending, generated, uploaded, sent, error
     - `delivery_country_iso`: ISO paese **consegna** dell'ordine collegato
     - `date_add_from` / `date_add_to`: range data emissione (`date_add`)
+
+    ## Paginazione a cursore:
+    - `after`: `next_cursor` della risposta precedente (nessun OFFSET)
+    - `with_total=false`: nessun conteggio, pagine a costo costante
     """
     filters = FiscalDocumentListFiltersSchema(
         document_type=document_type,
@@ -534,14 +548,16 @@ async def get_fiscal_documents(
     repo = get_fiscal_repository(db)
     skip = (filters.page - 1) * filters.limit
 
-    total = repo.count_fiscal_documents(
-        document_type=filters.document_type,
-        is_electronic=filters.is_electronic,
-        status=filters.status,
-        delivery_country_iso=filters.delivery_country_iso,
-        date_add_from=date_from,
-        date_add_to=date_to,
-    )
+    total = None
+    if with_total:
+        total = repo.count_fiscal_documents(
+            document_type=filters.document_type,
+            is_electronic=filters.is_electronic,
+            status=filters.status,
+            delivery_country_iso=filters.delivery_country_iso,
+            date_add_from=date_from,
+            date_add_to=date_to,
+        )
     documents = repo.get_fiscal_documents(
         skip=skip,
         limit=filters.limit,
@@ -551,6 +567,7 @@ async def get_fiscal_documents(
         delivery_country_iso=filters.delivery_country_iso,
         date_add_from=date_from,
         date_add_to=date_to,
+        after=after,
     )
 
     return FiscalDocumentListResponseSchema(
@@ -558,6 +575,7 @@ async def get_fiscal_documents(
         total=total,
         page=filters.page,
         limit=filters.limit,
+        next_cursor=repo.build_next_cursor(documents, filters.limit),
     )
 
 
@@ -784,6 +802,45 @@ async def send_to_sdi(
 
 # ==================== GENERAZIONE PDF ====================
 
+@router.post("/pdf/bulk", status_code=status.HTTP_200_OK)
+async def export_fiscal_documents_pdf_bulk(
+    request: FiscalDocumentBulkPdfRequestSchema = Body(...),
+    user: dict = user_dependency,
+    db: Session = db_dependency,
+    fiscal_service: IFiscalDocumentService = Depends(get_fiscal_document_service),
+    _: None = Depends(require_permission("fiscal_documents", "read")),
+):
+    """
+    Export PDF massivo fatture / note di credito (stesso layout di `GET /{id}/pdf`).
+
+    ## Selezione:
+    - `ids`: lista esplicita di documenti (ordine mantenuto)
+    - `filters`: stessi filtri di `GET /invoices/export` (document_type, status, date, ...)
+
+    ## Output (`format`):
+    - **zip** (default): un PDF per documento, inviato in streaming man mano che i PDF
+      sono pronti (max `PDF_BULK_MAX_DOCUMENTS`); i documenti non generabili sono
+      elencati in `errori.txt`
+    - **pdf**: unico PDF con un segnalibro per documento (max `PDF_BULK_MERGE_MAX_DOCUMENTS`);
+      documenti non generabili conteggiati nell'header `X-Bulk-Pdf-Failed`
+
+    I PDF già generati per gli stessi dati sono serviti dalla cache PDF.
+    """
+    document_ids = fiscal_service.get_bulk_pdf_document_ids(
+        request, get_bulk_max_documents(request.format)
+    )
+    is_credit_note = bool(request.filters and request.filters.document_type == "credit_note")
+
+    return await bulk_pdf_streaming_response(
+        document_ids,
+        request.format,
+        lambda session: partial(prepare_fiscal_document_pdf_job, session, raise_http=False),
+        db,
+        label="note-credito" if is_credit_note else "fatture",
+        duplicate_prefix="nota-credito" if is_credit_note else "fattura",
+    )
+
+
 @router.get("/{id_fiscal_document}/pdf")
 async def generate_fiscal_document_pdf(
     id_fiscal_document: int = Path(..., gt=0, description="ID del documento fiscale"),
@@ -808,7 +865,7 @@ async def generate_fiscal_document_pdf(
     - Se nota di credito senza riferimento fattura → 400
     - Se non ci sono dettagli → 404
     """
-    pdf_buffer, filename = build_fiscal_document_pdf_buffer(db, id_fiscal_document)
+    pdf_buffer, filename = await build_fiscal_document_pdf_buffer(db, id_fiscal_document)
 
     return StreamingResponse(
         pdf_buffer,
@@ -10,7 +10,7 @@ from pydantic import ValidationError
 from typing import Optional
 import time
 
-from src.database import get_db
+from src.database import get_async_db
 from src.services.routers.init_service import InitService
 from src.schemas.init_schema import InitDataSchema
 from src.core.exceptions import InfrastructureException, ErrorCode
@@ -56,7 +56,7 @@ async def get_init_data(
         "all", description="Dati da includere (static,dynamic,all)"
     ),
     version: Optional[str] = Query("1.0", description="Versione dei dati"),
-    db=Depends(get_db),
+    db=Depends(get_async_db),
 ):
     """
     Ottiene i dati di inizializzazione per il frontend.
@@ -182,7 +182,7 @@ async def get_init_data(
 
 
 @router.get("/static")
-async def get_static_data_only(db=Depends(get_db)):
+async def get_static_data_only(db=Depends(get_async_db)):
     """
     Ottiene solo i dati statici (platforms, languages, countries, taxes).
     Cache: 7 giorni
@@ -212,7 +212,7 @@ async def get_static_data_only(db=Depends(get_db)):
 
 
 @router.get("/dynamic")
-async def get_dynamic_data_only(db=Depends(get_db)):
+async def get_dynamic_data_only(db=Depends(get_async_db)):
     """
     Ottiene solo i dati dinamici (sectionals, order_states, shipping_states).
     Cache: 1 giorno
@@ -242,7 +242,7 @@ async def get_dynamic_data_only(db=Depends(get_db)):
 
 
 @router.get("/health")
-async def get_init_health(db=Depends(get_db)):
+async def get_init_health(db=Depends(get_async_db)):
     """
     Health check per i dati di inizializzazione.
     Verifica che tutti i servizi siano disponibili.
@@ -255,7 +255,7 @@ async def get_init_health(db=Depends(get_db)):
 
         # Test platforms
         try:
-            platforms = await init_service._get_platforms()
+            platforms = await init_service._run_loader(init_service._get_platforms)
             health_status["services"]["platforms"] = {
                 "status": "ok",
                 "count": len(platforms),
@@ -269,7 +269,7 @@ async def get_init_health(db=Depends(get_db)):
 
         # Test languages
         try:
-            languages = await init_service._get_languages()
+            languages = await init_service._run_loader(init_service._get_languages)
             health_status["services"]["languages"] = {
                 "status": "ok",
                 "count": len(languages),
@@ -283,7 +283,7 @@ async def get_init_health(db=Depends(get_db)):
 
         # Test countries
         try:
-            countries = await init_service._get_countries()
+            countries = await init_service._run_loader(init_service._get_countries)
             health_status["services"]["countries"] = {
                 "status": "ok",
                 "count": len(countries),
@@ -12,11 +12,12 @@ from src.models.address import Address
 from src.models.order import Order
 from fastapi import APIRouter, Depends, HTTPException, Path, Query, Body
 from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from starlette import status
 
 from src.core.exceptions import BusinessRuleException, NotFoundException
-from src.database import get_db
+from src.database import get_async_db, get_db
 from src.repository.order_detail_repository import OrderDetailRepository
 from src.repository.product_repository import ProductRepository
 from src.routers.dependencies import get_fiscal_document_service
@@ -108,6 +109,7 @@ def get_product_service(db: Session = Depends(get_db)) -> ProductService:
 @check_authentication
 async def get_all_orders(user: dict = Depends(get_current_user),
                         or_repo: OrderRepository = Depends(get_repository),
+                        async_db: AsyncSession = Depends(get_async_db),
                         orders_ids: Optional[str] = Query(None, description="ID degli ordini, separati da virgole (es: 1,2,3)"),
                         customers_ids: Optional[str] = Query(None, description="ID dei clienti, separati da virgole (es: 1,2,3)"),
                         order_states_ids: Optional[str] = Query(None, description="ID degli stati ordine, separati da virgole (es: 1,2,3)"),
@@ -153,6 +155,18 @@ async def get_all_orders(user: dict = Depends(get_current_user),
                             ),
                             examples=["desc", "asc"],
                         ),
+                        after: Optional[str] = Query(
+                            None,
+                            description=(
+                                "Cursore opaco restituito come `next_cursor` dalla pagina precedente. "
+                                "Se presente attiva la paginazione keyset (nessun OFFSET) e `page` viene ignorato. "
+                                "Va usato con gli stessi `order_by`/`order_direction` della pagina che l'ha generato."
+                            ),
+                        ),
+                        with_total: bool = Query(
+                            True,
+                            description="Se false non esegue il conteggio totale (`total` = null): pagine a costo costante per infinite scroll",
+                        ),
                         _: None = Depends(require_permission("orders", "read"))):
     """
     Recupera una lista di ordini con filtri opzionali e possibilità di includere dettagli completi.
@@ -198,13 +212,20 @@ async def get_all_orders(user: dict = Depends(get_current_user),
       di ordinamento, anche quando `order_by` è una data, per garantire ordine
       deterministico in caso di timestamp identici (paginazione stabile).
 
+    **Paginazione a cursore (keyset):**
+    - `after`: passare il `next_cursor` della risposta precedente per leggere la pagina
+      successiva senza OFFSET (costo costante anche su pagine profonde)
+    - `with_total=false`: salta il conteggio totale (`total` = null)
+    - `next_cursor` è null quando la pagina restituita non è piena
+
     **Risposta:**
     ```json
     {
         "orders": [...],
         "total": 150,
         "page": 1,
-        "limit": 20
+        "limit": 20,
+        "next_cursor": "eyJvIjoiaWRfb3JkZXIiLC..."
     }
     ```
 
@@ -230,7 +251,9 @@ async def get_all_orders(user: dict = Depends(get_current_user),
     vies_status_filter = _normalize_vies_status_filter(vies_status)
 
     try:
-        orders = or_repo.get_all(orders_ids=orders_ids,
+        # Lista e conteggio su AsyncSession: le query non bloccano l'event loop
+        orders = await or_repo.get_all_async(async_db,
+                                orders_ids=orders_ids,
                                 customers_ids=customers_ids,
                                 order_states_ids=order_states_ids,
                                 shipping_states_ids=shipping_states_ids,
@@ -250,32 +273,39 @@ async def get_all_orders(user: dict = Depends(get_current_user),
                                 page=page,
                                 limit=limit,
                                 order_by=order_by,
-                                order_direction=order_direction_normalized)
+                                order_direction=order_direction_normalized,
+                                after=after)
         
-        if not orders:
-            return {"orders": [], "total": 0, "page": page, "limit": limit}
-
-        total_count = or_repo.get_count(orders_ids=orders_ids,
-                                       customers_ids=customers_ids,
-                                       order_states_ids=order_states_ids,
-                                       shipping_states_ids=shipping_states_ids,
-                                       delivery_countries_ids=delivery_countries_ids,
-                                       platforms_ids=platforms_ids,
-                                       store_ids=stores_ids,
-                                       payments_ids=payments_ids,
-                                       ecommerce_states_ids=ecommerce_states_ids,
-                                       search=search,
-                                       is_payed=is_payed,
-                                       is_invoice_requested=is_invoice_requested,
-                                       has_invoice=has_invoice,
-                                       vies_status=vies_status_filter,
-                                       date_from=date_from,
-                                       date_to=date_to)
-
-        results = []
-        for order in orders:
-            results.append(or_repo.formatted_output(order, show_details=show_details == "true", include_order_history=False))
-        return {"orders": results, "total": total_count, "page": page, "limit": limit}
+        if not orders and not after:
+            return {"orders": [], "total": 0 if with_total else None, "page": page, "limit": limit, "next_cursor": None}
+
+        total_count = None
+        if with_total:
+            total_count = await or_repo.get_count_async(async_db,
+                                           orders_ids=orders_ids,
+                                           customers_ids=customers_ids,
+                                           order_states_ids=order_states_ids,
+                                           shipping_states_ids=shipping_states_ids,
+                                           delivery_countries_ids=delivery_countries_ids,
+                                           platforms_ids=platforms_ids,
+                                           store_ids=stores_ids,
+                                           payments_ids=payments_ids,
+                                           ecommerce_states_ids=ecommerce_states_ids,
+                                           search=search,
+                                           is_payed=is_payed,
+                                           is_invoice_requested=is_invoice_requested,
+                                           has_invoice=has_invoice,
+                                           vies_status=vies_status_filter,
+                                           date_from=date_from,
+                                           date_to=date_to)
+
+        # Relazioni caricate in batch (una query IN per tipo di entità)
+        results = or_repo.formatted_output_batch(orders, show_details=show_details == "true", include_order_history=False)
+        next_cursor = or_repo.build_next_cursor(orders, limit, order_by, order_direction_normalized)
+        return {"orders": results, "total": total_count, "page": page, "limit": limit, "next_cursor": next_cursor}
+    except HTTPException:
+        # Errori di validazione (es. cursore 'after' non valido) restano 4xx
+        raise
     except Exception as e:
         logger.error(f"Error in get_all_orders: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Errore durante il recupero degli ordini: {str(e)}")
@@ -332,7 +362,7 @@ async def download_order_pdf(
 ):
     """Scarica il PDF di riepilogo ordine per stampa/archivio."""
     try:
-        pdf_content = order_service.generate_order_pdf(order_id)
+        pdf_content = await order_service.generate_order_pdf(order_id)
     except NotFoundException:
         raise HTTPException(status_code=404, detail="Ordine non trovato")
     except Exception as e:
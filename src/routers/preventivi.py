@@ -23,6 +23,8 @@ from src.schemas.preventivo_schema import (
     BulkUpdateArticoliItem,
     BulkUpdateArticoliResponseSchema
 )
+from src.schemas.pdf_export_schema import OrderDocumentBulkPdfRequestSchema
+from src.services.pdf.bulk_pdf_export import bulk_pdf_streaming_response, get_bulk_max_documents
 
 router = APIRouter(prefix="/api/v1/preventivi", tags=["Preventivi"])
 
@@ -245,6 +247,8 @@ async def get_preventivi(
     payments_ids: Optional[str] = Query(None, description="ID pagamenti separati da virgole (es: 1,2,3)"),
     date_from: Optional[str] = Query(None, description="Data inizio filtro (formato: YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="Data fine filtro (formato: YYYY-MM-DD)"),
+    after: Optional[str] = Query(None, description="Cursore `next_cursor` della pagina precedente: paginazione keyset, `page` ignorato"),
+    with_total: bool = Query(True, description="Se false non calcola le statistiche (`stats` = null): pagine a costo costante"),
     user: User = user_dependency,
     db: Session = db_dependency,
     _: None = Depends(require_permission("quotes", "read")),
@@ -261,8 +265,10 @@ async def get_preventivi(
     - `payments_ids`: ID pagamenti separati da virgole (es: 1,2,3)
     - `date_from`: Data inizio filtro (formato: YYYY-MM-DD)
     - `date_to`: Data fine filtro (formato: YYYY-MM-DD)
+    - `after`: cursore `next_cursor` della risposta precedente (paginazione keyset, senza OFFSET)
+    - `with_total`: se false salta il calcolo delle statistiche aggregate
     
-    **Risposta**: Lista preventivi con total, page, limit per paginazione e statistiche.
+    **Risposta**: Lista preventivi con total, page, limit, next_cursor per paginazione e statistiche.
     
     **Statistiche (stats)**:
     Le statistiche vengono calcolate applicando gli stessi filtri della lista e includono:
@@ -284,25 +290,29 @@ async def get_preventivi(
         payments_ids=payments_ids,
         date_from=date_from,
         date_to=date_to,
-        user=user
+        user=user,
+        after=after
     )
     
     # Calcola statistiche con gli stessi filtri
-    stats_data = service.get_preventivi_stats(
-        search=search,
-        sectionals_ids=sectionals_ids,
-        payments_ids=payments_ids,
-        date_from=date_from,
-        date_to=date_to
-    )
-    stats = PreventivoStatsSchema(**stats_data)
+    stats = None
+    if with_total:
+        stats_data = service.get_preventivi_stats(
+            search=search,
+            sectionals_ids=sectionals_ids,
+            payments_ids=payments_ids,
+            date_from=date_from,
+            date_to=date_to
+        )
+        stats = PreventivoStatsSchema(**stats_data)
     
     return PreventivoListResponseSchema(
         preventivi=preventivi,
         total=len(preventivi),
         page=page,
         limit=limit,
-        stats=stats
+        stats=stats,
+        next_cursor=service.build_next_cursor(preventivi, limit)
     )
 
 
@@ -913,6 +923,42 @@ async def bulk_update_articoli(
     return service.bulk_update_articoli(articoli)
 
 
+@router.post("/pdf/bulk",
+             status_code=status.HTTP_200_OK,
+             summary="Export PDF massivo preventivi",
+             description="Genera i PDF di più preventivi (ids o filtri lista) in un unico ZIP in streaming o in un PDF unito",
+             response_description="ZIP o PDF con i preventivi selezionati")
+async def export_preventivi_pdf_bulk(
+    request: OrderDocumentBulkPdfRequestSchema = Body(...),
+    user: User = user_dependency,
+    db: Session = db_dependency,
+    _: None = Depends(require_permission("quotes", "read")),
+):
+    """
+    Export PDF massivo preventivi
+    
+    Args:
+        request: `ids` oppure `filters` (stessi filtri di GET /preventivi) e `format` (zip o pdf)
+        user: Utente autenticato
+        db: Sessione database
+        
+    Returns:
+        StreamingResponse: ZIP con un PDF per preventivo (errori in `errori.txt`)
+        oppure PDF unito (errori conteggiati nell'header `X-Bulk-Pdf-Failed`)
+    """
+    service = get_preventivo_service(db)
+    document_ids = service.get_bulk_pdf_ids(request, get_bulk_max_documents(request.format))
+
+    return await bulk_pdf_streaming_response(
+        document_ids,
+        request.format,
+        lambda session: PreventivoService(session).prepare_preventivo_pdf_job,
+        db,
+        label="preventivi",
+        duplicate_prefix="Preventivo",
+    )
+
+
 @router.get("/{id_order_document}/download-pdf",
             status_code=status.HTTP_200_OK,
             summary="Genera PDF Preventivo",
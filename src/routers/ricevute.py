@@ -1,4 +1,5 @@
 """Router API ricevute."""
+import asyncio
 from datetime import date
 from io import BytesIO
 from typing import Optional
@@ -137,7 +138,7 @@ async def export_ricevute(
     )
     content, media_type, filename = service.export_ricevute(filters, fmt.value)
     return StreamingResponse(
-        BytesIO(content),
+        content,
         media_type=media_type,
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
@@ -178,7 +179,8 @@ async def regenerate_ricevuta_pdf(
     _: None = update_permission,
     service: IRicevutaService = Depends(get_ricevuta_service),
 ):
-    pdf_bytes = service.regenerate_pdf(id_ricevuta)
+    # Rendering + scrittura su disco fuori dall'event loop
+    pdf_bytes = await asyncio.to_thread(service.regenerate_pdf, id_ricevuta)
     filename = f"Ricevuta-{id_ricevuta}.pdf"
     return StreamingResponse(
         BytesIO(pdf_bytes),
@@ -203,7 +205,8 @@ async def download_ricevuta_pdf(
     _: None = read_permission,
     service: IRicevutaService = Depends(get_ricevuta_service),
 ):
-    pdf_bytes = service.get_ricevuta_pdf_bytes(id_ricevuta, regenerate=regenerate)
+    # Se il PDF è già su disco (pdf_storage) la lettura è immediata; altrimenti genera fuori dal loop
+    pdf_bytes = await asyncio.to_thread(service.get_ricevuta_pdf_bytes, id_ricevuta, regenerate=regenerate)
     filename = f"Ricevuta-{id_ricevuta}.pdf"
     return StreamingResponse(
         BytesIO(pdf_bytes),
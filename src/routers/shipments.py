@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, Query, Path, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Path, Body, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
 import logging
 from sqlalchemy.orm import Session
@@ -13,8 +14,7 @@ from src.schemas.dhl_tracking_schema import NormalizedTrackingResponseSchema
 from src.schemas.shipment_schema import (
     BulkShipmentCreateRequestSchema,
     BulkShipmentCreateResponseSchema,
-    BulkShipmentCreateSuccess,
-    BulkShipmentCreateError
+    BulkShipmentJobSchema
 )
 from src.models.order_document import OrderDocument
 from src.models.shipping import Shipping
@@ -29,6 +29,11 @@ from src.database import get_db
 from src.repository.shipping_repository import ShippingRepository
 from src.services.interfaces.shipping_service_interface import IShippingService
 from src.services.routers.shipping_service import ShippingService
+from src.services.routers.bulk_shipment_service import (
+    BulkShipmentService,
+    create_bulk_shipment_job,
+    get_bulk_shipment_job
+)
 from src.repository.shipment_document_repository import ShipmentDocumentRepository
 from src.core.exceptions import (
     NotFoundException,
@@ -68,88 +73,9 @@ def get_shipping_service(db: Session = Depends(get_db)) -> IShippingService:
     shipping_repo = ShippingRepository(db)
     return ShippingService(shipping_repo)
 
-def _create_bulk_shipment_error(
-    order_id: int,
-    exception: Exception,
-    error_type: str,
-    default_category: Optional[str] = None
-) -> BulkShipmentCreateError:
-    """
-    Crea un BulkShipmentCreateError da un'eccezione.
-    Segue il principio Single Responsibility: una funzione per creare l'errore.
-    
-    Args:
-        order_id: ID dell'ordine
-        exception: L'eccezione da cui estrarre i dettagli
-        error_type: Tipo di errore (es. "NOT_FOUND", "BUSINESS_RULE_ERROR")
-        default_category: Categoria di errore di default se non presente nei details
-        
-    Returns:
-        BulkShipmentCreateError configurato
-    """
-    error_details = _extract_carrier_error_details(exception, default_category)
-    
-    return BulkShipmentCreateError(
-        order_id=order_id,
-        error_type=error_type,
-        error_message=str(exception),
-        carrier_error_code=error_details.get("carrier_error_code"),
-        carrier_error_description=error_details.get("carrier_error_description"),
-        carrier_name=error_details.get("carrier_name"),
-        error_category=error_details.get("error_category", default_category)
-    )
-
-
-def _extract_carrier_error_details(exception: Exception, default_category: Optional[str] = None) -> dict:
-    """
-    Estrae i dettagli di errore del corriere in modo generico dalle eccezioni.
-    Supporta sia la nuova convenzione generica che quella legacy BRT per retrocompatibilità.
-    
-    Args:
-        exception: L'eccezione da cui estrarre i dettagli
-        default_category: Categoria di errore di default se non presente nei details
-        
-    Returns:
-        Dict con carrier_error_code, carrier_error_description, carrier_name, error_category
-    """
-    details = {}
-    if hasattr(exception, 'details') and isinstance(exception.details, dict):
-        details = exception.details
-    
-    # Extract carrier_error_code (new generic convention)
-    # Fallback to error_code, then to legacy brt_error_code
-    carrier_error_code = details.get("carrier_error_code") or details.get("error_code")
-    if carrier_error_code is None:
-        # Legacy BRT support
-        brt_error_code = details.get("brt_error_code")
-        if brt_error_code is not None:
-            carrier_error_code = brt_error_code
-    
-    # Extract carrier_error_description (new generic convention)
-    # Fallback to error_description, then to legacy brt_code_desc
-    carrier_error_description = details.get("carrier_error_description") or details.get("error_description")
-    if carrier_error_description is None:
-        # Legacy BRT support
-        brt_code_desc = details.get("brt_code_desc")
-        if brt_code_desc:
-            carrier_error_description = brt_code_desc
-    
-    # Extract carrier_name
-    carrier_name = details.get("carrier_name")
-    
-    # Extract error_category (new generic convention)
-    # Fallback to legacy brt_error_category
-    error_category = details.get("error_category") or details.get("brt_error_category")
-    if error_category is None:
-        error_category = default_category
-    
-    return {
-        "carrier_error_code": carrier_error_code,
-        "carrier_error_description": carrier_error_description,
-        "carrier_name": carrier_name,
-        "error_category": error_category
-    }
-
+def get_bulk_shipment_service() -> BulkShipmentService:
+    """Dependency injection per Bulk Shipment Service (sessioni DB proprie per ordine)."""
+    return BulkShipmentService()
 
 def get_carrier_repo(db: Session = Depends(get_db)) -> IApiCarrierRepository:
     """Dependency to get carrier API repository"""
@@ -333,30 +259,36 @@ async def create_shipment(
     return result
 
 
-@router.post("/bulk-create", response_model=BulkShipmentCreateResponseSchema)
+@router.post(
+    "/bulk-create",
+    response_model=BulkShipmentCreateResponseSchema,
+    responses={202: {"model": BulkShipmentJobSchema, "description": "Job avviato (background=true)"}},
+)
 async def bulk_create_shipments(
+    background_tasks: BackgroundTasks,
     request: BulkShipmentCreateRequestSchema = Body(...),
-    or_repo: IOrderRepository = Depends(get_repository),
-    shipping_repo: IShippingRepository = Depends(get_shipping_repository),
-    shipping_service: IShippingService = Depends(get_shipping_service),
+    background: bool = Query(False, description="Se true risponde 202 con job_id e processa in background"),
+    service: BulkShipmentService = Depends(get_bulk_shipment_service),
     user: dict = Depends(get_current_user),
-    factory: CarrierServiceFactory = Depends(get_carrier_service_factory),
-    db: Session = Depends(get_db),
     _: None = Depends(require_permission("shipments", "create")),
 ):
     """
     Crea spedizioni in modo massivo per una lista di ordini (unificato per tutti i corrieri)
     
     Il sistema determina automaticamente quale corriere usare per ogni ordine in base a
-    Shipping.id_carrier_api associato all'ordine.
+    Shipping.id_carrier_api associato all'ordine (letto per tutti gli ordini con una query).
     
+    Gli ordini vengono processati in parallelo, con un limite di chiamate contemporanee
+    per CarrierApi (BULK_SHIPMENT_CARRIER_CONCURRENCY / BULK_SHIPMENT_CARRIER_LIMITS).
     Ogni ordine viene processato indipendentemente: gli errori su singoli ordini
     non bloccano il processing degli altri.
     
+    Con background=true la risposta è 202 con job_id: lo stato si legge da
+    GET /bulk-create/jobs/{job_id}, l'avanzamento per ordine da .../stream (SSE).
+    
     Args:
         request: Richiesta con lista di order_ids
-        factory: Factory per selezionare il service corretto
-        db: Database session
+        background: Modalità job asincrona
         
     Returns:
         BulkShipmentCreateResponseSchema con:
@@ -364,132 +296,55 @@ async def bulk_create_shipments(
         - failed: Lista di errori (order_id, error_type, error_message)
         - summary: Riepilogo (total, successful_count, failed_count)
     """
+    if background:
+        job = create_bulk_shipment_job(request.order_ids)
+        background_tasks.add_task(job.run, service)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=job.to_schema().model_dump()
+        )
     
+    return await service.create_shipments(request.order_ids)
+
+
+def _get_bulk_job_or_404(job_id: str):
+    job = get_bulk_shipment_job(job_id)
+    if job is None:
+        raise NotFoundException("BulkShipmentJob", None, {"job_id": job_id})
+    return job
+
+
+@router.get("/bulk-create/jobs/{job_id}", response_model=BulkShipmentJobSchema)
+async def get_bulk_create_job(
+    job_id: str = Path(..., description="ID del job di creazione massiva"),
+    user: dict = Depends(get_current_user),
+    _: None = Depends(require_permission("shipments", "read")),
+):
+    """Stato e risultati (parziali) di un job di creazione massiva spedizioni."""
+    return _get_bulk_job_or_404(job_id).to_schema()
+
+
+@router.get("/bulk-create/jobs/{job_id}/stream")
+async def stream_bulk_create_job(
+    job_id: str = Path(..., description="ID del job di creazione massiva"),
+    user: dict = Depends(get_current_user),
+    _: None = Depends(require_permission("shipments", "read")),
+):
+    """
+    Avanzamento per ordine del job (Server-Sent Events).
     
-    successful = []
-    failed = []
-    total = len(request.order_ids)
-    
-    logger.info(f"Starting bulk shipment creation for {total} orders")
-    
-    for order_id in request.order_ids:
-        try:
-            # 1. Recupera id_shipping da Order
-            id_shipping = or_repo.get_id_shipping_by_order_id(order_id)
-            
-            if not id_shipping:
-                failed.append(BulkShipmentCreateError(
-                    order_id=order_id,
-                    error_type="NOT_FOUND",
-                    error_message=f"Order {order_id} has no shipping"
-                ))
-                logger.warning(f"Order {order_id}: No shipping found")
-                continue
-            
-            # 2. Recupera Shipping per ottenere id_carrier_api
-            shipping_info = shipping_repo.get_carrier_info(id_shipping)
-            carrier_api_id = shipping_info.id_carrier_api
-            
-            if not carrier_api_id:
-                failed.append(BulkShipmentCreateError(
-                    order_id=order_id,
-                    error_type="NO_CARRIER_API",
-                    error_message=f"Order {order_id} has no carrier_api assigned"
-                ))
-                logger.warning(f"Order {order_id}: No carrier_api assigned")
-                continue
-            
-            # 3. Usa factory per ottenere il service corretto
-            shipment_service = factory.get_shipment_service(carrier_api_id, db)
-            
-            # 4. Crea spedizione
-            logger.info(f"Creating shipment for order {order_id} with carrier_api_id {carrier_api_id}")
-            result = await shipment_service.create_shipment(order_id)
-            
-            # 5. Estrai awb dal risultato
-            awb = result.get("awb", "") if isinstance(result, dict) else ""
-            
-            if not awb:
-                failed.append(BulkShipmentCreateError(
-                    order_id=order_id,
-                    error_type="SHIPMENT_ERROR",
-                    error_message=f"Shipment created but no AWB returned for order {order_id}"
-                ))
-                logger.warning(f"Order {order_id}: Shipment created but no AWB in response")
-                continue
-            
-            successful.append(BulkShipmentCreateSuccess(
-                order_id=order_id,
-                id_shipping=id_shipping,
-                awb=awb
-            ))
-            logger.info(f"Order {order_id}: Shipment created successfully with AWB {awb}")
-            
-            # Emetti evento per creazione spedizione
-            try:
-                event = Event(
-                    event_type=EventType.SHIPMENT_CREATED.value,
-                    data={
-                        "order_id": order_id,
-                        "carrier_api_id": carrier_api_id,
-                        "awb": awb,
-                        "shipment_data": result
-                    },
-                    metadata={
-                        "source": "shipments.bulk_create_shipments",
-                        "id_order": order_id
-                    }
-                )
-                emit_event(event)
-                logger.info(f"Event SHIPMENT_CREATED emitted for order {order_id} in bulk operation")
-            except Exception as e:
-                # Non bloccare il processing in caso di errori nell'emissione dell'evento
-                logger.warning(f"Failed to emit SHIPMENT_CREATED event for order {order_id} in bulk operation: {str(e)}", exc_info=True)
-            
-            # REPLAN-SHIPMENT-WORKFLOW: rimosso auto-update stato ordine dopo creazione spedizione nel bulk.
-            # Lo stato ordine viene gestito SOLO manualmente dall'operatore (vedi commento in create_shipment singolo).
-
-        except (NotFoundException, BusinessRuleException, ValidationException, 
-                AuthenticationException, InfrastructureException) as e:
-            # Mapping tra eccezioni e configurazioni di errore
-            error_config = {
-                NotFoundException: ("NOT_FOUND", "not_found", logger.warning),
-                BusinessRuleException: ("BUSINESS_RULE_ERROR", "business", logger.warning),
-                ValidationException: ("VALIDATION_ERROR", "validation", logger.warning),
-                AuthenticationException: ("AUTHENTICATION_ERROR", "authentication", logger.warning),
-                InfrastructureException: ("INFRASTRUCTURE_ERROR", "infrastructure", logger.warning)
-            }
-            
-            error_type, default_category, log_func = error_config[type(e)]
-            failed.append(_create_bulk_shipment_error(order_id, e, error_type, default_category))
-            log_func(f"Order {order_id}: {type(e).__name__} - {str(e)}")
-            
-        except Exception as e:
-            # Gestione generica per tutte le altre eccezioni
-            failed.append(_create_bulk_shipment_error(
-                order_id, 
-                e, 
-                "UNKNOWN_ERROR", 
-                None
-            ))
-            logger.error(f"Order {order_id}: Unexpected error - {str(e)}", exc_info=True)
-    
-    # Calcola summary
-    successful_count = len(successful)
-    failed_count = len(failed)
-    
-    summary = {
-        "total": total,
-        "successful_count": successful_count,
-        "failed_count": failed_count
-    }
-    
-    logger.info(f"Bulk shipment creation completed: {successful_count} successful, {failed_count} failed out of {total} total")
-    
-    return BulkShipmentCreateResponseSchema(
-        successful=successful,
-        failed=failed,
-        summary=summary
+    Un evento ``progress`` per ogni ordine processato, poi ``completed`` (o ``failed``)
+    con lo stato finale. Riconnettendosi gli eventi vengono rispediti dall'inizio.
+    """
+    job = _get_bulk_job_or_404(job_id)
+    return StreamingResponse(
+        job.stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
     )
 
 
@@ -5,12 +5,14 @@ Synchronization endpoints for e-commerce platforms
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Path, Body
 from starlette import status
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, List, Set, Tuple
 import asyncio
 import logging
 import time
 
+from src.core.settings import get_prestashop_sync_settings
 from src.database import get_db, SessionLocal
+from src.models.sync_job import SyncJob
 from src.services.routers.auth_service import db_dependency, get_current_user
 from src.services.core.wrap import check_authentication
 from src.services.routers.auth_service import authorize
@@ -18,9 +20,11 @@ from src.repository.platform_repository import PlatformRepository
 from src.repository.store_repository import StoreRepository
 from src.repository.product_repository import ProductRepository
 from src.repository.order_repository import OrderRepository
+from src.repository.sync_job_repository import SyncJobRepository
 from src.routers.dependencies import get_ecommerce_service
 from src.services.routers.order_service import OrderService
 from src.services.sync.order_state_sync_service import _update_local_order_states
+from src.services.sync.sync_job_tracker import SyncJobTracker, serialize_sync_job, stale_before
 from src.services.interfaces.order_service_interface import IOrderService
 from src.schemas.order_schema import OrderStateSyncSchema, OrderStateSyncResponseSchema
 from src.schemas.product_schema import SyncImagesResponseSchema
@@ -32,6 +36,11 @@ router = APIRouter(
     tags=['Synchronization'],
 )
 
+# Job di sync in esecuzione in questo processo (segnati interrotti all'arresto)
+_active_sync_jobs: Set[int] = set()
+# Riferimenti ai task dei job ripresi all'avvio
+_resumed_sync_tasks: Set[asyncio.Task] = set()
+
 
 def get_platform_repository(db: db_dependency) -> PlatformRepository:
     return PlatformRepository(db)
@@ -67,6 +76,36 @@ def get_default_store(sr: StoreRepository = Depends(get_store_repository)):
     return store
 
 
+def _start_sync_job(db: Session, store_id: int, sync_type: str, resume: bool) -> Tuple[SyncJob, bool]:
+    """
+    Job per una nuova sync dello store: riprende l'ultimo job interrotto dello stesso
+    tipo (se `resume`) oppure ne crea uno nuovo. Controllo e creazione avvengono sotto
+    il lock della riga dello store: due richieste concorrenti non avviano due sync.
+    
+    Raises:
+        HTTPException 409: Sync già in esecuzione per lo store
+    """
+    limit_time = stale_before(get_prestashop_sync_settings().prestashop_sync_job_stale_seconds)
+    job_repo = SyncJobRepository(db)
+    # Nuova transazione: dopo il lock le letture vedono i job committati da altre richieste
+    db.commit()
+    job_repo.lock_store(store_id)
+    running = job_repo.get_running(store_id, limit_time)
+    if running:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"Sync job {running.id_sync_job} already running for store {store_id}"
+        )
+    if resume:
+        job = job_repo.get_resumable(store_id, sync_type, limit_time)
+        if job is not None and job_repo.claim(job.id_sync_job, limit_time):
+            db.refresh(job)
+            return job, True
+    # create() esegue il commit e rilascia il lock
+    return job_repo.create(store_id, sync_type), False
+
+
 @router.post("/prestashop", status_code=status.HTTP_202_ACCEPTED)
 @check_authentication
 @authorize(roles_permitted=['ADMIN'], permissions_required=['C'])
@@ -76,6 +115,7 @@ async def sync_prestashop(
     store_repo: StoreRepository = Depends(get_store_repository),
     store_id: int = Query(..., description="ID dello store da sincronizzare"),  
     limit: int = None,
+    resume: bool = Query(True, description="Riprende dal checkpoint l'ultimo job interrotto (non fallito) dello store"),
     user: dict = Depends(get_current_user)
 ):
     """
@@ -85,11 +125,16 @@ async def sync_prestashop(
     1. Retrieve the store by ID
     2. Sync all data in the correct order (base tables first, then dependent tables)
     3. Process data in batches to avoid timeouts
-    4. Log all operations for tracking
+    4. Track progress in sync_jobs (GET /prestashop/status?sync_id=...)
+    
+    An interrupted job for the same store and sync type is resumed from its
+    checkpoint unless resume=false. Failed jobs are never resumed: a new job
+    re-runs every entity, so orders get their customers and addresses.
     
     Returns:
         202 Accepted: Synchronization started successfully
         400 Bad Request: Missing configuration or invalid store
+        409 Conflict: A synchronization is already running for the store
         500 Internal Server Error: Failed to start synchronization
     """
     # Verifica che lo store esista
@@ -98,22 +143,26 @@ async def sync_prestashop(
     if not store:
         raise HTTPException(status_code=404, detail=f"Store {store_id} not found")
     
+    job, resumed = _start_sync_job(db, store_id, "incremental", resume)
+    
     # Start background synchronization (task crea la propria sessione DB)
     background_tasks.add_task(
         _run_prestashop_sync,
         store_id=store_id,
         new_elements=True,
-        limit=limit
+        limit=limit,
+        id_sync_job=job.id_sync_job
     )
     
     return {
-        "message": "PrestaShop incremental synchronization started",
+        "message": "PrestaShop incremental synchronization " + ("resumed" if resumed else "started"),
         "status": "accepted",
         "sync_type": "incremental",
         "store_id": store_id,
         "store_name": store.name,
         "vat_number": store.get_default_vat_number(),
-        "sync_id": f"prestashop_incremental_{user['id']}_{int(__import__('time').time())}"
+        "sync_id": job.id_sync_job,
+        "resumed": resumed
     }
         
 
@@ -124,6 +173,7 @@ async def sync_prestashop_full(
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     store_id: int = Query(..., description="ID dello store da sincronizzare"),
+    resume: bool = Query(True, description="Riprende dal checkpoint l'ultimo job interrotto (non fallito) dello store"),
     user: dict = Depends(get_current_user)
 ):
     """
@@ -133,11 +183,16 @@ async def sync_prestashop_full(
     1. Retrieve the store by ID
     2. Sync all data in the correct order (base tables first, then dependent tables)
     3. Process data in batches to avoid timeouts
-    4. Log all operations for tracking
+    4. Track progress in sync_jobs (GET /prestashop/status?sync_id=...)
+    
+    An interrupted job for the same store and sync type is resumed from its
+    checkpoint unless resume=false. Failed jobs are never resumed: a new job
+    re-runs every entity, so orders get their customers and addresses.
     
     Returns:
         202 Accepted: Synchronization started successfully
         400 Bad Request: Missing configuration or invalid store
+        409 Conflict: A synchronization is already running for the store
         500 Internal Server Error: Failed to start synchronization
     """
     # Verifica che lo store esista
@@ -147,21 +202,25 @@ async def sync_prestashop_full(
     if not store:
         raise HTTPException(status_code=404, detail=f"Store {store_id} not found")
     
+    job, resumed = _start_sync_job(db, store_id, "full", resume)
+    
     # Start background synchronization (task crea la propria sessione DB)
     background_tasks.add_task(
         _run_prestashop_sync,
         store_id=store_id,
-        new_elements=False
+        new_elements=False,
+        id_sync_job=job.id_sync_job
     )
     
     return {
-        "message": "PrestaShop full synchronization started",
+        "message": "PrestaShop full synchronization " + ("resumed" if resumed else "started"),
         "status": "accepted",
         "sync_type": "full",
         "store_id": store_id,
         "store_name": store.name,
         "vat_number": store.get_default_vat_number(),
-        "sync_id": f"prestashop_full_{user['id']}_{int(__import__('time').time())}"
+        "sync_id": job.id_sync_job,
+        "resumed": resumed
     }
 
 
@@ -169,25 +228,32 @@ async def sync_prestashop_full(
 @check_authentication
 @authorize(roles_permitted=['ADMIN'], permissions_required=['R'])
 async def get_prestashop_sync_status(
+    db: Session = Depends(get_db),
     user: dict = Depends(get_current_user),
-    sync_id: str = None
+    sync_id: int = Query(None, description="ID del job di sync (restituito dagli endpoint di avvio)"),
+    store_id: int = Query(None, description="Filtra gli ultimi job per store"),
+    limit: int = Query(20, ge=1, le=100, description="Numero massimo di job senza sync_id")
 ):
     """
     Get PrestaShop synchronization status
     
     Args:
-        sync_id: Optional sync ID to get specific status
+        sync_id: Optional sync job ID to get specific status
+        store_id: Optional store filter for the latest jobs
         
     Returns:
-        Current synchronization status and progress
+        Job status and progress: phase, entity, last processed ID (checkpoint),
+        completed entities, counts, throughput, errors and heartbeat.
+        Without sync_id, the latest jobs (most recent first).
     """
-    # TODO: Implement status tracking
-    # For now, return a placeholder response
-    return {
-        "status": "not_implemented",
-        "message": "Status tracking will be implemented in the next phase",
-        "sync_id": sync_id
-    }
+    job_repo = SyncJobRepository(db)
+    if sync_id is not None:
+        job = job_repo.get_by_id(sync_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Sync job {sync_id} not found")
+        return serialize_sync_job(job)
+    
+    return {"jobs": [serialize_sync_job(job) for job in job_repo.get_latest(store_id, limit)]}
 
 
 @router.get("/prestashop/last-ids", status_code=status.HTTP_200_OK)
@@ -265,16 +331,27 @@ async def sync_images(
     )
 
 
-async def _run_prestashop_sync(store_id: int, new_elements: bool = True, incremental: bool = None, limit: int = None):
+async def _run_prestashop_sync(
+    store_id: int,
+    new_elements: bool = True,
+    incremental: bool = None,
+    limit: int = None,
+    id_sync_job: int = None
+):
     """
     Background task to run PrestaShop synchronization.
     Crea una sessione DB dedicata per evitare che la sessione della request sia chiusa prima del commit.
     
+    L'avanzamento è registrato sul job `id_sync_job` (creato se assente) con una
+    sessione separata; un job ripreso salta le entità completate e riparte dal
+    checkpoint dell'entità interrotta.
+    
     Args:
         store_id: Store ID in the stores table
         new_elements: Whether to sync only new elements (incremental sync)
         incremental: Whether to run incremental sync (only new data) - deprecated, use new_elements
         limit: Maximum number of records to process per batch
+        id_sync_job: Sync job to track (new or resumed)
     """
     # Handle both new_elements and incremental parameters
     if incremental is not None:
@@ -282,6 +359,17 @@ async def _run_prestashop_sync(store_id: int, new_elements: bool = True, increme
     
     sync_type = "incremental" if new_elements else "full"
     
+    job_db = SessionLocal()
+    job_repo = SyncJobRepository(job_db)
+    job = job_repo.get_by_id(id_sync_job) if id_sync_job else None
+    if job is None:
+        job = job_repo.create(store_id, sync_type)
+    tracker = SyncJobTracker(job_repo, job)
+    _active_sync_jobs.add(tracker.id_sync_job)
+    heartbeat = asyncio.create_task(
+        tracker.keep_alive(get_prestashop_sync_settings().prestashop_sync_job_heartbeat_seconds)
+    )
+    
     db = SessionLocal()
     try:
         # Recupera lo store per verificare che esista
@@ -302,11 +390,17 @@ async def _run_prestashop_sync(store_id: int, new_elements: bool = True, increme
         # Crea il service usando la funzione centralizzata
         service_class = get_ecommerce_service(store_id, db, new_elements=new_elements)
 
+        service_class.job_tracker = tracker
+
         async with service_class as ps_service:
             print(f"Base URL: {ps_service.base_url}")
             print(f"API Key: {ps_service.api_key[:10]}...")
             # Run synchronization based on type
             results = await ps_service.sync_all_data()
+            if results.get('status') == 'SUCCESS':
+                tracker.finish('completed')
+            else:
+                tracker.finish('failed', results.get('error'))
 
             # Sincronizza anche gli stati ordini e persiste in ecommerce_order_states
             try:
@@ -339,6 +433,69 @@ async def _run_prestashop_sync(store_id: int, new_elements: bool = True, increme
                     print(f"    {status_icon} {func_result['function']}: {func_result['processed']} records")
                     if func_result['status'] == 'ERROR':
                         print(f"      Error: {func_result['error']}")
+    except asyncio.CancelledError:
+        # Arresto dell'applicazione: il job resta riprendibile dal checkpoint
+        tracker.finish('interrupted')
+        raise
+    except Exception as e:
+        if tracker.job.status == 'running':
+            tracker.finish('failed', str(e))
+        raise
+    finally:
+        heartbeat.cancel()
+        _active_sync_jobs.discard(tracker.id_sync_job)
+        db.close()
+        job_db.close()
+
+
+def interrupt_active_sync_jobs() -> List[int]:
+    """Segna come interrotti i job in esecuzione in questo processo (arresto applicazione)"""
+    ids = list(_active_sync_jobs)
+    if not ids:
+        return []
+    db = SessionLocal()
+    try:
+        SyncJobRepository(db).mark_interrupted(ids)
+    finally:
+        db.close()
+    return ids
+
+
+async def resume_interrupted_sync_jobs() -> List[int]:
+    """
+    Riprende all'avvio l'ultimo job interrotto di ogni store e tipo di sync
+    (PRESTASHOP_SYNC_RESUME_ON_STARTUP). Il claim è atomico: con più worker
+    ogni job viene ripreso da un solo processo.
+    """
+    settings = get_prestashop_sync_settings()
+    if not settings.prestashop_sync_resume_on_startup:
+        return []
+    
+    limit_time = stale_before(settings.prestashop_sync_job_stale_seconds)
+    db = SessionLocal()
+    try:
+        job_repo = SyncJobRepository(db)
+        candidates = {(job.id_store, job.sync_type) for job in job_repo.get_abandoned(limit_time)}
+        resumed = []
+        for store_id, sync_type in sorted(candidates):
+            # Stesso lock degli endpoint di avvio: nessuna sync nuova in parallelo al claim
+            db.commit()
+            job_repo.lock_store(store_id)
+            job = job_repo.get_resumable(store_id, sync_type, limit_time)
+            if job is None or job_repo.get_running(store_id, limit_time) is not None:
+                db.rollback()
+                continue
+            if not job_repo.claim(job.id_sync_job, limit_time):
+                continue
+            task = asyncio.create_task(_run_prestashop_sync(
+                store_id=store_id,
+                new_elements=sync_type == "incremental",
+                id_sync_job=job.id_sync_job
+            ))
+            _resumed_sync_tasks.add(task)
+            task.add_done_callback(_resumed_sync_tasks.discard)
+            resumed.append(job.id_sync_job)
+        return resumed
     finally:
         db.close()
 
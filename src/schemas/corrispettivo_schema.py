@@ -160,3 +160,12 @@ class CorrispettivoDayExportRequestSchema(BaseModel):
             month=self.month,
             filters=merged_filters,
         )
+
+
+class CorrispettivoPeriodLockResponseSchema(BaseModel):
+    """Stato di chiusura del mese nel rollup giornaliero corrispettivi."""
+
+    year: int
+    month: int
+    locked: bool
+    days: int = Field(..., description="Giorni del mese interessati")
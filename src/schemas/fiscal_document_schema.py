@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field, field_validator, validator
 from datetime import date, datetime
 
 from src.models.order import ViesStatus
+from src.schemas.pdf_export_schema import BulkPdfRequestSchema
 from src.schemas.ricevuta_schema import (
     RicevutaAddressEmbedSchema,
     RicevutaCustomerEmbedSchema,
@@ -346,9 +347,10 @@ class FiscalDocumentResponseSchema(BaseModel):
 class FiscalDocumentListResponseSchema(BaseModel):
     """Schema risposta lista documenti fiscali"""
     documents: List[FiscalDocumentResponseSchema]
-    total: int
+    total: Optional[int] = None
     page: int
     limit: int
+    next_cursor: Optional[str] = None
 
 
 class FiscalDocumentListFiltersSchema(BaseModel):
@@ -488,6 +490,24 @@ class InvoiceListExportItemSchema(BaseModel):
         return round(float(v), 2)
 
 
+class FiscalDocumentBulkPdfRequestSchema(BulkPdfRequestSchema):
+    """Export PDF massivo fatture / note di credito (ids oppure filtri export)."""
+
+    filters: Optional[InvoiceExportFiltersSchema] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "filters": {
+                    "document_type": "invoice",
+                    "date_add_from": "2026-09-01",
+                    "date_add_to": "2026-09-30",
+                },
+                "format": "zip",
+            }
+        }
+
+
 # ==================== SCHEMAS PER UPDATE ====================
 
 class FiscalDocumentUpdateStatusSchema(BaseModel):
@@ -0,0 +1,51 @@
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class BulkPdfFormatSchema(str, Enum):
+    ZIP = "zip"
+    PDF = "pdf"
+
+
+class BulkPdfRequestSchema(BaseModel):
+    """Export PDF massivo: lista ID esplicita oppure filtri (definiti per tipo documento)."""
+
+    ids: Optional[List[int]] = Field(
+        None,
+        min_length=1,
+        description="ID documenti da esportare, nell'ordine desiderato",
+    )
+    format: BulkPdfFormatSchema = Field(
+        BulkPdfFormatSchema.ZIP,
+        description="zip (un PDF per documento) o pdf (unico PDF unito)",
+    )
+
+    @model_validator(mode="after")
+    def validate_selection(self):
+        if not self.ids and getattr(self, "filters", None) is None:
+            raise ValueError("Indicare ids oppure filters")
+        return self
+
+
+class OrderDocumentBulkPdfFiltersSchema(BaseModel):
+    """Stessi filtri delle liste DDT / preventivi."""
+
+    search: Optional[str] = None
+    sectionals_ids: Optional[str] = Field(None, description="ID sezionali separati da virgole")
+    payments_ids: Optional[str] = Field(None, description="ID pagamenti separati da virgole")
+    date_from: Optional[str] = Field(None, description="Data inizio (YYYY-MM-DD)")
+    date_to: Optional[str] = Field(None, description="Data fine (YYYY-MM-DD)")
+
+
+class OrderDocumentBulkPdfRequestSchema(BulkPdfRequestSchema):
+    filters: Optional[OrderDocumentBulkPdfFiltersSchema] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "filters": {"date_from": "2026-09-01", "date_to": "2026-09-30"},
+                "format": "zip",
+            }
+        }
@@ -401,7 +401,8 @@ class PreventivoListResponseSchema(BaseModel):
     total: int
     page: int
     limit: int
-    stats: PreventivoStatsSchema
+    stats: Optional[PreventivoStatsSchema] = None
+    next_cursor: Optional[str] = None
     
     class Config:
         json_schema_extra = {
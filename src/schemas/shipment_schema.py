@@ -57,3 +57,16 @@ class BulkShipmentCreateResponseSchema(BaseModel):
 
     model_config = ConfigDict(from_attributes=True, extra='ignore')
 
+
+
+class BulkShipmentJobSchema(BaseModel):
+    """Stato di un job di creazione massiva spedizioni (modalità 202)"""
+    job_id: str = Field(..., description="ID del job")
+    status: str = Field(..., description="Stato del job (pending, running, completed, failed)")
+    total: int = Field(..., description="Numero di ordini da processare")
+    processed: int = Field(0, description="Ordini già processati")
+    successful: List[BulkShipmentCreateSuccess] = Field(default_factory=list)
+    failed: List[BulkShipmentCreateError] = Field(default_factory=list)
+    error_message: Optional[str] = Field(None, description="Errore che ha interrotto il job")
+
+    model_config = ConfigDict(from_attributes=True, extra='ignore')
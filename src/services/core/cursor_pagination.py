@@ -0,0 +1,106 @@
+"""
+Paginazione keyset (cursor) per le liste ad alto volume.
+
+Il cursore è opaco per il client (base64url di un JSON) e contiene la chiave di
+ordinamento, la direzione e i valori (colonna di ordinamento, id) dell'ultima
+riga restituita. La pagina successiva filtra "dopo" quella riga invece di usare
+OFFSET, quindi il costo non cresce con la profondità della pagina.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def _serialize_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _deserialize_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise ValueError("Valore cursore non valido")
+    return value
+
+
+def encode_cursor(order_by: str, direction: str, sort_value: Any, row_id: int) -> str:
+    """Codifica il cursore opaco a partire dall'ultima riga della pagina."""
+    payload = {"o": order_by, "d": direction, "v": _serialize_value(sort_value), "id": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, direction: str) -> Tuple[Any, int]:
+    """
+    Decodifica il cursore e restituisce (valore ordinamento, id).
+
+    Raises:
+        HTTPException 400: cursore malformato o generato con un ordinamento diverso
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        sort_value = _deserialize_value(payload["v"])
+        row_id = int(payload["id"])
+        cursor_order_by, cursor_direction = payload["o"], payload["d"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Parametro 'after' non valido")
+
+    if cursor_order_by != order_by or cursor_direction != direction:
+        raise HTTPException(
+            status_code=400,
+            detail="Il cursore 'after' è stato generato con un ordinamento diverso da quello richiesto",
+        )
+    return sort_value, row_id
+
+
+def keyset_condition(sort_column, id_column, direction: str, sort_value: Any, row_id: int):
+    """
+    Condizione WHERE per le righe successive a (sort_value, row_id).
+
+    Presuppone l'ordinamento `sort_column <direction>, id_column ASC` (tie-breaker
+    stabile). I NULL sono trattati come valori minimi (semantica MySQL/SQLite:
+    primi in ASC, ultimi in DESC). Se la colonna di ordinamento è l'id stesso la
+    condizione si riduce a un semplice confronto sull'id.
+    """
+    descending = direction == "desc"
+
+    if sort_column is id_column:
+        return id_column < row_id if descending else id_column > row_id
+
+    same_value_after = and_(
+        sort_column.is_(None) if sort_value is None else sort_column == sort_value,
+        id_column > row_id,
+    )
+    if sort_value is None:
+        if descending:
+            # Dopo i NULL (ultimi in DESC) restano solo altri NULL con id maggiore
+            return same_value_after
+        # In ASC i NULL vengono prima: seguono tutti i valori non NULL
+        return or_(same_value_after, sort_column.isnot(None))
+
+    if descending:
+        return or_(sort_column < sort_value, same_value_after, sort_column.is_(None))
+    return or_(sort_column > sort_value, same_value_after)
+
+
+def next_cursor_for(rows: list, limit: int, order_by: str, direction: str,
+                    sort_attr: str, id_attr: str) -> Optional[str]:
+    """
+    Cursore della pagina successiva, oppure None se la pagina non è piena
+    (nessuna riga ulteriore da leggere).
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(order_by, direction, getattr(last, sort_attr), getattr(last, id_attr))
@@ -14,6 +14,7 @@ __all__ = [
     'CSVValidator',
     'DependencyResolver',
     'EntityMapper',
+    'ReferenceResolver',
     'CSVImportService'
 ]
 
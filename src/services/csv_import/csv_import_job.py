@@ -0,0 +1,187 @@
+"""
+Job di import CSV in streaming (modalità background=true dell'endpoint di import).
+
+L'upload viene copiato a blocchi su un file temporaneo e importato da un thread
+dedicato con CSVImportService.import_entity_stream. La sessione del job è legata
+a una transazione esterna sulla connessione (``join_transaction_mode="create_savepoint"``):
+il commit dei repository a fine blocco chiude solo il SAVEPOINT, e l'intero file
+viene confermato o annullato in un'unica transazione.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import UploadFile
+from sqlalchemy.engine import Engine
+
+from src.core.settings import get_csv_import_settings
+from .csv_import_service import CSVImportService
+from .models import ImportResult
+
+logger = logging.getLogger(__name__)
+
+_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+async def spool_upload(file: UploadFile) -> str:
+    """Copia l'upload su un file temporaneo a blocchi da 1 MiB; restituisce il percorso."""
+    spool_dir = get_csv_import_settings().csv_import_spool_dir or None
+    if spool_dir:
+        os.makedirs(spool_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="csv_import_", suffix=".csv", dir=spool_dir)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+                handle.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class CSVImportJob:
+    """Import CSV in background con avanzamento consultabile tramite job_id."""
+
+    def __init__(
+        self,
+        file_path: str,
+        entity_type: str,
+        id_store: Optional[int] = None,
+        batch_size: int = 1000,
+        validate_only: bool = False,
+    ):
+        self.job_id = uuid.uuid4().hex
+        self.file_path = file_path
+        self.entity_type = entity_type
+        self.id_store = id_store
+        self.batch_size = batch_size
+        self.validate_only = validate_only
+        self.status = "pending"
+        self.total_bytes = os.path.getsize(file_path)
+        self.bytes_read = 0
+        self.processed_rows = 0
+        self.inserted_rows = 0
+        self.result: Optional[ImportResult] = None
+        self.error_message: Optional[str] = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[float] = None
+        self._handle = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "rejected", "failed")
+
+    @property
+    def progress(self) -> float:
+        """Percentuale letta del file (100 a job terminato)."""
+        if self.finished:
+            return 100.0
+        if not self.total_bytes:
+            return 0.0
+        return round(min(self.bytes_read / self.total_bytes, 1.0) * 100, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "entity_type": self.entity_type,
+            "id_store": self.id_store,
+            "validate_only": self.validate_only,
+            "progress": self.progress,
+            "processed_rows": self.processed_rows,
+            "inserted_rows": self.inserted_rows,
+            "error_message": self.error_message,
+            "created_at": self.created_at.isoformat(),
+            "result": self.result.to_dict() if self.result else None,
+        }
+
+    def _on_progress(self, processed_rows: int, inserted_rows: int) -> None:
+        self.processed_rows = processed_rows
+        self.inserted_rows = inserted_rows
+        if self._handle is not None and not self._handle.closed:
+            self.bytes_read = self._handle.tell()
+
+    async def run(self, engine: Optional[Engine] = None) -> None:
+        """
+        Esegue il job in un thread con un proprio event loop: il lavoro è DB sincrono
+        e non deve bloccare il loop dell'applicazione.
+        """
+        self.status = "running"
+        try:
+            self.result = await asyncio.to_thread(asyncio.run, self._execute(engine))
+            # Errori di validazione: transazione annullata, nessuna riga inserita
+            self.status = "rejected" if self.result.errors else "completed"
+            self.inserted_rows = self.result.inserted_rows
+        except Exception as e:
+            logger.error(f"CSV import job {self.job_id} failed: {e}", exc_info=True)
+            self.status = "failed"
+            self.error_message = str(e)
+            self.inserted_rows = 0
+        finally:
+            self.finished_at = time.time()
+            try:
+                os.unlink(self.file_path)
+            except OSError:
+                pass
+
+    async def _execute(self, engine: Optional[Engine]) -> ImportResult:
+        from src.database import SessionLocal, engine as default_engine
+
+        with (engine or default_engine).connect() as connection:
+            transaction = connection.begin()
+            session = SessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+            try:
+                with open(self.file_path, "rb") as handle:
+                    self._handle = handle
+                    result = await CSVImportService(session).import_entity_stream(
+                        handle,
+                        self.entity_type,
+                        id_store=self.id_store,
+                        batch_size=self.batch_size,
+                        validate_only=self.validate_only,
+                        on_progress=self._on_progress,
+                    )
+                if result.errors or self.validate_only:
+                    transaction.rollback()
+                else:
+                    transaction.commit()
+                return result
+            except BaseException:
+                transaction.rollback()
+                raise
+            finally:
+                self._handle = None
+                session.close()
+
+
+# Job in memoria del processo: lo stato è consultabile dal worker che li ha avviati
+_csv_import_jobs: Dict[str, CSVImportJob] = {}
+
+
+def create_csv_import_job(
+    file_path: str,
+    entity_type: str,
+    id_store: Optional[int] = None,
+    batch_size: int = 1000,
+    validate_only: bool = False,
+) -> CSVImportJob:
+    """Registra un nuovo job, scartando quelli terminati da più di csv_import_job_ttl."""
+    ttl = get_csv_import_settings().csv_import_job_ttl
+    now = time.time()
+    for job_id, job in list(_csv_import_jobs.items()):
+        if job.finished_at is not None and now - job.finished_at > ttl:
+            del _csv_import_jobs[job_id]
+    job = CSVImportJob(file_path, entity_type, id_store, batch_size, validate_only)
+    _csv_import_jobs[job.job_id] = job
+    return job
+
+
+def get_csv_import_job(job_id: str) -> Optional[CSVImportJob]:
+    return _csv_import_jobs.get(job_id)
@@ -6,7 +6,7 @@ Coordinates the entire CSV import workflow following SOLID principles.
 from __future__ import annotations
 
 import time
-from typing import List, Dict, Any
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
 
@@ -15,6 +15,7 @@ from .csv_parser import CSVParser
 from .csv_validator import CSVValidator
 from .dependency_resolver import DependencyResolver
 from .entity_mapper import EntityMapper
+from .reference_resolver import ReferenceResolver
 
 from src.core.exceptions import ValidationException, InfrastructureException, ErrorCode
 
@@ -63,12 +64,7 @@ class CSVImportService:
         started_at = datetime.now()
         
         # Step 1: Validate entity type
-        if entity_type not in EntityMapper.SCHEMA_MAPPING:
-            raise ValidationException(
-                f"Unknown entity type: {entity_type}",
-                ErrorCode.VALIDATION_ERROR,
-                {"entity_type": entity_type, "supported": list(EntityMapper.SCHEMA_MAPPING.keys())}
-            )
+        self._check_entity_type(entity_type)
         
         try:
             # Step 2: Parse CSV
@@ -78,38 +74,12 @@ class CSVImportService:
             print(f"📝 Parsed {len(rows)} rows from CSV for {entity_type}")
             
             # Step 3: Check dependencies
-            deps_valid, missing_deps = DependencyResolver.validate_dependencies(
-                entity_type, 
-                self.db,
-                id_store
-            )
+            self._check_dependencies(entity_type, id_store)
             
-            if not deps_valid:
-                raise ValidationException(
-                    f"Missing dependencies for {entity_type}: {', '.join(missing_deps)}",
-                    ErrorCode.VALIDATION_ERROR,
-                    {"missing_dependencies": missing_deps}
-                )
-            
-            # Step 4: Map to schemas
+            # Step 4: Map to schemas (FK del file risolte con una query per tabella)
             print(f"🔄 Mapping {len(rows)} rows to {entity_type} schemas...")
-            mapped_data = []
-            mapping_errors = []
-            
-            for row in rows:
-                row_num = row.get('_row_number', 0)
-                try:
-                    # Passa db session per order_details (necessario per lookup id_origin->id_product e Tax->id_tax)
-                    db_session = self.db if entity_type == 'order_details' else None
-                    schema_instance = EntityMapper.map_to_schema(row, entity_type, id_store, db_session)
-                    mapped_data.append(schema_instance)
-                except Exception as e:
-                    mapping_errors.append(ValidationError(
-                        row_number=row_num,
-                        field_name='mapping',
-                        error_type='mapping_error',
-                        message=str(e)
-                    ))
+            resolver = ReferenceResolver(self.db, entity_type, id_store).load(rows)
+            mapped_data, mapping_errors = self._map_rows(rows, entity_type, id_store, resolver)
             
             if mapping_errors:
                 print(f"❌ Mapping failed: {len(mapping_errors)} errors")
@@ -127,7 +97,7 @@ class CSVImportService:
             
             # Step 5: Validate all
             print(f"✓ Validating {len(mapped_data)} {entity_type}...")
-            validation_result = await self.validator.validate_batch(rows, entity_type, id_store)
+            validation_result = await self.validator.validate_batch(rows, entity_type, id_store, resolver)
             
             if not validation_result.is_valid:
                 print(f"❌ Validation failed: {len(validation_result.errors)} errors")
@@ -177,7 +147,7 @@ class CSVImportService:
             
             return ImportResult(
                 entity_type=entity_type,
-                id_store=id_platform,
+                id_store=id_store,
                 total_rows=len(rows),
                 validated_rows=len(mapped_data),
                 inserted_rows=inserted_count,
@@ -198,11 +168,172 @@ class CSVImportService:
                 {"entity_type": entity_type, "error": str(e)}
             )
     
+    def check_preconditions(self, entity_type: str, id_store: int = None) -> None:
+        """Entity type supportato e dipendenze presenti (prima di avviare un import in background)."""
+        self._check_entity_type(entity_type)
+        self._check_dependencies(entity_type, id_store)
+    
+    def _check_entity_type(self, entity_type: str) -> None:
+        if entity_type not in EntityMapper.SCHEMA_MAPPING:
+            raise ValidationException(
+                f"Unknown entity type: {entity_type}",
+                ErrorCode.VALIDATION_ERROR,
+                {"entity_type": entity_type, "supported": list(EntityMapper.SCHEMA_MAPPING.keys())}
+            )
+    
+    def _check_dependencies(self, entity_type: str, id_store: int = None) -> None:
+        deps_valid, missing_deps = DependencyResolver.validate_dependencies(
+            entity_type, 
+            self.db,
+            id_store
+        )
+        
+        if not deps_valid:
+            raise ValidationException(
+                f"Missing dependencies for {entity_type}: {', '.join(missing_deps)}",
+                ErrorCode.VALIDATION_ERROR,
+                {"missing_dependencies": missing_deps}
+            )
+    
+    async def import_entity_stream(
+        self,
+        file_obj: BinaryIO,
+        entity_type: str,
+        id_store: int = None,
+        batch_size: int = 1000,
+        validate_only: bool = False,
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ) -> ImportResult:
+        """
+        Import in streaming a chunk: memoria costante rispetto alla dimensione del file.
+        
+        Le righe vengono lette dal file una alla volta e processate a blocchi di
+        `batch_size`: mapping, validazione e insert del blocco, poi il blocco viene
+        scartato. Tra un blocco e l'altro restano solo le chiavi per i duplicati nel
+        CSV (id_origin, email, sku).
+        
+        Tutto-o-niente: la sessione deve essere legata a una transazione esterna
+        (``join_transaction_mode="create_savepoint"``, vedi CSVImportJob), così il
+        commit dei repository chiude solo il SAVEPOINT del blocco. Al primo blocco non
+        valido gli insert si fermano ma la validazione prosegue fino a fine file per
+        riportare tutti gli errori; il chiamante fa rollback se il risultato ha errori.
+        
+        Args:
+            file_obj: File CSV binario seekable
+            entity_type: Tipo entità
+            id_store: ID store
+            batch_size: Righe per blocco (mapping, validazione e insert)
+            validate_only: Se True, solo validazione senza import
+            on_progress: Callback (righe processate, righe inserite) a fine blocco
+            
+        Returns:
+            ImportResult dell'intero file (inserted_rows=0 se ci sono errori)
+        """
+        started_at = datetime.now()
+        self.check_preconditions(entity_type, id_store)
+        
+        required_fields = EntityMapper.get_required_fields(entity_type)
+        try:
+            _, rows = CSVParser.iter_csv(file_obj, entity_type, required_fields)
+        except ValueError as e:
+            raise ValidationException(str(e), ErrorCode.VALIDATION_ERROR, {"entity_type": entity_type})
+        
+        duplicates = _CrossChunkDuplicates(entity_type, id_store)
+        errors: List[ValidationError] = []
+        error_rows = 0
+        total_rows = 0
+        inserted_count = 0
+        validation_time = 0.0
+        import_time = 0.0
+        
+        for chunk in _chunked(rows, batch_size):
+            total_rows += len(chunk)
+            
+            validation_start = time.time()
+            resolver = ReferenceResolver(self.db, entity_type, id_store).load(chunk)
+            mapped_data, chunk_errors = self._map_rows(chunk, entity_type, id_store, resolver)
+            if not chunk_errors:
+                validation_result = await self.validator.validate_batch(chunk, entity_type, id_store, resolver)
+                chunk_errors = list(validation_result.errors)
+            repeated = duplicates.check(chunk)
+            if repeated:
+                # Il "duplicato in DB" di un id_origin ripetuto è la riga inserita da un blocco precedente
+                repeated_rows = {err.row_number for err in repeated if err.field_name == 'id_origin'}
+                chunk_errors = [
+                    err for err in chunk_errors
+                    if not (err.error_type == 'duplicate_in_db' and err.row_number in repeated_rows)
+                ]
+                chunk_errors.extend(repeated)
+            validation_time += time.time() - validation_start
+            
+            if chunk_errors:
+                error_rows += len({err.row_number for err in chunk_errors})
+                errors.extend(chunk_errors[:max(0, MAX_STREAM_ERRORS - len(errors))])
+            elif not errors and not validate_only:
+                import_start = time.time()
+                inserted_count += await self._bulk_insert(mapped_data, entity_type, id_store, batch_size)
+                import_time += time.time() - import_start
+            
+            if on_progress:
+                on_progress(total_rows, inserted_count)
+        
+        if not total_rows:
+            raise ValidationException("CSV file has no data rows", ErrorCode.VALIDATION_ERROR, {"entity_type": entity_type})
+        
+        if errors:
+            print(f"❌ Streaming import of {entity_type} rejected: {error_rows} invalid rows out of {total_rows}")
+            inserted_count = 0
+        else:
+            print(f"✅ Streaming import of {entity_type}: {total_rows} rows validated, {inserted_count} inserted")
+        
+        return ImportResult(
+            entity_type=entity_type,
+            id_store=id_store,
+            total_rows=total_rows,
+            validated_rows=total_rows - error_rows,
+            inserted_rows=inserted_count,
+            skipped_rows=total_rows - inserted_count,
+            errors=errors,
+            validation_time=validation_time,
+            import_time=import_time,
+            started_at=started_at,
+            completed_at=datetime.now()
+        )
+    
+    def _map_rows(
+        self,
+        rows: List[Dict[str, Any]],
+        entity_type: str,
+        id_store: int = None,
+        resolver: Optional[ReferenceResolver] = None
+    ) -> Tuple[List[Any], List[ValidationError]]:
+        """
+        Mapping righe → schema; errori come ValidationError 'mapping_error'.
+        
+        Per order_details i lookup id_origin->id_product e Tax->id_tax usano le
+        mappature del resolver (caricato qui se non passato).
+        """
+        mapped_data = []
+        mapping_errors = []
+        if resolver is None and entity_type == 'order_details':
+            resolver = ReferenceResolver(self.db, entity_type, id_store).load(rows)
+        for row in rows:
+            try:
+                mapped_data.append(EntityMapper.map_to_schema(row, entity_type, id_store, resolver=resolver))
+            except Exception as e:
+                mapping_errors.append(ValidationError(
+                    row_number=row.get('_row_number', 0),
+                    field_name='mapping',
+                    error_type='mapping_error',
+                    message=str(e)
+                ))
+        return mapped_data, mapping_errors
+    
     async def _bulk_insert(
         self,
         data_list: List[Any],
         entity_type: str,
-        id_platform: int,
+        id_store: int,
         batch_size: int
     ) -> int:
         """
@@ -226,7 +357,7 @@ class CSVImportService:
                 # ProductRepository ha bulk_create standard
                 return repository.bulk_create(data_list, batch_size)
             else:
-                # Address, Order hanno bulk_create_csv_import con id_store
+                # Address, Customer, Order hanno bulk_create_csv_import con id_store
                 return repository.bulk_create_csv_import(data_list, id_store, batch_size)
         else:
             return repository.bulk_create_csv_import(data_list, batch_size)
@@ -259,3 +390,69 @@ class CSVImportService:
         
         return repo_class(self.db)
 
+
+
+# Errori conservati nel risultato dell'import in streaming (il conteggio righe resta completo)
+MAX_STREAM_ERRORS = 1000
+
+
+def _chunked(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _CrossChunkDuplicates:
+    """
+    Duplicati nel CSV tra blocchi diversi (quelli interni al blocco li segnala CSVValidator).
+    
+    Conserva solo le chiavi già viste: id_origin (con id_store per le entità
+    store-aware), email per customers, sku per products.
+    """
+    
+    def __init__(self, entity_type: str, id_store: int = None):
+        self.entity_type = entity_type
+        self.id_store = id_store
+        self.seen: Dict[str, Dict[Any, int]] = {"id_origin": {}, "email": {}, "sku": {}}
+    
+    def _keys(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        keys = {}
+        id_origin = row.get('id_origin')
+        if id_origin:
+            if self.entity_type in EntityMapper.PLATFORM_AWARE_ENTITIES and self.id_store:
+                keys['id_origin'] = (id_origin, self.id_store)
+            else:
+                keys['id_origin'] = id_origin
+        if self.entity_type == 'customers' and row.get('email'):
+            keys['email'] = row['email'].lower()
+        if self.entity_type == 'products' and row.get('sku'):
+            keys['sku'] = row['sku']
+        return keys
+    
+    def check(self, chunk: List[Dict[str, Any]]) -> List[ValidationError]:
+        errors = []
+        chunk_keys = []
+        for row in chunk:
+            row_num = row.get('_row_number', 0)
+            keys = self._keys(row)
+            chunk_keys.append((row_num, keys))
+            for field_name, key in keys.items():
+                first_row = self.seen[field_name].get(key)
+                if first_row is not None:
+                    errors.append(ValidationError(
+                        row_number=row_num,
+                        field_name=field_name,
+                        error_type='unique_violation' if field_name != 'id_origin' else 'duplicate_in_csv',
+                        message=f"Duplicate {field_name} in CSV (first seen at row {first_row})",
+                        value=row.get(field_name)
+                    ))
+        # Le chiavi del blocco diventano "già viste" solo dopo il controllo
+        for row_num, keys in chunk_keys:
+            for field_name, key in keys.items():
+                self.seen[field_name].setdefault(key, row_num)
+        return errors
@@ -6,9 +6,10 @@ Follows Single Responsibility Principle - only parsing logic.
 """
 from __future__ import annotations
 
+import codecs
 import csv
 import io
-from typing import List, Dict, Any, Optional, Tuple
+from typing import BinaryIO, Dict, Any, Iterator, List, Optional, Tuple
 
 
 class CSVParser:
@@ -21,6 +22,9 @@ class CSVParser:
     # Delimiters supportati in ordine di priorità
     SUPPORTED_DELIMITERS = [',', ';', '\t', '|']
     
+    # Byte letti dall'inizio del file per encoding e delimiter (modalità streaming)
+    STREAM_SAMPLE_SIZE = 64 * 1024
+    
     @staticmethod
     def parse_csv(
         file_content: bytes,
@@ -59,6 +63,74 @@ class CSVParser:
         # Parse CSV
         reader = csv.DictReader(io.StringIO(content), delimiter=delimiter)
         
+        headers = CSVParser._read_headers(reader, entity_type, expected_headers)
+        
+        # Parse righe
+        rows = list(CSVParser._iter_clean_rows(reader))
+        
+        if not rows:
+            raise ValueError("CSV file has no data rows")
+        
+        return headers, rows
+    
+    @staticmethod
+    def iter_csv(
+        file_obj: BinaryIO,
+        entity_type: str,
+        expected_headers: Optional[List[str]] = None
+    ) -> Tuple[List[str], Iterator[Dict[str, Any]]]:
+        """
+        Parse CSV in streaming da un file binario (seekable), senza caricarlo in memoria.
+        
+        Encoding e delimiter vengono rilevati sui primi STREAM_SAMPLE_SIZE byte; le
+        righe vengono lette e pulite una alla volta, con lo stesso formato di parse_csv.
+        
+        Args:
+            file_obj: File binario aperto (es. upload salvato su disco)
+            entity_type: Tipo entità (per logging/error reporting)
+            expected_headers: Headers attesi (opzionale, per validazione)
+            
+        Returns:
+            Tuple (headers, iteratore righe)
+            
+        Raises:
+            ValueError: Se CSV è vuoto o headers non validi
+        """
+        sample = file_obj.read(CSVParser.STREAM_SAMPLE_SIZE)
+        file_obj.seek(0)
+        
+        encoding = CSVParser.detect_encoding(sample)
+        sample_text = sample.decode(encoding, errors='ignore')
+        if not sample_text.strip():
+            raise ValueError("CSV file is empty")
+        
+        delimiter = CSVParser.detect_delimiter(sample_text)
+        text_stream = io.TextIOWrapper(file_obj, encoding=encoding, newline='')
+        reader = csv.DictReader(text_stream, delimiter=delimiter)
+        
+        headers = CSVParser._read_headers(reader, entity_type, expected_headers)
+        return headers, CSVParser._iter_clean_rows(reader)
+    
+    @staticmethod
+    def detect_encoding(sample: bytes) -> str:
+        """
+        Rileva l'encoding dall'inizio del file: UTF-8 (con o senza BOM), altrimenti Latin-1.
+        
+        Il campione può terminare a metà di un carattere multibyte: la decodifica
+        è incrementale e non segnala la sequenza troncata finale.
+        """
+        try:
+            codecs.getincrementaldecoder('utf-8-sig')().decode(sample, final=False)
+            return 'utf-8-sig'
+        except UnicodeDecodeError:
+            return 'latin-1'
+    
+    @staticmethod
+    def _read_headers(
+        reader: csv.DictReader,
+        entity_type: str,
+        expected_headers: Optional[List[str]]
+    ) -> List[str]:
         # Get headers
         if not reader.fieldnames:
             raise ValueError("CSV file has no headers")
@@ -72,9 +144,10 @@ class CSVParser:
                 raise ValueError(
                     f"Missing required headers for {entity_type}: {', '.join(missing_headers)}"
                 )
-        
-        # Parse righe
-        rows = []
+        return headers
+    
+    @staticmethod
+    def _iter_clean_rows(reader: csv.DictReader) -> Iterator[Dict[str, Any]]:
         for row_num, row in enumerate(reader, start=1):
             # Skip righe vuote
             if not any(row.values()):
@@ -88,12 +161,7 @@ class CSVParser:
             
             # Aggiungi row number per error reporting
             cleaned_row['_row_number'] = row_num
-            rows.append(cleaned_row)
-        
-        if not rows:
-            raise ValueError("CSV file has no data rows")
-        
-        return headers, rows
+            yield cleaned_row
     
     @staticmethod
     def detect_delimiter(content: str) -> str:
@@ -8,11 +8,13 @@ from __future__ import annotations
 
 from typing import List, Dict, Any, Set, Tuple, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from pydantic import ValidationError as PydanticValidationError
 
 from .models import ValidationResult, ValidationError as ImportValidationError
 from .entity_mapper import EntityMapper
+from .reference_resolver import (
+    ENTITY_TABLES, FK_CHECKS, ReferenceResolver, parse_percentage, parse_reference
+)
 import time
 
 
@@ -34,7 +36,8 @@ class CSVValidator:
         self,
         rows: List[Dict[str, Any]],
         entity_type: str,
-        id_store: int = None
+        id_store: int = None,
+        resolver: Optional[ReferenceResolver] = None
     ) -> ValidationResult:
         """
         Valida batch completo di righe CSV.
@@ -45,11 +48,15 @@ class CSVValidator:
             rows: Lista righe CSV (con _row_number)
             entity_type: Tipo entità
             id_store: ID store
+            resolver: Mappature FK già caricate per queste righe (evita di ripetere le query)
             
         Returns:
             ValidationResult con esito validazione
         """
         start_time = time.time()
+        if resolver is None:
+            # Una query per tabella referenziata, poi solo lookup in memoria
+            resolver = ReferenceResolver(self.db, entity_type, id_store).load(rows)
         errors: List[ImportValidationError] = []
         valid_rows = 0
         
@@ -62,11 +69,11 @@ class CSVValidator:
         errors.extend(duplicate_errors)
         
         # 3. Validate foreign keys
-        fk_errors = await self._validate_foreign_keys(rows, entity_type, id_store)
+        fk_errors = await self._validate_foreign_keys(rows, entity_type, id_store, resolver)
         errors.extend(fk_errors)
         
         # 4. Check existing records (duplicates in DB)
-        existing_errors = self._check_existing_records(rows, entity_type, id_store)
+        existing_errors = self._check_existing_records(rows, entity_type, id_store, resolver)
         errors.extend(existing_errors)
         
         # 5. Business rules validation (entity-specific)
@@ -160,207 +167,64 @@ class CSVValidator:
         self,
         rows: List[Dict[str, Any]],
         entity_type: str,
-        id_store: int = None
+        id_store: int = None,
+        resolver: Optional[ReferenceResolver] = None
     ) -> List[ImportValidationError]:
-        """Valida che foreign keys esistano nel DB"""
+        """Valida che foreign keys esistano nel DB (lookup sulle mappature del resolver)"""
         errors = []
+        if resolver is None:
+            resolver = ReferenceResolver(self.db, entity_type, id_store).load(rows)
         
         # Caso speciale per order_details: gestisci id_origin->id_product e Tax->id_tax
         if entity_type == 'order_details':
-            # Valida id_order
-            values_to_check = set()
+            fk_checks = {'id_order': ('orders', 'id_order', True)}
+        else:
+            fk_checks = self._get_fk_checks(entity_type)
+        
+        for fk_field, (table, _id_field, _platform_aware) in fk_checks.items():
+            missing = resolver.missing_ids(fk_field)
+            if not missing:
+                continue
             for row in rows:
-                value = row.get('id_order')
-                if value and value != '' and value != '0' and value != 0:
-                    try:
-                        values_to_check.add(int(value))
-                    except (ValueError, TypeError):
-                        pass
-            
-            if values_to_check:
-                try:
-                    placeholders = ','.join([f':val_{i}' for i in range(len(values_to_check))])
-                    params = {f'val_{i}': val for i, val in enumerate(values_to_check)}
-                    if id_store:
-                        params['id_store'] = id_store
-                        query = text(f"SELECT id_order FROM orders WHERE id_order IN ({placeholders}) AND id_store = :id_store")
-                    else:
-                        query = text(f"SELECT id_order FROM orders WHERE id_order IN ({placeholders})")
-                    result = self.db.execute(query, params)
-                    existing = {row[0] for row in result}
-                    missing = values_to_check - existing
-                    
-                    for row in rows:
-                        row_num = row.get('_row_number', 0)
-                        value = row.get('id_order')
-                        if value:
-                            try:
-                                val_int = int(value)
-                                if val_int in missing:
-                                    errors.append(ImportValidationError(
-                                        row_number=row_num,
-                                        field_name='id_order',
-                                        error_type='fk_violation',
-                                        message=f"Foreign key id_order={val_int} not found in orders",
-                                        value=val_int
-                                    ))
-                            except (ValueError, TypeError):
-                                pass
-                except Exception as e:
-                    print(f"WARNING: FK validation error for id_order: {str(e)}")
+                val_int = parse_reference(row.get(fk_field))
+                if val_int in missing:
+                    errors.append(ImportValidationError(
+                        row_number=row.get('_row_number', 0),
+                        field_name=fk_field,
+                        error_type='fk_violation',
+                        message=f"Foreign key {fk_field}={val_int} not found in {table}",
+                        value=val_int
+                    ))
+        
+        if entity_type != 'order_details':
+            return errors
+        
+        for row in rows:
+            row_num = row.get('_row_number', 0)
             
             # Valida id_origin (prodotto) -> id_product
-            product_origins_to_check = set()
-            row_store_map = {}  # Mappa row_num -> id_store per quel row
-            for row in rows:
-                row_num = row.get('_row_number', 0)
-                id_origin = row.get('id_origin')
-                row_id_store = row.get('id_store', id_store)
-                row_store_map[row_num] = row_id_store
-                if id_origin and id_origin != '' and id_origin != '0' and id_origin != 0:
-                    try:
-                        product_origins_to_check.add(int(id_origin))
-                    except (ValueError, TypeError):
-                        pass
-            
-            if product_origins_to_check:
-                try:
-                    stores_in_csv = set(row_store_map.values())
-                    
-                    for store in stores_in_csv:
-                        placeholders = ','.join([f':origin_{i}' for i in range(len(product_origins_to_check))])
-                        params = {f'origin_{i}': origin for i, origin in enumerate(product_origins_to_check)}
-                        if store:
-                            params['id_store'] = store
-                            query = text(f"SELECT id_origin FROM products WHERE id_origin IN ({placeholders}) AND id_store = :id_store")
-                        else:
-                            query = text(f"SELECT id_origin FROM products WHERE id_origin IN ({placeholders})")
-                        result = self.db.execute(query, params)
-                        existing_origins = {row[0] for row in result}
-                        missing_origins = product_origins_to_check - existing_origins
-                        
-                        for row in rows:
-                            row_num = row.get('_row_number', 0)
-                            row_id_store = row_store_map.get(row_num, id_store)
-                            if row_id_store != store:
-                                continue
-                            
-                            id_origin = row.get('id_origin')
-                            if id_origin:
-                                try:
-                                    origin_int = int(id_origin)
-                                    if origin_int in missing_origins:
-                                        errors.append(ImportValidationError(
-                                            row_number=row_num,
-                                            field_name='id_origin',
-                                            error_type='fk_violation',
-                                            message=f"Product with id_origin={origin_int} and id_store={row_id_store} not found",
-                                            value=origin_int
-                                        ))
-                                except (ValueError, TypeError):
-                                    pass
-                except Exception as e:
-                    print(f"WARNING: FK validation error for id_origin (product): {str(e)}")
+            origin_int = parse_reference(row.get('id_origin'))
+            if resolver.products_loaded and origin_int is not None:
+                row_id_store = resolver.row_store(row)
+                if resolver.product_id(origin_int, row_id_store) is None:
+                    errors.append(ImportValidationError(
+                        row_number=row_num,
+                        field_name='id_origin',
+                        error_type='fk_violation',
+                        message=f"Product with id_origin={origin_int} and id_store={row_id_store} not found",
+                        value=origin_int
+                    ))
             
             # Valida tax_percentage (percentuale) -> id_tax
-            tax_percentages_to_check = set()
-            for row in rows:
-                tax_percentage = row.get('tax_percentage')
-                if tax_percentage and tax_percentage != '':
-                    try:
-                        tax_percentages_to_check.add(float(tax_percentage))
-                    except (ValueError, TypeError):
-                        pass
-            
-            if tax_percentages_to_check:
-                try:
-                    placeholders = ','.join([f':tax_{i}' for i in range(len(tax_percentages_to_check))])
-                    params = {f'tax_{i}': tax_val for i, tax_val in enumerate(tax_percentages_to_check)}
-                    
-                    query = text(f"SELECT percentage FROM taxes WHERE percentage IN ({placeholders})")
-                    result = self.db.execute(query, params)
-                    existing_percentages = {float(row[0]) for row in result}
-                    missing_percentages = tax_percentages_to_check - existing_percentages
-                    
-                    for row in rows:
-                        row_num = row.get('_row_number', 0)
-                        tax_percentage = row.get('tax_percentage')
-                        if tax_percentage:
-                            try:
-                                tax_float = float(tax_percentage)
-                                if tax_float in missing_percentages:
-                                    errors.append(ImportValidationError(
-                                        row_number=row_num,
-                                        field_name='tax_percentage',
-                                        error_type='fk_violation',
-                                        message=f"Tax with percentage {tax_float} not found",
-                                        value=tax_float
-                                    ))
-                            except (ValueError, TypeError):
-                                pass
-                except Exception as e:
-                    print(f"WARNING: FK validation error for tax_percentage: {str(e)}")
-        else:
-            # Validazione standard per altre entità
-            fk_checks = self._get_fk_checks(entity_type)
-            
-            if not fk_checks:
-                return errors
-            
-            # Pre-fetch existing IDs for validation
-            for fk_field, (table, id_field, platform_aware) in fk_checks.items():
-                # Collect unique values da CSV
-                values_to_check = set()
-                for row in rows:
-                    value = row.get(fk_field)
-                    if value and value != '' and value != '0' and value != 0:
-                        try:
-                            values_to_check.add(int(value))
-                        except (ValueError, TypeError):
-                            pass
-                
-                if not values_to_check:
-                    continue
-                
-                # Check existence in DB
-                try:
-                    placeholders = ','.join([f':val_{i}' for i in range(len(values_to_check))])
-                    params = {f'val_{i}': val for i, val in enumerate(values_to_check)}
-                    
-                    if platform_aware:
-                        if id_store:
-                            query = text(f"SELECT {id_field} FROM {table} WHERE {id_field} IN ({placeholders}) AND id_store = :id_store")
-                            params['id_store'] = id_store
-                        else:
-                            query = text(f"SELECT {id_field} FROM {table} WHERE {id_field} IN ({placeholders})")
-                    else:
-                        query = text(f"SELECT {id_field} FROM {table} WHERE {id_field} IN ({placeholders})")
-                    
-                    result = self.db.execute(query, params)
-                    existing = {row[0] for row in result}
-                    
-                    missing = values_to_check - existing
-                    
-                    # Trova righe con FK invalidi
-                    for row in rows:
-                        row_num = row.get('_row_number', 0)
-                        value = row.get(fk_field)
-                        if value:
-                            try:
-                                val_int = int(value)
-                                if val_int in missing:
-                                    errors.append(ImportValidationError(
-                                        row_number=row_num,
-                                        field_name=fk_field,
-                                        error_type='fk_violation',
-                                        message=f"Foreign key {fk_field}={val_int} not found in {table}",
-                                        value=val_int
-                                    ))
-                            except (ValueError, TypeError):
-                                pass
-                                
-                except Exception as e:
-                    print(f"WARNING: FK validation error for {fk_field}: {str(e)}")
+            tax_float = parse_percentage(row.get('tax_percentage'))
+            if resolver.taxes_loaded and tax_float is not None and resolver.tax_id(tax_float) is None:
+                errors.append(ImportValidationError(
+                    row_number=row_num,
+                    field_name='tax_percentage',
+                    error_type='fk_violation',
+                    message=f"Tax with percentage {tax_float} not found",
+                    value=tax_float
+                ))
         
         return errors
     
@@ -368,63 +232,36 @@ class CSVValidator:
         self,
         rows: List[Dict[str, Any]],
         entity_type: str,
-        id_store: int = None
+        id_store: int = None,
+        resolver: Optional[ReferenceResolver] = None
     ) -> List[ImportValidationError]:
         """Check records già esistenti nel DB (duplicati)"""
         errors = []
+        if resolver is None:
+            resolver = ReferenceResolver(self.db, entity_type, id_store).load(rows)
         
-        table_name = self._get_table_name(entity_type)
-        if not table_name:
+        existing_origins = resolver.existing_origins
+        if not existing_origins:
             return errors
         
-        # Collect all id_origin from CSV
-        id_origins = []
+        # Mark rows with existing id_origin as errors
         for row in rows:
+            row_num = row.get('_row_number', 0)
             id_origin = row.get('id_origin')
             if id_origin:
                 try:
-                    id_origins.append(int(id_origin))
+                    origin_int = int(id_origin)
+                    if origin_int in existing_origins:
+                        errors.append(ImportValidationError(
+                            row_number=row_num,
+                            field_name='id_origin',
+                            error_type='duplicate_in_db',
+                            message=f"Record with id_origin={origin_int} already exists in database",
+                            value=origin_int
+                        ))
                 except (ValueError, TypeError):
                     pass
         
-        if not id_origins:
-            return errors
-        
-        try:
-            # Check existing by id_origin (+ id_store se applicabile)
-            placeholders = ','.join([f':id_{i}' for i in range(len(id_origins))])
-            params = {f'id_{i}': id_val for i, id_val in enumerate(id_origins)}
-            
-            if entity_type in EntityMapper.PLATFORM_AWARE_ENTITIES and id_store:
-                query = text(f"SELECT id_origin FROM {table_name} WHERE id_origin IN ({placeholders}) AND id_store = :id_store")
-                params['id_store'] = id_store
-            else:
-                query = text(f"SELECT id_origin FROM {table_name} WHERE id_origin IN ({placeholders})")
-            
-            result = self.db.execute(query, params)
-            existing_origins = {row[0] for row in result}
-            
-            # Mark rows with existing id_origin as errors
-            for row in rows:
-                row_num = row.get('_row_number', 0)
-                id_origin = row.get('id_origin')
-                if id_origin:
-                    try:
-                        origin_int = int(id_origin)
-                        if origin_int in existing_origins:
-                            errors.append(ImportValidationError(
-                                row_number=row_num,
-                                field_name='id_origin',
-                                error_type='duplicate_in_db',
-                                message=f"Record with id_origin={origin_int} already exists in database",
-                                value=origin_int
-                            ))
-                    except (ValueError, TypeError):
-                        pass
-                        
-        except Exception as e:
-            print(f"WARNING: Error checking existing records: {str(e)}")
-        
         return errors
     
     def _validate_business_rules(
@@ -484,48 +321,9 @@ class CSVValidator:
         Returns:
             Dict con configurazione FK checks
         """
-        fk_config = {
-            'products': {
-                'id_category': ('categories', 'id_category', False),
-                'id_brand': ('brands', 'id_brand', False)
-            },
-            'customers': {
-                'id_lang': ('languages', 'id_lang', False)
-            },
-            'addresses': {
-                'id_customer': ('customers', 'id_customer', False),
-                'id_country': ('countries', 'id_country', False)
-            },
-            'orders': {
-                'id_customer': ('customers', 'id_customer', False),
-                'id_address_delivery': ('addresses', 'id_address', True),
-                'id_address_invoice': ('addresses', 'id_address', True),
-                'id_payment': ('payments', 'id_payment', False),
-                'id_carrier': ('carriers', 'id_carrier', False)
-            },
-            'order_details': {
-                'id_order': ('orders', 'id_order', True),
-                'id_product': ('products', 'id_product', True),
-                'id_tax': ('taxes', 'id_tax', False)
-            }
-        }
-        
-        return fk_config.get(entity_type, {})
+        return FK_CHECKS.get(entity_type, {})
     
     def _get_table_name(self, entity_type: str) -> Optional[str]:
         """Get table name for entity type"""
-        table_mapping = {
-            'products': 'products',
-            'customers': 'customers',
-            'addresses': 'addresses',
-            'brands': 'brands',
-            'categories': 'categories',
-            'carriers': 'carriers',
-            'countries': 'countries',
-            'languages': 'languages',
-            'payments': 'payments',
-            'orders': 'orders',
-            'order_details': 'order_details'
-        }
-        return table_mapping.get(entity_type)
+        return ENTITY_TABLES.get(entity_type)
 
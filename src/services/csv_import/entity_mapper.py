@@ -10,6 +10,8 @@ from typing import Dict, Any, Type, Optional, List
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from .reference_resolver import ReferenceResolver
+
 from src.schemas.product_schema import ProductSchema
 from src.schemas.customer_schema import CustomerSchema
 from src.schemas.address_schema import AddressSchema
@@ -111,7 +113,8 @@ class EntityMapper:
         row: Dict[str, Any],
         entity_type: str,
         id_platform: int = 1,
-        db: Optional[Session] = None
+        db: Optional[Session] = None,
+        resolver: Optional[ReferenceResolver] = None
     ) -> BaseModel:
         """
         Map CSV row to Pydantic schema instance.
@@ -121,6 +124,7 @@ class EntityMapper:
             entity_type: Tipo entità
             id_platform: ID platform (viene iniettato se entity è platform-aware)
             db: Database session per lookup (necessario per order_details)
+            resolver: Mappature FK precaricate; se presente sostituisce i lookup per riga su `db`
             
         Returns:
             Istanza schema Pydantic validato
@@ -132,7 +136,7 @@ class EntityMapper:
         schema_class = EntityMapper.get_schema(entity_type)
         
         # Transform fields
-        transformed = EntityMapper.transform_fields(row, entity_type, id_platform, db)
+        transformed = EntityMapper.transform_fields(row, entity_type, id_platform, db, resolver)
         
         # Create and validate schema
         return schema_class(**transformed)
@@ -142,7 +146,8 @@ class EntityMapper:
         row: Dict[str, Any],
         entity_type: str,
         id_store: int = None,
-        db: Optional[Session] = None
+        db: Optional[Session] = None,
+        resolver: Optional[ReferenceResolver] = None
     ) -> Dict[str, Any]:
         """
         Transform and clean CSV row fields.
@@ -158,6 +163,7 @@ class EntityMapper:
             entity_type: Tipo entità
             id_platform: ID platform
             db: Database session per lookup (necessario per order_details)
+            resolver: Mappature FK precaricate; se presente sostituisce i lookup per riga su `db`
             
         Returns:
             Dizionario pulito per schema
@@ -186,7 +192,15 @@ class EntityMapper:
                 cleaned['id_store'] = id_store
             
             # Converti id_origin (prodotto) in id_product
-            if 'id_origin' in cleaned and cleaned['id_origin'] is not None and db is not None:
+            if 'id_origin' in cleaned and cleaned['id_origin'] is not None and resolver is not None:
+                product_origin = int(cleaned['id_origin'])
+                store_id = resolver.row_store(row)
+                id_product = resolver.product_id(product_origin, store_id)
+                if id_product is None:
+                    raise ValueError(f"Prodotto con id_origin={product_origin} e id_store={store_id} non trovato")
+                cleaned['id_product'] = id_product
+                cleaned.pop('id_origin', None)
+            elif 'id_origin' in cleaned and cleaned['id_origin'] is not None and db is not None:
                 from src.models.product import Product
                 from sqlalchemy.orm import load_only
                 product_origin = int(cleaned['id_origin'])
@@ -205,7 +219,14 @@ class EntityMapper:
                 cleaned.pop('id_origin', None)
             
             # Converti tax_percentage (percentuale) in id_tax
-            if 'tax_percentage' in cleaned and cleaned['tax_percentage'] is not None and db is not None:
+            if 'tax_percentage' in cleaned and cleaned['tax_percentage'] is not None and resolver is not None:
+                tax_percentage = float(cleaned['tax_percentage'])
+                id_tax = resolver.tax_id(tax_percentage)
+                if id_tax is None:
+                    raise ValueError(f"Tax con percentuale {tax_percentage} non trovata")
+                cleaned['id_tax'] = id_tax
+                cleaned.pop('tax_percentage', None)
+            elif 'tax_percentage' in cleaned and cleaned['tax_percentage'] is not None and db is not None:
                 from src.models.tax import Tax
                 from sqlalchemy.orm import load_only
                 tax_percentage = float(cleaned['tax_percentage'])
@@ -0,0 +1,249 @@
+"""
+Set-based Reference Resolver for CSV Import System.
+
+Raccoglie in un solo passaggio tutte le chiavi referenziate dalle righe CSV
+(FK configurate, id_order, id_origin prodotto, percentuali IVA, id_origin già
+presenti) e carica ogni mappatura con una query per tabella in dizionari in
+memoria. EntityMapper e CSVValidator lavorano poi sui dizionari invece di
+interrogare il DB per riga o per gruppo di riferimenti.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import column, func, select, table
+from sqlalchemy.orm import Session
+
+# Configurazione FK per entity: {field: (table, id_field, platform_aware)}
+FK_CHECKS: Dict[str, Dict[str, Tuple[str, str, bool]]] = {
+    'products': {
+        'id_category': ('categories', 'id_category', False),
+        'id_brand': ('brands', 'id_brand', False)
+    },
+    'customers': {
+        'id_lang': ('languages', 'id_lang', False)
+    },
+    'addresses': {
+        'id_customer': ('customers', 'id_customer', False),
+        'id_country': ('countries', 'id_country', False)
+    },
+    'orders': {
+        'id_customer': ('customers', 'id_customer', False),
+        'id_address_delivery': ('addresses', 'id_address', True),
+        'id_address_invoice': ('addresses', 'id_address', True),
+        'id_payment': ('payments', 'id_payment', False),
+        'id_carrier': ('carriers', 'id_carrier', False)
+    },
+    'order_details': {
+        'id_order': ('orders', 'id_order', True),
+        'id_product': ('products', 'id_product', True),
+        'id_tax': ('taxes', 'id_tax', False)
+    }
+}
+
+# Tabella per entity (controllo id_origin già presenti)
+ENTITY_TABLES: Dict[str, str] = {
+    'products': 'products',
+    'customers': 'customers',
+    'addresses': 'addresses',
+    'brands': 'brands',
+    'categories': 'categories',
+    'carriers': 'carriers',
+    'countries': 'countries',
+    'languages': 'languages',
+    'payments': 'payments',
+    'orders': 'orders',
+    'order_details': 'order_details'
+}
+
+# Entità con id_store (stesso insieme di EntityMapper.PLATFORM_AWARE_ENTITIES)
+_STORE_AWARE_ENTITIES = {'products', 'addresses', 'orders', 'customers'}
+
+# Valori per IN (...) in una singola query
+_IN_CHUNK_SIZE = 5000
+
+
+def parse_reference(value: Any) -> Optional[int]:
+    """Chiave intera da valore CSV; None per vuoto, 0 o non numerico (come la validazione FK)."""
+    if value is None or value == '' or value == '0' or value == 0:
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_percentage(value: Any) -> Optional[float]:
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _chunks(values: Iterable[Any]) -> Iterable[List[Any]]:
+    values = list(values)
+    for i in range(0, len(values), _IN_CHUNK_SIZE):
+        yield values[i:i + _IN_CHUNK_SIZE]
+
+
+class ReferenceResolver:
+    """
+    Mappature FK di un insieme di righe CSV, caricate con una query per tabella.
+
+    Uso: ``ReferenceResolver(db, entity_type, id_store).load(rows)``, poi lookup in
+    memoria. Un campo la cui query fallisce non viene controllato (stesso
+    comportamento tollerante della validazione FK storica).
+    """
+
+    def __init__(self, db: Session, entity_type: str, id_store: int = None):
+        self.db = db
+        self.entity_type = entity_type
+        self.id_store = id_store
+        # {fk_field: id esistenti}; campo assente = non controllabile
+        self.existing_ids: Dict[str, Set[int]] = {}
+        self.referenced_ids: Dict[str, Set[int]] = {}
+        # order_details: (id_origin, id_store) -> id_product, (id_origin, None) per qualsiasi store
+        self.products: Dict[Tuple[int, Optional[int]], int] = {}
+        self.products_loaded = False
+        # order_details: percentuale -> id_tax
+        self.taxes: Dict[float, int] = {}
+        self.taxes_loaded = False
+        # id_origin già presenti nella tabella dell'entity (None = non controllabile)
+        self.existing_origins: Optional[Set[int]] = None
+
+    def row_store(self, row: Dict[str, Any]) -> Optional[int]:
+        """Store della riga: colonna id_store del CSV se valorizzata, altrimenti quello dell'import."""
+        value = row.get('id_store')
+        if value is None or value == '':
+            return self.id_store
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return self.id_store
+
+    def load(self, rows: List[Dict[str, Any]]) -> "ReferenceResolver":
+        if self.entity_type == 'order_details':
+            self._load_ids(rows, 'id_order', 'orders', 'id_order', platform_aware=True)
+            self._load_products(rows)
+            self._load_taxes(rows)
+        else:
+            for fk_field, (table_name, id_field, platform_aware) in FK_CHECKS.get(self.entity_type, {}).items():
+                self._load_ids(rows, fk_field, table_name, id_field, platform_aware)
+        self._load_existing_origins(rows)
+        return self
+
+    # ------------------------------------------------------------------ lookup
+
+    def product_id(self, id_origin: int, id_store: Optional[int]) -> Optional[int]:
+        return self.products.get((id_origin, id_store))
+
+    def tax_id(self, percentage: float) -> Optional[int]:
+        return self.taxes.get(percentage)
+
+    def missing_ids(self, fk_field: str) -> Set[int]:
+        """Valori referenziati per `fk_field` non presenti nel DB."""
+        if fk_field not in self.existing_ids:
+            return set()
+        return self.referenced_ids.get(fk_field, set()) - self.existing_ids[fk_field]
+
+    # ----------------------------------------------------------------- loading
+
+    def _load_ids(
+        self,
+        rows: List[Dict[str, Any]],
+        fk_field: str,
+        table_name: str,
+        id_field: str,
+        platform_aware: bool
+    ) -> None:
+        values = {v for v in (parse_reference(row.get(fk_field)) for row in rows) if v is not None}
+        self.referenced_ids[fk_field] = values
+        if not values:
+            return
+        id_column = column(id_field)
+        try:
+            existing: Set[int] = set()
+            for chunk in _chunks(values):
+                query = select(id_column).select_from(table(table_name)).where(id_column.in_(chunk))
+                if platform_aware and self.id_store:
+                    query = query.where(column('id_store') == self.id_store)
+                existing.update(row[0] for row in self.db.execute(query))
+            self.existing_ids[fk_field] = existing
+        except Exception as e:
+            print(f"WARNING: FK validation error for {fk_field}: {str(e)}")
+
+    def _load_products(self, rows: List[Dict[str, Any]]) -> None:
+        from src.models.product import Product
+
+        origins = set()
+        stores = set()
+        for row in rows:
+            origin = parse_reference(row.get('id_origin'))
+            if origin is not None:
+                origins.add(origin)
+                stores.add(self.row_store(row))
+        self.products_loaded = True
+        if not origins:
+            return
+        try:
+            for chunk in _chunks(origins):
+                query = select(Product.id_product, Product.id_origin, Product.id_store).where(
+                    Product.id_origin.in_(chunk)
+                )
+                if None not in stores:
+                    query = query.where(Product.id_store.in_(stores))
+                for id_product, id_origin, id_store in self.db.execute(query):
+                    # Più prodotti con stessa chiave: id_product minore (deterministico)
+                    for key in ((id_origin, id_store), (id_origin, None)):
+                        current = self.products.get(key)
+                        if current is None or id_product < current:
+                            self.products[key] = id_product
+        except Exception as e:
+            self.products_loaded = False
+            print(f"WARNING: FK validation error for id_origin (product): {str(e)}")
+
+    def _load_taxes(self, rows: List[Dict[str, Any]]) -> None:
+        from src.models.tax import Tax
+
+        percentages = {p for p in (parse_percentage(row.get('tax_percentage')) for row in rows) if p is not None}
+        self.taxes_loaded = True
+        if not percentages:
+            return
+        try:
+            query = (
+                select(Tax.percentage, func.min(Tax.id_tax))
+                .where(Tax.percentage.in_(percentages))
+                .group_by(Tax.percentage)
+            )
+            self.taxes = {float(percentage): id_tax for percentage, id_tax in self.db.execute(query)}
+        except Exception as e:
+            self.taxes_loaded = False
+            print(f"WARNING: FK validation error for tax_percentage: {str(e)}")
+
+    def _load_existing_origins(self, rows: List[Dict[str, Any]]) -> None:
+        table_name = ENTITY_TABLES.get(self.entity_type)
+        if not table_name:
+            return
+        origins = set()
+        for row in rows:
+            try:
+                if row.get('id_origin'):
+                    origins.add(int(row['id_origin']))
+            except (ValueError, TypeError):
+                pass
+        if not origins:
+            self.existing_origins = set()
+            return
+        origin_column = column('id_origin')
+        try:
+            existing: Set[int] = set()
+            for chunk in _chunks(origins):
+                query = select(origin_column).select_from(table(table_name)).where(origin_column.in_(chunk))
+                if self.entity_type in _STORE_AWARE_ENTITIES and self.id_store:
+                    query = query.where(column('id_store') == self.id_store)
+                existing.update(row[0] for row in self.db.execute(query))
+            self.existing_origins = existing
+        except Exception as e:
+            print(f"WARNING: Error checking existing records: {str(e)}")
@@ -0,0 +1,156 @@
+"""
+Download a intervalli di ID con richieste parallele e dimensione pagina adattiva.
+
+Invece di `limit=offset,N` (con offset alti PrestaShop scorre tutte le righe
+precedenti) ogni pagina è un intervallo `filter[id]=[a,b]`, che il webservice
+risolve sull'indice primario. Più intervalli sono in volo contemporaneamente e
+l'ampiezza dell'intervallo segue i tempi di risposta osservati:
+
+- risposta sotto metà del tempo obiettivo: intervallo x1.5 (fino al massimo);
+- risposta oltre il tempo obiettivo: intervallo x0.7;
+- errore: intervallo dimezzato e una richiesta in volo in meno (ripristinata a
+  ogni successo). Un timeout o una risposta 5xx (intervallo troppo pesante per
+  il webservice) riprova l'intervallo in due metà; gli altri errori (connessione,
+  4xx) riprovano lo stesso intervallo con backoff;
+- troppi errori consecutivi (webservice non raggiungibile): download interrotto
+  con IdRangeFetchAborted invece di riprovare ogni intervallo.
+
+Le pagine vengono restituite nell'ordine degli ID, così il chiamante può
+registrare l'ultimo ID elaborato come checkpoint.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+FetchRange = Callable[[int, int], Awaitable[List[Dict[str, Any]]]]
+
+
+class IdRangeFetchAborted(Exception):
+    """Download interrotto dopo troppi errori consecutivi."""
+
+
+def is_overload_error(error: Exception) -> bool:
+    """Timeout o risposta 5xx: l'intervallo può essere troppo pesante e va diviso."""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    status = getattr(error, "status", None)
+    return isinstance(status, int) and status >= 500
+
+
+@dataclass
+class IdRangeFetchStats:
+    requests: int = 0
+    errors: int = 0
+    rows: int = 0
+    failed_ranges: List[Tuple[int, int]] = field(default_factory=list)
+
+
+class IdRangeFetcher:
+    """
+    Scheduler delle richieste per intervalli di ID [start_id, end_id].
+
+    Args:
+        fetch: Coroutine (primo_id, ultimo_id) -> record dell'intervallo
+        start_id / end_id: Estremi inclusi
+        concurrency: Intervalli in volo al massimo
+        initial_span / min_span / max_span: Ampiezza dell'intervallo di ID
+        target_seconds: Tempo di risposta obiettivo per richiesta
+        max_attempts: Tentativi per un intervallo non divisibile
+        max_consecutive_errors: Errori consecutivi oltre i quali il download si interrompe
+    """
+
+    def __init__(
+        self,
+        fetch: FetchRange,
+        start_id: int,
+        end_id: int,
+        *,
+        concurrency: int = 4,
+        initial_span: int = 5000,
+        min_span: int = 100,
+        max_span: int = 10000,
+        target_seconds: float = 3.0,
+        max_attempts: int = 3,
+        max_consecutive_errors: int = 10,
+    ):
+        self._fetch = fetch
+        self.start_id = start_id
+        self.end_id = end_id
+        self.concurrency = max(1, concurrency)
+        self.min_span = max(1, min_span)
+        self.max_span = max(self.min_span, max_span)
+        self.span = min(max(initial_span, self.min_span), self.max_span)
+        self.target_seconds = target_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.max_consecutive_errors = max(1, max_consecutive_errors)
+        self.consecutive_errors = 0
+        self.in_flight = self.concurrency
+        self.stats = IdRangeFetchStats()
+
+    def _observe(self, elapsed: float, ok: bool) -> None:
+        if not ok:
+            self.stats.errors += 1
+            self.consecutive_errors += 1
+            self.span = max(self.min_span, self.span // 2)
+            self.in_flight = max(1, self.in_flight - 1)
+            return
+        self.consecutive_errors = 0
+        self.in_flight = min(self.concurrency, self.in_flight + 1)
+        if elapsed < self.target_seconds / 2:
+            self.span = min(self.max_span, int(self.span * 1.5))
+        elif elapsed > self.target_seconds:
+            self.span = max(self.min_span, int(self.span * 0.7))
+
+    async def _fetch_range(self, first_id: int, last_id: int, attempt: int = 1) -> List[Dict[str, Any]]:
+        started = time.monotonic()
+        self.stats.requests += 1
+        try:
+            items = await self._fetch(first_id, last_id)
+        except Exception as e:
+            self._observe(time.monotonic() - started, ok=False)
+            if self.consecutive_errors >= self.max_consecutive_errors:
+                raise IdRangeFetchAborted(
+                    f"{self.consecutive_errors} consecutive errors, last on ID range "
+                    f"[{first_id},{last_id}]: {e}"
+                ) from e
+            if is_overload_error(e) and last_id - first_id + 1 > self.min_span:
+                # Intervallo troppo pesante per il webservice: riprova in due metà
+                middle = (first_id + last_id) // 2
+                logger.warning(f"ID range [{first_id},{last_id}] failed ({e}), splitting")
+                return (
+                    await self._fetch_range(first_id, middle)
+                    + await self._fetch_range(middle + 1, last_id)
+                )
+            if attempt < self.max_attempts:
+                await asyncio.sleep(2 ** attempt)
+                return await self._fetch_range(first_id, last_id, attempt + 1)
+            logger.error(f"ID range [{first_id},{last_id}] skipped after {attempt} attempts: {e}")
+            self.stats.failed_ranges.append((first_id, last_id))
+            return []
+        self._observe(time.monotonic() - started, ok=True)
+        self.stats.rows += len(items)
+        return items
+
+    async def pages(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Pagine non vuote in ordine di ID."""
+        next_id = self.start_id
+        pending: deque = deque()
+        try:
+            while pending or next_id <= self.end_id:
+                while len(pending) < self.in_flight and next_id <= self.end_id:
+                    last_id = min(next_id + self.span - 1, self.end_id)
+                    pending.append(asyncio.create_task(self._fetch_range(next_id, last_id)))
+                    next_id = last_id + 1
+                items = await pending.popleft()
+                if items:
+                    yield items
+        finally:
+            for task in pending:
+                task.cancel()
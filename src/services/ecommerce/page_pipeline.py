@@ -0,0 +1,97 @@
+"""
+Pipeline produttore/consumatore per la sincronizzazione a pagine.
+
+Il produttore scarica le pagine dal webservice e le accoda in una coda limitata;
+il consumatore trasforma e inserisce una pagina alla volta mentre la successiva è
+già in download. In memoria restano al più `max_pending` pagine in coda più
+quella in lavorazione, indipendentemente dal numero totale di record.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+@dataclass
+class PagePipelineStats:
+    """Esito della pipeline: pagine e record letti, record elaborati dal consumatore."""
+    pages: int = 0
+    fetched: int = 0
+    processed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return round(self.fetched / self.elapsed, 1) if self.elapsed else 0.0
+
+
+async def run_page_pipeline(
+    pages: AsyncIterator[List[Dict[str, Any]]],
+    consume: Callable[[List[Dict[str, Any]]], Awaitable[int]],
+    max_pending: int = 2,
+) -> PagePipelineStats:
+    """
+    Esegue `consume` su ogni pagina prodotta da `pages`, con download in anticipo.
+
+    Args:
+        pages: Generatore asincrono di pagine (liste di record)
+        consume: Coroutine che elabora una pagina e restituisce i record elaborati
+        max_pending: Pagine scaricate in attesa di elaborazione (backpressure)
+
+    Returns:
+        PagePipelineStats
+
+    Un errore del produttore o del consumatore interrompe la pipeline e viene
+    rilanciato; le pagine già elaborate restano confermate.
+    """
+    stats = PagePipelineStats()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_pending))
+    started = time.monotonic()
+
+    async def produce() -> None:
+        try:
+            async for page in pages:
+                if page:
+                    await queue.put(page)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            stats.pages += 1
+            stats.fetched += len(item)
+            stats.processed += await consume(item) or 0
+            # La pagina elaborata non è più referenziata prima di attendere la successiva
+            del item
+    finally:
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+        aclose = getattr(pages, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        stats.elapsed = time.monotonic() - started
+
+    logger.info(
+        "Page pipeline: %s pages, %s rows fetched, %s processed (%s rows/s)",
+        stats.pages, stats.fetched, stats.processed, stats.rows_per_second,
+    )
+    return stats
@@ -9,17 +9,22 @@ import logging
 import os
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
 # Third-party imports
 import aiohttp
-from sqlalchemy import text
+from sqlalchemy import bindparam, insert, select, text, update
 from sqlalchemy.orm import Session
 
 # Local imports - Core
+from src.core.corrispettivi_rollup_sync import queue_corrispettivi_rollup_refresh
+from src.core.order_search_sync import queue_order_search_refresh, queue_order_search_related_refresh
+from src.core.settings import get_bulk_write_settings, get_image_ingest_settings, get_prestashop_sync_settings
 
 # Local imports - Models
+from src.models.address import Address
 from src.models.order import Order
+from src.models.order_detail import OrderDetail
 
 # Local imports - Repositories
 from src.repository.address_repository import AddressRepository
@@ -29,6 +34,7 @@ from src.repository.customer_repository import CustomerRepository
 from src.repository.payment_repository import PaymentRepository
 from src.repository.shipping_repository import ShippingRepository
 from src.repository.store_repository import StoreRepository
+from src.repository.sync_watermark_repository import SyncWatermarkRepository
 from src.repository.tax_repository import TaxRepository
 from src.repository.product_repository import ProductRepository
 from src.models.product import Product
@@ -48,10 +54,10 @@ from src.services.core.tool import (
     get_tax_percentage_by_country,
     safe_float,
     safe_int,
-    sql_value,
 )
 from src.services.external.province_service import province_service
 from src.services.media.image_cache_service import get_image_cache_service
+from src.services.media.image_ingest import ImageIngestPipeline
 from src.services.media.image_service import ImageService
 from src.services.vies.vies_status_resolver import (
     extract_prestashop_vies_valid,
@@ -60,6 +66,8 @@ from src.services.vies.vies_status_resolver import (
 
 # Local imports - Relative
 from .base_ecommerce_service import BaseEcommerceService
+from .id_range_fetcher import IdRangeFetcher
+from .page_pipeline import run_page_pipeline
 
 logger = logging.getLogger(__name__)
 
@@ -96,11 +104,15 @@ class PrestaShopService(BaseEcommerceService):
         self._semaphore = None  # Will be initialized in async context
         self.default_language_id = default_language_id
         self.new_elements = new_elements
+        self._watermark_repo = SyncWatermarkRepository(db)
+        self._remote_last_updates: Dict[str, Optional[datetime]] = {}  # date_upd remoto massimo a inizio lettura
+        self._failed_ranges: Dict[str, List[tuple]] = {}  # intervalli di ID non scaricati per risorsa
+        self.job_tracker = None  # SyncJobTracker opzionale: avanzamento e checkpoint su sync_jobs
         self.image_service = ImageService()
         self.image_cache_service = None  # Inizializzato lazy
         self._product_data_for_images = []  # Store product data for image synchronization
         self._original_products_data = []  # Store original PrestaShop data for images
-        self.max_concurrent_images = 50  # Massima concorrenza per download immagini
+        self.max_concurrent_images = get_image_ingest_settings().image_download_concurrency  # Massima concorrenza per download immagini
         
     async def _get_image_cache_service(self):
         """Inizializza lazy il servizio di cache delle immagini"""
@@ -280,6 +292,78 @@ class PrestaShopService(BaseEcommerceService):
         date_range = f"[{start_date},{end_date}]"
         return date_range
     
+    def _get_date_upd_filter(self, since: datetime) -> str:
+        """Filtro filter[date_upd] [since,domani] (richiede date=1); estremi inclusi"""
+        until = datetime.now() + timedelta(days=1)
+        return f"[{since.strftime('%Y-%m-%d %H:%M:%S')},{until.strftime('%Y-%m-%d %H:%M:%S')}]"
+    
+    async def _get_remote_last_update(self, resource: str, params: Dict[str, Any]) -> Optional[datetime]:
+        """date_upd più recente della risorsa con i filtri dati (una richiesta); None se vuota o non leggibile"""
+        last_params = {**params, 'display': '[id,date_upd]', 'sort': '[date_upd_DESC]', 'limit': '1'}
+        response = await self._make_request_with_rate_limit(f'/api/{resource}', last_params)
+        items = self._extract_items_from_response(response, resource)
+        if not items:
+            return None
+        try:
+            return datetime.strptime(items[0].get('date_upd', ''), '%Y-%m-%d %H:%M:%S')
+        except (ValueError, TypeError):
+            return None
+    
+    async def _prepare_delta_fetch(
+        self, resource: str, params: Dict[str, Any], date_add_filter: bool = False
+    ) -> Tuple[Dict[str, Any], Optional[int]]:
+        """
+        Parametri di lettura di `resource` per questa sync e `last_id` per _iter_resource_pages.
+        
+        - incrementale con watermark: filter[date_upd] dal watermark, cioè record nuovi
+          e modificati (applicati in upsert), senza filtro per ID;
+        - incrementale senza watermark: ID successivi al massimo id_origin dello store;
+        - completa: tutti i record (con `date_add_filter` solo quelli dell'ultimo anno).
+        
+        Annota il date_upd remoto più recente prima del download: diventa il watermark
+        a sync riuscita (_commit_delta), così le modifiche arrivate durante il download
+        rientrano nella sync successiva.
+        
+        Con un job ripreso (job_tracker) la lettura riparte dopo l'ultimo ID elaborato
+        e il watermark resta quello annotato all'avvio dell'entità.
+        """
+        params = dict(params)
+        last_id = None
+        watermark = self._watermark_repo.get_watermark(self.store_id, resource) if self.new_elements else None
+        if watermark is not None:
+            params['date'] = 1
+            params['filter[date_upd]'] = self._get_date_upd_filter(watermark)
+            print(f"DEBUG: {resource} delta since {watermark}")
+        else:
+            if self.new_elements:
+                last_id = self.db.execute(
+                    text(f"SELECT MAX(id_origin) FROM {resource} WHERE id_origin IS NOT NULL AND id_store = :id_store"),
+                    {"id_store": self.store_id}
+                ).scalar() or 0
+            if date_add_filter:
+                params['date'] = 1
+                params['filter[date_add]'] = self._get_date_range_filter()
+        checkpoint_id, remote_mark = self.job_tracker.resume_checkpoint() if self.job_tracker else (None, None)
+        if checkpoint_id is not None:
+            last_id = max(last_id or 0, checkpoint_id)
+            print(f"DEBUG: {resource} resumed after id {checkpoint_id}")
+        if remote_mark is None:
+            remote_mark = await self._get_remote_last_update(resource, params)
+            if self.job_tracker:
+                self.job_tracker.set_remote_mark(remote_mark)
+        self._remote_last_updates[resource] = remote_mark
+        return params, last_id
+    
+    def _commit_delta(self, resource: str) -> None:
+        """Avanza il watermark di `resource` dopo una sync riuscita (non se mancano intervalli di ID)"""
+        last_update = self._remote_last_updates.pop(resource, None)
+        failed_ranges = self._failed_ranges.pop(resource, None)
+        if failed_ranges:
+            logger.warning(f"PrestaShop {resource}: watermark not advanced, {len(failed_ranges)} ID ranges not fetched")
+            return
+        if last_update is not None:
+            self._watermark_repo.advance(self.store_id, resource, last_update)
+    
     def _get_auth_headers(self) -> Dict[str, str]:
         """Get PrestaShop authentication headers"""
         # PrestaShop uses Basic Auth with API key
@@ -307,8 +391,10 @@ class PrestaShopService(BaseEcommerceService):
             self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
         
         async with self._semaphore:
-            # Add small delay to be gentle with the server
-            await asyncio.sleep(0.1)
+            # Pausa opzionale per webservice lenti (il carico è regolato dalle pagine in volo)
+            delay = get_prestashop_sync_settings().prestashop_request_delay
+            if delay > 0:
+                await asyncio.sleep(delay)
             try:
                 return await self._make_request(endpoint, params)
             except Exception as e:
@@ -437,10 +523,18 @@ class PrestaShopService(BaseEcommerceService):
         }
         
         for func_name, func in functions:
+            if self.job_tracker and self.job_tracker.is_completed(func_name):
+                # Job ripreso: entità già completata prima dell'interruzione
+                print(f"SKIPPING {func_name}: already completed in sync job {self.job_tracker.id_sync_job}")
+                phase_results['functions'].append({'function': func_name, 'status': 'SKIPPED', 'processed': 0})
+                continue
+            
             print(f"\n{'='*50}")
             print(f"EXECUTING {func_name}")
             print(f"{'='*50}")
             func_start_time = datetime.now()
+            if self.job_tracker:
+                self.job_tracker.start_entity(phase_name, func_name)
             
             try:
                 if asyncio.iscoroutinefunction(func):
@@ -469,6 +563,8 @@ class PrestaShopService(BaseEcommerceService):
                 })
                 
                 phase_results['total_processed'] += processed_count
+                if self.job_tracker:
+                    self.job_tracker.finish_entity(func_name, processed_count)
                 
                 print(f"✅ {func_name}: {processed_count} records processed in {func_duration:.2f}s")
                 
@@ -488,6 +584,8 @@ class PrestaShopService(BaseEcommerceService):
                 
                 phase_results['total_errors'] += 1
                 phase_results['status'] = 'ERROR'
+                if self.job_tracker:
+                    self.job_tracker.record_error(f"{func_name}: {e}")
                 
                 print(f"❌ {func_name}: FAILED - {str(e)}")
                 print(f"STOPPING {phase_name} due to error in {func_name}")
@@ -645,31 +743,15 @@ class PrestaShopService(BaseEcommerceService):
                     continue
                 
                 brand_data = {
-                    'id_origin': manufacturer.get('id', ''),
-                    'name': brand_name,
-                    'id_platform': self.platform_id,
-                    'id_store': self.store_id
+                    'id_origin': safe_int(manufacturer.get('id', 0)),
+                    'name': brand_name
                 }
                 brand_data_list.append(brand_data)
             
-            # Process all upserts concurrently
+            # Upsert bulk per (id_store, id_origin)
             if brand_data_list:
-                results = await asyncio.gather(*[self._upsert_brand(data) for data in brand_data_list], return_exceptions=True)
-                
-                # Filter out exceptions and log them
-                successful_results = []
-                errors = []
-                for i, result in enumerate(results):
-                    if isinstance(result, Exception):
-                        errors.append(f"Brand {brand_data_list[i].get('id_origin', 'unknown')}: {str(result)}")
-                    else:
-                        successful_results.append(result)
-                
-                if errors:
-                    self._log_sync_result("Brands (Italian)", len(successful_results), errors)
-                else:
-                    self._log_sync_result("Brands (Italian)", len(successful_results))
-                
+                successful_results = self._upsert_brands(brand_data_list)
+                self._log_sync_result("Brands (Italian)", len(successful_results))
                 return successful_results
             else:
                 print("DEBUG: No brands to process")
@@ -714,29 +796,15 @@ class PrestaShopService(BaseEcommerceService):
                     continue
                 
                 category_data = {
-                    'id_origin': category.get('id', ''),
-                    'name': category_name,
-                    'id_store': self.store_id
+                    'id_origin': safe_int(category.get('id', 0)),
+                    'name': category_name
                 }
                 category_data_list.append(category_data)
             
-            # Process all upserts concurrently
+            # Upsert bulk per (id_store, id_origin)
             if category_data_list:
-                results = await asyncio.gather(*[self._upsert_category(data) for data in category_data_list], return_exceptions=True)
-                
-                # Filter out exceptions and log them
-                successful_results = []
-                errors = []
-                for i, result in enumerate(results):
-                    if isinstance(result, Exception):
-                        errors.append(f"Category {category_data_list[i].get('id_origin', 'unknown')}: {str(result)}")
-                    else:
-                        successful_results.append(result)
-                
-                if errors:
-                    self._log_sync_result("Categories (Italian)", len(successful_results), errors)
-                else:
-                    self._log_sync_result("Categories (Italian)", len(successful_results))
+                successful_results = self._upsert_categories(category_data_list)
+                self._log_sync_result("Categories (Italian)", len(successful_results))
                 
                 print(f"DEBUG: Processed {len(successful_results)} Italian categories (API filtered)")
                 return successful_results
@@ -767,55 +835,24 @@ class PrestaShopService(BaseEcommerceService):
             response = await self._make_request_with_rate_limit('/api/carriers', params)
             carriers = self._extract_items_from_response(response, 'carriers')
             
-            # Check for existing carriers to avoid duplicates
-            existing_carriers = self.db.execute(text("SELECT id_origin FROM carriers WHERE id_origin IS NOT NULL")).fetchall()
-            existing_carrier_origins = {str(row[0]) for row in existing_carriers}
-            
             print(f"DEBUG: Found {len(carriers)} total carriers from API")
-            print(f"DEBUG: Found {len(existing_carrier_origins)} existing carriers in database")
-            
-            # Filter out carriers that already exist
-            new_carriers = []
-            for carrier in carriers:
-                carrier_id = str(carrier.get('id', ''))
-                if carrier_id not in existing_carrier_origins:
-                    new_carriers.append(carrier)
-                else:
-                    print(f"DEBUG: Carrier {carrier_id} already exists, skipping...")
-            
-            print(f"DEBUG: Found {len(new_carriers)} new carriers to process out of {len(carriers)} total carriers")
             
             # Prepare all carrier data
             carrier_data_list = []
-            for carrier in new_carriers:
+            for carrier in carriers:
                 carrier_data = {
-                    'id_origin': carrier.get('id', ''),
-                    'name': carrier.get('name', ''),
-                    'id_store': self.store_id
+                    'id_origin': safe_int(carrier.get('id', 0)),
+                    'name': self._carrier_name(carrier.get('name', ''))
                 }
                 carrier_data_list.append(carrier_data)
             
-            # Process all upserts concurrently
+            # Upsert bulk per (id_store, id_origin): i corrieri esistenti aggiornano il nome
             if carrier_data_list:
-                results = await asyncio.gather(*[self._upsert_carrier(data) for data in carrier_data_list], return_exceptions=True)
-                
-                # Filter out exceptions and log them
-                successful_results = []
-                errors = []
-                for i, result in enumerate(results):
-                    if isinstance(result, Exception):
-                        errors.append(f"Carrier {carrier_data_list[i].get('id_origin', 'unknown')}: {str(result)}")
-                    else:
-                        successful_results.append(result)
-                
-                if errors:
-                    self._log_sync_result("Carriers", len(successful_results), errors)
-                else:
-                    self._log_sync_result("Carriers", len(successful_results))
-                
+                successful_results = self._upsert_carriers(carrier_data_list)
+                self._log_sync_result("Carriers", len(successful_results))
                 return successful_results
             else:
-                print("DEBUG: No new carriers to process")
+                print("DEBUG: No carriers to process")
                 self._log_sync_result("Carriers", 0)
                 return []
             
@@ -828,54 +865,15 @@ class PrestaShopService(BaseEcommerceService):
         """Synchronize products from ps_product (Italian language only)"""
         print("🚀 STARTING SYNC_PRODUCTS")
         try:
-            # Try with pagination to avoid server disconnection
             all_products = []
-            limit = 1000  # Batch size
-            offset = 0
             params = {
-                'display': '[id,id_manufacturer,id_category_default,name,reference,ean13,weight,depth,height,width,id_default_image,wholesale_price,price,minimal_quantity]',  # Only necessary fields
+                'display': '[id,id_manufacturer,id_category_default,name,reference,ean13,weight,depth,height,width,id_default_image,wholesale_price,price,minimal_quantity,date_upd]',  # Only necessary fields
             }
-            last_id = None
-            if self.new_elements:
-                last_id = self.db.execute(text("SELECT MAX(id_origin) FROM products WHERE id_origin IS NOT NULL")).scalar()
-                last_id = last_id if last_id else 0
-
-            
-            while True:
-                try:
-                    # Include only necessary fields to reduce response size
-                    # Use PrestaShop format: limit=[offset,]limit
-
-                    if last_id:
-                        params['filter[id]'] = f'>[{str(last_id)}]'
+            params, last_id = await self._prepare_delta_fetch('products', params)
 
-                    params['limit'] = f'{offset},{limit}'
-                    
-                    response = await self._make_request_with_rate_limit('/api/products', params)
-
-                    products = self._extract_items_from_response(response, 'products')
-                    if not products:
-                        break
-                        
-                    all_products.extend(products)
-                    print(f"DEBUG: Total products so far: {len(all_products)}")
-                    offset += limit
-                    
-                    # Small delay to avoid overwhelming the server
-                    await asyncio.sleep(0.1)
-                    
-                except Exception as e:
-                    print(f"DEBUG: Exception in products loop: {str(e)}")
-                    error_msg = str(e).lower()
-                    if any(keyword in error_msg for keyword in ['server disconnected', '500', 'timeout', 'connection reset']):
-                        print(f"DEBUG: Server error detected, reducing batch size from {limit} to {max(10, limit // 2)}")
-                        limit = max(10, limit // 2)  # Reduce batch size
-                        await asyncio.sleep(2)  # Wait before retry
-                        continue
-                    else:
-                        print(f"DEBUG: Non-server error, raising exception")
-                        raise
-                
+            async for products in self._iter_resource_pages('products', params, last_id):
+                all_products.extend(products)
+                print(f"DEBUG: Total products so far: {len(all_products)}")
                 
             print(f"DEBUG: Finished products loop. Total products fetched: {len(all_products)}")
             # Deduplicate products by ID and filter for Italian language
@@ -1004,11 +1002,19 @@ class PrestaShopService(BaseEcommerceService):
                 
                 product_repo = ProductRepository(self.db)
                 
-                # valid_product_data already contains ProductSchema objects
-                # Bulk insert
-                print(f"DEBUG: Attempting to insert {len(valid_product_data)} products")
-                total_inserted = product_repo.bulk_create(valid_product_data, batch_size=10000)
-                print(f"DEBUG: Successfully inserted {total_inserted} products")
+                # Upsert: nuovi prodotti inseriti, esistenti aggiornati (img_url e quantità restano locali)
+                print(f"DEBUG: Attempting to upsert {len(valid_product_data)} products")
+                result = product_repo.upsert_by_origin(
+                    [ProductRepository.to_row(data) for data in valid_product_data],
+                    self.store_id,
+                    self._PRODUCT_UPDATE_FIELDS,
+                    batch_size=10000,
+                )
+                if result.updated_ids:
+                    queue_order_search_related_refresh(self.db, "products", result.updated_ids)
+                    self.db.commit()
+                total_inserted = result.inserted + result.updated
+                print(f"DEBUG: Products inserted: {result.inserted}, updated: {result.updated}")
                 
                 # Aggiorna img_url per i prodotti inseriti che hanno immagini
                 self._update_product_img_urls(valid_product_data, products)
@@ -1025,17 +1031,26 @@ class PrestaShopService(BaseEcommerceService):
                 all_errors = errors + upsert_errors
                 self._log_sync_result("Products (Italian)", total_inserted, all_errors if all_errors else None)
                 
-                print(f"DEBUG: Bulk inserted {total_inserted} Italian products")
+                print(f"DEBUG: Bulk upserted {total_inserted} Italian products")
+                self._commit_delta('products')
                 return successful_results
             else:
                 print("DEBUG: No products to process")
                 self._log_sync_result("Products (Italian)", 0, errors)
+                if not errors:
+                    self._commit_delta('products')
                 return []
                 
         except Exception as e:
             self._log_sync_result("Products (Italian)", 0, [str(e)])
             raise
     
+    # Campi aggiornati sui prodotti già presenti (img_url e quantity sono gestiti da sync dedicate)
+    _PRODUCT_UPDATE_FIELDS = (
+        'id_category', 'id_brand', 'name', 'sku', 'reference', 'type',
+        'weight', 'depth', 'height', 'width', 'price', 'purchase_price', 'minimal_quantity',
+    )
+    
     async def sync_quantity(self) -> Dict[str, Any]:
         """
         Sincronizza le quantità dei prodotti da PrestaShop stock_availables.
@@ -1461,13 +1476,24 @@ class PrestaShopService(BaseEcommerceService):
         full_path = os.path.join(os.getcwd(), local_image_path)
         return os.path.exists(full_path)
     
-    async def _download_single_product_image(self, product_data, product_info, id_image_default):
+    def _remote_product_image_url(self, product_data, id_image_default) -> str:
+        """URL PrestaShop dell'immagine di copertina di un prodotto."""
+        link_rewrite = self.image_service._generate_link_rewrite(product_data.name)
+        return self.image_service.generate_prestashop_image_url(
+            self.base_url,
+            id_image_default,
+            link_rewrite
+        )
+    
+    async def _download_single_product_image(self, pipeline, product_data, product_info, remote_image_url):
         """
         Download a single product image asynchronously.
         
         Args:
+            pipeline: ImageIngestPipeline aperta (sessione HTTP e manifest condivisi)
             product_data: ProductSchema with product data
             product_info: Tuple of (id_product, current_img_url) from database
+            remote_image_url: URL PrestaShop dell'immagine
             
         Returns:
             Dict with update data if successful, None if failed or skipped
@@ -1477,56 +1503,30 @@ class PrestaShopService(BaseEcommerceService):
             self._image_semaphore = asyncio.Semaphore(self.max_concurrent_images)
         
         async with self._image_semaphore:
+            id_product, current_img_url = product_info
             try:
-                id_product, current_img_url = product_info
+                result = await pipeline.ingest(remote_image_url, id_product, self.platform_id)
                 
-                # Genera il percorso locale dell'immagine usando l'ID locale
-                local_image_path = self.image_service.generate_local_image_path(
-                    self.platform_id,
-                    id_product
-                )
+                if result.status == "downloaded":
+                    return {"img_url": result.img_url, "id_product": id_product, "downloaded": True}
+                if result.img_url:
+                    # Immagine invariata (manifest o 304) o download fallito con file locale
+                    # già presente (mantenuto): aggiorna img_url solo se diverso
+                    if current_img_url != result.img_url:
+                        return {"img_url": result.img_url, "id_product": id_product}
+                    return {"img_url": result.img_url, "id_product": id_product, "skipped": True}
                 
-                # Genera il percorso relativo dell'immagine
-                image_relative_path = self.image_service.generate_local_image_path(
-                    self.platform_id,
-                    id_product
-                )
-                
-                # Controlla se l'immagine esiste già
-
-                full_path = os.path.join(os.getcwd(), local_image_path)
-                if os.path.exists(full_path):
-                    print(f"DEBUG: Image already exists for product {id_product}, skipping download")
-                    # Aggiungi alla lista per batch update se necessario
-                    if current_img_url != image_relative_path:
-                        return {"img_url": image_relative_path, "id_product": id_product}
-                    return {"img_url": image_relative_path, "id_product": id_product, "skipped": True}
-                
-                # Ricostruisci l'URL remoto per il download
-                name = product_data.name
-                link_rewrite = self.image_service._generate_link_rewrite(name)
-                remote_image_url = self.image_service.generate_prestashop_image_url(
-                    self.base_url, 
-                    id_image_default, 
-                    link_rewrite
-                )
-                
-                # Scarica l'immagine usando l'ID locale
-                saved_path = self.image_service.download_and_save_image(
-                    remote_image_url,
-                    id_product,
-                    self.platform_id
-                )
-                
-                if saved_path:
-                    return {"img_url": image_relative_path, "id_product": id_product, "downloaded": True}
-                else:
-                    print(f"DEBUG: Failed to download image for product {id_product}, using fallback image")
-                    # Usa l'immagine di fallback quando il download fallisce
-                    fallback_img_url = self.image_service.FALLBACK_IMG_URL
-                    return {"img_url": fallback_img_url, "id_product": id_product, "downloaded": False, "fallback": True}
+                print(f"DEBUG: Failed to download image for product {id_product}, using fallback image")
+                # Usa l'immagine di fallback quando il download fallisce e non c'è un file locale
+                fallback_img_url = self.image_service.FALLBACK_IMG_URL
+                return {"img_url": fallback_img_url, "id_product": id_product, "downloaded": False, "fallback": True}
                     
             except Exception as e:
+                stored_img_url = pipeline.stored_image(id_product, self.platform_id)
+                if stored_img_url:
+                    # Errore su un'immagine già presente: resta il file locale
+                    print(f"DEBUG: Error downloading image for product {product_data.id_origin}: {str(e)}, keeping local image")
+                    return {"img_url": stored_img_url, "id_product": id_product, "skipped": current_img_url == stored_img_url}
                 print(f"DEBUG: Error downloading image for product {product_data.id_origin}: {str(e)}, using fallback image")
                 # Usa l'immagine di fallback quando c'è un errore
                 fallback_img_url = self.image_service.FALLBACK_IMG_URL
@@ -1580,47 +1580,44 @@ class PrestaShopService(BaseEcommerceService):
             
             print(f"DEBUG: Found {len(products_dict)} products in database")
             
-            # Prepara le task per il download parallelo
-            download_tasks = []
+            # Prepara le task per il download parallelo. Le immagini già presenti con
+            # URL sorgente invariato (manifest) vengono saltate senza contattare PrestaShop.
+            updates_to_process = []
             skipped_existing_count = 0
-            for product_data, id_image_default in products_with_images:
-                product_info = products_dict.get(str(product_data.id_origin))
-                if product_info:
-                    id_product, current_img_url = product_info
-                    
-                    # Controlla se l'immagine esiste già prima di aggiungere il task
-                    if self.check_image_exist(id_product):
-                        skipped_existing_count += 1
-                        # Aggiorna il campo img_url nel database se necessario
-                        if current_img_url != self.image_service.generate_local_image_path(self.platform_id, id_product):
+            async with ImageIngestPipeline(self.image_service) as pipeline:
+                download_tasks = []
+                for product_data, id_image_default in products_with_images:
+                    product_info = products_dict.get(str(product_data.id_origin))
+                    if product_info:
+                        id_product, current_img_url = product_info
+                        remote_image_url = self._remote_product_image_url(product_data, id_image_default)
+                        
+                        if not pipeline.revalidate and pipeline.is_current(remote_image_url, id_product, self.platform_id):
+                            skipped_existing_count += 1
+                            # Aggiorna il campo img_url nel database se necessario
                             image_relative_path = self.image_service.generate_local_image_path(self.platform_id, id_product)
-                            product_repo._session.execute(
-                                {"img_url": image_relative_path, "id_product": id_product}
-                            )
-                        continue
-                    
-                    # Se l'immagine non esiste, aggiungi il task per il download
-                    download_tasks.append(
-                        self._download_single_product_image(product_data, product_info, id_image_default)
-                    )
+                            if current_img_url != image_relative_path:
+                                updates_to_process.append({"img_url": image_relative_path, "id_product": id_product})
+                            continue
+                        
+                        download_tasks.append(
+                            self._download_single_product_image(pipeline, product_data, product_info, remote_image_url)
+                        )
+                    else:
+                        print(f"DEBUG: Product {product_data.id_origin} not found in database")
+                
+                if skipped_existing_count > 0:
+                    print(f"DEBUG: Skipped {skipped_existing_count} products with existing images")
+                
+                # Esegui tutti i download in parallelo
+                if download_tasks:
+                    print(f"DEBUG: Starting parallel download of {len(download_tasks)} images")
+                    results = await asyncio.gather(*download_tasks, return_exceptions=True)
                 else:
-                    print(f"DEBUG: Product {product_data.id_origin} not found in database")
-            
-            # Commit eventuali aggiornamenti di prodotti con immagini già esistenti
-            if skipped_existing_count > 0:
-                product_repo._session.commit()
-                print(f"DEBUG: Skipped {skipped_existing_count} products with existing images")
-            
-            # Esegui tutti i download in parallelo
-            if download_tasks:
-                print(f"DEBUG: Starting parallel download of {len(download_tasks)} images")
-                results = await asyncio.gather(*download_tasks, return_exceptions=True)
-            else:
-                print(f"DEBUG: No images to download (all already exist)")
-                results = []
+                    print(f"DEBUG: No images to download (all already exist)")
+                    results = []
             
             # Processa i risultati
-            updates_to_process = []
             downloaded_count = 0
             failed_count = 0
             skipped_count = 0
@@ -1765,36 +1762,12 @@ class PrestaShopService(BaseEcommerceService):
         print("🚀 STARTING SYNC_CUSTOMERS")
         try:
             all_customers = []
-            limit = 5000
-            offset = 0
+            params = {'display': '[id,firstname,lastname,email,date_upd]'}
+            params, last_id = await self._prepare_delta_fetch('customers', params)
             
-            while True:
-                params = {
-                    'display': '[id,firstname,lastname,email]',
-                    'limit': f'{offset},{limit}'
-                }
-
-                if self.new_elements:
-                    last_id = self.db.execute(text("SELECT MAX(id_origin) FROM customers WHERE id_origin IS NOT NULL")).scalar()
-                    last_id = last_id if last_id else 0
-                    params['filter[id]'] = f'>[{last_id}]'
-                
-
-                response = await self._make_request_with_rate_limit('/api/customers', params)
-                customers = self._extract_items_from_response(response, 'customers')
+            async for customers in self._iter_resource_pages('customers', params, last_id):
                 print(f"Found {len(customers)} customers")
-                if not customers:
-                    return []
-                    
                 all_customers.extend(customers)
-                
-                # If we got less than the limit, we've reached the end
-                if len(customers) < limit:
-                    break
-                    
-                offset += limit
-                # Small delay between batches
-                await asyncio.sleep(0.1)
             
             customers = all_customers
             
@@ -1844,14 +1817,25 @@ class PrestaShopService(BaseEcommerceService):
                     )
                     customer_schemas.append(customer_schema)
                 
-                # Bulk insert
-                total_inserted = customer_repo.bulk_create(customer_schemas, batch_size=10000)
+                # Upsert: clienti modificati su PrestaShop aggiornano nome ed email
+                result = customer_repo.upsert_by_origin(
+                    [schema.model_dump() for schema in customer_schemas],
+                    self.store_id,
+                    ('firstname', 'lastname', 'email'),
+                    batch_size=10000,
+                )
+                if result.updated_ids:
+                    queue_order_search_related_refresh(self.db, "customers", result.updated_ids)
+                    self.db.commit()
+                total_inserted = result.inserted + result.updated
                 successful_results = [{"status": "success", "count": total_inserted}]
                 
                 self._log_sync_result("Customers", total_inserted)
+                self._commit_delta('customers')
                 return successful_results
             else:
                 self._log_sync_result("Customers", 0)
+                self._commit_delta('customers')
                 return []
             
         except Exception as e:
@@ -1999,8 +1983,19 @@ class PrestaShopService(BaseEcommerceService):
             print(f"DEBUG: Error processing batch: {str(e)}")
             return len(batch_addresses), 0, 1
     
-    async def _process_all_addresses_and_create_sql(self, all_addresses: List[Dict], all_states: Dict, all_countries: Dict) -> int:
-        """Process all addresses and create SQL file for bulk insert"""
+    # Campi aggiornati sugli indirizzi già presenti
+    _ADDRESS_UPDATE_FIELDS = (
+        'id_country', 'id_customer', 'company', 'firstname', 'lastname', 'address1', 'address2',
+        'state', 'postcode', 'city', 'phone', 'vat', 'dni', 'pec', 'sdi',
+    )
+    
+    def _process_addresses_page(self, all_addresses: List[Dict], all_states: Dict, all_countries: Dict) -> int:
+        """
+        Process a page of addresses: inserisce i nuovi e aggiorna quelli già presenti (upsert).
+        
+        Sincrono (solo DB): sync_addresses lo esegue in un thread mentre la pagina
+        successiva è in download.
+        """
         try:
 
             
@@ -2009,7 +2004,7 @@ class PrestaShopService(BaseEcommerceService):
             print("DEBUG: Pre-fetching customer IDs...")
             customer_origins = set()
             for address in all_addresses:
-                customer_origin = address.get('id', 0)
+                customer_origin = address.get('id_customer', 0)
                 if customer_origin and customer_origin != '0':
                     try:
                         customer_origins.add(int(customer_origin))
@@ -2108,23 +2103,10 @@ class PrestaShopService(BaseEcommerceService):
                 print("DEBUG: No valid addresses to insert")
                 return 0
             
-            # Use executemany for bulk insert (more reliable than SQL file)
-            # Get existing address origin IDs to avoid duplicates
-            existing_origins = set()
-            existing_addresses = self.db.execute(text("SELECT id_origin FROM addresses WHERE id_origin IS NOT NULL")).fetchall()
-            existing_origins = {str(row[0]) for row in existing_addresses}
-            
-            # Prepare data for executemany, filtering out existing addresses
+            # Upsert per (id_store, id_origin): gli indirizzi modificati su PrestaShop vengono aggiornati
             insert_data = []
-            skipped_count = 0
             
             for data in valid_address_data:
-                # Check if address already exists
-                address_origin = str(data.get('id_origin', 0))
-                if address_origin in existing_origins:
-                    skipped_count += 1
-                    continue
-                
                 # Clean the data
                 if data.get('id_country') == 0:
                     data['id_country'] = None
@@ -2156,28 +2138,23 @@ class PrestaShopService(BaseEcommerceService):
                 print("DEBUG: No new addresses to insert")
                 return 0
             
-            # Execute bulk insert in batches
-            insert_sql = text("""
-                INSERT INTO addresses (
-                    id_origin, id_store, id_country, id_customer, company, firstname, lastname,
-                    address1, address2, state, postcode, city, phone, vat, dni, pec, sdi, date_add
-                ) VALUES (
-                    :id_origin, :id_store, :id_country, :id_customer, :company, :firstname, :lastname,
-                    :address1, :address2, :state, :postcode, :city, :phone, :vat, :dni, :pec, :sdi, :date_add
-                )
-            """)
-            
-            # Insert in batches of 5000 for better performance
-            batch_size = 5000
-            total_inserted = 0
-            
-            for i in range(0, len(insert_data), batch_size):
-                batch = insert_data[i:i + batch_size]
-                self.db.execute(insert_sql, batch)
+            previous_countries = self._address_countries_by_origin({row['id_origin'] for row in insert_data})
+            result = AddressRepository(self.db).upsert_by_origin(
+                insert_data, self.store_id, self._ADDRESS_UPDATE_FIELDS, batch_size=5000
+            )
+            # L'upsert è Core (nessun listener ORM): paese cambiato -> giorni corrispettivi degli ordini
+            recountried = [
+                previous_countries[row['id_origin']][0]
+                for row in insert_data
+                if row['id_origin'] in previous_countries
+                and previous_countries[row['id_origin']][1] != row['id_country']
+            ]
+            if result.updated_ids or recountried:
+                queue_order_search_related_refresh(self.db, "addresses", result.updated_ids)
+                queue_corrispettivi_rollup_refresh(self.db, address_ids=recountried)
                 self.db.commit()
-                total_inserted += len(batch)
             
-            print(f"DEBUG: Successfully inserted {total_inserted} addresses")
+            print(f"DEBUG: Addresses inserted: {result.inserted}, updated: {result.updated}")
             
             return len(valid_address_data)
             
@@ -2185,89 +2162,59 @@ class PrestaShopService(BaseEcommerceService):
             print(f"DEBUG: Error processing addresses: {str(e)}")
             raise
     
+    def _address_countries_by_origin(self, origins: set) -> Dict[int, tuple]:
+        """id_origin -> (id_address, id_country) degli indirizzi già presenti nello store"""
+        origins = [origin for origin in origins if origin]
+        if not origins:
+            return {}
+        rows = self.db.execute(
+            select(Address.id_origin, Address.id_address, Address.id_country).where(
+                Address.id_store == self.store_id, Address.id_origin.in_(origins)
+            )
+        )
+        return {id_origin: (id_address, id_country) for id_origin, id_address, id_country in rows}
+    
+    async def _iter_addresses_pages(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Fetch addresses page by page (display=full)"""
+        # Letto una sola volta: le pagine inserite durante la sync non spostano il filtro
+        params, last_id = await self._prepare_delta_fetch('addresses', {'display': 'full'})
+        
+        async for page in self._iter_resource_pages('addresses', params, last_id):
+            yield page
+    
     async def sync_addresses(self) -> List[Dict[str, Any]]:
         """Synchronize addresses from ps_address"""
         print("🚀 STARTING SYNC_ADDRESSES")
         try:
-            limit = 5000  # 25k addresses per API call
-            offset = 0
-            parallel_batches = 1  # Single call per batch since we're getting 50k at once
-
             # Fetch all states at once for efficient lookup
             all_states = await self._get_all_states()
             all_countries = self._get_all_countries()
             
-            # Collect all addresses first
-            all_addresses = []
-            total_processed = 0
-            total_errors = 0
+            async def insert_page(addresses: List[Dict[str, Any]]) -> int:
+                # Solo DB: in un thread, così il download della pagina successiva prosegue
+                return await asyncio.to_thread(self._process_addresses_page, addresses, all_states, all_countries)
             
-            while True:
-                # Prepare multiple parallel requests
-                tasks = []
-                for i in range(parallel_batches):
-                    current_offset = offset + (i * limit)
-                    params = {
-                        'display': 'full',
-                        'limit': f'{current_offset},{limit}'
-                    }
-
-                    if self.new_elements:
-                        last_id = self.db.execute(text("SELECT MAX(id_origin) FROM addresses WHERE id_origin IS NOT NULL")).scalar()
-                        last_id = last_id if last_id else 0
-                        params['filter[id]'] = f'>[{last_id}]'
-
-                    tasks.append(self._make_request_with_rate_limit('/api/addresses', params=params))
-                
-                # Execute parallel requests
-                responses = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                
-                # Process responses
-                batch_addresses = []
-                for i, response in enumerate(responses):
-                    if isinstance(response, Exception):
-                        print(f"DEBUG: Error in batch {i}: {str(response)}")
-                        total_errors += 1
-                        continue
-                        
-                    addresses = self._extract_items_from_response(response, 'addresses')
-                    if addresses:
-                        batch_addresses.extend(addresses)
-                
-                if not batch_addresses:
-                    break
-                
-                # Collect addresses instead of processing immediately
-                all_addresses.extend(batch_addresses)
-                total_processed += len(batch_addresses)
-                
-                # If we got less than expected, we've reached the end
-                if len(batch_addresses) < limit:
-                    break
-                    
-                offset += limit
-                # Small delay between batches
-                await asyncio.sleep(0.1)  # Reduced delay for faster processing
+            stats = await run_page_pipeline(
+                self._iter_addresses_pages(),
+                self._track_pages('addresses', insert_page),
+                max_pending=get_prestashop_sync_settings().prestashop_sync_prefetch_pages,
+            )
+            total_successful = stats.processed
             
-            # All addresses collected, now process them all at once
-            if not all_addresses:
+            if not stats.fetched:
                 print("DEBUG: No addresses to process")
+                self._commit_delta('addresses')
                 self._log_sync_result("Addresses", 0)
                 return []
             
-            # Process all addresses and create SQL file
-            total_successful = await self._process_all_addresses_and_create_sql(
-                all_addresses, all_states, all_countries
-            )
-            
-            print(f"DEBUG: Address sync completed - Processed: {total_processed}, Inserted: {total_successful}")
+            print(f"DEBUG: Address sync completed - Processed: {stats.fetched}, Inserted: {total_successful}")
+            self._commit_delta('addresses')
             
             if total_successful > 0:
                 self._log_sync_result("Addresses", total_successful)
                 return [{"status": "success", "count": total_successful}]
             else:
-                self._log_sync_result("Addresses", 0, [f"Total errors: {total_errors}"])
+                self._log_sync_result("Addresses", 0)
                 return []
             
         except Exception as e:
@@ -2301,32 +2248,16 @@ class PrestaShopService(BaseEcommerceService):
             
             print("DEBUG: All dependencies verified. Proceeding with orders sync...")
             
-            orders = await self._get_orders_data()  # Get fresh orders data
-            
-            
-            existing_orders = self.db.execute(text("SELECT id_origin FROM orders WHERE id_origin IS NOT NULL")).fetchall()
-            existing_order_origins = {str(row[0]) for row in existing_orders}
-            
-            # Filter out existing orders
-            new_orders = []
-            for order in orders:
-                order_id_prestashop = order.get('id', 0)
-                if str(order_id_prestashop) not in existing_order_origins:
-                    new_orders.append(order)
-                else:
-                    print(f"DEBUG: Order {order_id_prestashop} already exists, skipping...")
-            
-            print(f"DEBUG: Found {len(new_orders)} new orders to process out of {len(orders)} total orders")
-            
-            if not new_orders:
-                print("DEBUG: No new orders to process")
-                self._log_sync_result("Orders", 0)
-                return []
-            
-            # Process all orders and create SQL file for bulk insert
-            total_successful = await self._process_all_orders_and_create_sql(new_orders)
+            # Pipeline a pagine: la pagina successiva si scarica mentre la corrente viene inserita
+            stats = await run_page_pipeline(
+                self._iter_orders_pages(),
+                self._track_pages('orders', self._sync_orders_page),
+                max_pending=get_prestashop_sync_settings().prestashop_sync_prefetch_pages,
+            )
+            total_successful = stats.processed
             
-            print(f"DEBUG: Order sync completed - Total processed: {len(new_orders)}, Successful: {total_successful}")
+            print(f"DEBUG: Order sync completed - Total fetched: {stats.fetched}, Successful: {total_successful}")
+            self._commit_delta('orders')
             
             if total_successful > 0:
                 self._log_sync_result("Orders", total_successful)
@@ -2340,6 +2271,59 @@ class PrestaShopService(BaseEcommerceService):
             raise
     
     
+    async def _sync_orders_page(self, orders: List[Dict[str, Any]]) -> int:
+        """Inserisce gli ordini nuovi di una pagina e aggiorna lo stato di quelli esistenti; restituisce gli ordini elaborati"""
+        page_origins = {safe_int(order.get('id', 0)) for order in orders}
+        existing_order_ids = {
+            str(row[1]): row[0] for row in self.db.execute(
+                text("SELECT id_order, id_origin FROM orders WHERE id_store = :id_store AND id_origin IN :origins").bindparams(
+                    bindparam("origins", expanding=True)
+                ),
+                {"id_store": self.store_id, "origins": list(page_origins)}
+            )
+        } if page_origins else {}
+        
+        # Split new / existing orders
+        new_orders = []
+        existing_orders = []
+        for order in orders:
+            order_id_prestashop = str(order.get('id', 0))
+            if order_id_prestashop in existing_order_ids:
+                existing_orders.append((existing_order_ids[order_id_prestashop], order))
+            else:
+                new_orders.append(order)
+        
+        print(f"DEBUG: Found {len(new_orders)} new orders to process out of {len(orders)} orders in page")
+        
+        updated = self._update_existing_orders_state(existing_orders) if existing_orders else 0
+        if not new_orders:
+            return updated
+        
+        return updated + await self._process_all_orders_and_create_sql(new_orders)
+    
+    def _update_existing_orders_state(self, existing_orders: List[tuple]) -> int:
+        """
+        Ordini già importati riletti dal delta date_upd: aggiorna lo stato e-commerce.
+        Il resto dell'ordine (totali, righe, indirizzi) è gestito localmente e non viene sovrascritto.
+        """
+        state_map = {
+            int(row.id_platform_state): row.id_ecommerce_order_state
+            for row in self.db.execute(
+                text("SELECT id_platform_state, id_ecommerce_order_state FROM ecommerce_order_states WHERE id_store = :id_store"),
+                {"id_store": self.store_id}
+            )
+        }
+        updates = []
+        for id_order, order in existing_orders:
+            state = state_map.get(safe_int(order.get('current_state', 0)))
+            if state is not None:
+                updates.append({'id_order': id_order, 'id_ecommerce_state': state})
+        if updates:
+            self.db.execute(update(Order), updates)
+            self.db.commit()
+        print(f"DEBUG: Updated ecommerce state of {len(updates)} existing orders")
+        return len(updates)
+    
     # Helper methods for data extraction and transformation
     def _extract_product_type(self, product_name: Any) -> str:
         """Extract product type from name (dual/trial logic)"""
@@ -2432,174 +2416,47 @@ class PrestaShopService(BaseEcommerceService):
             print(f"DEBUG: Error upserting country {data.get('id_origin', 'unknown')}: {str(e)}")
             return {"status": "error", "error": str(e), "id_origin": data.get('id_origin', 'unknown')}
     
-    async def _upsert_brand(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Upsert brand record"""
-        try:
-            from src.repository.brand_repository import BrandRepository
-            from src.schemas.brand_schema import BrandSchema
-            
-            brand_repo = BrandRepository(self.db)
-            
-            # Check if brand already exists
-            id_origin = data.get('id_origin', 0)
-            existing_brand = brand_repo.get_by_origin_id(str(id_origin))
-            if existing_brand:
-                return {"status": "skipped", "id_origin": id_origin, "reason": "already_exists"}
-            
-            # Convert data to BrandSchema, add id_platform
-            brand_data = {**data, 'id_platform': self.platform_id, 'id_store': self.store_id}
-            brand_schema = BrandSchema(**brand_data)
-            
-            # Create brand in database
-            brand_repo.create(brand_schema)
-            
-            return {"status": "success", "id_origin": data.get('id_origin', 'unknown')}
-        except Exception as e:
-            print(f"DEBUG: Error upserting brand {data.get('id_origin', 'unknown')}: {str(e)}")
-            return {"status": "error", "error": str(e), "id_origin": data.get('id_origin', 'unknown')}
-    
-    async def _upsert_category(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Upsert category record"""
-        try:
-            from src.repository.category_repository import CategoryRepository
-            from src.schemas.category_schema import CategorySchema
-            
-            category_repo = CategoryRepository(self.db)
-            
-            # Check if category already exists
-            id_origin = data.get('id_origin', 0)
-            existing_category = category_repo.get_by_origin_id(str(id_origin))
-            if existing_category:
-                return {"status": "skipped", "id_origin": id_origin, "reason": "already_exists"}
-            
-            # Extract data from PrestaShop format - handle both string and object formats
-            category_name = data.get('name', '')
-            
-            # Create CategorySchema with id_platform
-            category_schema = CategorySchema(
-                id_origin=data.get('id_origin', 0),
-                name=category_name,
-                id_store=self.store_id
-            )
-            
-            # Create category in database
-            category_repo.create(category_schema)
-            
-            return {"status": "success", "id_origin": data.get('id_origin', 'unknown')}
-        except Exception as e:
-            print(f"DEBUG: Error upserting category {data.get('id_origin', 'unknown')}: {str(e)}")
-            return {"status": "error", "error": str(e), "id_origin": data.get('id_origin', 'unknown')}
-    
-    async def _upsert_carrier(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Upsert carrier record"""
-        try:
-            from src.repository.carrier_repository import CarrierRepository
-            from src.schemas.carrier_schema import CarrierSchema
-            
-            carrier_repo = CarrierRepository(self.db)
-            
-            # Extract data from PrestaShop format - handle both string and object formats
-            carrier_name = data.get('name', '')
-            
-            if isinstance(carrier_name, dict):
-                if 'value' in carrier_name:
-                    carrier_name = carrier_name['value']
-                else:
-                    # If it's a dict but no 'value' key, try to get the first string value
-                    carrier_name = str(list(carrier_name.values())[0]) if carrier_name else ''
-            elif isinstance(carrier_name, list) and carrier_name:
-                if isinstance(carrier_name[0], dict):
-                    if 'value' in carrier_name[0]:
-                        carrier_name = carrier_name[0]['value']
-                    else:
-                        # If it's a list of dicts but no 'value' key, try to get the first string value
-                        carrier_name = str(list(carrier_name[0].values())[0]) if carrier_name[0] else ''
-                else:
-                    carrier_name = str(carrier_name[0])
-
-            
-            # Create CarrierSchema
-            carrier_schema = CarrierSchema(
-                id_origin=data.get('id_origin', 0),
-                id_store=data.get('id_store'),
-                name=carrier_name
-            )
-            
-            # Create carrier in database - convert schema to dict
-            carrier_repo.create(carrier_schema.model_dump())
-            
-            return {"status": "success", "id_origin": data.get('id_origin', 'unknown')}
-        except Exception as e:
-            print(f"DEBUG: Error upserting carrier {data.get('id_origin', 'unknown')}: {str(e)}")
-            return {"status": "error", "error": str(e), "id_origin": data.get('id_origin', 'unknown')}
+    def _upsert_brands(self, brand_data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Upsert bulk dei brand (id_origin, name) dello store"""
+        from src.repository.brand_repository import BrandRepository
+        
+        rows = [{**data, 'id_platform': self.platform_id} for data in brand_data_list]
+        BrandRepository(self.db).upsert_by_origin(rows, self.store_id, ('name', 'id_platform'))
+        return [{"status": "success", "id_origin": data['id_origin']} for data in brand_data_list]
     
+    def _upsert_categories(self, category_data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Upsert bulk delle categorie (id_origin, name) dello store"""
+        from src.repository.category_repository import CategoryRepository
+        
+        CategoryRepository(self.db).upsert_by_origin(category_data_list, self.store_id, ('name',))
+        return [{"status": "success", "id_origin": data['id_origin']} for data in category_data_list]
     
-    async def _upsert_product(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        try:
-            from src.repository.product_repository import ProductRepository
-            from src.schemas.product_schema import ProductSchema
-            
-            product_repo = ProductRepository(self.db)
-            
-            # Check if product already exists
-            id_origin = data.get('id_origin', 0)
-            
-            existing_product = product_repo.get_by_origin_id(str(id_origin))
-            if existing_product:
-                print(f"DEBUG: Product with origin ID {id_origin} already exists, skipping")
-                return {"status": "skipped", "id_origin": id_origin, "reason": "already_exists"}
-            
-            # Create ProductSchema with extracted data
-            product_schema = ProductSchema(
-                id_origin=data.get('id_origin', 0),
-                id_category=data.get('id_category', 0),
-                id_brand=data.get('id_brand', 0),
-                name=data.get('name', {}),
-                sku=data.get('sku', ''),
-                type=data.get('type', 'standard')
-            )
-            
-            # Create product in database
-            product_repo.create(product_schema)
-            
-            return {"status": "success", "id_origin": data.get('id_origin', 'unknown')}
-        except Exception as e:
-            print(f"DEBUG: Error upserting product {data.get('id_origin', 'unknown')}: {str(e)}")
-            return {"status": "error", "error": str(e), "id_origin": data.get('id_origin', 'unknown')}
+    def _upsert_carriers(self, carrier_data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Upsert bulk dei corrieri (id_origin, name) dello store"""
+        from src.repository.carrier_repository import CarrierRepository
+        
+        CarrierRepository(self.db).upsert_by_origin(carrier_data_list, self.store_id, ('name',))
+        return [{"status": "success", "id_origin": data['id_origin']} for data in carrier_data_list]
     
-    async def _upsert_customer(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Upsert customer record"""
-        try:
-            
-            customer_repo = CustomerRepository(self.db)
-            
-            # Extract data from PrestaShop format
-            firstname = data.get('firstname', '')
-            lastname = data.get('lastname', '')
-            email = data.get('email', '')
-            
-            # Use defaults if fields are empty
-            if not firstname:
-                firstname = f"Customer_{data.get('id_origin', 'unknown')}"
-            if not lastname:
-                lastname = "Unknown"     
-            # Create CustomerSchema
-            customer_schema = CustomerSchema(
-                id_origin=data.get('id_origin', 0),
-                id_lang=self.default_language_id,
-                id_store=self.store_id,
-                firstname=firstname,
-                lastname=lastname,
-                email=email
-            )
-            
-            # Create customer in database
-            customer_repo.create(customer_schema)
-            
-            return {"status": "success", "id_origin": data.get('id_origin', 'unknown')}
-        except Exception as e:
-            print(f"DEBUG: Error upserting customer {data.get('id_origin', 'unknown')}: {str(e)}")
-            return {"status": "error", "error": str(e), "id_origin": data.get('id_origin', 'unknown')}
+    @staticmethod
+    def _carrier_name(carrier_name: Any) -> str:
+        """Nome corriere dal formato PrestaShop (stringa, dict con 'value' o lista di lingue)"""
+        if isinstance(carrier_name, dict):
+            if 'value' in carrier_name:
+                carrier_name = carrier_name['value']
+            else:
+                # If it's a dict but no 'value' key, try to get the first string value
+                carrier_name = str(list(carrier_name.values())[0]) if carrier_name else ''
+        elif isinstance(carrier_name, list) and carrier_name:
+            if isinstance(carrier_name[0], dict):
+                if 'value' in carrier_name[0]:
+                    carrier_name = carrier_name[0]['value']
+                else:
+                    # If it's a list of dicts but no 'value' key, try to get the first string value
+                    carrier_name = str(list(carrier_name[0].values())[0]) if carrier_name[0] else ''
+            else:
+                carrier_name = str(carrier_name[0])
+        return carrier_name or ''
     
     async def _upsert_payment(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Upsert payment record"""
@@ -2628,64 +2485,6 @@ class PrestaShopService(BaseEcommerceService):
             print(f"DEBUG: Error upserting payment {data.get('id_origin', 'unknown')}: {str(e)}")
             return {"status": "error", "error": str(e), "id_origin": data.get('id_origin', 'unknown')}
     
-    async def _upsert_address(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Upsert address record"""
-        try:
-            
-            
-            address_repo = AddressRepository(self.db)
-            
-            # Convert data to AddressSchema
-            address_schema = AddressSchema(**data)
-            
-            # Create address in database
-            address_repo.create(address_schema)
-            
-            return {"status": "success", "id_origin": data.get('id_origin', 'unknown')}
-        except Exception as e:
-            return {"status": "error", "error": str(e), "id_origin": data.get('id_origin', 'unknown')}
-    
-    async def _upsert_order(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Upsert order record"""
-        try:
-            from src.repository.order_repository import OrderRepository
-            from src.schemas.order_schema import OrderSchema
-            
-            order_repo = OrderRepository(self.db)
-            
-            # Convert data to OrderSchema
-            order_schema = OrderSchema(**data)
-            # Create order in database
-            order_repo.create(order_schema)
-            
-            id_order = int(self._get_order_id_by_origin(data.get('id_origin')))
-            
-            return {"status": "success", "id_origin": data.get('id_origin', 'unknown'), "id_order": id_order}
-            
-        except Exception as e:
-            print(f"DEBUG: Error upserting order {data.get('id_origin', 'unknown')}: {str(e)}")
-            return {"status": "error", "error": str(e), "id_origin": data.get('id_origin', 'unknown')}
-    
-    
-    async def _upsert_order_detail(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Upsert order detail record"""
-        try:
-            from src.repository.order_detail_repository import OrderDetailRepository
-            from src.schemas.order_detail_schema import OrderDetailSchema
-            
-            order_detail_repo = OrderDetailRepository(self.db)
-            
-            # Convert data to OrderDetailSchema
-            order_detail_schema = OrderDetailSchema(**data)
-            
-            # Create order detail in database
-            order_detail_repo.create(order_detail_schema)
-            
-            return {"status": "success", "id_origin": data.get('id_origin', 'unknown')}
-        except Exception as e:
-            print(f"DEBUG: Error upserting order detail {data.get('id_origin', 'unknown')}: {str(e)}")
-            return {"status": "error", "error": str(e), "id_origin": data.get('id_origin', 'unknown')}
-    
     async def _check_order_exists(self, id_origin: str) -> bool:
         """Check if order already exists in database by id_origin"""
         try:
@@ -3280,13 +3079,9 @@ class PrestaShopService(BaseEcommerceService):
                     print(f"DEBUG: Skipping incremental brand {manufacturer.get('id', 'unknown')} - no name found")
                     continue
                 
-                brand_data = {
-                    'id_origin': manufacturer.get('id', ''),
-                    'name': brand_name
-                }
-                
-                result = await self._upsert_brand(brand_data)
-                results.append(result)
+                results.append({'id_origin': safe_int(manufacturer.get('id', 0)), 'name': brand_name})
+            
+            results = self._upsert_brands(results) if results else []
             
             print(f"DEBUG: Processed {len(results)} Italian brands (API filtered incremental)")
             self._log_sync_result(f"Brands (Incremental from ID {last_id}) - Italian", len(results))
@@ -3323,13 +3118,9 @@ class PrestaShopService(BaseEcommerceService):
                     print(f"DEBUG: Skipping incremental category {category.get('id', 'unknown')} - no name found")
                     continue
                 
-                category_data = {
-                    'id_origin': category.get('id', ''),
-                    'name': category_name
-                }
-                
-                result = await self._upsert_category(category_data)
-                results.append(result)
+                results.append({'id_origin': safe_int(category.get('id', 0)), 'name': category_name})
+            
+            results = self._upsert_categories(results) if results else []
             
             print(f"DEBUG: Processed {len(results)} Italian categories (API filtered incremental)")
             self._log_sync_result(f"Categories (Incremental from ID {last_id}) - Italian", len(results))
@@ -3339,6 +3130,87 @@ class PrestaShopService(BaseEcommerceService):
             self._log_sync_result(f"Categories (Incremental from ID {last_id}) - Italian", 0, [str(e)])
             raise
 
+    async def _get_resource_id_bounds(
+        self, resource: str, params: Dict[str, Any], last_id: Optional[int] = None
+    ) -> Optional[tuple]:
+        """Primo e ultimo ID della risorsa con i filtri dati (due richieste display=[id]); None se vuota"""
+        bounds = []
+        for direction in ('ASC', 'DESC'):
+            bound_params = {**params, 'display': '[id]', 'sort': f'[id_{direction}]', 'limit': '1'}
+            if last_id is not None:
+                bound_params['filter[id]'] = f'>[{last_id}]'
+            response = await self._make_request_with_rate_limit(f'/api/{resource}', bound_params)
+            items = self._extract_items_from_response(response, resource)
+            if not items:
+                return None
+            bounds.append(safe_int(items[0].get('id', 0)))
+        return bounds[0], bounds[1]
+    
+    async def _iter_resource_pages(
+        self, resource: str, params: Dict[str, Any], last_id: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Pagine di una risorsa del webservice per intervalli di ID (filter[id]=[a,b]).
+        
+        Più intervalli in volo e ampiezza adattiva (IdRangeFetcher, impostazioni
+        PRESTASHOP_SYNC_*); con `last_id` solo gli ID successivi (sync incrementale).
+        """
+        bounds = await self._get_resource_id_bounds(resource, params, last_id)
+        if bounds is None:
+            print(f"DEBUG: No {resource} to fetch")
+            return
+        
+        async def fetch(first_id: int, last_range_id: int) -> List[Dict[str, Any]]:
+            range_params = {**params, 'filter[id]': f'[{first_id},{last_range_id}]'}
+            response = await self._make_request_with_rate_limit(f'/api/{resource}', range_params)
+            return self._extract_items_from_response(response, resource)
+        
+        settings = get_prestashop_sync_settings()
+        fetcher = IdRangeFetcher(
+            fetch,
+            bounds[0],
+            bounds[1],
+            concurrency=settings.prestashop_sync_pages_in_flight,
+            initial_span=settings.prestashop_sync_page_size,
+            min_span=settings.prestashop_sync_min_page_size,
+            max_span=settings.prestashop_sync_max_page_size,
+            target_seconds=settings.prestashop_sync_target_seconds,
+            max_consecutive_errors=settings.prestashop_sync_max_consecutive_errors,
+        )
+        # Lista aggiornata durante il download: limita il checkpoint (_track_pages)
+        self._failed_ranges[resource] = fetcher.stats.failed_ranges
+        async for page in fetcher.pages():
+            yield page
+        
+        stats = fetcher.stats
+        print(f"DEBUG: Fetched {stats.rows} {resource} (ids {bounds[0]}-{bounds[1]}) in {stats.requests} requests, {stats.errors} errors")
+        if stats.failed_ranges:
+            logger.error(f"PrestaShop {resource}: ID ranges not fetched: {stats.failed_ranges}")
+    
+    def _track_pages(
+        self, resource: str, consume: Callable[[List[Dict[str, Any]]], Awaitable[int]]
+    ) -> Callable[[List[Dict[str, Any]]], Awaitable[int]]:
+        """
+        Consumatore di run_page_pipeline che, con un job_tracker, registra dopo ogni
+        pagina elaborata il checkpoint (ID massimo della pagina) e i conteggi.
+        
+        Le pagine arrivano in ordine di ID; il checkpoint non supera un intervallo di
+        ID non scaricato, così una ripresa lo riprova.
+        """
+        if self.job_tracker is None:
+            return consume
+        
+        async def tracked(page: List[Dict[str, Any]]) -> int:
+            processed = await consume(page) or 0
+            last_id = max(safe_int(item.get('id', 0)) for item in page)
+            failed_ranges = self._failed_ranges.get(resource)
+            if failed_ranges:
+                last_id = min(last_id, min(first_id for first_id, _ in failed_ranges) - 1)
+            self.job_tracker.page_done(last_id, len(page), processed)
+            return processed
+        
+        return tracked
+    
     def _extract_items_from_response(self, response: Any, key: str) -> List[Dict[str, Any]]:
         """Extract items from API response, handling both list and dict formats"""
         
@@ -3380,99 +3252,62 @@ class PrestaShopService(BaseEcommerceService):
             return []
     
     async def _get_orders_data(self) -> List[Dict[str, Any]]:
-        """Get orders data with pagination to avoid server overload"""
-        print("DEBUG: Fetching fresh orders data...")
+        """Get all orders data (in memoria: per la sync usare _iter_orders_pages)"""
+        return [order async for page in self._iter_orders_pages() for order in page]
 
+    async def _iter_orders_pages(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Get orders data page by page to avoid server overload"""
+        print("DEBUG: Fetching fresh orders data...")
         
-        all_orders = []
-        limit = 5000  
-        offset = 0
-        consecutive_errors = 0
-        max_consecutive_errors = 5
-        
-        date_range_filter = self._get_date_range_filter()
-        one_year_ago = self._get_one_year_ago_date()
+        # Senza watermark: solo ordini dell'ultimo anno (filter[date_add]) per non importare lo storico
+        params, last_id = await self._prepare_delta_fetch('orders', {'display': 'full'}, date_add_filter=True)
         
-        while True:
-            try:
-                params = {
-                    'display': 'full',
-                    'limit': f'{offset},{limit}'
-                }
-
-                # Always use date filter for orders sync to avoid old data
-                self.new_elements = False # DEBUG, DA TOGLIERE
-                if self.new_elements:
-                    last_id = self.db.execute(text("SELECT MAX(id_origin) FROM orders WHERE id_origin IS NOT NULL")).scalar()
-                    last_id = last_id if last_id else 0
-                    params['filter[id]'] = f'>[{last_id}]'
-                else:
-                    params['date'] = 1
-                    params['filter[date_add]'] = date_range_filter
-                
-                # Add timeout to prevent indefinite blocking
-                try:
-                    # Print complete URL with parameters
-                    url_params = '&'.join([f"{k}={v}" for k, v in params.items()])
-                    complete_url = f"{self.base_url}/api/orders?{url_params}&output_format=JSON"
-                    print(f"PRESTASHOP ORDERS URL: {complete_url}")
-                    
-                    response = await asyncio.wait_for(
-                        self._make_request_with_rate_limit('/api/orders', params),
-                        timeout=60.0  # 60 second timeout
-                    )
-                except asyncio.TimeoutError:
-                    raise Exception("API request timed out")
-            
-                
-                orders_batch = self._extract_items_from_response(response, 'orders')
-                if not orders_batch:
-                    break
-                
-                
-                all_orders.extend(orders_batch)
-                offset += limit
-                consecutive_errors = 0  # Reset error counter on success
-                
-                
-                # Small delay between batches to be gentle with the server
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                consecutive_errors += 1
-                print(f"DEBUG: Error {consecutive_errors}/{max_consecutive_errors} at offset {offset}")
-                print(f"DEBUG: Error type: {type(e).__name__}")
-                print(f"DEBUG: Error message: {str(e)}")
-                print(f"DEBUG: Error args: {e.args if hasattr(e, 'args') else 'No args'}")
-                
-                # If too many consecutive errors, give up
-                if consecutive_errors >= max_consecutive_errors:
-                    print(f"DEBUG: Too many consecutive errors ({consecutive_errors}), stopping order fetch")
-                    break
-                
-                error_msg = str(e).lower()
-                
-                # Check for memory exhaustion errors first
-                if any(keyword in error_msg for keyword in ['memory', 'exhausted', 'fatal error', 'allowed memory size']):
-                    print(f"DEBUG: Memory exhaustion error - reducing batch size from {limit} to {max(5, limit // 4)}")
-                    limit = max(5, limit // 4)  # Reduce batch size more aggressively
-                    await asyncio.sleep(15)  # Wait longer before retry
-                    continue
-                elif any(keyword in error_msg for keyword in ['500', 'server', 'timeout', 'connection reset', 'disconnected']):
-                    print(f"DEBUG: Server error - reducing batch size from {limit} to {max(10, limit // 2)}")
-                    limit = max(10, limit // 2)  # Reduce batch size
-                    await asyncio.sleep(8)  # Wait before retry
-                    continue
-                else:
-                    print(f"DEBUG: Non-server error - continuing with next batch...")
-                    # Don't break, try to continue with next batch
-                    offset += limit
-                    await asyncio.sleep(2)
-                    continue
-        
-        print(f"DEBUG: Fetched {len(all_orders)} orders total")
-        return all_orders
+        async for page in self._iter_resource_pages('orders', params, last_id):
+            yield page
 
+    # Colonne order_details scritte dalla sync ordini
+    _ORDER_DETAIL_COLUMNS = (
+        'id_origin', 'id_order', 'id_order_document', 'id_product', 'product_name', 'product_reference',
+        'product_qty', 'product_weight', 'unit_price_net', 'unit_price_with_tax', 'total_price_net',
+        'total_price_with_tax', 'id_tax', 'reduction_percent', 'reduction_amount', 'rda',
+    )
+    
+    @staticmethod
+    def _order_row(order_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Riga orders dai dati ordine preparati dalla sync"""
+        date_add = order_data['date_add']
+        return {
+            'id_origin': order_data['id_origin'],
+            'reference': order_data['reference'],
+            'internal_reference': order_data.get('internal_reference'),
+            'id_address_delivery': order_data['address_delivery'],
+            'id_address_invoice': order_data['address_invoice'],
+            'id_customer': order_data['customer'],
+            'id_store': order_data.get('id_store'),
+            'id_payment': order_data['id_payment'],
+            'id_carrier': order_data.get('id_carrier', 0),
+            'id_shipping': order_data['shipping'],
+            'id_sectional': order_data['sectional'],
+            'id_order_state': order_data['id_order_state'],
+            'is_invoice_requested': bool(order_data['is_invoice_requested']),
+            'vies_status': order_data.get('vies_status'),
+            'is_payed': bool(order_data['payed']),
+            'payment_date': order_data['date_payment'],
+            'total_weight': order_data['total_weight'],
+            'products_total_price_net': order_data['products_total_price_net'],
+            'products_total_price_with_tax': order_data['products_total_price_with_tax'],
+            'total_price_with_tax': order_data['total_price_with_tax'],
+            'total_price_net': order_data.get('total_price_net', 0),
+            'total_discounts': order_data['total_discounts'],
+            'cash_on_delivery': order_data['cash_on_delivery'],
+            'insured_value': order_data['insured_value'],
+            'privacy_note': order_data['privacy_note'],
+            'general_note': order_data['note'],
+            'delivery_date': order_data['delivery_date'],
+            'id_ecommerce_state': order_data.get('id_ecommerce_state'),
+            'date_add': None if date_add in (None, 'None') else date_add,
+        }
+    
     async def _process_all_orders_and_create_sql(self, all_orders: List[Dict]) -> int:
         """Process all orders and create SQL file for bulk insert"""
         try:
@@ -3950,32 +3785,12 @@ class PrestaShopService(BaseEcommerceService):
                 print("DEBUG: No valid orders to insert - valid_order_data is empty")
                 return 0
             
-            # Create SQL file for orders
-            orders_sql_file = "temp_orders_insert.sql"
-            with open(orders_sql_file, 'w', encoding='utf-8') as f:
-                f.write("-- Orders bulk insert\n")
-                f.write("INSERT INTO orders (id_origin, reference, internal_reference, id_address_delivery, id_address_invoice, id_customer, id_store, id_payment, id_carrier, id_shipping, id_sectional, id_order_state, is_invoice_requested, vies_status, is_payed, payment_date, total_weight, products_total_price_net, products_total_price_with_tax, total_price_with_tax, total_price_net, total_discounts, cash_on_delivery, insured_value, privacy_note, general_note, delivery_date, id_ecommerce_state, date_add) VALUES\n")
-                
-                for i, order_data in enumerate(valid_order_data):
-                    comma = "," if i < len(valid_order_data) - 1 else ";"
-                    f.write(f"({order_data['id_origin']}, {sql_value(order_data['reference'])}, {sql_value(order_data.get('internal_reference'))}, {sql_value(order_data['address_delivery'])}, {sql_value(order_data['address_invoice'])}, {order_data['customer']}, {order_data.get('id_store', 'NULL')}, {sql_value(order_data['id_payment'])}, {order_data.get('id_carrier', 0)}, {order_data['shipping']}, {order_data['sectional']}, {order_data['id_order_state']}, {1 if order_data['is_invoice_requested'] else 0}, {sql_value(order_data.get('vies_status'))}, {order_data['payed']}, {sql_value(order_data['date_payment'])}, {order_data['total_weight']}, {order_data['products_total_price_net']}, {order_data['products_total_price_with_tax']}, {order_data['total_price_with_tax']}, {sql_value(order_data.get('total_price_net', 0))}, {order_data['total_discounts']}, {order_data['cash_on_delivery']}, {order_data['insured_value']}, {sql_value(order_data['privacy_note'])}, {sql_value(order_data['note'])}, {sql_value(order_data['delivery_date'])}, {sql_value(order_data.get('id_ecommerce_state'))}, {sql_value(order_data['date_add'])}){comma}\n")
-            
-            # Execute orders SQL file
-            with open(orders_sql_file, 'r', encoding='utf-8') as f:
-                sql_content = f.read()
-                # Temporarily disable echo to prevent SQL output
-                original_echo = self.db.bind.echo
-                self.db.bind.echo = False
-                try:
-                    self.db.execute(text(sql_content))
-                    self.db.commit()
-                finally:
-                    self.db.bind.echo = original_echo
-            
-            # Get the inserted order IDs
-            inserted_orders = self.db.execute(text("SELECT id_order, id_origin FROM orders WHERE id_origin IN :origins"), 
-                                            {"origins": [order['id_origin'] for order in valid_order_data]}).fetchall()
-            order_id_mapping = {row.id_origin: row.id_order for row in inserted_orders}
+            # Upsert bulk degli ordini (solo nuovi): id_origin -> id_order dalle righe inserite
+            from src.repository.order_repository import OrderRepository
+            order_result = OrderRepository(self.db).upsert_by_origin(
+                [self._order_row(order_data) for order_data in valid_order_data], self.store_id
+            )
+            order_id_mapping = order_result.inserted_ids
             
             # Create order history entries
             self._create_order_history(order_id_mapping, valid_order_data)
@@ -3994,41 +3809,25 @@ class PrestaShopService(BaseEcommerceService):
                 else:
                     print(f"DEBUG: Warning - No mapping found for order detail {detail['id_origin']}")
             
-            # Create SQL file for order details
-            if valid_order_detail_data:
-                details_sql_file = "temp_order_details_insert.sql"
-                with open(details_sql_file, 'w', encoding='utf-8') as f:
-                    f.write("-- Order details bulk insert\n")
-                    f.write("INSERT INTO order_details (id_origin, id_order, id_order_document, id_product, product_name, product_reference, product_qty, product_weight, unit_price_net, unit_price_with_tax, total_price_net, total_price_with_tax, id_tax, reduction_percent, reduction_amount, rda) VALUES\n")
-                    
-                    for i, detail_data in enumerate(valid_order_detail_data):
-                        if detail_data['id_order']:  # Only include details with valid order IDs
-                            comma = "," if i < len(valid_order_detail_data) - 1 else ";"
-                            f.write(f"({detail_data['id_origin']}, {detail_data['id_order']}, {sql_value(detail_data['id_order_document'])}, {detail_data['id_product']}, {sql_value(detail_data['product_name'])}, {sql_value(detail_data['product_reference'])}, {detail_data['product_qty']}, {detail_data['product_weight']}, {detail_data.get('unit_price_net', 0.0)}, {detail_data.get('unit_price_with_tax', 0.0)}, {detail_data.get('total_price_net', 0.0)}, {detail_data.get('total_price_with_tax', 0.0)}, {sql_value(detail_data['id_tax'])}, {detail_data['reduction_percent']}, {detail_data['reduction_amount']}, {sql_value(detail_data['rda'])}){comma}\n")
-                
-                # Execute order details SQL file
-                with open(details_sql_file, 'r', encoding='utf-8') as f:
-                    sql_content = f.read()
-                    # Temporarily disable echo to prevent SQL output
-                    original_echo = self.db.bind.echo
-                    self.db.bind.echo = False
-                    try:
-                        self.db.execute(text(sql_content))
-                        self.db.commit()
-                    finally:
-                        self.db.bind.echo = original_echo
-                
-                # Clean up order details SQL file    
-                if os.path.exists(details_sql_file):
-                    os.remove(details_sql_file)
+            # Insert multi-riga delle righe ordine con id_order valido
+            detail_rows = [
+                {column: detail[column] for column in self._ORDER_DETAIL_COLUMNS}
+                for detail in valid_order_detail_data if detail['id_order']
+            ]
+            if detail_rows:
+                batch_size = get_bulk_write_settings().bulk_upsert_batch_size
+                for i in range(0, len(detail_rows), batch_size):
+                    self.db.execute(insert(OrderDetail), detail_rows[i:i + batch_size])
+                self.db.commit()
             
-            # Clean up orders SQL file
-            if os.path.exists(orders_sql_file):
-                os.remove(orders_sql_file)
+            # Indice di ricerca ordini e rollup corrispettivi: gli INSERT raw non passano dai listener di sessione
+            queue_order_search_refresh(self.db, order_id_mapping.values())
+            queue_corrispettivi_rollup_refresh(self.db, order_id_mapping.values())
+            self.db.commit()
             
-            print(f"DEBUG: Successfully inserted {len(valid_order_data)} orders, {len(valid_order_data)} shipments, {len(valid_order_data)} order history entries, {len(valid_order_data)} order packages, and {len(valid_order_detail_data)} order details")
+            print(f"DEBUG: Successfully inserted {order_result.inserted} orders, {len(valid_order_data)} shipments, {len(order_id_mapping)} order history entries, {len(order_id_mapping)} order packages, and {len(detail_rows)} order details")
             
-            return len(valid_order_data)
+            return order_result.inserted
             
         except Exception as e:
             print(f"DEBUG: Error in _process_all_orders_and_create_sql: {str(e)}")
@@ -5,6 +5,7 @@ from typing import Dict, Any, Optional, Tuple, Type
 from sqlalchemy.engine import Row
 import logging
 
+from src.core.http_clients import get_http_client
 from src.core.settings import get_carrier_integration_settings
 
 logger = logging.getLogger(__name__)
@@ -83,10 +84,10 @@ class BrtClient:
         url = f"{self._get_base_url(credentials.use_sandbox)}/rest/v1/shipments/routing"
         headers = self._get_headers(for_tracking=False)
     
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await self._make_request_with_retry(
-                client, "PUT", url, headers=headers, json=payload
-            )
+        client = get_http_client("brt")
+        response = await self._make_request_with_retry(
+            client, "PUT", url, headers=headers, json=payload
+        )
         
         response_data = response.json()
         
@@ -118,10 +119,10 @@ class BrtClient:
         logger.info(f"BRT Create Shipment Request URL: {url}")
         logger.info(f"BRT Create Shipment Request Payload: {json.dumps(payload, indent=2, ensure_ascii=False)}")
         
-        async with httpx.AsyncClient(timeout=45.0) as client:
-            response = await self._make_request_with_retry(
-                client, "POST", url, headers=headers, json=payload
-            )
+        client = get_http_client("brt")
+        response = await self._make_request_with_retry(
+            client, "POST", url, headers=headers, json=payload, timeout=45.0
+        )
         
         # Parse JSON response
         try:
@@ -167,10 +168,10 @@ class BrtClient:
         logger.info(f"BRT Confirm Shipment Request Method: PUT")
         logger.info(f"BRT Confirm Shipment Request Payload: {json.dumps(payload, indent=2, ensure_ascii=False)}")
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await self._make_request_with_retry(
-                client, "PUT", url, headers=headers, json=payload
-            )
+        client = get_http_client("brt")
+        response = await self._make_request_with_retry(
+            client, "PUT", url, headers=headers, json=payload
+        )
         
         response_data = response.json()
         
@@ -199,10 +200,10 @@ class BrtClient:
         url = f"{self._get_base_url(credentials.use_sandbox)}/rest/v1/tracking/parcelID/{parcel_id}"
         headers = self._get_headers(for_tracking=True, brt_config=brt_config)
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await self._make_request_with_retry(
-                client, "GET", url, headers=headers
-            )
+        client = get_http_client("brt")
+        response = await self._make_request_with_retry(
+            client, "GET", url, headers=headers
+        )
         
         # Se c'è un errore 401, logga i dettagli
         if response.status_code == 401:
@@ -244,10 +245,10 @@ class BrtClient:
         logger.info(f"BRT Cancel Shipment Request Method: PUT")
         logger.info(f"BRT Cancel Shipment Request Payload: {json.dumps(payload, indent=2, ensure_ascii=False)}")
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await self._make_request_with_retry(
-                client, "PUT", url, headers=headers, json=payload
-            )
+        client = get_http_client("brt")
+        response = await self._make_request_with_retry(
+            client, "PUT", url, headers=headers, json=payload
+        )
         
         response_data = response.json()
         
@@ -8,6 +8,7 @@ from typing import Dict, Any, Optional
 from sqlalchemy.engine import Row
 import logging
 
+from src.core.http_clients import get_http_client
 from src.core.settings import get_carrier_integration_settings
 from src.services.core.tool import convert_decimals_to_float
 
@@ -47,10 +48,10 @@ class DhlClient:
         # Convert Decimal objects to float for JSON serialization
         payload_serializable = convert_decimals_to_float(payload)
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await self._make_request_with_retry(
-                client, "POST", url, headers=headers, json=payload_serializable
-            )
+        client = get_http_client("dhl")
+        response = await self._make_request_with_retry(
+            client, "POST", url, headers=headers, json=payload_serializable
+        )
             
         # Debug: Log response
         response_data = response.json()
@@ -105,10 +106,10 @@ class DhlClient:
         logger.info(f"🔐 DHL Tracking Auth: Basic {headers.get('Authorization', '').split(' ')[1] if 'Authorization' in headers else 'N/A'}")
         logger.info(f"Getting DHL tracking for {len(tracking)} shipments")
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await self._make_request_with_retry(
-                client, "GET", url, headers=headers, params=params
-            )
+        client = get_http_client("dhl")
+        response = await self._make_request_with_retry(
+            client, "GET", url, headers=headers, params=params
+        )
             
         # Debug: Log response
         response_data = response.json()
@@ -7,6 +7,7 @@ from typing import Dict, Any, Optional, List
 from sqlalchemy.engine import Row
 import logging
 
+from src.core.http_clients import get_http_client
 from src.core.settings import get_carrier_integration_settings
 from src.core.exceptions import CarrierApiError
 from src.services.core.tool import convert_decimals_to_float
@@ -83,48 +84,48 @@ class FedexClient:
             "Accept": "application/json"
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.post(url, headers=headers, data=form_data)
-                
-                # Check for errors
-                if response.status_code == 401:
-                    error_data = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
-                    error_code = error_data.get("errors", [{}])[0].get("code", "NOT.AUTHORIZED.ERROR")
-                    error_message = error_data.get("errors", [{}])[0].get("message", "Invalid credentials")
-                    raise ValueError(f"FedEx OAuth Error (401): {error_code} - {error_message}")
-                
-                if response.status_code >= 500:
-                    error_data = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
-                    error_code = error_data.get("errors", [{}])[0].get("code", "INTERNAL.SERVER.ERROR")
-                    error_message = error_data.get("errors", [{}])[0].get("message", "Server error")
-                    raise RuntimeError(f"FedEx OAuth Error ({response.status_code}): {error_code} - {error_message}")
-                
-                response.raise_for_status()
-                response_data = response.json()
-                
-                access_token = response_data.get("access_token")
-                expires_in = response_data.get("expires_in", 3600)  # Default 1 hour
-                
-                if not access_token:
-                    raise ValueError("FedEx OAuth response missing access_token")
-                
-                # Cache token
-                expires_at = datetime.now() + timedelta(seconds=expires_in)
-                self._token_cache[carrier_api_id] = {
-                    "token": access_token,
-                    "expires_at": expires_at
-                }
-                
-                return access_token
-                
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 503:
-                    error_data = e.response.json() if e.response.headers.get("content-type", "").startswith("application/json") else {}
-                    error_code = error_data.get("errors", [{}])[0].get("code", "SERVICE.UNAVAILABLE.ERROR")
-                    error_message = error_data.get("errors", [{}])[0].get("message", "Service unavailable")
-                    raise RuntimeError(f"FedEx OAuth Error (503): {error_code} - {error_message}")
-                raise
+        client = get_http_client("fedex")
+        try:
+            response = await client.post(url, headers=headers, data=form_data)
+            
+            # Check for errors
+            if response.status_code == 401:
+                error_data = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+                error_code = error_data.get("errors", [{}])[0].get("code", "NOT.AUTHORIZED.ERROR")
+                error_message = error_data.get("errors", [{}])[0].get("message", "Invalid credentials")
+                raise ValueError(f"FedEx OAuth Error (401): {error_code} - {error_message}")
+            
+            if response.status_code >= 500:
+                error_data = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+                error_code = error_data.get("errors", [{}])[0].get("code", "INTERNAL.SERVER.ERROR")
+                error_message = error_data.get("errors", [{}])[0].get("message", "Server error")
+                raise RuntimeError(f"FedEx OAuth Error ({response.status_code}): {error_code} - {error_message}")
+            
+            response.raise_for_status()
+            response_data = response.json()
+            
+            access_token = response_data.get("access_token")
+            expires_in = response_data.get("expires_in", 3600)  # Default 1 hour
+            
+            if not access_token:
+                raise ValueError("FedEx OAuth response missing access_token")
+            
+            # Cache token
+            expires_at = datetime.now() + timedelta(seconds=expires_in)
+            self._token_cache[carrier_api_id] = {
+                "token": access_token,
+                "expires_at": expires_at
+            }
+            
+            return access_token
+            
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 503:
+                error_data = e.response.json() if e.response.headers.get("content-type", "").startswith("application/json") else {}
+                error_code = error_data.get("errors", [{}])[0].get("code", "SERVICE.UNAVAILABLE.ERROR")
+                error_message = error_data.get("errors", [{}])[0].get("message", "Service unavailable")
+                raise RuntimeError(f"FedEx OAuth Error (503): {error_code} - {error_message}")
+            raise
     
     async def create_shipment(
         self,
@@ -154,10 +155,10 @@ class FedexClient:
         
         logger.info(f"FedEx Create Shipment Request Payload: {json.dumps(payload_serializable, indent=2, ensure_ascii=False)}")
         
-        async with httpx.AsyncClient(timeout=45.0) as client:
-            response = await self._make_request_with_retry(
-                client, "POST", url, headers=headers, json=payload_serializable
-            )
+        client = get_http_client("fedex")
+        response = await self._make_request_with_retry(
+            client, "POST", url, headers=headers, json=payload_serializable, timeout=45.0
+        )
         
         response_data = response.json()
         
@@ -194,10 +195,10 @@ class FedexClient:
         
         logger.info(f"FedEx Validate Shipment Request Payload: {json.dumps(payload_serializable, indent=2, ensure_ascii=False)}")
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await self._make_request_with_retry(
-                client, "POST", url, headers=headers, json=payload_serializable
-            )
+        client = get_http_client("fedex")
+        response = await self._make_request_with_retry(
+            client, "POST", url, headers=headers, json=payload_serializable
+        )
         
         response_data = response.json()
         
@@ -240,10 +241,10 @@ class FedexClient:
         logger.info(f"FedEx Get Async Results Request Method: POST")
         logger.info(f"FedEx Get Async Results Request Payload: {json.dumps(payload, indent=2, ensure_ascii=False)}")
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await self._make_request_with_retry(
-                client, "POST", url, headers=headers, json=payload
-            )
+        client = get_http_client("fedex")
+        response = await self._make_request_with_retry(
+            client, "POST", url, headers=headers, json=payload
+        )
         
         response_data = response.json()
         logger.info(f"FedEx Get Async Results Response Status: {response.status_code}")
@@ -277,10 +278,10 @@ class FedexClient:
         url = f"{self._get_base_url(credentials.use_sandbox)}/ship/v1/shipments/cancel"
         headers = self._get_headers(access_token)
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await self._make_request_with_retry(
-                client, "PUT", url, headers=headers, json=payload
-            )
+        client = get_http_client("fedex")
+        response = await self._make_request_with_retry(
+            client, "PUT", url, headers=headers, json=payload
+        )
         
         response_data = response.json()
         
@@ -336,10 +337,10 @@ class FedexClient:
         logger.info(f"FedEx Get Tracking Request Headers: {json.dumps({k: v if k != 'Authorization' else 'Bearer ***' for k, v in headers.items()}, indent=2)}")
         logger.info(f"FedEx Get Tracking Request Payload: {json.dumps(payload, indent=2, ensure_ascii=False)}")
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await self._make_request_with_retry(
-                client, "POST", url, headers=headers, json=payload
-            )
+        client = get_http_client("fedex")
+        response = await self._make_request_with_retry(
+            client, "POST", url, headers=headers, json=payload
+        )
         
         response_data = response.json()
         logger.info(f"FedEx Get Tracking Response Status: {response.status_code}")
@@ -1,17 +1,22 @@
 from __future__ import annotations
 
-import io
-import zipfile
 from decimal import Decimal
+from typing import IO, Iterator
 
 from openpyxl import Workbook
-from openpyxl.styles import Font
 
 from src.schemas.corrispettivo_schema import (
     CorrispettivoRiepilogoResponseSchema,
     CorrispettivoTaxCellSchema,
     CorrispettivoTaxColumnSchema,
 )
+from src.services.export.streaming import (
+    iter_file_chunks,
+    read_and_close,
+    save_workbook,
+    write_only_sheet,
+)
+from src.services.export.zip_stream import ZipStreamWriter
 
 
 class CorrispettiviExcelService:
@@ -64,28 +69,21 @@ class CorrispettiviExcelService:
             return f"Totale {self._format_date(riepilogo.rows[0].date)}"
         return f"Totale {riepilogo.month:02d}/{riepilogo.year}"
 
-    def build_riepilogo_workbook(
+    def write_riepilogo_workbook(
         self, riepilogo: CorrispettivoRiepilogoResponseSchema
-    ) -> bytes:
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = "Riepilogo"
-
+    ) -> IO[bytes]:
+        workbook = Workbook(write_only=True)
         columns = riepilogo.columns
-        sheet.append(self._riepilogo_headers(columns))
-        for cell in sheet[1]:
-            cell.font = Font(bold=True)
+        sheet = write_only_sheet(workbook, "Riepilogo", self._riepilogo_headers(columns))
 
+        month_cells = {
+            str(column.id_tax): CorrispettivoTaxCellSchema() for column in columns
+        }
         for row in riepilogo.rows:
             sheet.append(
                 [self._format_date(row.date)]
                 + self._riepilogo_row_values(columns, row.cells)
             )
-
-        month_cells = {
-            str(column.id_tax): CorrispettivoTaxCellSchema() for column in columns
-        }
-        for row in riepilogo.rows:
             for column in columns:
                 cell = row.cells.get(str(column.id_tax), self._zero_cell())
                 bucket = month_cells[str(column.id_tax)]
@@ -98,25 +96,33 @@ class CorrispettiviExcelService:
             [self._totals_label(riepilogo)]
             + self._riepilogo_row_values(columns, month_cells)
         )
+        return save_workbook(workbook)
+
+    def build_riepilogo_workbook(
+        self, riepilogo: CorrispettivoRiepilogoResponseSchema
+    ) -> bytes:
+        return read_and_close(self.write_riepilogo_workbook(riepilogo))
 
-        buffer = io.BytesIO()
-        workbook.save(buffer)
-        return buffer.getvalue()
+    def iter_registri_zip(
+        self,
+        consolidated_riepilogo: CorrispettivoRiepilogoResponseSchema,
+        by_country: dict[str, CorrispettivoRiepilogoResponseSchema],
+    ) -> Iterator[bytes]:
+        """ZIP dei registri in streaming: un workbook alla volta, inviato a chunk."""
+        entries = [("registro.xlsx", consolidated_riepilogo)] + [
+            (f"registro_{iso_code}.xlsx", riepilogo)
+            for iso_code, riepilogo in sorted(by_country.items())
+        ]
+        writer = ZipStreamWriter(duplicate_prefix="registro")
+        for filename, riepilogo in entries:
+            yield from writer.add_chunks(
+                filename, iter_file_chunks(self.write_riepilogo_workbook(riepilogo))
+            )
+        yield writer.close()
 
     def build_registri_zip(
         self,
         consolidated_riepilogo: CorrispettivoRiepilogoResponseSchema,
         by_country: dict[str, CorrispettivoRiepilogoResponseSchema],
     ) -> bytes:
-        buffer = io.BytesIO()
-        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
-            archive.writestr(
-                "registro.xlsx",
-                self.build_riepilogo_workbook(consolidated_riepilogo),
-            )
-            for iso_code, riepilogo in sorted(by_country.items()):
-                archive.writestr(
-                    f"registro_{iso_code}.xlsx",
-                    self.build_riepilogo_workbook(riepilogo),
-                )
-        return buffer.getvalue()
+        return b"".join(self.iter_registri_zip(consolidated_riepilogo, by_country))
@@ -1,14 +1,13 @@
 """Export massivo lista fatture (Excel, ZIP XML)."""
 from __future__ import annotations
 
-import io
-import zipfile
-from typing import Callable, Iterable, Sequence
+from typing import IO, Callable, Iterable, Iterator, Sequence
 
 from openpyxl import Workbook
-from openpyxl.styles import Font
 
 from src.schemas.fiscal_document_schema import InvoiceListExportItemSchema
+from src.services.export.streaming import read_and_close, save_workbook, write_only_sheet
+from src.services.export.zip_stream import ZipStreamWriter
 
 
 class FiscalDocumentExportService:
@@ -64,42 +63,52 @@ class FiscalDocumentExportService:
             item.products_total_price_with_tax,
         ]
 
-    def build_list_xlsx(
+    def write_list_xlsx(
         self,
         items: Iterable[InvoiceListExportItemSchema],
         *,
         sheet_title: str = "Fatture",
-    ) -> bytes:
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = sheet_title
-        sheet.append(self.LIST_HEADERS)
-        for cell in sheet[1]:
-            cell.font = Font(bold=True)
+    ) -> IO[bytes]:
+        """Workbook write-only su file temporaneo: ``items`` può essere un iteratore sul DB."""
+        workbook = Workbook(write_only=True)
+        sheet = write_only_sheet(workbook, sheet_title, self.LIST_HEADERS)
         for item in items:
             sheet.append(self._list_row(item))
+        return save_workbook(workbook)
 
-        buffer = io.BytesIO()
-        workbook.save(buffer)
-        return buffer.getvalue()
+    def build_list_xlsx(
+        self,
+        items: Iterable[InvoiceListExportItemSchema],
+        *,
+        sheet_title: str = "Fatture",
+    ) -> bytes:
+        return read_and_close(self.write_list_xlsx(items, sheet_title=sheet_title))
 
     @staticmethod
-    def _build_zip(
-        entries: Sequence[tuple[bytes, str]],
+    def _iter_zip(
+        entries: Iterable[tuple[bytes, str]],
         duplicate_prefix: str,
-    ) -> bytes:
-        buffer = io.BytesIO()
-        used_names: set[str] = set()
+    ) -> Iterator[bytes]:
+        writer = ZipStreamWriter(duplicate_prefix=duplicate_prefix)
+        for payload, filename in entries:
+            yield writer.add(filename, payload)
+        yield writer.close()
 
-        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
-            for index, (payload, filename) in enumerate(entries, start=1):
-                unique_name = filename
-                if unique_name in used_names:
-                    unique_name = f"{duplicate_prefix}-{index}{unique_name[unique_name.rfind('.'):]}"
-                used_names.add(unique_name)
-                archive.writestr(unique_name, payload)
+    def iter_xml_zip(
+        self,
+        invoice_ids: Sequence[int],
+        xml_loader: Callable[[int], tuple[bytes, str]],
+        *,
+        duplicate_prefix: str = "fattura",
+    ) -> Iterator[bytes]:
+        """
+        ZIP con un XML FatturaPA per documento, prodotto in streaming.
 
-        return buffer.getvalue()
+        xml_loader: callable(id_fiscal_document) -> (bytes, filename), chiamata
+        un documento alla volta mentre l'archivio viene inviato.
+        """
+        entries = (xml_loader(invoice_id) for invoice_id in invoice_ids)
+        return self._iter_zip(entries, duplicate_prefix)
 
     def build_xml_zip(
         self,
@@ -108,10 +117,7 @@ class FiscalDocumentExportService:
         *,
         duplicate_prefix: str = "fattura",
     ) -> bytes:
-        """
-        Crea ZIP con un XML FatturaPA per ogni documento.
-
-        xml_loader: callable(id_fiscal_document) -> (bytes, filename)
-        """
-        entries = [xml_loader(invoice_id) for invoice_id in invoice_ids]
-        return self._build_zip(entries, duplicate_prefix)
+        """Come iter_xml_zip, con l'archivio completo in bytes."""
+        return b"".join(
+            self.iter_xml_zip(invoice_ids, xml_loader, duplicate_prefix=duplicate_prefix)
+        )
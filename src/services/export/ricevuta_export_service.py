@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import csv
 import io
-from typing import Iterable, List, Optional
+from typing import IO, Iterable, List, Optional
 
 from openpyxl import Workbook
 from openpyxl.styles import Font
@@ -13,6 +13,12 @@ from src.schemas.ricevuta_schema import (
     RicevutaListItemSchema,
     RicevutaResponseSchema,
 )
+from src.services.export.streaming import (
+    read_and_close,
+    save_workbook,
+    spooled_file,
+    write_only_sheet,
+)
 
 
 class RicevutaExportService:
@@ -149,13 +155,25 @@ class RicevutaExportService:
             writer.writerow(row)
         return buffer.getvalue().encode("utf-8-sig")
 
+    def write_list_csv(self, items: Iterable[RicevutaListItemSchema]) -> IO[bytes]:
+        """CSV della lista su file temporaneo, posizionato all'inizio."""
+        handle = spooled_file()
+        text = io.TextIOWrapper(handle, encoding="utf-8-sig", newline="")
+        try:
+            writer = csv.writer(text, delimiter=";", lineterminator="\n")
+            writer.writerow(self.LIST_HEADERS)
+            for item in items:
+                writer.writerow(self._list_row(item))
+            text.flush()
+        except Exception:
+            text.close()
+            raise
+        text.detach()
+        handle.seek(0)
+        return handle
+
     def build_list_csv(self, items: Iterable[RicevutaListItemSchema]) -> bytes:
-        buffer = io.StringIO()
-        writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
-        writer.writerow(self.LIST_HEADERS)
-        for item in items:
-            writer.writerow(self._list_row(item))
-        return buffer.getvalue().encode("utf-8-sig")
+        return read_and_close(self.write_list_csv(items))
 
     def build_detail_xlsx(self, ricevuta: RicevutaResponseSchema) -> bytes:
         workbook = Workbook()
@@ -184,16 +202,13 @@ class RicevutaExportService:
         workbook.save(buffer)
         return buffer.getvalue()
 
-    def build_list_xlsx(self, items: Iterable[RicevutaListItemSchema]) -> bytes:
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = "Ricevute"
-        sheet.append(self.LIST_HEADERS)
-        for cell in sheet[1]:
-            cell.font = Font(bold=True)
+    def write_list_xlsx(self, items: Iterable[RicevutaListItemSchema]) -> IO[bytes]:
+        """Excel della lista in modalità write-only, su file temporaneo."""
+        workbook = Workbook(write_only=True)
+        sheet = write_only_sheet(workbook, "Ricevute", self.LIST_HEADERS)
         for item in items:
             sheet.append(self._list_row(item))
+        return save_workbook(workbook)
 
-        buffer = io.BytesIO()
-        workbook.save(buffer)
-        return buffer.getvalue()
+    def build_list_xlsx(self, items: Iterable[RicevutaListItemSchema]) -> bytes:
+        return read_and_close(self.write_list_xlsx(items))
@@ -0,0 +1,63 @@
+"""Utility per export in streaming: file temporanei, workbook write-only, lettura a chunk."""
+from __future__ import annotations
+
+import tempfile
+from typing import IO, Iterator, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+STREAM_CHUNK_SIZE = 64 * 1024
+# Oltre questa dimensione il contenuto passa dalla memoria a un file temporaneo su disco
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def spooled_file() -> IO[bytes]:
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+
+def iter_file_chunks(handle: IO[bytes], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Legge il file a chunk e lo chiude al termine (body di StreamingResponse)."""
+    try:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        handle.close()
+
+
+def read_and_close(handle: IO[bytes]) -> bytes:
+    with handle:
+        return handle.read()
+
+
+def write_only_sheet(workbook: Workbook, title: str, headers: Sequence[str]):
+    """
+    Foglio di un workbook ``Workbook(write_only=True)`` con intestazione in grassetto.
+
+    In modalità write-only le righe vengono serializzate subito su file temporaneo:
+    la memoria non cresce con il numero di righe.
+    """
+    sheet = workbook.create_sheet(title)
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.font = Font(bold=True)
+        header_cells.append(cell)
+    sheet.append(header_cells)
+    return sheet
+
+
+def save_workbook(workbook: Workbook) -> IO[bytes]:
+    """Salva il workbook su file temporaneo, posizionato all'inizio."""
+    handle = spooled_file()
+    try:
+        workbook.save(handle)
+    except Exception:
+        handle.close()
+        raise
+    handle.seek(0)
+    return handle
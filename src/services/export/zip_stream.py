@@ -0,0 +1,105 @@
+"""ZIP scritto in streaming: ogni voce viene restituita come chunk appena compressa."""
+from __future__ import annotations
+
+import io
+import zipfile
+from typing import Iterable, Iterator, List, Optional
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Destinazione non seekable per ZipFile: accumula i byte scritti fino al drain.
+
+    Senza seek() zipfile usa i data descriptor, quindi non torna mai indietro
+    sull'output già emesso.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._offset += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStreamWriter:
+    """
+    Archivio ZIP prodotto voce per voce: in memoria resta solo la voce corrente.
+
+    Uso::
+
+        writer = ZipStreamWriter(duplicate_prefix="fattura")
+        for payload, filename in entries:
+            yield writer.add(filename, payload)
+        yield from writer.add_chunks("registro.xlsx", iter_file_chunks(handle))
+        yield writer.close()
+    """
+
+    def __init__(
+        self,
+        *,
+        duplicate_prefix: str = "file",
+        compression: int = zipfile.ZIP_DEFLATED,
+        compresslevel: Optional[int] = None,
+    ) -> None:
+        self._sink = _ChunkSink()
+        self._archive = zipfile.ZipFile(
+            self._sink, "w", compression=compression, compresslevel=compresslevel
+        )
+        self._duplicate_prefix = duplicate_prefix
+        self._used_names: set[str] = set()
+        self._count = 0
+
+    def _unique_name(self, filename: str) -> str:
+        # Nome duplicato: prefisso + posizione della voce nell'archivio (es. fattura-3.xml)
+        if filename not in self._used_names:
+            return filename
+        extension = filename[filename.rfind("."):] if "." in filename else ""
+        name = f"{self._duplicate_prefix}-{self._count}{extension}"
+        # Anche il nome di ripiego può coincidere con una voce reale (es. DDT-4.pdf)
+        suffix = 1
+        while name in self._used_names:
+            suffix += 1
+            name = f"{self._duplicate_prefix}-{self._count}-{suffix}{extension}"
+        return name
+
+    def _next_name(self, filename: str) -> str:
+        self._count += 1
+        name = self._unique_name(filename)
+        self._used_names.add(name)
+        return name
+
+    def add(self, filename: str, payload: bytes) -> bytes:
+        """Aggiunge una voce e restituisce i byte ZIP pronti da inviare."""
+        self._archive.writestr(self._next_name(filename), payload)
+        return self._sink.drain()
+
+    def add_chunks(self, filename: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Aggiunge una voce letta a chunk (es. file temporaneo), emettendo i byte man mano."""
+        with self._archive.open(self._next_name(filename), "w") as entry:
+            for chunk in chunks:
+                entry.write(chunk)
+                data = self._sink.drain()
+                if data:
+                    yield data
+        yield self._sink.drain()
+
+    def close(self) -> bytes:
+        """Chiude l'archivio e restituisce la central directory."""
+        self._archive.close()
+        return self._sink.drain()
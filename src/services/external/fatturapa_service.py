@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
 
+from src.core.http_clients import get_http_client
 from src.models.tax import Tax
 from src.models import Order, Address, FiscalDocument, FiscalDocumentDetail, OrderDetail, Country
 from src.repository.app_configuration_repository import AppConfigurationRepository
@@ -642,15 +643,15 @@ class FatturaPAService:
         headers = kwargs.get('headers', {})
         headers['User-Agent'] = self.user_agent
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            if method.upper() == 'GET':
-                response = await client.get(url, headers=headers)
-            elif method.upper() == 'PUT':
-                response = await client.put(url, headers=headers, content=kwargs.get('content'))
-            else:
-                raise ValueError(f"Metodo HTTP non supportato: {method}")
-            
-            return response.status_code, response.headers.get('content-type', ''), response.text
+        client = get_http_client("fatturapa")
+        if method.upper() == 'GET':
+            response = await client.get(url, headers=headers, timeout=self.timeout)
+        elif method.upper() == 'PUT':
+            response = await client.put(url, headers=headers, content=kwargs.get('content'), timeout=self.timeout)
+        else:
+            raise ValueError(f"Metodo HTTP non supportato: {method}")
+        
+        return response.status_code, response.headers.get('content-type', ''), response.text
     
     async def verify_api(self) -> bool:
         """Verifica la connessione API"""
@@ -1,6 +1,6 @@
 """Interfaccia service ricevute."""
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Iterator, Optional
 
 from src.schemas.ricevuta_schema import (
     RicevutaCreateSchema,
@@ -59,6 +59,6 @@ class IRicevutaService(ABC):
     @abstractmethod
     def export_ricevute(
         self, filters: RicevutaFiltersSchema, fmt: str
-    ) -> tuple[bytes, str, str]:
-        """Export massivo (lista filtrata)."""
+    ) -> tuple[Iterator[bytes], str, str]:
+        """Export massivo (lista filtrata): (chunk del file, media_type, filename)."""
         pass
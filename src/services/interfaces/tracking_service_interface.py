@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 
 class ITrackingService(ABC):
@@ -26,3 +26,17 @@ class ITrackingService(ABC):
         """
         pass
 
+    async def get_tracking_with_failures(
+        self, tracking_numbers: List[str], carrier_api_id: int
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Come get_tracking, riportando anche i tracking la cui richiesta è fallita
+        (da ripianificare a breve dal polling).
+
+        Default: una chiamata per tutto il batch, che in errore solleva eccezione.
+        I servizi con una richiesta per parcel (BRT) riportano i singoli fallimenti.
+
+        Returns:
+            Tuple (risultati normalizzati, tracking falliti)
+        """
+        return await self.get_tracking(tracking_numbers, carrier_api_id), []
@@ -5,10 +5,14 @@ This module contains services for media and image handling.
 """
 
 from .image_service import ImageService
+from .image_ingest import ImageIngestPipeline, ImageIngestResult, ImageManifest
 from .image_cache_service import ImageCacheService, get_image_cache_service
 
 __all__ = [
     "ImageService",
+    "ImageIngestPipeline",
+    "ImageIngestResult",
+    "ImageManifest",
     "ImageCacheService", 
     "get_image_cache_service",
 ]
@@ -75,7 +75,8 @@ class ImageCacheService:
     @cached(
         ttl=TTL_PRESETS["products_list"],  # 1 minuto
         key="images_batch:{platform_id}:{product_ids_hash}",
-        layer="memory"  # Solo memory per batch queries
+        layer="memory",  # Solo memory per batch queries
+        namespace="images_batch"
     )
     async def get_batch_image_metadata(self, platform_id: int, product_ids: List[int]) -> Dict[int, Dict[str, Any]]:
         """
@@ -113,7 +114,7 @@ class ImageCacheService:
         await self.cache_manager.delete(cache_key)
         
         # Invalida batch cache che potrebbero contenere questo prodotto
-        await self.cache_manager.delete_pattern(f"images_batch:{platform_id}:*")
+        await self.cache_manager.invalidate(f"images_batch:{platform_id}:*")
     
     async def invalidate_platform_images(self, platform_id: int):
         """
@@ -132,7 +133,7 @@ class ImageCacheService:
         ]
         
         for pattern in patterns:
-            await self.cache_manager.delete_pattern(pattern)
+            await self.cache_manager.invalidate(pattern)
     
     async def warm_cache_for_products(self, platform_id: int, product_ids: List[int], batch_size: int = 50):
         """
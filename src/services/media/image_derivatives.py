@@ -0,0 +1,160 @@
+"""
+Derivati responsive delle immagini prodotto.
+
+All'acquisizione (ImageIngestPipeline) ogni immagine viene salvata, oltre al file
+storico `product_{id}.jpg`, in più misure (thumb/list/detail) e formati (AVIF,
+WebP, JPEG di fallback) accanto all'originale:
+
+    media/product_images/{platform}/product_{id}.{size}.{ext}
+
+CachedStaticFiles sceglie il derivato in base al parametro `size` e all'header
+`Accept`; senza `size` e senza formati moderni accettati serve il file storico.
+"""
+
+import io
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image, features
+
+from src.core.settings import ImageIngestSettings
+
+# formato -> (estensione, media type, modulo PIL per il controllo di supporto)
+FORMATS: Dict[str, Tuple[str, str, Optional[str]]] = {
+    "avif": ("avif", "image/avif", "avif"),
+    "webp": ("webp", "image/webp", "webp"),
+    "jpeg": ("jpg", "image/jpeg", None),
+}
+
+
+def parse_sizes(spec: str) -> Dict[str, Tuple[int, int]]:
+    """Interpreta `thumb=150x150,list=400x300` in {nome: (larghezza, altezza)}."""
+    sizes: Dict[str, Tuple[int, int]] = {}
+    for item in (spec or "").split(","):
+        name, _, dimensions = item.strip().partition("=")
+        width, _, height = dimensions.lower().partition("x")
+        if name and width.isdigit() and height.isdigit():
+            sizes[name.strip()] = (int(width), int(height))
+    return sizes
+
+
+def available_formats(spec: str) -> List[str]:
+    """Formati configurati supportati da Pillow, in ordine di preferenza; JPEG sempre incluso."""
+    formats = []
+    for name in (spec or "").split(","):
+        name = name.strip().lower()
+        if name == "jpg":
+            name = "jpeg"
+        if name not in FORMATS or name in formats:
+            continue
+        feature = FORMATS[name][2]
+        if feature and not features.check(feature):
+            continue
+        formats.append(name)
+    if "jpeg" not in formats:
+        formats.append("jpeg")
+    return formats
+
+
+def derivative_suffix(size: str, image_format: str) -> str:
+    """Suffisso del file derivato, es. `list.webp`."""
+    return f"{size}.{FORMATS[image_format][0]}"
+
+
+def derivative_filename(filename: str, suffix: str) -> str:
+    """`product_5.jpg` + `list.webp` -> `product_5.list.webp`."""
+    stem = filename.rsplit(".", 1)[0]
+    return f"{stem}.{suffix}"
+
+
+def expected_derivatives(settings: ImageIngestSettings) -> List[str]:
+    """Suffissi dei derivati attesi con la configurazione corrente (vuota se disattivati)."""
+    if not settings.image_derivatives_enabled:
+        return []
+    formats = available_formats(settings.image_derivative_formats)
+    return sorted(
+        derivative_suffix(size, image_format)
+        for size in parse_sizes(settings.image_derivative_sizes)
+        for image_format in formats
+    )
+
+
+def render_derivatives(
+    content: bytes,
+    sizes: Dict[str, Tuple[int, int]],
+    formats: Iterable[str],
+    quality: int,
+) -> Dict[str, bytes]:
+    """
+    Genera tutti i derivati di un'immagine: {suffisso: contenuto}.
+
+    Funzione di modulo (serializzabile) per il process pool. Resampling LANCZOS;
+    le immagini più piccole della misura richiesta non vengono ingrandite.
+    """
+    source = Image.open(io.BytesIO(content))
+    source.load()
+    has_alpha = source.mode in ('RGBA', 'LA') or (source.mode == 'P' and 'transparency' in source.info)
+    source = source.convert('RGBA' if has_alpha else 'RGB')
+
+    results: Dict[str, bytes] = {}
+    for size, dimensions in sizes.items():
+        image = source.copy()
+        image.thumbnail(dimensions, Image.Resampling.LANCZOS)
+        for image_format in formats:
+            frame = image
+            if image_format == "jpeg" and frame.mode != 'RGB':
+                # JPEG senza alpha: trasparenza su sfondo bianco
+                background = Image.new('RGB', frame.size, (255, 255, 255))
+                background.paste(frame, mask=frame.getchannel('A'))
+                frame = background
+            output = io.BytesIO()
+            if image_format == "jpeg":
+                frame.save(output, format='JPEG', quality=quality, optimize=True, progressive=True)
+            elif image_format == "webp":
+                frame.save(output, format='WEBP', quality=quality, method=4)
+            else:
+                frame.save(output, format='AVIF', quality=max(1, quality - 20))
+            results[derivative_suffix(size, image_format)] = output.getvalue()
+    return results
+
+
+def _accepted_media_types(accept: str) -> List[str]:
+    accepted = []
+    for part in (accept or "").split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        q = next((p[2:] for p in params if p.startswith("q=")), "1")
+        try:
+            if float(q) <= 0:
+                continue
+        except ValueError:
+            pass
+        if media_type:
+            accepted.append(media_type.lower())
+    return accepted
+
+
+def negotiate_derivatives(
+    size: Optional[str],
+    accept: str,
+    settings: ImageIngestSettings,
+) -> List[str]:
+    """
+    Suffissi dei derivati candidati, in ordine di preferenza.
+
+    - `size` sconosciuto o assente: misura di default (IMAGE_DEFAULT_SIZE), ma solo
+      se il client accetta un formato moderno; altrimenti lista vuota (file storico).
+    - formati: ordine di IMAGE_DERIVATIVE_FORMATS filtrato per `Accept`; il JPEG
+      chiude sempre la lista.
+    """
+    if not settings.image_derivatives_enabled:
+        return []
+    sizes = parse_sizes(settings.image_derivative_sizes)
+    accepted = _accepted_media_types(accept)
+    modern = [
+        image_format for image_format in available_formats(settings.image_derivative_formats)
+        if image_format != "jpeg" and FORMATS[image_format][1] in accepted
+    ]
+    if size not in sizes:
+        if not modern or settings.image_default_size not in sizes:
+            return []
+        size = settings.image_default_size
+    return [derivative_suffix(size, image_format) for image_format in modern + ["jpeg"]]
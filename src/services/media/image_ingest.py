@@ -0,0 +1,406 @@
+"""
+Pipeline asincrona di acquisizione delle immagini prodotto.
+
+Il download storico (requests bloccante + compressione PIL inline) girava dentro
+i task asyncio della sincronizzazione e bloccava l'event loop per ogni immagine.
+Qui:
+- i download usano una sessione aiohttp condivisa (connessioni riutilizzate,
+  limite IMAGE_DOWNLOAD_CONCURRENCY) con richieste condizionali ETag/Last-Modified;
+- ridimensionamento ed encoding (file storico più derivati responsive, vedi
+  image_derivatives) girano in un process pool (IMAGE_INGEST_WORKERS);
+- i file vengono scritti in modo atomico (file temporaneo + os.replace);
+- un manifest JSON per piattaforma registra, per ogni file locale, URL sorgente,
+  hash del contenuto scaricato, ETag/Last-Modified e derivati generati.
+
+Alla risincronizzazione le immagini già presenti con URL sorgente e derivati
+invariati vengono saltate senza contattare l'e-commerce (IMAGE_REVALIDATE=true
+per forzare la richiesta condizionale).
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from PIL import Image
+
+from src.core.settings import get_image_ingest_settings
+from src.services.media.image_derivatives import (
+    available_formats,
+    derivative_filename,
+    expected_derivatives,
+    parse_sizes,
+    render_derivatives,
+)
+
+if TYPE_CHECKING:
+    from src.services.media.image_service import ImageService
+
+logger = logging.getLogger(__name__)
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_executor: Optional[Executor] = None
+_thread_executor: Optional[ThreadPoolExecutor] = None
+
+
+def compress_image(content: bytes, max_size: Tuple[int, int], quality: int) -> bytes:
+    """
+    Ridimensiona e ricodifica un'immagine in JPEG.
+
+    Funzione di modulo (serializzabile) per l'esecuzione nel process pool.
+    Se la conversione fallisce restituisce il contenuto originale.
+    """
+    try:
+        image = Image.open(io.BytesIO(content))
+
+        # Converti in RGB se necessario (per JPEG)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGB')
+
+        max_width, max_height = max_size
+        if image.width > max_width or image.height > max_height:
+            image.thumbnail((max_width, max_height), Image.Resampling.NEAREST)  # Più veloce di LANCZOS
+
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=quality, optimize=True)
+        return output.getvalue()
+    except Exception as e:
+        print(f"Warning: Failed to compress image: {str(e)}")
+        return content
+
+
+def encode_product_image(
+    content: bytes,
+    max_size: Tuple[int, int],
+    quality: int,
+    sizes: Dict[str, Tuple[int, int]],
+    formats: List[str],
+    derivative_quality: int,
+) -> Tuple[bytes, Dict[str, bytes]]:
+    """File storico compresso più derivati responsive, in un'unica chiamata al pool."""
+    base = compress_image(content, max_size, quality)
+    if not sizes:
+        return base, {}
+    try:
+        return base, render_derivatives(content, sizes, formats, derivative_quality)
+    except Exception as e:
+        print(f"Warning: Failed to render image derivatives: {str(e)}")
+        return base, {}
+
+
+def write_file_atomic(file_path: Path, content: bytes) -> None:
+    """
+    Scrive un file in modo atomico: file temporaneo nella stessa cartella e os.replace.
+
+    Un processo interrotto o un lettore concorrente (mount statico /media) non vede
+    mai un'immagine scritta a metà.
+    """
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(content)
+        os.replace(tmp_name, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def _get_thread_executor() -> ThreadPoolExecutor:
+    global _thread_executor
+    if _thread_executor is None:
+        _thread_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image-ingest")
+    return _thread_executor
+
+
+def get_image_executor() -> Executor:
+    """Executor condiviso per l'encoding (process pool, o thread pool se IMAGE_INGEST_WORKERS=0)."""
+    global _executor
+    if _executor is None:
+        workers = get_image_ingest_settings().image_ingest_workers
+        if workers > 0:
+            # spawn: i worker non ereditano loop, connessioni DB e thread del processo web
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _executor = _get_thread_executor()
+    return _executor
+
+
+def shutdown_image_executor() -> None:
+    """Chiude i pool di encoding immagini (lifespan di main)."""
+    global _executor, _thread_executor
+    if _executor is not None and _executor is not _thread_executor:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    if _thread_executor is not None:
+        _thread_executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _thread_executor = None
+
+
+class ImageManifest:
+    """
+    Manifest persistente delle immagini di una piattaforma.
+
+    Chiave: percorso pubblico locale (`/media/product_images/{platform}/product_{id}.jpg`);
+    valore: `url` sorgente, `sha256` del contenuto scaricato, `etag`, `last_modified`,
+    `derivatives` (suffissi dei derivati generati) e `updated_at`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception as e:
+                # Manifest illeggibile: si riparte vuoti, le immagini verranno riverificate
+                logger.warning(f"Manifest immagini non leggibile ({self.path}): {e}")
+
+    def get(self, img_url: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(img_url)
+
+    def record(
+        self,
+        img_url: str,
+        url: str,
+        *,
+        sha256: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        derivatives: Optional[List[str]] = None,
+    ) -> None:
+        self.entries[img_url] = {
+            "url": url,
+            "sha256": sha256,
+            "etag": etag,
+            "last_modified": last_modified,
+            "derivatives": sorted(derivatives or []),
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        content = json.dumps(self.entries, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        write_file_atomic(self.path, content)
+        self._dirty = False
+
+
+@dataclass
+class ImageIngestResult:
+    """
+    Esito dell'acquisizione di un'immagine.
+
+    Con `failed`, `img_url` è il file locale già presente (mantenuto) o None se
+    non esiste ancora un'immagine valida.
+    """
+
+    status: str  # downloaded | unchanged | not_modified | failed
+    img_url: Optional[str] = None
+
+
+@dataclass
+class _Fetched:
+    status: int
+    body: bytes = b""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ImageIngestPipeline:
+    """
+    Acquisizione asincrona delle immagini prodotto, da usare come context manager::
+
+        async with ImageIngestPipeline(image_service) as pipeline:
+            result = await pipeline.ingest(remote_url, id_product, platform_id)
+
+    All'uscita chiude la sessione HTTP e salva i manifest modificati.
+    """
+
+    def __init__(self, image_service: "ImageService", *, revalidate: Optional[bool] = None):
+        self.image_service = image_service
+        self.settings = get_image_ingest_settings()
+        self.revalidate = self.settings.image_revalidate if revalidate is None else revalidate
+        self.derivatives = expected_derivatives(self.settings)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._manifests: Dict[int, ImageManifest] = {}
+
+    async def __aenter__(self) -> "ImageIngestPipeline":
+        connector_kwargs: Dict[str, Any] = {"limit": max(1, self.settings.image_download_concurrency)}
+        if not self.image_service.verify_ssl:
+            connector_kwargs["ssl"] = False
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(**connector_kwargs),
+            timeout=aiohttp.ClientTimeout(total=self.settings.image_download_timeout),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        await asyncio.to_thread(self.save_manifests)
+
+    def save_manifests(self) -> None:
+        for manifest in self._manifests.values():
+            try:
+                manifest.save()
+            except Exception as e:
+                logger.warning(f"Salvataggio manifest immagini fallito ({manifest.path}): {e}")
+
+    def manifest(self, platform_id: int) -> ImageManifest:
+        if platform_id not in self._manifests:
+            path = Path(self.settings.image_manifest_dir) / f"platform_{platform_id}.json"
+            self._manifests[platform_id] = ImageManifest(path)
+        return self._manifests[platform_id]
+
+    def _target(self, platform_id: int, product_id: int) -> Tuple[Path, str]:
+        file_path = self.image_service.base_path / str(platform_id) / f"product_{product_id}.jpg"
+        return file_path, self.image_service.generate_local_image_path(platform_id, product_id)
+
+    def stored_image(self, product_id: int, platform_id: int) -> Optional[str]:
+        """img_url del file locale già presente per il prodotto (None se assente)."""
+        file_path, img_url = self._target(platform_id, product_id)
+        return img_url if file_path.exists() else None
+
+    def is_current(self, image_url: str, product_id: int, platform_id: int) -> bool:
+        """
+        True se il file locale esiste, proviene da `image_url` e ha tutti i derivati
+        previsti dalla configurazione corrente.
+
+        I file salvati prima del manifest vengono adottati così come sono (stesso
+        comportamento del controllo di esistenza precedente) solo se non sono previsti
+        derivati; se il manifest riporta un URL diverso (immagine di copertina cambiata)
+        o derivati diversi (misure/formati cambiati) l'immagine va riscaricata.
+        """
+        file_path, img_url = self._target(platform_id, product_id)
+        if not file_path.exists():
+            return False
+        manifest = self.manifest(platform_id)
+        entry = manifest.get(img_url)
+        if entry is None:
+            if self.derivatives:
+                return False
+            manifest.record(img_url, image_url)
+            return True
+        return self._entry_current(entry, image_url)
+
+    def _entry_current(self, entry: Optional[Dict[str, Any]], image_url: str) -> bool:
+        return (
+            entry is not None
+            and entry.get("url") == image_url
+            and sorted(entry.get("derivatives") or []) == self.derivatives
+        )
+
+    async def ingest(self, image_url: str, product_id: int, platform_id: int) -> ImageIngestResult:
+        """Scarica (se necessario), ridimensiona e salva l'immagine di un prodotto."""
+        if self._session is None:
+            raise RuntimeError("ImageIngestPipeline va usata come async context manager")
+
+        file_path, img_url = self._target(platform_id, product_id)
+        if not self.revalidate and self.is_current(image_url, product_id, platform_id):
+            return ImageIngestResult("unchanged", img_url)
+
+        manifest = self.manifest(platform_id)
+        entry = manifest.get(img_url)
+        same_source = file_path.exists() and self._entry_current(entry, image_url)
+
+        headers = {}
+        if same_source:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            fetched = await self._fetch(image_url, headers)
+        except Exception as e:
+            print(f"Warning: Failed to download image from {image_url}: {str(e)}")
+            return ImageIngestResult("failed", self.stored_image(product_id, platform_id))
+
+        if fetched.status == 304 and same_source:
+            return ImageIngestResult("not_modified", img_url)
+        if fetched.status != 200:
+            print(f"Warning: Failed to download image: HTTP {fetched.status}")
+            return ImageIngestResult("failed", self.stored_image(product_id, platform_id))
+
+        digest = hashlib.sha256(fetched.body).hexdigest()
+        if same_source and entry.get("sha256") == digest:
+            # Stesso contenuto con validatori nuovi: aggiorna solo il manifest
+            manifest.record(
+                img_url, image_url, sha256=digest, etag=fetched.etag,
+                last_modified=fetched.last_modified, derivatives=entry.get("derivatives"),
+            )
+            return ImageIngestResult("not_modified", img_url)
+
+        content, derivatives = await self._encode(fetched.body)
+        await asyncio.to_thread(self._write_files, file_path, content, derivatives)
+        manifest.record(
+            img_url, image_url, sha256=digest, etag=fetched.etag,
+            last_modified=fetched.last_modified, derivatives=list(derivatives),
+        )
+        return ImageIngestResult("downloaded", img_url)
+
+    @staticmethod
+    def _write_files(file_path: Path, content: bytes, derivatives: Dict[str, bytes]) -> None:
+        # Derivati prima del file storico: chi vede il nuovo originale trova già le varianti
+        for suffix, data in derivatives.items():
+            write_file_atomic(file_path.with_name(derivative_filename(file_path.name, suffix)), data)
+        write_file_atomic(file_path, content)
+
+    async def _fetch(self, image_url: str, headers: Dict[str, str]) -> _Fetched:
+        """GET con retry su 429/5xx ed errori di rete (backoff breve, come la sessione requests storica)."""
+        retries = max(0, self.settings.image_download_retries)
+        for attempt in range(retries + 1):
+            try:
+                async with self._session.get(image_url, headers=headers) as response:
+                    if response.status in _RETRY_STATUSES and attempt < retries:
+                        await asyncio.sleep(0.1 * (2 ** attempt))
+                        continue
+                    body = await response.read() if response.status == 200 else b""
+                    return _Fetched(
+                        status=response.status,
+                        body=body,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= retries:
+                    raise
+                await asyncio.sleep(0.1 * (2 ** attempt))
+        raise RuntimeError("unreachable")
+
+    async def _encode(self, content: bytes) -> Tuple[bytes, Dict[str, bytes]]:
+        loop = asyncio.get_running_loop()
+        enabled = self.settings.image_derivatives_enabled
+        task = partial(
+            encode_product_image,
+            content,
+            tuple(self.image_service.max_image_size),
+            self.image_service.image_quality,
+            parse_sizes(self.settings.image_derivative_sizes) if enabled else {},
+            available_formats(self.settings.image_derivative_formats),
+            self.settings.image_derivative_quality,
+        )
+        return await loop.run_in_executor(get_image_executor(), task)
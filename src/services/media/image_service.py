@@ -27,8 +27,8 @@ from pathlib import Path
 from urllib.parse import urlparse
 import hashlib
 from datetime import datetime
-from PIL import Image
-import io
+
+from src.services.media.image_ingest import compress_image, write_file_atomic
 
 
 class ImageService:
@@ -152,34 +152,11 @@ class ImageService:
         Returns:
             Contenuto binario dell'immagine compressa
         """
-        try:
-            # Apri l'immagine
-            image = Image.open(io.BytesIO(content))
-            
-            # Converti in RGB se necessario (per JPEG)
-            if image.mode in ('RGBA', 'LA', 'P'):
-                image = image.convert('RGB')
-            
-            # Ridimensiona usando parametri configurabili
-            max_width, max_height = self.max_image_size
-            if image.width > max_width or image.height > max_height:
-                image.thumbnail((max_width, max_height), Image.Resampling.NEAREST)  # Più veloce di LANCZOS
-            
-            # Comprimi usando qualità configurabile per velocità massima
-            output = io.BytesIO()
-            image.save(output, format='JPEG', quality=self.image_quality, optimize=True)
-            
-            return output.getvalue()
-            
-        except Exception as e:
-            # Se la compressione fallisce, restituisci l'originale
-            print(f"Warning: Failed to compress image: {str(e)}")
-            return content
+        return compress_image(content, self.max_image_size, self.image_quality)
     
     def _write_file_sync(self, file_path: Path, content: bytes):
-        """Metodo helper sincrono per scrivere file"""
-        with open(file_path, 'wb') as f:
-            f.write(content)
+        """Metodo helper sincrono per scrivere file (scrittura atomica)"""
+        write_file_atomic(file_path, content)
     
     def generate_prestashop_image_url(
         self, 
@@ -391,6 +368,9 @@ class ImageService:
             file_path = self.base_path / normalized
             if file_path.exists():
                 file_path.unlink()
+                # Derivati responsive (product_{id}.{size}.{ext}) generati all'acquisizione
+                for derivative in file_path.parent.glob(f"{file_path.stem}.*.*"):
+                    derivative.unlink(missing_ok=True)
                 return True
             return False
         except Exception:
@@ -0,0 +1,306 @@
+"""
+Export PDF massivo (fatture / note di credito, DDT, preventivi).
+
+La preparazione dei documenti usa la sessione DB ed è sequenziale; il disegno gira
+nel pool di rendering (render_pool) passando dalla cache PDF, con al massimo
+``PDF_BULK_CONCURRENCY`` documenti in corso. I risultati arrivano nell'ordine
+richiesto e vengono scritti subito nell'output:
+
+- **zip**: un PDF per documento, archivio prodotto in streaming (in memoria solo
+  i documenti in corso di rendering);
+- **pdf**: unico PDF unito con pypdf, salvato su file temporaneo e poi inviato a
+  chunk. pypdf tiene in memoria le pagine fino al salvataggio, per questo il
+  numero di documenti è limitato da ``PDF_BULK_MERGE_MAX_DOCUMENTS``.
+
+I documenti che non si riescono a generare non interrompono l'export: nello ZIP
+sono elencati in ``errori.txt``, nel PDF unito sono conteggiati nell'header
+``X-Bulk-Pdf-Failed``.
+"""
+
+import asyncio
+import inspect
+import logging
+import zipfile
+from collections import deque
+from dataclasses import dataclass
+from datetime import date
+from io import BytesIO
+from typing import (
+    IO,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pypdf import PdfReader, PdfWriter
+from sqlalchemy.orm import Session
+
+from src.core.exceptions import BaseApplicationException, NotFoundException, ValidationException
+from src.core.settings import get_pdf_render_settings
+from src.database import SessionLocal
+from src.schemas.pdf_export_schema import BulkPdfFormatSchema
+from src.services.export.streaming import iter_file_chunks, spooled_file
+from src.services.export.zip_stream import ZipStreamWriter
+from src.services.pdf.pdf_cache import PdfRenderJob, render_pdf_job
+
+logger = logging.getLogger(__name__)
+
+BULK_ERRORS_FILENAME = "errori.txt"
+
+PrepareJob = Callable[[int], Union[PdfRenderJob, Awaitable[PdfRenderJob]]]
+
+
+@dataclass
+class BulkPdfResult:
+    document_id: int
+    filename: Optional[str] = None
+    pdf_bytes: Optional[bytes] = None
+    error: Optional[str] = None
+
+
+def get_bulk_concurrency() -> int:
+    settings = get_pdf_render_settings()
+    if settings.pdf_bulk_concurrency > 0:
+        return settings.pdf_bulk_concurrency
+    return max(2, settings.pdf_render_workers * 2)
+
+
+def get_bulk_max_documents(fmt: BulkPdfFormatSchema) -> int:
+    settings = get_pdf_render_settings()
+    if fmt == BulkPdfFormatSchema.PDF:
+        return settings.pdf_bulk_merge_max_documents
+    return settings.pdf_bulk_max_documents
+
+
+def select_bulk_document_ids(
+    ids: Optional[Sequence[int]],
+    load_filtered_ids: Callable[[int], List[int]],
+    max_documents: int,
+    *,
+    entity_type: str,
+) -> List[int]:
+    """
+    ID da esportare: quelli indicati (senza duplicati) oppure quelli dei filtri.
+
+    ``load_filtered_ids(limit)`` viene chiamata con ``max_documents + 1`` per
+    riconoscere il superamento del limite senza una query di conteggio.
+    """
+    if ids:
+        document_ids = list(dict.fromkeys(ids))
+    else:
+        document_ids = load_filtered_ids(max_documents + 1)
+
+    if not document_ids:
+        raise NotFoundException(
+            entity_type,
+            None,
+            details={"message": "Nessun documento trovato con i criteri indicati"},
+        )
+    if len(document_ids) > max_documents:
+        raise ValidationException(
+            f"Troppi documenti per export PDF massivo; restringere la selezione "
+            f"(max {max_documents})",
+            details={"max": max_documents},
+        )
+    return document_ids
+
+
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, HTTPException):
+        return str(exc.detail)
+    if isinstance(exc, BaseApplicationException):
+        return exc.message
+    return str(exc) or exc.__class__.__name__
+
+
+async def _collect(
+    entry: Tuple[int, Optional[str], Optional["asyncio.Task[bytes]"], Optional[str]],
+) -> BulkPdfResult:
+    document_id, filename, task, error = entry
+    if task is None:
+        return BulkPdfResult(document_id=document_id, filename=filename, error=error)
+    try:
+        pdf_bytes = await task
+    except Exception as e:
+        logger.warning(f"Rendering PDF {document_id} fallito nell'export massivo: {e}")
+        return BulkPdfResult(document_id=document_id, filename=filename, error=_error_message(e))
+    return BulkPdfResult(document_id=document_id, filename=filename, pdf_bytes=pdf_bytes)
+
+
+async def iter_bulk_pdfs(
+    document_ids: Sequence[int],
+    prepare_job: PrepareJob,
+    *,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[BulkPdfResult]:
+    """
+    Genera i PDF in parallelo restituendoli nell'ordine di ``document_ids``.
+
+    ``prepare_job`` (sincrona o async) carica i dati dal DB: è chiamata un
+    documento alla volta, mentre fino a ``concurrency`` rendering sono in corso
+    nel pool. Gli errori sono riportati nel risultato del singolo documento.
+    """
+    window = concurrency or get_bulk_concurrency()
+    pending: Deque[Tuple[int, Optional[str], Optional["asyncio.Task[bytes]"], Optional[str]]] = deque()
+    try:
+        for document_id in document_ids:
+            try:
+                job = prepare_job(document_id)
+                if inspect.isawaitable(job):
+                    job = await job
+            except Exception as e:
+                logger.warning(f"Preparazione PDF {document_id} fallita nell'export massivo: {e}")
+                pending.append((document_id, None, None, _error_message(e)))
+            else:
+                pending.append(
+                    (document_id, job.filename, asyncio.create_task(render_pdf_job(job)), None)
+                )
+
+            while len(pending) >= window:
+                yield await _collect(pending.popleft())
+
+        while pending:
+            yield await _collect(pending.popleft())
+    finally:
+        # Client disconnesso o errore: i rendering non ancora consumati vanno annullati
+        for _, _, task, _ in pending:
+            if task is not None:
+                task.cancel()
+
+
+def _errors_report(errors: List[BulkPdfResult]) -> bytes:
+    lines = [f"{result.document_id}\t{result.error}" for result in errors]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def stream_bulk_pdf_zip(
+    document_ids: Sequence[int],
+    make_prepare_job: Callable[[Session], PrepareJob],
+    *,
+    duplicate_prefix: str,
+) -> AsyncIterator[bytes]:
+    """
+    ZIP dei PDF prodotto in streaming, da usare come body di StreamingResponse.
+
+    Il generatore gira dopo la chiusura della sessione della request: apre una
+    sessione dedicata e la passa a ``make_prepare_job``.
+    """
+    # I PDF fpdf2 sono già compressi: ZIP_STORED evita di ricomprimerli nel loop
+    writer = ZipStreamWriter(duplicate_prefix=duplicate_prefix, compression=zipfile.ZIP_STORED)
+    errors: List[BulkPdfResult] = []
+    db = SessionLocal()
+    results = iter_bulk_pdfs(document_ids, make_prepare_job(db))
+    try:
+        async for result in results:
+            if result.error is not None:
+                errors.append(result)
+                continue
+            yield writer.add(result.filename, result.pdf_bytes)
+    finally:
+        await results.aclose()
+        db.close()
+
+    if errors:
+        yield writer.add(BULK_ERRORS_FILENAME, _errors_report(errors))
+    yield writer.close()
+
+
+def _append_pdf(writer: PdfWriter, result: BulkPdfResult) -> None:
+    writer.append(
+        PdfReader(BytesIO(result.pdf_bytes)),
+        outline_item=result.filename,
+        import_outline=False,
+    )
+
+
+async def build_bulk_pdf_merged(
+    document_ids: Sequence[int],
+    prepare_job: PrepareJob,
+) -> Tuple[IO[bytes], List[Dict[str, Any]]]:
+    """
+    Unisce i PDF in un unico documento (un segnalibro per documento).
+
+    Returns:
+        (file temporaneo posizionato all'inizio, errori per documento)
+    """
+    writer = PdfWriter()
+    errors: List[Dict[str, Any]] = []
+    merged = 0
+    async for result in iter_bulk_pdfs(document_ids, prepare_job):
+        if result.error is None:
+            try:
+                await asyncio.to_thread(_append_pdf, writer, result)
+                merged += 1
+                continue
+            except Exception as e:
+                logger.warning(f"Unione PDF {result.document_id} fallita: {e}")
+                result.error = _error_message(e)
+        errors.append({"document_id": result.document_id, "error": result.error})
+
+    if not merged:
+        raise ValidationException(
+            "Nessun PDF generato per i documenti selezionati",
+            details={"failed": errors},
+        )
+
+    output = spooled_file()
+    try:
+        await asyncio.to_thread(writer.write, output)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output, errors
+
+
+async def bulk_pdf_streaming_response(
+    document_ids: Sequence[int],
+    fmt: BulkPdfFormatSchema,
+    make_prepare_job: Callable[[Session], PrepareJob],
+    db: Session,
+    *,
+    label: str,
+    duplicate_prefix: str,
+) -> StreamingResponse:
+    """
+    Risposta dell'export massivo nel formato richiesto.
+
+    Args:
+        document_ids: ID già selezionati (select_bulk_document_ids)
+        fmt: zip o pdf
+        make_prepare_job: Dalla sessione alla funzione che prepara il PdfRenderJob di un ID
+        db: Sessione della request (usata per il PDF unito, generato prima della risposta)
+        label: Prefisso del nome file (es. "fatture")
+        duplicate_prefix: Prefisso dei nomi duplicati nello ZIP
+    """
+    stamp = date.today().isoformat()
+    if fmt == BulkPdfFormatSchema.PDF:
+        output, errors = await build_bulk_pdf_merged(document_ids, make_prepare_job(db))
+        return StreamingResponse(
+            iter_file_chunks(output),
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f'attachment; filename="{label}-{stamp}.pdf"',
+                "Cache-Control": "no-cache",
+                "X-Bulk-Pdf-Failed": str(len(errors)),
+            },
+        )
+
+    return StreamingResponse(
+        stream_bulk_pdf_zip(document_ids, make_prepare_job, duplicate_prefix=duplicate_prefix),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{label}-pdf-{stamp}.zip"',
+            "Cache-Control": "no-cache",
+        },
+    )
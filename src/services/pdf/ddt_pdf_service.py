@@ -641,7 +641,8 @@ class DDTPDFService(BasePDFService):
         pdf.ln(spacing_before)
         
         if text is None:
-            text = f"Documento generato automaticamente - {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+            # Senza data/ora di generazione: il PDF è servito dalla cache PDF
+            text = "Documento generato automaticamente"
         
         pdf.set_font('Arial', 'I', 8)
         pdf.set_text_color(128, 128, 128)
@@ -649,3 +650,7 @@ class DDTPDFService(BasePDFService):
         
         return {'y_end': pdf.get_y()}
 
+
+def render_ddt_pdf(tax_repo=None, **kwargs) -> bytes:
+    """Entry point serializzabile per il pool di rendering (tax_repo: TaxPercentageLookup)."""
+    return bytes(DDTPDFService(tax_repo=tax_repo).generate_pdf(**kwargs))
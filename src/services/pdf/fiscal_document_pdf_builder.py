@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from src.repository.app_configuration_repository import AppConfigurationRepository
 from src.repository.fiscal_document_repository import FiscalDocumentRepository
 from src.services.pdf.fiscal_document_pdf_service import FiscalDocumentPDFService
+from src.services.pdf.pdf_cache import PdfRenderJob, file_version, render_pdf_job
 
 
 def _build_details_with_products(db: Session, id_fiscal_document: int, details) -> list:
@@ -98,23 +99,12 @@ def _load_company_configs(db: Session) -> tuple[dict, dict]:
     return company_config, invoice_pdf_config
 
 
-def build_fiscal_document_pdf(
+def _load_fiscal_document_pdf_inputs(
     db: Session,
     id_fiscal_document: int,
-    *,
-    raise_http: bool = True,
-) -> Tuple[bytes, str]:
-    """
-    Genera bytes PDF e nome file per un documento fiscale.
-
-    Args:
-        db: Sessione SQLAlchemy
-        id_fiscal_document: ID documento
-        raise_http: Se True solleva HTTPException; altrimenti ValueError
-
-    Returns:
-        (pdf_bytes, filename)
-    """
+    raise_http: bool,
+) -> Tuple[dict, str]:
+    """Carica i dati del documento fiscale: (argomenti di FiscalDocumentPDFService, filename)."""
     from src.models.address import Address
     from src.models.fiscal_document_detail import FiscalDocumentDetail
     from src.models.order import Order
@@ -182,8 +172,7 @@ def build_fiscal_document_pdf(
             fiscal_document.id_fiscal_document_ref
         )
 
-    pdf_service = FiscalDocumentPDFService()
-    pdf_bytes = pdf_service.generate_pdf(
+    pdf_kwargs = dict(
         fiscal_document=fiscal_document,
         order=order,
         invoice_address=invoice_address,
@@ -205,15 +194,72 @@ def build_fiscal_document_pdf(
         or str(id_fiscal_document)
     )
     filename = f"{doc_type}-{doc_number}.pdf"
+    return pdf_kwargs, filename
+
+
+def build_fiscal_document_pdf(
+    db: Session,
+    id_fiscal_document: int,
+    *,
+    raise_http: bool = True,
+) -> Tuple[bytes, str]:
+    """
+    Genera bytes PDF e nome file per un documento fiscale.
+
+    Args:
+        db: Sessione SQLAlchemy
+        id_fiscal_document: ID documento
+        raise_http: Se True solleva HTTPException; altrimenti ValueError
+
+    Returns:
+        (pdf_bytes, filename)
+    """
+    pdf_kwargs, filename = _load_fiscal_document_pdf_inputs(db, id_fiscal_document, raise_http)
+    pdf_bytes = FiscalDocumentPDFService().generate_pdf(**pdf_kwargs)
     return pdf_bytes, filename
 
 
-def build_fiscal_document_pdf_buffer(
+def prepare_fiscal_document_pdf_job(
+    db: Session,
+    id_fiscal_document: int,
+    *,
+    raise_http: bool = True,
+) -> PdfRenderJob:
+    """Carica i dati del documento e prepara il rendering (senza disegnare)."""
+    pdf_kwargs, filename = _load_fiscal_document_pdf_inputs(db, id_fiscal_document, raise_http)
+    context = FiscalDocumentPDFService().build_render_context(**pdf_kwargs)
+    return PdfRenderJob(
+        kind="fiscal_document",
+        document_id=id_fiscal_document,
+        filename=filename,
+        render_func=FiscalDocumentPDFService.render_context,
+        locale=context.get("locale"),
+        version=file_version(context.get("logo_path")),
+        render_kwargs={"context": context},
+    )
+
+
+async def render_fiscal_document_pdf(
+    db: Session,
+    id_fiscal_document: int,
+    *,
+    raise_http: bool = True,
+) -> Tuple[bytes, str]:
+    """
+    Come build_fiscal_document_pdf, ma il disegno gira nel pool di rendering e il
+    risultato è servito dalla cache PDF se i dati del documento non sono cambiati.
+    """
+    job = prepare_fiscal_document_pdf_job(db, id_fiscal_document, raise_http=raise_http)
+    pdf_bytes = await render_pdf_job(job)
+    return pdf_bytes, job.filename
+
+
+async def build_fiscal_document_pdf_buffer(
     db: Session,
     id_fiscal_document: int,
 ) -> Tuple[BytesIO, str]:
     """Wrapper che restituisce BytesIO per StreamingResponse."""
-    pdf_bytes, filename = build_fiscal_document_pdf(db, id_fiscal_document)
+    pdf_bytes, filename = await render_fiscal_document_pdf(db, id_fiscal_document)
     pdf_buffer = BytesIO()
     pdf_buffer.write(pdf_bytes)
     pdf_buffer.seek(0)
@@ -10,6 +10,7 @@ from typing import Any, Dict, List, Optional
 
 from src.services.pdf.base_pdf_service import BasePDFService
 from src.services.pdf.fiscal_document_pdf_layout import FiscalDocumentPDFLayout
+from src.services.pdf.render_pool import snapshot_address
 from src.services.pdf.i18n.invoice_pdf_labels import (
     DEFAULT_PRE_INVOICE_DISCLAIMER,
     get_invoice_labels,
@@ -65,6 +66,39 @@ class FiscalDocumentPDFService(BasePDFService):
         Returns:
             bytes: Contenuto PDF
         """
+        context = self.build_render_context(
+            fiscal_document=fiscal_document,
+            order=order,
+            invoice_address=invoice_address,
+            delivery_address=delivery_address,
+            details_with_products=details_with_products,
+            payment_name=payment_name,
+            company_config=company_config,
+            referenced_invoice=referenced_invoice,
+            db=db,
+            invoice_pdf_config=invoice_pdf_config,
+        )
+        return self.render_context(context)
+
+    def build_render_context(
+        self,
+        fiscal_document,
+        order=None,
+        invoice_address=None,
+        delivery_address=None,
+        details_with_products: Optional[List[Dict[str, Any]]] = None,
+        payment_name: Optional[str] = None,
+        company_config: Optional[Dict[str, Any]] = None,
+        referenced_invoice=None,
+        db=None,
+        invoice_pdf_config: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Context serializzabile per FiscalDocumentPDFLayout.render_document.
+
+        Stessi argomenti di generate_pdf: la parte DB viene eseguita qui, gli indirizzi
+        diventano snapshot, così il disegno può girare nel pool di rendering.
+        """
         if not fiscal_document:
             raise ValueError("fiscal_document è richiesto")
         if not details_with_products:
@@ -85,7 +119,17 @@ class FiscalDocumentPDFService(BasePDFService):
                 db=db,
                 invoice_pdf_config=invoice_pdf_config or {},
             )
-            return FiscalDocumentPDFLayout.render_document(context)
+            context["invoice_address"] = snapshot_address(context["invoice_address"])
+            context["delivery_address"] = snapshot_address(context["delivery_address"])
+        except Exception as e:
+            raise Exception(f"Errore durante la generazione del PDF: {str(e)}")
+        return context
+
+    @staticmethod
+    def render_context(context: Dict[str, Any]) -> bytes:
+        """Disegna il PDF da build_render_context (eseguibile nel pool di rendering)."""
+        try:
+            return bytes(FiscalDocumentPDFLayout.render_document(context))
         except ImportError:
             raise Exception(
                 "Libreria fpdf2 non installata. Installare con: pip install fpdf2"
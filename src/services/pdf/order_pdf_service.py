@@ -620,3 +620,8 @@ class OrderPDFService(BasePDFService):
         pdf.add_page()
         pdf.set_auto_page_break(auto=True, margin=margin)
         return pdf
+
+
+def render_order_pdf(**kwargs) -> bytes:
+    """Entry point serializzabile per il pool di rendering (argomenti di generate_pdf)."""
+    return bytes(OrderPDFService().generate_pdf(**kwargs))
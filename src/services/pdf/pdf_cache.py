@@ -0,0 +1,183 @@
+"""
+Cache su disco dei PDF generati, indirizzata per contenuto.
+
+Chiave = tipo documento + id + sha256 dei dati di rendering + lingua: un PDF già
+generato per gli stessi dati viene restituito senza ridisegnarlo; qualsiasi modifica
+al documento cambia l'hash e quindi la chiave. Per ogni documento si tiene solo
+l'ultima versione (``<PDF_CACHE_DIR>/<tipo>/<id>/<chiave>.pdf``), come per le ricevute
+in ``ricevute/pdf_storage.py``.
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+from src.core.settings import get_pdf_render_settings
+from src.services.pdf.render_pool import render_pdf_off_loop
+
+logger = logging.getLogger(__name__)
+
+# Da incrementare quando cambia un layout: invalida tutti i PDF in cache
+PDF_LAYOUT_VERSION = 2
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if isinstance(value, SimpleNamespace) or hasattr(value, "__dict__"):
+        return {k: v for k, v in vars(value).items() if not k.startswith("_")}
+    return str(value)
+
+
+def file_version(path: Optional[str]) -> Optional[str]:
+    """Versione di un file usato dal layout (es. logo): mtime e dimensione, None se assente."""
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def pdf_cache_key(
+    kind: str,
+    document_id: Any,
+    payload: Any,
+    locale: Optional[str] = None,
+    version: Optional[str] = None,
+) -> str:
+    """sha256 di tipo, id, lingua, versione layout/asset e dati di rendering."""
+    raw = json.dumps(
+        {
+            "kind": kind,
+            "id": document_id,
+            "locale": locale,
+            "version": version,
+            "layout": PDF_LAYOUT_VERSION,
+            "payload": payload,
+        },
+        sort_keys=True,
+        default=_json_default,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _document_dir(kind: str, document_id: Any) -> str:
+    return os.path.join(get_pdf_render_settings().pdf_cache_dir, kind, str(document_id))
+
+
+def read_cached_pdf(kind: str, document_id: Any, key: str) -> Optional[bytes]:
+    path = os.path.join(_document_dir(kind, document_id), f"{key}.pdf")
+    try:
+        with open(path, "rb") as handle:
+            return handle.read()
+    except FileNotFoundError:
+        return None
+
+
+def store_cached_pdf(kind: str, document_id: Any, key: str, pdf_bytes: bytes) -> None:
+    """Scrittura atomica (file temporaneo + rename); rimuove le versioni precedenti."""
+    directory = _document_dir(kind, document_id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{key}.pdf")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(pdf_bytes)
+    os.replace(tmp_path, path)
+
+    for name in os.listdir(directory):
+        if name != f"{key}.pdf" and name.endswith(".pdf"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+async def render_pdf_cached(
+    kind: str,
+    document_id: Any,
+    render_func: Callable[..., bytes],
+    *,
+    locale: Optional[str] = None,
+    version: Optional[str] = None,
+    **render_kwargs,
+) -> bytes:
+    """
+    Restituisce il PDF dalla cache o lo genera nel pool di rendering e lo salva.
+
+    Args:
+        kind: Tipo documento (es. "fiscal_document", "ddt", "preventivo", "order")
+        document_id: ID del documento
+        render_func: Funzione di rendering serializzabile (vedi render_pool)
+        locale: Lingua del layout, parte della chiave
+        version: Versione di asset esterni ai dati (es. file_version del logo)
+        render_kwargs: Dati di rendering, il loro hash è parte della chiave
+    """
+    settings = get_pdf_render_settings()
+    if not settings.pdf_cache_enabled:
+        return await render_pdf_off_loop(render_func, **render_kwargs)
+
+    key = pdf_cache_key(kind, document_id, render_kwargs, locale, version)
+    try:
+        cached = read_cached_pdf(kind, document_id, key)
+    except OSError as e:
+        logger.warning(f"Lettura cache PDF {kind}/{document_id} fallita: {e}")
+        cached = None
+    if cached is not None:
+        return cached
+
+    pdf_bytes = await render_pdf_off_loop(render_func, **render_kwargs)
+    try:
+        store_cached_pdf(kind, document_id, key, pdf_bytes)
+    except OSError as e:
+        logger.warning(f"Scrittura cache PDF {kind}/{document_id} fallita: {e}")
+    return pdf_bytes
+
+
+@dataclass
+class PdfRenderJob:
+    """
+    Rendering PDF già preparato: dati caricati dal DB e funzione di disegno.
+
+    Separa la parte che usa la sessione (preparazione, sequenziale) dal disegno, che
+    può girare in parallelo nel pool per più documenti (export massivo).
+    """
+
+    kind: str
+    document_id: Any
+    filename: str
+    render_func: Callable[..., bytes]
+    locale: Optional[str] = None
+    version: Optional[str] = None
+    render_kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+async def render_pdf_job(job: PdfRenderJob) -> bytes:
+    """Esegue un PdfRenderJob passando dalla cache PDF."""
+    return await render_pdf_cached(
+        job.kind,
+        job.document_id,
+        job.render_func,
+        locale=job.locale,
+        version=job.version,
+        **job.render_kwargs,
+    )
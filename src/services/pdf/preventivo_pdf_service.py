@@ -737,10 +737,16 @@ class PreventivoPDFService(BasePDFService):
         pdf.ln(1)
 
         if text is None:
-            text = f"Documento generato automaticamente - {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+            # Senza data/ora di generazione: il PDF è servito dalla cache PDF
+            text = "Documento generato automaticamente"
 
         _set_text(pdf, COLOR_TEXT_MUTED)
         pdf.set_font('Arial', 'I', 8)
         pdf.cell(0, 5, text, 0, 1, 'C')
         _set_text(pdf, COLOR_TEXT)
         return {'y_end': pdf.get_y()}
+
+
+def render_preventivo_pdf(tax_repo=None, **kwargs) -> bytes:
+    """Entry point serializzabile per il pool di rendering (tax_repo: TaxPercentageLookup)."""
+    return bytes(PreventivoPDFService(db_session=None, tax_repo=tax_repo).generate_pdf(**kwargs))
@@ -0,0 +1,124 @@
+"""
+Pool di rendering PDF fuori dall'event loop.
+
+Il disegno fpdf2 è CPU puro e sincrono: eseguito direttamente negli endpoint async
+blocca il loop per centinaia di ms a documento. Qui il rendering gira in un
+ProcessPoolExecutor (dimensione da PDF_RENDER_WORKERS); la parte DB resta nel
+processo dell'applicazione e al pool arrivano solo dati serializzabili.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import pickle
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import NoInspectionAvailable
+
+from src.core.settings import get_pdf_render_settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[Executor] = None
+_thread_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_thread_executor() -> ThreadPoolExecutor:
+    global _thread_executor
+    if _thread_executor is None:
+        _thread_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pdf-render")
+    return _thread_executor
+
+
+def get_pdf_executor() -> Executor:
+    """Executor di rendering condiviso (process pool, o thread pool se PDF_RENDER_WORKERS=0)."""
+    global _executor
+    if _executor is None:
+        workers = get_pdf_render_settings().pdf_render_workers
+        if workers > 0:
+            # spawn: i worker non ereditano loop, connessioni DB e thread del processo web
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _executor = _get_thread_executor()
+    return _executor
+
+
+def shutdown_pdf_executor() -> None:
+    """Chiude i pool di rendering (lifespan di main)."""
+    global _executor, _thread_executor
+    if _executor is not None and _executor is not _thread_executor:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    if _thread_executor is not None:
+        _thread_executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _thread_executor = None
+
+
+async def render_pdf_off_loop(render_func: Callable[..., bytes], **kwargs) -> bytes:
+    """
+    Esegue ``render_func(**kwargs)`` fuori dall'event loop.
+
+    Con il process pool funzione e argomenti devono essere serializzabili (funzioni di
+    modulo, dict, schemi pydantic, ``snapshot_model``); se non lo sono il rendering
+    ripiega sul thread pool, che libera comunque il loop.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_pdf_executor()
+    if isinstance(executor, ProcessPoolExecutor):
+        try:
+            pickle.dumps((render_func, kwargs))
+        except Exception as e:
+            logger.warning(f"Dati PDF non serializzabili per il process pool, uso thread pool: {e}")
+            executor = _get_thread_executor()
+    return await loop.run_in_executor(executor, partial(render_func, **kwargs))
+
+
+def snapshot_model(obj: Any, relations: Iterable[str] = ()) -> Any:
+    """
+    Copia serializzabile di un'istanza ORM: colonne più le relazioni indicate
+    (es. ``Address.country``), caricate qui dove la sessione è disponibile.
+    """
+    if obj is None:
+        return None
+    try:
+        mapper = sa_inspect(obj).mapper
+    except NoInspectionAvailable:
+        # Già un oggetto semplice (dict, SimpleNamespace, schema): nessuna copia necessaria
+        return obj
+    data: Dict[str, Any] = {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}
+    for name in relations:
+        data[name] = snapshot_model(getattr(obj, name, None))
+    return SimpleNamespace(**data)
+
+
+def snapshot_address(address: Any) -> Any:
+    """Snapshot di un Address con il paese (usato dai layout per nome/ISO)."""
+    return snapshot_model(address, relations=("country",))
+
+
+class TaxPercentageLookup:
+    """
+    Sostituto serializzabile di TaxRepository per i renderer che risolvono l'IVA
+    durante il disegno: percentuali precaricate, stesso fallback 22% del repository.
+    """
+
+    def __init__(self, percentages: Dict[int, float]):
+        self.percentages = percentages
+
+    @classmethod
+    def from_session(cls, session) -> "TaxPercentageLookup":
+        from src.models.tax import Tax
+
+        rows = session.query(Tax.id_tax, Tax.percentage).all()
+        return cls({row.id_tax: float(row.percentage) for row in rows if row.percentage is not None})
+
+    def get_percentage_by_id(self, id_tax: int) -> float:
+        value = self.percentages.get(int(id_tax))
+        return value if value is not None else 22.0
@@ -22,6 +22,7 @@ from sqlalchemy.orm import Session
 from src.repository.order_repository import OrderRepository
 from src.schemas.bordero_schema import BorderoRow, BorderoZeroHintSchema
 from src.services.pdf.bordero_pdf_service import BorderoPDFService
+from src.services.pdf.render_pool import render_pdf_off_loop
 from src.services.routers.order_document_service import OrderDocumentService
 from src.services.routers.order_service import OrderService
 
@@ -115,8 +116,10 @@ class BorderoService:
         ]
 
         # 7. Generazione PDF (anche quando 0 righe: il PDF service mostra
-        #    "Nessuna spedizione idonea").
-        pdf_bytes = self.pdf_service.generate_pdf(
+        #    "Nessuna spedizione idonea"), nel pool di rendering. Niente cache
+        #    PDF: il borderò riporta l'istante di generazione.
+        pdf_bytes = await render_pdf_off_loop(
+            self.pdf_service.generate_pdf,
             rows=bordero_rows,
             company_info=company_info,
             carrier_name=carrier_name,
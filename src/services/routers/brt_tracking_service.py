@@ -1,4 +1,5 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
 import logging
 from datetime import datetime
 
@@ -10,6 +11,9 @@ from src.services.ecommerce.shipments.brt_client import BrtClient
 
 logger = logging.getLogger(__name__)
 
+# Chiamate BRT contemporanee per singola richiesta di tracking (l'API accetta un parcel per chiamata)
+BRT_TRACKING_CONCURRENCY = 10
+
 
 class BrtTrackingService(IBrtTrackingService):
     """BRT Tracking service for getting shipment tracking information"""
@@ -35,6 +39,22 @@ class BrtTrackingService(IBrtTrackingService):
         Returns:
             List of normalized tracking responses
         """
+        normalized_tracking, _ = await self.get_tracking_with_failures(tracking_numbers, carrier_api_id)
+        return normalized_tracking
+    
+    async def get_tracking_with_failures(
+        self, tracking_numbers: List[str], carrier_api_id: int
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Tracking dei parcel con l'elenco di quelli la cui richiesta è fallita
+        
+        Args:
+            tracking_numbers: List of tracking numbers (parcel IDs) to track
+            carrier_api_id: Carrier API ID for authentication
+            
+        Returns:
+            Tuple (risultati normalizzati, tracking falliti)
+        """
         # Get carrier credentials (for consistency, but BRT uses brt_config)
         credentials = self.carrier_api_repository.get_auth_credentials(carrier_api_id)
         
@@ -49,24 +69,43 @@ class BrtTrackingService(IBrtTrackingService):
         if not hasattr(brt_config, 'api_password') or not brt_config.api_password:
             raise ValueError(f"BRT api_password is missing or empty in BrtConfiguration for carrier_api_id {carrier_api_id}")
         
-        # BRT tracking API only supports single parcel ID per request
-        # So we need to make multiple requests
+        # BRT tracking API only supports single parcel ID per request:
+        # le richieste partono in parallelo (limitate) sul client HTTP condiviso
+        semaphore = asyncio.Semaphore(BRT_TRACKING_CONCURRENCY)
+        
+        async def _track(tracking_number: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.brt_client.get_tracking(
+                    parcel_id=tracking_number,
+                    credentials=credentials,
+                    brt_config=brt_config
+                )
+        
+        responses = await asyncio.gather(
+            *(_track(tracking_number) for tracking_number in tracking_numbers),
+            return_exceptions=True
+        )
         
         normalized_tracking = []
-        for tracking_number in tracking_numbers:
-            # Call BRT API for single parcel
-            brt_response = await self.brt_client.get_tracking(
-                parcel_id=tracking_number,
-                credentials=credentials,
-                brt_config=brt_config
-            )
+        errors = []
+        failed_tracking_numbers = []
+        for tracking_number, brt_response in zip(tracking_numbers, responses):
+            if isinstance(brt_response, Exception):
+                logger.warning(f"BRT tracking failed for parcel {tracking_number}: {brt_response}")
+                errors.append(brt_response)
+                failed_tracking_numbers.append(tracking_number)
+                continue
             
             # Normalize response
             normalized = self._normalize_tracking_response(brt_response, tracking_number)
             if normalized:
                 normalized_tracking.append(normalized)
         
-        return normalized_tracking
+        # Un parcel in errore non blocca gli altri; se falliscono tutti propaga il primo errore
+        if errors and len(errors) == len(tracking_numbers):
+            raise errors[0]
+        
+        return normalized_tracking, failed_tracking_numbers
     
     def _normalize_tracking_response(self, brt_response: Dict[str, Any], tracking_number: str) -> Optional[Dict[str, Any]]:
         """
@@ -0,0 +1,403 @@
+"""
+Creazione massiva spedizioni: ordini processati in parallelo con limiti di concorrenza
+per CarrierApi e modalità job (202 + avanzamento per ordine in streaming).
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from src.core.exceptions import (
+    NotFoundException,
+    BusinessRuleException,
+    ValidationException,
+    AuthenticationException,
+    InfrastructureException
+)
+from src.core.settings import get_carrier_integration_settings
+from src.database import SessionLocal
+from src.events.core.event import Event, EventType
+from src.events.runtime import emit_event
+from src.factories.services.carrier_service_factory import CarrierServiceFactory
+from src.repository.api_carrier_repository import ApiCarrierRepository
+from src.repository.order_repository import OrderRepository
+from src.schemas.shipment_schema import (
+    BulkShipmentCreateResponseSchema,
+    BulkShipmentCreateSuccess,
+    BulkShipmentCreateError,
+    BulkShipmentJobSchema
+)
+
+logger = logging.getLogger(__name__)
+
+BulkShipmentResult = Union[BulkShipmentCreateSuccess, BulkShipmentCreateError]
+
+# Mapping tra eccezioni e configurazioni di errore (tipo, categoria di default)
+_ERROR_CONFIG = (
+    (NotFoundException, "NOT_FOUND", "not_found"),
+    (BusinessRuleException, "BUSINESS_RULE_ERROR", "business"),
+    (ValidationException, "VALIDATION_ERROR", "validation"),
+    (AuthenticationException, "AUTHENTICATION_ERROR", "authentication"),
+    (InfrastructureException, "INFRASTRUCTURE_ERROR", "infrastructure"),
+)
+
+
+def _create_bulk_shipment_error(
+    order_id: int,
+    exception: Exception,
+    error_type: str,
+    default_category: Optional[str] = None
+) -> BulkShipmentCreateError:
+    """
+    Crea un BulkShipmentCreateError da un'eccezione.
+    Segue il principio Single Responsibility: una funzione per creare l'errore.
+    
+    Args:
+        order_id: ID dell'ordine
+        exception: L'eccezione da cui estrarre i dettagli
+        error_type: Tipo di errore (es. "NOT_FOUND", "BUSINESS_RULE_ERROR")
+        default_category: Categoria di errore di default se non presente nei details
+        
+    Returns:
+        BulkShipmentCreateError configurato
+    """
+    error_details = _extract_carrier_error_details(exception, default_category)
+    
+    return BulkShipmentCreateError(
+        order_id=order_id,
+        error_type=error_type,
+        error_message=str(exception),
+        carrier_error_code=error_details.get("carrier_error_code"),
+        carrier_error_description=error_details.get("carrier_error_description"),
+        carrier_name=error_details.get("carrier_name"),
+        error_category=error_details.get("error_category", default_category)
+    )
+
+
+def _extract_carrier_error_details(exception: Exception, default_category: Optional[str] = None) -> dict:
+    """
+    Estrae i dettagli di errore del corriere in modo generico dalle eccezioni.
+    Supporta sia la nuova convenzione generica che quella legacy BRT per retrocompatibilità.
+    
+    Args:
+        exception: L'eccezione da cui estrarre i dettagli
+        default_category: Categoria di errore di default se non presente nei details
+        
+    Returns:
+        Dict con carrier_error_code, carrier_error_description, carrier_name, error_category
+    """
+    details = {}
+    if hasattr(exception, 'details') and isinstance(exception.details, dict):
+        details = exception.details
+    
+    # Extract carrier_error_code (new generic convention)
+    # Fallback to error_code, then to legacy brt_error_code
+    carrier_error_code = details.get("carrier_error_code") or details.get("error_code")
+    if carrier_error_code is None:
+        # Legacy BRT support
+        brt_error_code = details.get("brt_error_code")
+        if brt_error_code is not None:
+            carrier_error_code = brt_error_code
+    
+    # Extract carrier_error_description (new generic convention)
+    # Fallback to error_description, then to legacy brt_code_desc
+    carrier_error_description = details.get("carrier_error_description") or details.get("error_description")
+    if carrier_error_description is None:
+        # Legacy BRT support
+        brt_code_desc = details.get("brt_code_desc")
+        if brt_code_desc:
+            carrier_error_description = brt_code_desc
+    
+    # Extract carrier_name
+    carrier_name = details.get("carrier_name")
+    
+    # Extract error_category (new generic convention)
+    # Fallback to legacy brt_error_category
+    error_category = details.get("error_category") or details.get("brt_error_category")
+    if error_category is None:
+        error_category = default_category
+    
+    return {
+        "carrier_error_code": carrier_error_code,
+        "carrier_error_description": carrier_error_description,
+        "carrier_name": carrier_name,
+        "error_category": error_category
+    }
+
+
+def _error_from_exception(order_id: int, exception: Exception) -> BulkShipmentCreateError:
+    """Converte l'eccezione di un singolo ordine nell'errore del report massivo."""
+    for exc_type, error_type, default_category in _ERROR_CONFIG:
+        if isinstance(exception, exc_type):
+            logger.warning(f"Order {order_id}: {type(exception).__name__} - {str(exception)}")
+            return _create_bulk_shipment_error(order_id, exception, error_type, default_category)
+    logger.error(f"Order {order_id}: Unexpected error - {str(exception)}", exc_info=exception)
+    return _create_bulk_shipment_error(order_id, exception, "UNKNOWN_ERROR", None)
+
+
+class BulkShipmentService:
+    """
+    Crea le spedizioni di più ordini in parallelo.
+    
+    Ogni ordine usa una sessione DB dedicata (la Session non è condivisibile tra
+    coroutine concorrenti); le chiamate verso la stessa CarrierApi sono limitate
+    da un semaforo dimensionato sul tipo di corriere.
+    """
+    
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self.settings = get_carrier_integration_settings()
+    
+    def _prefetch(self, order_ids: List[int]) -> Tuple[Dict[int, Tuple[Optional[int], Optional[int]]], Dict[int, object]]:
+        """id_shipping/id_carrier_api di tutti gli ordini e carrier_type delle CarrierApi coinvolte."""
+        db = self._session_factory()
+        try:
+            shipping_map = OrderRepository(db).get_shipping_carrier_map(order_ids)
+            carrier_repo = ApiCarrierRepository(db)
+            carrier_types = {}
+            for carrier_api_id in {c for _, c in shipping_map.values() if c}:
+                carrier = carrier_repo.get_by_id(carrier_api_id)
+                if carrier:
+                    carrier_types[carrier_api_id] = carrier.carrier_type
+            return shipping_map, carrier_types
+        finally:
+            db.close()
+    
+    async def create_shipments(
+        self,
+        order_ids: List[int],
+        on_result: Optional[Callable[[BulkShipmentResult], Awaitable[None]]] = None
+    ) -> BulkShipmentCreateResponseSchema:
+        """
+        Crea le spedizioni per gli ordini indicati.
+        
+        Gli errori su singoli ordini non bloccano gli altri. Gli ID duplicati vengono
+        processati una sola volta (due creazioni concorrenti per lo stesso ordine
+        produrrebbero due etichette).
+        
+        Args:
+            order_ids: Lista di ID ordine
+            on_result: Callback opzionale invocata al completamento di ogni ordine
+            
+        Returns:
+            BulkShipmentCreateResponseSchema con successful, failed e summary
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+        total = len(order_ids)
+        logger.info(f"Starting bulk shipment creation for {total} orders")
+        
+        shipping_map, carrier_types = self._prefetch(order_ids)
+        global_semaphore = asyncio.Semaphore(max(1, self.settings.bulk_shipment_max_concurrency))
+        carrier_semaphores = {
+            carrier_api_id: asyncio.Semaphore(
+                self.settings.get_carrier_concurrency(getattr(carrier_type, "value", carrier_type))
+            )
+            for carrier_api_id, carrier_type in carrier_types.items()
+        }
+        
+        async def _process(order_id: int) -> BulkShipmentResult:
+            result = await self._process_order(
+                order_id, shipping_map.get(order_id), carrier_types,
+                global_semaphore, carrier_semaphores
+            )
+            if on_result is not None:
+                try:
+                    await on_result(result)
+                except Exception as e:
+                    logger.warning(f"Bulk shipment progress callback failed for order {order_id}: {e}")
+            return result
+        
+        results = await asyncio.gather(*(_process(order_id) for order_id in order_ids))
+        
+        successful = [r for r in results if isinstance(r, BulkShipmentCreateSuccess)]
+        failed = [r for r in results if isinstance(r, BulkShipmentCreateError)]
+        summary = {
+            "total": total,
+            "successful_count": len(successful),
+            "failed_count": len(failed)
+        }
+        logger.info(
+            f"Bulk shipment creation completed: {len(successful)} successful, "
+            f"{len(failed)} failed out of {total} total"
+        )
+        return BulkShipmentCreateResponseSchema(successful=successful, failed=failed, summary=summary)
+    
+    async def _process_order(
+        self,
+        order_id: int,
+        shipping: Optional[Tuple[Optional[int], Optional[int]]],
+        carrier_types: Dict[int, object],
+        global_semaphore: asyncio.Semaphore,
+        carrier_semaphores: Dict[int, asyncio.Semaphore]
+    ) -> BulkShipmentResult:
+        id_shipping, carrier_api_id = shipping or (None, None)
+        
+        if not id_shipping:
+            logger.warning(f"Order {order_id}: No shipping found")
+            return BulkShipmentCreateError(
+                order_id=order_id,
+                error_type="NOT_FOUND",
+                error_message=f"Order {order_id} has no shipping"
+            )
+        
+        if not carrier_api_id:
+            logger.warning(f"Order {order_id}: No carrier_api assigned")
+            return BulkShipmentCreateError(
+                order_id=order_id,
+                error_type="NO_CARRIER_API",
+                error_message=f"Order {order_id} has no carrier_api assigned"
+            )
+        
+        if carrier_api_id not in carrier_types:
+            return _error_from_exception(
+                order_id,
+                NotFoundException("CarrierApi", carrier_api_id, {"id_carrier_api": carrier_api_id})
+            )
+        
+        async with global_semaphore, carrier_semaphores[carrier_api_id]:
+            db = self._session_factory()
+            try:
+                factory = CarrierServiceFactory(ApiCarrierRepository(db))
+                shipment_service = factory.get_shipment_service_for_type(
+                    carrier_types[carrier_api_id], db, carrier_api_id
+                )
+                logger.info(f"Creating shipment for order {order_id} with carrier_api_id {carrier_api_id}")
+                result = await shipment_service.create_shipment(order_id)
+            except Exception as e:
+                return _error_from_exception(order_id, e)
+            finally:
+                db.close()
+        
+        awb = result.get("awb", "") if isinstance(result, dict) else ""
+        if not awb:
+            logger.warning(f"Order {order_id}: Shipment created but no AWB in response")
+            return BulkShipmentCreateError(
+                order_id=order_id,
+                error_type="SHIPMENT_ERROR",
+                error_message=f"Shipment created but no AWB returned for order {order_id}"
+            )
+        
+        logger.info(f"Order {order_id}: Shipment created successfully with AWB {awb}")
+        
+        # Emetti evento per creazione spedizione
+        try:
+            emit_event(Event(
+                event_type=EventType.SHIPMENT_CREATED.value,
+                data={
+                    "order_id": order_id,
+                    "carrier_api_id": carrier_api_id,
+                    "awb": awb,
+                    "shipment_data": result
+                },
+                metadata={
+                    "source": "shipments.bulk_create_shipments",
+                    "id_order": order_id
+                }
+            ))
+            logger.info(f"Event SHIPMENT_CREATED emitted for order {order_id} in bulk operation")
+        except Exception as e:
+            # Non bloccare il processing in caso di errori nell'emissione dell'evento
+            logger.warning(f"Failed to emit SHIPMENT_CREATED event for order {order_id} in bulk operation: {str(e)}", exc_info=True)
+        
+        # REPLAN-SHIPMENT-WORKFLOW: nessun auto-update dello stato ordine dopo la creazione spedizione.
+        return BulkShipmentCreateSuccess(order_id=order_id, id_shipping=id_shipping, awb=awb)
+
+
+class BulkShipmentJob:
+    """Job di creazione massiva in background, con avanzamento per ordine."""
+    
+    def __init__(self, order_ids: List[int]):
+        self.job_id = uuid.uuid4().hex
+        self.order_ids = list(dict.fromkeys(order_ids))
+        self.status = "pending"
+        self.successful: List[BulkShipmentCreateSuccess] = []
+        self.failed: List[BulkShipmentCreateError] = []
+        self.error_message: Optional[str] = None
+        self.finished_at: Optional[float] = None
+        self._events: List[str] = []
+        self._condition = asyncio.Condition()
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+    
+    def to_schema(self) -> BulkShipmentJobSchema:
+        return BulkShipmentJobSchema(
+            job_id=self.job_id,
+            status=self.status,
+            total=len(self.order_ids),
+            processed=len(self.successful) + len(self.failed),
+            successful=self.successful,
+            failed=self.failed,
+            error_message=self.error_message
+        )
+    
+    async def _publish(self, event: str, data: dict) -> None:
+        async with self._condition:
+            self._events.append(f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n")
+            self._condition.notify_all()
+    
+    async def record(self, result: BulkShipmentResult) -> None:
+        if isinstance(result, BulkShipmentCreateSuccess):
+            self.successful.append(result)
+            outcome = "success"
+        else:
+            self.failed.append(result)
+            outcome = "failed"
+        await self._publish("progress", {
+            "job_id": self.job_id,
+            "outcome": outcome,
+            "processed": len(self.successful) + len(self.failed),
+            "total": len(self.order_ids),
+            "result": result.model_dump()
+        })
+    
+    async def run(self, service: BulkShipmentService) -> None:
+        self.status = "running"
+        try:
+            await service.create_shipments(self.order_ids, on_result=self.record)
+            self.status = "completed"
+        except Exception as e:
+            logger.error(f"Bulk shipment job {self.job_id} failed: {e}", exc_info=True)
+            self.status = "failed"
+            self.error_message = str(e)
+        self.finished_at = time.time()
+        await self._publish(self.status, self.to_schema().model_dump())
+    
+    async def stream(self) -> AsyncIterator[str]:
+        """Eventi SSE dall'inizio del job fino al completamento."""
+        index = 0
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: len(self._events) > index or self.finished)
+                chunks = self._events[index:]
+                index = len(self._events)
+                done = self.finished
+            for chunk in chunks:
+                yield chunk
+            if done and index == len(self._events):
+                return
+
+
+# Job in memoria del processo: lo stato è consultabile dal worker che li ha avviati
+_bulk_shipment_jobs: Dict[str, BulkShipmentJob] = {}
+
+
+def create_bulk_shipment_job(order_ids: List[int]) -> BulkShipmentJob:
+    """Registra un nuovo job, scartando quelli terminati da più di bulk_shipment_job_ttl."""
+    ttl = get_carrier_integration_settings().bulk_shipment_job_ttl
+    now = time.time()
+    for job_id, job in list(_bulk_shipment_jobs.items()):
+        if job.finished_at is not None and now - job.finished_at > ttl:
+            del _bulk_shipment_jobs[job_id]
+    job = BulkShipmentJob(order_ids)
+    _bulk_shipment_jobs[job.job_id] = job
+    return job
+
+
+def get_bulk_shipment_job(job_id: str) -> Optional[BulkShipmentJob]:
+    return _bulk_shipment_jobs.get(job_id)
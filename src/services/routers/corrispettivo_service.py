@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from typing import Optional
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
 
 from sqlalchemy.orm import Session
 
+from src.core.exceptions import ValidationException
 from src.repository.corrispettivo_repository import CorrispettivoRepository
+from src.repository.corrispettivo_rollup_repository import CorrispettivoRollupRepository
 from src.schemas.corrispettivo_schema import (
     CorrispettivoDaySummarySchema,
     CorrispettivoExportRequestSchema,
     CorrispettivoFiltersSchema,
     CorrispettivoListResponseSchema,
+    CorrispettivoPeriodLockResponseSchema,
     CorrispettivoRiepilogoResponseSchema,
     CorrispettivoRiepilogoRowSchema,
     CorrispettivoRiepilogoTotalsSchema,
@@ -23,14 +28,21 @@ from src.services.corrispettivi.aggregation import (
     build_month_totals,
     build_riepilogo_rows,
     build_tax_columns,
+    MovementRow,
     iter_month_dates,
 )
 from src.services.export.corrispettivi_excel_service import CorrispettiviExcelService
 
 
+def local_today() -> date:
+    return datetime.now(ZoneInfo(CorrispettivoRepository.TIMEZONE)).date()
+
+
 class CorrispettivoService:
     def __init__(self, session: Session):
         self._repository = CorrispettivoRepository(session)
+        self._rollup = CorrispettivoRollupRepository(session)
+        self._session = session
 
     @staticmethod
     def _filters_to_dict(filters: Optional[CorrispettivoFiltersSchema]) -> Optional[dict]:
@@ -52,6 +64,65 @@ class CorrispettivoService:
             return None
         return CorrispettivoFiltersSchema(**data)
 
+    def _rollup_plan(
+        self, year: int, month: int, filter_dict: Optional[dict]
+    ) -> Optional[Tuple[List[date], Optional[date]]]:
+        """
+        Giorni letti dal rollup e giorno corrente (calcolato live).
+
+        None = periodo interamente live: il rollup è per paese, non per
+        piattaforma/negozio.
+        """
+        if filter_dict and (filter_dict.get("id_platform") or filter_dict.get("id_store")):
+            return None
+        today = local_today()
+        days = iter_month_dates(year, month, filter_dict.get("day") if filter_dict else None)
+        closed_days = [day for day in days if day < today]
+        if closed_days:
+            self._rollup.ensure_days(closed_days, self._repository)
+        return closed_days, (today if today in days else None)
+
+    @staticmethod
+    def _live_day_filters(filter_dict: Optional[dict], day: date) -> dict:
+        return {**(filter_dict or {}), "day": day.day}
+
+    def _fetch_movements(
+        self, year: int, month: int, filter_dict: Optional[dict]
+    ) -> List[MovementRow]:
+        plan = self._rollup_plan(year, month, filter_dict)
+        if plan is None:
+            return self._repository.fetch_movements(year, month, filter_dict)
+        closed_days, live_day = plan
+        country_iso = filter_dict.get("delivery_country_iso") if filter_dict else None
+        movements = self._rollup.fetch_movements(closed_days, country_iso)
+        if live_day:
+            movements += self._repository.fetch_movements(
+                year, month, self._live_day_filters(filter_dict, live_day)
+            )
+        return movements
+
+    def _fetch_daily_totals(
+        self, year: int, month: int, filter_dict: Optional[dict]
+    ) -> Tuple[dict, dict]:
+        """(conteggi, totali lordi) per giorno, dal rollup più il giorno corrente live."""
+        plan = self._rollup_plan(year, month, filter_dict)
+        if plan is None:
+            return (
+                self._repository.fetch_daily_counts(year, month, filter_dict),
+                self._repository.fetch_daily_gross_totals(year, month, filter_dict),
+            )
+        closed_days, live_day = plan
+        country_iso = filter_dict.get("delivery_country_iso") if filter_dict else None
+        counts = self._rollup.fetch_daily_counts(closed_days, country_iso)
+        gross_totals = self._rollup.fetch_daily_gross_totals(closed_days, country_iso)
+        if live_day:
+            live_filters = self._live_day_filters(filter_dict, live_day)
+            counts.update(self._repository.fetch_daily_counts(year, month, live_filters))
+            gross_totals.update(
+                self._repository.fetch_daily_gross_totals(year, month, live_filters)
+            )
+        return counts, gross_totals
+
     def get_riepilogo(
         self,
         year: int,
@@ -61,7 +132,7 @@ class CorrispettivoService:
         filter_dict = self._filters_to_dict(filters)
         country_iso = filter_dict.get("delivery_country_iso") if filter_dict else None
         day_filter = filter_dict.get("day") if filter_dict else None
-        movements = self._repository.fetch_movements(year, month, filter_dict)
+        movements = self._fetch_movements(year, month, filter_dict)
         matrix = aggregate_matrix(movements, country_iso=country_iso)
         tax_ids_set = {
             tax_id for day_buckets in matrix.values() for tax_id in day_buckets.keys()
@@ -129,8 +200,7 @@ class CorrispettivoService:
     ) -> CorrispettivoListResponseSchema:
         filter_dict = self._filters_to_dict(filters)
         day_filter = filter_dict.get("day") if filter_dict else None
-        daily_counts = self._repository.fetch_daily_counts(year, month, filter_dict)
-        gross_totals = self._repository.fetch_daily_gross_totals(year, month, filter_dict)
+        daily_counts, gross_totals = self._fetch_daily_totals(year, month, filter_dict)
 
         days: list[CorrispettivoDaySummarySchema] = []
         month_net = CorrispettivoSplitTotalsSchema()
@@ -203,11 +273,19 @@ class CorrispettivoService:
             return f"Registro_{request.year}-{request.month:02d}-{day:02d}.zip"
         return "Registri.zip"
 
-    def build_export_zip(self, request: CorrispettivoExportRequestSchema) -> bytes:
+    def iter_export_zip(self, request: CorrispettivoExportRequestSchema) -> Iterator[bytes]:
+        """
+        Riepiloghi calcolati subito (servono la sessione della request); lo ZIP dei
+        registri è poi prodotto in streaming durante l'invio della risposta.
+        """
         consolidated_filters = self._filters_without_country(request.filters)
         filter_dict = self._filters_to_dict(consolidated_filters)
-        country_codes = self._repository.list_country_codes_with_movements(
-            request.year, request.month, filter_dict
+        country_codes = sorted(
+            {
+                row.country_iso.upper()
+                for row in self._fetch_movements(request.year, request.month, filter_dict)
+                if row.country_iso
+            }
         )
 
         riepilogo_all = self.get_riepilogo(
@@ -230,7 +308,37 @@ class CorrispettivoService:
             )
 
         excel_service = CorrispettiviExcelService()
-        return excel_service.build_registri_zip(
+        return excel_service.iter_registri_zip(
             consolidated_riepilogo=riepilogo_all,
             by_country=riepilogo_by_country,
         )
+
+    def build_export_zip(self, request: CorrispettivoExportRequestSchema) -> bytes:
+        return b"".join(self.iter_export_zip(request))
+
+    def set_period_locked(
+        self, year: int, month: int, locked: bool
+    ) -> CorrispettivoPeriodLockResponseSchema:
+        """
+        Chiude (o riapre) un mese nel rollup.
+
+        Chiusura: i giorni vengono materializzati e da quel momento le modifiche a
+        ordini e documenti non li aggiornano più. Riapertura: i giorni tornano a
+        essere ricalcolati dalle query live alla prossima lettura.
+        """
+        days = iter_month_dates(year, month)
+        if locked:
+            if days[-1] >= local_today():
+                raise ValidationException(
+                    "Si possono chiudere solo mesi già conclusi",
+                    details={"year": year, "month": month},
+                )
+            self._rollup.ensure_days(days, self._repository)
+            self._rollup.set_locked(days, True)
+        else:
+            self._rollup.set_locked(days, False)
+            self._rollup.invalidate_days(days)
+        self._session.commit()
+        return CorrispettivoPeriodLockResponseSchema(
+            year=year, month=month, locked=locked, days=len(days)
+        )
@@ -21,6 +21,7 @@ from src.schemas.ddt_schema import (
     DDTMergeRequestSchema,
     DDTMergeResponseSchema
 )
+from src.schemas.pdf_export_schema import OrderDocumentBulkPdfFiltersSchema, OrderDocumentBulkPdfRequestSchema
 from src.models.customer import Customer
 from src.models.address import Address
 from src.models.shipping import Shipping
@@ -263,24 +264,73 @@ class DDTService:
             is_modifiable=is_modifiable
         )
     
-    def generate_ddt_pdf(self, id_order_document: int) -> bytes:
+    def prepare_ddt_pdf_job(self, id_order_document: int):
         """
-        Genera il PDF del DDT
+        Carica i dati del DDT e prepara il rendering PDF (senza disegnare)
         
         Args:
             id_order_document: ID del DDT
             
         Returns:
-            bytes: Contenuto del PDF
+            PdfRenderJob: Dati e funzione di disegno per il pool di rendering
         """
-        from src.services.pdf.ddt_pdf_service import DDTPDFService
+        from src.services.pdf.ddt_pdf_service import render_ddt_pdf
+        from src.services.pdf.pdf_cache import PdfRenderJob, file_version
+        from src.services.pdf.render_pool import TaxPercentageLookup
 
         ddt_data = self.get_ddt_complete(id_order_document)
         if not ddt_data:
             raise ValueError("DDT non trovato")
 
-        pdf_service = DDTPDFService(tax_repo=self.tax_repo)
-        return pdf_service.generate_pdf(ddt_data=ddt_data)
+        return PdfRenderJob(
+            kind="ddt",
+            document_id=id_order_document,
+            filename=f"DDT-{ddt_data.document_number}.pdf",
+            render_func=render_ddt_pdf,
+            version=file_version(getattr(ddt_data.sender, "logo_path", None)),
+            render_kwargs={
+                "tax_repo": TaxPercentageLookup.from_session(self.db),
+                "ddt_data": ddt_data,
+            },
+        )
+    
+    def get_bulk_pdf_ids(self, request: OrderDocumentBulkPdfRequestSchema, max_documents: int) -> List[int]:
+        """
+        ID DDT per l'export PDF massivo (lista esplicita o stessi filtri della lista DDT)
+        
+        Args:
+            request: Richiesta export con ids o filters
+            max_documents: Numero massimo di documenti esportabili
+            
+        Returns:
+            List[int]: ID DDT nell'ordine di export
+        """
+        from src.services.pdf.bulk_pdf_export import select_bulk_document_ids
+
+        filters = request.filters or OrderDocumentBulkPdfFiltersSchema()
+
+        def load_filtered_ids(limit: int) -> List[int]:
+            ddt_list = self.ddt_repo.get_ddt_list(
+                0, limit, filters.search, filters.sectionals_ids,
+                filters.payments_ids, filters.date_from, filters.date_to
+            )
+            return [ddt.id_order_document for ddt in ddt_list]
+
+        return select_bulk_document_ids(request.ids, load_filtered_ids, max_documents, entity_type="DDT")
+    
+    async def generate_ddt_pdf(self, id_order_document: int) -> bytes:
+        """
+        Genera il PDF del DDT (disegno nel pool di rendering, con cache PDF)
+        
+        Args:
+            id_order_document: ID del DDT
+            
+        Returns:
+            bytes: Contenuto del PDF
+        """
+        from src.services.pdf.pdf_cache import render_pdf_job
+
+        return await render_pdf_job(self.prepare_ddt_pdf_job(id_order_document))
     
     @emit_event_on_success(
         event_type=EventType.DOCUMENT_UPDATED,
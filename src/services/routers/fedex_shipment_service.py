@@ -21,6 +21,7 @@ from src.core.exceptions import (
     NotFoundException,
     ValidationException,
 )
+from src.core.http_clients import get_http_client
 from src.core.settings import get_cache_settings
 
 # Local - Models
@@ -824,19 +825,19 @@ class FedexShipmentService(IFedexShipmentService):
         """
         try:
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                
-                # Get PDF content as bytes
-                pdf_bytes = response.content
-                
-                # Check if it's actually a PDF
-                if not pdf_bytes.startswith(b'%PDF'):
-                    logger.warning(f"Downloaded content from {url} doesn't appear to be a PDF")
-                    return None
-                
-                return pdf_bytes
+            client = get_http_client("fedex")
+            response = await client.get(url)
+            response.raise_for_status()
+            
+            # Get PDF content as bytes
+            pdf_bytes = response.content
+            
+            # Check if it's actually a PDF
+            if not pdf_bytes.startswith(b'%PDF'):
+                logger.warning(f"Downloaded content from {url} doesn't appear to be a PDF")
+                return None
+            
+            return pdf_bytes
                 
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error downloading PDF from URL {url}: {e.response.status_code} - {e.response.text}")
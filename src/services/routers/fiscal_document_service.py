@@ -1,8 +1,9 @@
 """
 Servizio centralizzato per la gestione dei documenti fiscali
 """
+import asyncio
 from datetime import date, datetime, time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from src.repository.interfaces.order_repository_interface import IOrderRepository
 from src.repository.interfaces.order_detail_repository_interface import IOrderDetailRepository
 from src.services.interfaces.fiscal_document_service_interface import IFiscalDocumentService
@@ -13,12 +14,14 @@ from src.models.order import Order
 from src.schemas.return_schema import ReturnCreateSchema, ReturnDocumentResponseSchema, ReturnDetailResponseSchema, ReturnResponseSchema, ReturnUpdateSchema, ReturnDetailUpdateSchema
 from src.schemas.fiscal_document_schema import (
     CreditNoteEligibleLinesResponseSchema,
+    FiscalDocumentBulkPdfRequestSchema,
     InvoiceExportFiltersSchema,
     InvoiceExportFormatSchema,
     InvoiceListExportItemSchema,
     InvoiceResponseSchema,
 )
 from src.services.export.fiscal_document_export_service import FiscalDocumentExportService
+from src.services.export.streaming import iter_file_chunks
 from src.services.external.fatturapa_filename import (
     normalize_xml_bytes,
     resolve_fatturapa_filename_from_xml,
@@ -50,7 +53,9 @@ from src.services.ricevute.order_lines import (
     resolve_shipping_amounts,
 )
 
-EXPORT_XLSX_MAX_LIMIT = 5000
+# Excel in streaming (write-only, DB letto a blocchi): il limite non dipende più dalla memoria
+EXPORT_XLSX_MAX_LIMIT = 100000
+# XML: gli XML mancanti sono generati nella request prima dello streaming dello ZIP
 EXPORT_XML_MAX_LIMIT = 5000
 
 
@@ -831,6 +836,43 @@ class FiscalDocumentService(IFiscalDocumentService):
         )
         return [self._map_invoice_export_row(row) for row in rows], total
 
+    def _iter_invoices_for_export(
+        self,
+        filters: InvoiceExportFiltersSchema,
+        repository: Optional[IFiscalDocumentRepository] = None,
+    ) -> Iterator[InvoiceListExportItemSchema]:
+        date_from, date_to = self._export_date_bounds(
+            filters.date_add_from, filters.date_add_to
+        )
+        repository = repository or self._fiscal_document_repository
+        rows = repository.iter_invoices_for_export(
+            document_type=filters.document_type,
+            is_electronic=filters.is_electronic,
+            status=filters.status,
+            id_order=filters.id_order,
+            id_customer=filters.id_customer,
+            delivery_country_iso=filters.delivery_country_iso,
+            date_add_from=date_from,
+            date_add_to=date_to,
+        )
+        for row in rows:
+            yield self._map_invoice_export_row(row)
+
+    def _count_invoices_for_export(self, filters: InvoiceExportFiltersSchema) -> int:
+        date_from, date_to = self._export_date_bounds(
+            filters.date_add_from, filters.date_add_to
+        )
+        return self._fiscal_document_repository.count_invoices_for_export(
+            document_type=filters.document_type,
+            is_electronic=filters.is_electronic,
+            status=filters.status,
+            id_order=filters.id_order,
+            id_customer=filters.id_customer,
+            delivery_country_iso=filters.delivery_country_iso,
+            date_add_from=date_from,
+            date_add_to=date_to,
+        )
+
     @staticmethod
     def _parse_export_format(fmt: str) -> InvoiceExportFormatSchema:
         normalized = (fmt or "").strip().lower()
@@ -838,7 +880,7 @@ class FiscalDocumentService(IFiscalDocumentService):
             return InvoiceExportFormatSchema(normalized)
         except ValueError as exc:
             raise ValidationException(
-                "Formato export non valido: usare xlsx o xml (il PDF è solo singolo: GET /{id}/pdf)",
+                "Formato export non valido: usare xlsx o xml (PDF: GET /{id}/pdf o POST /pdf/bulk)",
                 details={"fmt": fmt, "allowed": ["xlsx", "xml"]},
             ) from exc
 
@@ -939,8 +981,12 @@ class FiscalDocumentService(IFiscalDocumentService):
     ) -> tuple[List[int], List[Dict[str, Any]]]:
         return self._prepare_fiscal_document_ids_for_xml_export(invoice_ids)
 
-    def _load_fiscal_document_xml(self, id_fiscal_document: int) -> tuple[bytes, str]:
-        doc = self._fiscal_document_repository.get_fiscal_document_by_id(
+    def _load_fiscal_document_xml(
+        self,
+        id_fiscal_document: int,
+        repository: Optional[IFiscalDocumentRepository] = None,
+    ) -> tuple[bytes, str]:
+        doc = (repository or self._fiscal_document_repository).get_fiscal_document_by_id(
             id_fiscal_document
         )
         if not doc:
@@ -983,10 +1029,55 @@ class FiscalDocumentService(IFiscalDocumentService):
             buckets[key]["id_fiscal_documents"].append(item.get("id_fiscal_document"))
         return list(buckets.values())
 
+    def _stream_fiscal_document_xml_zip(
+        self, document_ids: List[int], duplicate_prefix: str
+    ) -> Iterator[bytes]:
+        """
+        ZIP XML prodotto mentre la risposta viene inviata, quando la sessione della
+        request è già chiusa: gli XML sono letti uno alla volta con una sessione dedicata.
+        """
+        from src.database import SessionLocal
+        from src.repository.fiscal_document_repository import FiscalDocumentRepository
+
+        session = SessionLocal()
+        try:
+            repository = FiscalDocumentRepository(session)
+            yield from self._export_service.iter_xml_zip(
+                document_ids,
+                lambda document_id: self._load_fiscal_document_xml(document_id, repository),
+                duplicate_prefix=duplicate_prefix,
+            )
+        finally:
+            session.close()
+
+    def _write_invoices_xlsx(self, filters: InvoiceExportFiltersSchema):
+        """
+        Scrive l'Excel dell'export su file temporaneo. Eseguito in un thread (fino a
+        EXPORT_XLSX_MAX_LIMIT righe): il cursore yield_per usa una sessione dedicata,
+        perché la sessione della request non va usata fuori dal suo thread.
+        """
+        from src.database import SessionLocal
+        from src.repository.fiscal_document_repository import FiscalDocumentRepository
+
+        session = SessionLocal()
+        try:
+            return self._export_service.write_list_xlsx(
+                self._iter_invoices_for_export(filters, FiscalDocumentRepository(session)),
+                sheet_title=self._export_sheet_title(filters.document_type),
+            )
+        finally:
+            session.close()
+
     async def export_invoices(
         self, filters: InvoiceExportFiltersSchema, fmt: str
-    ) -> Tuple[bytes, str, str]:
-        """Export massivo fatture o note di credito in Excel o ZIP XML."""
+    ) -> Tuple[Iterator[bytes], str, str]:
+        """
+        Export massivo fatture o note di credito in Excel o ZIP XML.
+
+        Il contenuto è un iteratore di chunk per StreamingResponse: l'Excel è scritto
+        in un thread, in modalità write-only su file temporaneo leggendo il DB a blocchi, lo ZIP XML
+        è generato durante l'invio un documento alla volta.
+        """
         export_fmt = self._parse_export_format(fmt)
         max_limit = self._export_max_limit(export_fmt)
         label_prefix = self._export_label_prefix(filters.document_type)
@@ -996,7 +1087,7 @@ class FiscalDocumentService(IFiscalDocumentService):
         else:
             export_filters = filters.model_copy(update={"page": 1, "limit": max_limit})
 
-        items, total = self._list_invoices_for_export(export_filters)
+        total = self._count_invoices_for_export(export_filters)
 
         if total == 0:
             raise NotFoundException(
@@ -1024,17 +1115,19 @@ class FiscalDocumentService(IFiscalDocumentService):
         )
 
         if export_fmt == InvoiceExportFormatSchema.XLSX:
-            content = self._export_service.build_list_xlsx(
-                items,
-                sheet_title=self._export_sheet_title(export_filters.document_type),
-            )
+            # Lettura DB e scrittura del workbook fuori dall'event loop
+            workbook_file = await asyncio.to_thread(self._write_invoices_xlsx, export_filters)
+            content = iter_file_chunks(workbook_file)
             media_type = (
                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
             filename = f"{label_prefix}-export{suffix}.xlsx"
             return content, media_type, filename
 
-        document_ids = [item.id_fiscal_document for item in items]
+        document_ids = [
+            item.id_fiscal_document
+            for item in self._iter_invoices_for_export(export_filters)
+        ]
         ready_ids, xml_failures = self._prepare_fiscal_document_ids_for_xml_export(
             document_ids
         )
@@ -1060,12 +1153,43 @@ class FiscalDocumentService(IFiscalDocumentService):
             if export_filters.document_type == "credit_note"
             else "fattura"
         )
-        content = self._export_service.build_xml_zip(
-            ready_ids,
-            self._load_fiscal_document_xml,
-            duplicate_prefix=zip_prefix,
-        )
+        content = self._stream_fiscal_document_xml_zip(ready_ids, zip_prefix)
         media_type = "application/zip"
         filename = f"{label_prefix}-xml-export{suffix}.zip"
         return content, media_type, filename
+
+    def get_bulk_pdf_document_ids(
+        self,
+        request: FiscalDocumentBulkPdfRequestSchema,
+        max_documents: int,
+    ) -> List[int]:
+        """ID documenti fiscali per l'export PDF massivo (lista esplicita o filtri export)."""
+        from src.services.pdf.bulk_pdf_export import select_bulk_document_ids
+
+        filters = request.filters or InvoiceExportFiltersSchema()
+        date_from, date_to = self._export_date_bounds(
+            filters.date_add_from, filters.date_add_to
+        )
+
+        def load_filtered_ids(limit: int) -> List[int]:
+            rows = self._fiscal_document_repository.list_invoices_for_export(
+                skip=0,
+                limit=limit,
+                document_type=filters.document_type,
+                is_electronic=filters.is_electronic,
+                status=filters.status,
+                id_order=filters.id_order,
+                id_customer=filters.id_customer,
+                delivery_country_iso=filters.delivery_country_iso,
+                date_add_from=date_from,
+                date_add_to=date_to,
+            )
+            return [row[0].id_fiscal_document for row in rows]
+
+        return select_bulk_document_ids(
+            request.ids,
+            load_filtered_ids,
+            max_documents,
+            entity_type="FiscalDocumentPdfExport",
+        )
     
\ No newline at end of file
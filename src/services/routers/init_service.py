@@ -2,11 +2,16 @@
 Servizio per i dati di inizializzazione del frontend
 """
 
-from typing import Dict, Any, List
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Callable, TypeVar
 from datetime import datetime
 
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
 from src.core.cached import cached
 from src.core.settings import TTL_PRESETS
+from src.database import get_async_session_factory
 from src.core.exceptions import InfrastructureException, ErrorCode
 from src.schemas.init_schema import InitDataSchema, CacheInfoSchema
 from src.schemas.tax_schema import serialize_taxes_response
@@ -24,6 +29,19 @@ from src.repository.store_repository import StoreRepository
 from src.vies.vies_app_configuration import get_reverse_charge_id_tax
 from src.models.ecommerce_order_state import EcommerceOrderState
 
+T = TypeVar("T")
+
+
+@asynccontextmanager
+async def _refresh_on_own_session(args: tuple, kwargs: dict):
+    """
+    Argomenti per il refresh SWR in background: una InitService nuova su una
+    AsyncSession propria. Il refresh può girare dopo la chiusura della sessione
+    della richiesta o mentre la richiesta la usa ancora (get_full_init_data).
+    """
+    async with get_async_session_factory()() as session:
+        yield (InitService(session), *args[1:]), kwargs
+
 
 class InitService:
     """
@@ -31,29 +49,58 @@ class InitService:
     """
     
     def __init__(self, db):
+        """
+        Args:
+            db: Session sincrona oppure AsyncSession. Con AsyncSession i loader
+                sincroni vengono eseguiti via `run_sync`, senza bloccare l'event loop.
+        """
         self.db = db
-        self.platform_repo = PlatformRepository(db)
-        self.lang_repo = LangRepository(db)
-        self.country_repo = CountryRepository(db)
-        self.tax_repo = TaxRepository(db)
-        self.sectional_repo = SectionalRepository(db)
-        self.order_state_repo = OrderStateRepository(db)
-        self.shipping_state_repo = ShippingStateRepository(db)
-        self.payment_repo = PaymentRepository(db)
-        self.api_carrier_repo = ApiCarrierRepository(db)
-        self.store_repo = StoreRepository(db)
-    
+        if not isinstance(db, AsyncSession):
+            self._bind_repositories(db)
+
+    def _bind_repositories(self, session: Session) -> None:
+        """Istanzia i repository sulla sessione sincrona indicata."""
+        self._session = session
+        self.platform_repo = PlatformRepository(session)
+        self.lang_repo = LangRepository(session)
+        self.country_repo = CountryRepository(session)
+        self.tax_repo = TaxRepository(session)
+        self.sectional_repo = SectionalRepository(session)
+        self.order_state_repo = OrderStateRepository(session)
+        self.shipping_state_repo = ShippingStateRepository(session)
+        self.payment_repo = PaymentRepository(session)
+        self.api_carrier_repo = ApiCarrierRepository(session)
+        self.store_repo = StoreRepository(session)
+
+    async def _run_loader(self, loader: Callable[[], T]) -> T:
+        """
+        Esegue un loader sincrono sulla sessione corrente.
+
+        Con AsyncSession il loader gira in `run_sync` (I/O del driver async),
+        con Session sincrona viene invocato direttamente.
+        """
+        if isinstance(self.db, AsyncSession):
+            def _call(sync_session: Session) -> T:
+                self._bind_repositories(sync_session)
+                return loader()
+            return await self.db.run_sync(_call)
+        return loader()
+
     @cached(
-        ttl=TTL_PRESETS.get("init_static", 604800),  # 7 giorni per dati statici
+        preset="init_static",  # 7 giorni per dati statici (+ finestra SWR da STALE_TTL_PRESETS)
         key="init_data:static",
-        layer="hybrid"
+        layer="hybrid",
+        background_refresh=_refresh_on_own_session
     )
     async def get_static_data(self) -> Dict[str, Any]:
         """
         Ottiene i dati statici (platforms, languages, countries, taxes)
         Cache: 7 giorni
         """
-        # Carica tutti i dati statici sequenzialmente
+        return await self._run_loader(self._load_static_data)
+
+    def _load_static_data(self) -> Dict[str, Any]:
+        """Carica sequenzialmente i dati statici (una sola sessione)."""
         platforms = self._get_platforms()
         languages = self._get_languages()
         countries = self._get_countries()
@@ -77,16 +124,20 @@ class InitService:
         return result_dict
     
     @cached(
-        ttl=TTL_PRESETS.get("init_dynamic", 86400),  # 1 giorno per dati dinamici
+        preset="init_dynamic",  # 1 giorno per dati dinamici (+ finestra SWR da STALE_TTL_PRESETS)
         key="init_data:dynamic",
-        layer="hybrid"
+        layer="hybrid",
+        background_refresh=_refresh_on_own_session
     )
     async def get_dynamic_data(self) -> Dict[str, Any]:
         """
         Ottiene i dati dinamici (sectionals, order_states, shipping_states, ecommerce_order_states)
         Cache: 1 giorno
         """
-        # Carica tutti i dati dinamici sequenzialmente
+        return await self._run_loader(self._load_dynamic_data)
+
+    def _load_dynamic_data(self) -> Dict[str, Any]:
+        """Carica sequenzialmente i dati dinamici (una sola sessione)."""
         sectionals = self._get_sectionals()
         order_states = self._get_order_states()
         shipping_states = self._get_shipping_states()
@@ -100,9 +151,10 @@ class InitService:
         }
     
     @cached(
-        ttl=TTL_PRESETS.get("init_full", 1800),  # 30 minuti per endpoint completo
+        preset="init_full",  # 30 minuti per endpoint completo (+ finestra SWR da STALE_TTL_PRESETS)
         key="init_data:full",
-        layer="hybrid"
+        layer="hybrid",
+        background_refresh=_refresh_on_own_session
     )
     async def get_full_init_data(self) -> InitDataSchema:
         """
@@ -229,7 +281,7 @@ class InitService:
     
     def _get_settings(self) -> Dict[str, Any]:
         try:
-            return {"reverse_charge_id_tax": get_reverse_charge_id_tax(self.db)}
+            return {"reverse_charge_id_tax": get_reverse_charge_id_tax(self._session)}
         except Exception:
             return {"reverse_charge_id_tax": None}
 
@@ -338,7 +390,7 @@ class InitService:
     def _get_ecommerce_order_states(self) -> List[Dict[str, Any]]:
         """Ottiene gli stati e-commerce sincronizzati (id_platform_state, id_store, name)"""
         try:
-            ecommerce_states = self.db.query(EcommerceOrderState).all()
+            ecommerce_states = self._session.query(EcommerceOrderState).all()
             return [
                 {
                     "id_platform_state": es.id_platform_state,
@@ -1432,8 +1432,11 @@ class OrderService(IOrderService):
 
         return {"processed": len(unique_ids), "order_ids": unique_ids}
 
-    def generate_order_pdf(self, order_id: int) -> bytes:
-        """Genera il PDF di stampa del singolo ordine (layout elettronew)."""
+    async def generate_order_pdf(self, order_id: int) -> bytes:
+        """
+        Genera il PDF di stampa del singolo ordine (layout elettronew).
+        Il disegno gira nel pool di rendering; ristampe con gli stessi dati escono dalla cache PDF.
+        """
         session = self._order_repository.session
         order = self._order_repository.get_by_id(order_id)
         if not order:
@@ -1445,7 +1448,9 @@ class OrderService(IOrderService):
         from src.models.tax import Tax
         from src.models.store import Store
         from src.services.media.media_utils import get_store_logo_path
-        from src.services.pdf.order_pdf_service import OrderPDFService
+        from src.services.pdf.order_pdf_service import render_order_pdf
+        from src.services.pdf.pdf_cache import file_version, render_pdf_cached
+        from src.services.pdf.render_pool import snapshot_address, snapshot_model
         from sqlalchemy.orm import joinedload
 
         # Righe ordine: id_order_document NULL o 0 (PS sync usa 0, non NULL)
@@ -1507,15 +1512,19 @@ class OrderService(IOrderService):
         if not logo_path:
             logo_path = company_config.get("company_logo")
 
-        pdf_service = OrderPDFService()
-        return pdf_service.generate_pdf(
-            order=order,
-            order_details=order_details,
+        logo_path = logo_path if logo_path and os.path.exists(logo_path) else None
+        return await render_pdf_cached(
+            "order",
+            order_id,
+            render_order_pdf,
+            version=file_version(logo_path),
+            order=snapshot_model(order),
+            order_details=[snapshot_model(detail) for detail in order_details],
             company_config=company_config,
-            invoice_address=invoice_address,
-            delivery_address=delivery_address,
+            invoice_address=snapshot_address(invoice_address),
+            delivery_address=snapshot_address(delivery_address),
             payment_name=payment_name,
-            shipping=shipping,
+            shipping=snapshot_model(shipping),
             tax_percentages=tax_percentages,
-            logo_path=logo_path if logo_path and os.path.exists(logo_path) else None,
+            logo_path=logo_path,
         )
\ No newline at end of file
@@ -47,11 +47,14 @@ from src.schemas.order_package_schema import OrderPackageResponseSchema
 from src.schemas.sectional_schema import SectionalResponseSchema
 from src.schemas.preventivo_schema import PreventivoShipmentSchema
 from src.schemas.address_schema import AddressResponseSchema
+from src.schemas.pdf_export_schema import OrderDocumentBulkPdfFiltersSchema, OrderDocumentBulkPdfRequestSchema
 from src.models.customer import Customer
 from src.models.address import Address
 from src.models.shipping import Shipping
 from src.models.app_configuration import AppConfiguration
-from src.services.pdf.preventivo_pdf_service import PreventivoPDFService
+from src.services.pdf.preventivo_pdf_service import render_preventivo_pdf
+from src.services.pdf.pdf_cache import PdfRenderJob, file_version, render_pdf_job
+from src.services.pdf.render_pool import TaxPercentageLookup
 from src.services.core.tool import calculate_price_without_tax
 
 
@@ -584,7 +587,8 @@ class PreventivoService:
         sectionals_ids: Optional[str] = None,
         payments_ids: Optional[str] = None,
         date_from: Optional[str] = None,
-        date_to: Optional[str] = None
+        date_to: Optional[str] = None,
+        after: Optional[str] = None
     ) -> List[PreventivoResponseSchema]:
         """Recupera lista preventivi (metodo sincrono interno)"""
         order_documents = self.preventivo_repo.get_preventivi(
@@ -592,7 +596,8 @@ class PreventivoService:
             sectionals_ids=sectionals_ids,
             payments_ids=payments_ids,
             date_from=date_from,
-            date_to=date_to
+            date_to=date_to,
+            after=after
         )
         
         result = []
@@ -863,7 +868,8 @@ class PreventivoService:
         payments_ids: Optional[str] = None,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
-        user=None
+        user=None,
+        after: Optional[str] = None
     ) -> List[PreventivoResponseSchema]:
         """Recupera lista preventivi (con caching)"""
         # Esegui il metodo sincrono in un thread
@@ -872,10 +878,14 @@ class PreventivoService:
             None, 
             self._get_preventivi_sync, 
             skip, limit, search, show_details,
-            sectionals_ids, payments_ids, date_from, date_to
+            sectionals_ids, payments_ids, date_from, date_to, after
         )
         return result
     
+    def build_next_cursor(self, preventivi: List[PreventivoResponseSchema], limit: int) -> Optional[str]:
+        """Cursore `after` per la pagina successiva della lista preventivi"""
+        return self.preventivo_repo.build_next_cursor(preventivi, limit)
+    
     def get_preventivi_stats(
         self,
         search: Optional[str] = None,
@@ -1397,124 +1407,159 @@ class PreventivoService:
             updated_at=order_document.updated_at
         )
     
-    async def generate_preventivo_pdf(self, id_order_document: int) -> bytes:
+    async def prepare_preventivo_pdf_job(self, id_order_document: int) -> PdfRenderJob:
         """
-        Genera il PDF del preventivo
+        Carica i dati del preventivo e prepara il rendering PDF (senza disegnare)
         
         Args:
             id_order_document: ID del preventivo
             
         Returns:
-            bytes: Contenuto del PDF
+            PdfRenderJob: Dati e funzione di disegno per il pool di rendering
         """
-        try:            
-            # Recupera i dati del preventivo
-            preventivo_data = await self.get_preventivo(id_order_document)
-            if not preventivo_data:
-                raise NotFoundException("Preventivo", id_order_document)
-            
-            # Recupera OrderDocument per accedere agli ID indirizzi
-            order_document = self.preventivo_repo.get_preventivo_by_id(id_order_document)
-            if not order_document:
-                raise NotFoundException("OrderDocument", id_order_document)
-            
-            # Recupera dati cliente
-            customer_data = None
-            if order_document.id_customer:
-                customer = self.db.query(Customer).filter(Customer.id_customer == order_document.id_customer).first()
-                if customer:
-                    customer_data = {
-                        "id_customer": customer.id_customer,
-                        "firstname": customer.firstname,
-                        "lastname": customer.lastname,
-                        "email": customer.email
-                    }
-            
-            # Recupera indirizzo di consegna
-            address_delivery_data = None
-            if order_document.id_address_delivery:
-                address = self.db.query(Address).filter(Address.id_address == order_document.id_address_delivery).first()
-                if address:
-                    address_delivery_data = {
-                        "id_address": address.id_address,
-                        "firstname": address.firstname,
-                        "lastname": address.lastname,
-                        "address1": address.address1,
-                        "address2": address.address2,
-                        "city": address.city,
-                        "postcode": address.postcode,
-                        "phone": address.phone
-                    }
-            
+        # Recupera i dati del preventivo
+        preventivo_data = await self.get_preventivo(id_order_document)
+        if not preventivo_data:
+            raise NotFoundException("Preventivo", id_order_document)
+        
+        # Recupera OrderDocument per accedere agli ID indirizzi
+        order_document = self.preventivo_repo.get_preventivo_by_id(id_order_document)
+        if not order_document:
+            raise NotFoundException("OrderDocument", id_order_document)
+        
+        # Recupera dati cliente
+        customer_data = None
+        if order_document.id_customer:
+            customer = self.db.query(Customer).filter(Customer.id_customer == order_document.id_customer).first()
+            if customer:
+                customer_data = {
+                    "id_customer": customer.id_customer,
+                    "firstname": customer.firstname,
+                    "lastname": customer.lastname,
+                    "email": customer.email
+                }
+        
+        # Recupera indirizzo di consegna
+        address_delivery_data = None
+        if order_document.id_address_delivery:
+            address = self.db.query(Address).filter(Address.id_address == order_document.id_address_delivery).first()
+            if address:
+                address_delivery_data = {
+                    "id_address": address.id_address,
+                    "firstname": address.firstname,
+                    "lastname": address.lastname,
+                    "address1": address.address1,
+                    "address2": address.address2,
+                    "city": address.city,
+                    "postcode": address.postcode,
+                    "phone": address.phone
+                }
+        
 
-            # Recupera dati spedizione
-            shipping_data = None
-            shipping_vat_percentage = 0
-            if order_document.id_shipping:
-                shipping = self.db.query(Shipping).filter(Shipping.id_shipping == order_document.id_shipping).first()
-                if shipping:
-                    if shipping.id_tax:
-                        shipping_vat_percentage = float(self.tax_repo.get_percentage_by_id(int(shipping.id_tax)))
-                    shipping_data = {
-                        "id_shipping": shipping.id_shipping,
-                        "price_tax_incl": shipping.price_tax_incl,
-                        "price_tax_excl": shipping.price_tax_excl,
-                        "weight": shipping.weight,
-                        "shipping_message": shipping.shipping_message
-                    }
-            
-            # Recupera dati legali della societa' (categoria company_info).
-            # Per i preventivi il mittente e' la ragione sociale, non il
-            # mittente fisico DDT (ddt_sender_*).
-            sender_config = self.order_doc_service.get_company_info()
-            
-            # Recupera il logo: prima prova logo store, poi fallback a logo aziendale
-            logo_path = None
-            if order_document.id_store:
-                from src.models.store import Store
-                from src.services.media.media_utils import get_store_logo_path
-                store = self.db.query(Store).filter(Store.id_store == order_document.id_store).first()
-                if store:
-                    # Recupera logo aziendale come fallback
-                    company_logo_config = self.db.query(AppConfiguration).filter(
-                        and_(
-                            AppConfiguration.category == "company_info",
-                            AppConfiguration.name == "company_logo"
-                        )
-                    ).first()
-                    fallback_logo = company_logo_config.value if company_logo_config else None
-                    logo_path = get_store_logo_path(store, fallback_path=fallback_logo)
-            
-            # Se non c'è store o logo store non disponibile, usa logo aziendale
-            if not logo_path:
+        # Recupera dati spedizione
+        shipping_data = None
+        shipping_vat_percentage = 0
+        if order_document.id_shipping:
+            shipping = self.db.query(Shipping).filter(Shipping.id_shipping == order_document.id_shipping).first()
+            if shipping:
+                if shipping.id_tax:
+                    shipping_vat_percentage = float(self.tax_repo.get_percentage_by_id(int(shipping.id_tax)))
+                shipping_data = {
+                    "id_shipping": shipping.id_shipping,
+                    "price_tax_incl": shipping.price_tax_incl,
+                    "price_tax_excl": shipping.price_tax_excl,
+                    "weight": shipping.weight,
+                    "shipping_message": shipping.shipping_message
+                }
+        
+        # Recupera dati legali della societa' (categoria company_info).
+        # Per i preventivi il mittente e' la ragione sociale, non il
+        # mittente fisico DDT (ddt_sender_*).
+        sender_config = self.order_doc_service.get_company_info()
+        
+        # Recupera il logo: prima prova logo store, poi fallback a logo aziendale
+        logo_path = None
+        if order_document.id_store:
+            from src.models.store import Store
+            from src.services.media.media_utils import get_store_logo_path
+            store = self.db.query(Store).filter(Store.id_store == order_document.id_store).first()
+            if store:
+                # Recupera logo aziendale come fallback
                 company_logo_config = self.db.query(AppConfiguration).filter(
                     and_(
                         AppConfiguration.category == "company_info",
                         AppConfiguration.name == "company_logo"
                     )
                 ).first()
-                logo_path = company_logo_config.value if company_logo_config else None
-            
-            # Usa PreventivoPDFService per generare il PDF
-            pdf_service = PreventivoPDFService(
-                db_session=self.db,
-                preventivo_repo=self.preventivo_repo,
-                customer_repo=self.customer_repo,
-                tax_repo=self.tax_repo,
-                order_doc_service=self.order_doc_service
-            )
+                fallback_logo = company_logo_config.value if company_logo_config else None
+                logo_path = get_store_logo_path(store, fallback_path=fallback_logo)
+        
+        # Se non c'è store o logo store non disponibile, usa logo aziendale
+        if not logo_path:
+            company_logo_config = self.db.query(AppConfiguration).filter(
+                and_(
+                    AppConfiguration.category == "company_info",
+                    AppConfiguration.name == "company_logo"
+                )
+            ).first()
+            logo_path = company_logo_config.value if company_logo_config else None
+        
+        # Disegno con PreventivoPDFService delegato al pool di rendering (con cache PDF)
+        return PdfRenderJob(
+            kind="preventivo",
+            document_id=id_order_document,
+            filename=f"Preventivo-{preventivo_data.document_number}.pdf",
+            render_func=render_preventivo_pdf,
+            version=file_version(logo_path),
+            render_kwargs={
+                "tax_repo": TaxPercentageLookup.from_session(self.db),
+                "preventivo_data": preventivo_data,
+                "customer_data": customer_data,
+                "address_delivery_data": address_delivery_data,
+                "shipping_data": shipping_data,
+                "shipping_vat_percentage": shipping_vat_percentage,
+                "sender_config": sender_config,
+                "logo_path": logo_path,
+            },
+        )
+    
+    def get_bulk_pdf_ids(self, request: OrderDocumentBulkPdfRequestSchema, max_documents: int) -> List[int]:
+        """
+        ID preventivi per l'export PDF massivo (lista esplicita o stessi filtri della lista preventivi)
+        
+        Args:
+            request: Richiesta export con ids o filters
+            max_documents: Numero massimo di documenti esportabili
             
-            return pdf_service.generate_pdf(
-                preventivo_data=preventivo_data,
-                order_document=order_document,
-                customer_data=customer_data,
-                address_delivery_data=address_delivery_data,
-                shipping_data=shipping_data,
-                shipping_vat_percentage=shipping_vat_percentage,
-                sender_config=sender_config,
-                logo_path=logo_path
+        Returns:
+            List[int]: ID preventivi nell'ordine di export
+        """
+        from src.services.pdf.bulk_pdf_export import select_bulk_document_ids
+
+        filters = request.filters or OrderDocumentBulkPdfFiltersSchema()
+
+        def load_filtered_ids(limit: int) -> List[int]:
+            preventivi = self.preventivo_repo.get_preventivi(
+                0, limit, filters.search, filters.sectionals_ids,
+                filters.payments_ids, filters.date_from, filters.date_to
             )
+            return [preventivo.id_order_document for preventivo in preventivi]
+
+        return select_bulk_document_ids(request.ids, load_filtered_ids, max_documents, entity_type="Preventivo")
+    
+    async def generate_preventivo_pdf(self, id_order_document: int) -> bytes:
+        """
+        Genera il PDF del preventivo
+        
+        Args:
+            id_order_document: ID del preventivo
             
+        Returns:
+            bytes: Contenuto del PDF
+        """
+        try:
+            job = await self.prepare_preventivo_pdf_job(id_order_document)
+            return await render_pdf_job(job)
         except ImportError:
             raise Exception("Libreria fpdf2 non installata. Installare con: pip install fpdf2")
         except Exception as e:
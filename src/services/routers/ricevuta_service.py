@@ -1,7 +1,7 @@
 """Service ricevute — lettura con join live ordine/cliente/order_details."""
 
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from sqlalchemy.orm import joinedload
 
@@ -38,6 +38,7 @@ from src.services.ricevute.order_embed_formatters import (
     map_ricevuta_shipping_embed,
 )
 from src.services.export.ricevuta_export_service import RicevutaExportService
+from src.services.export.streaming import iter_file_chunks
 from src.services.interfaces.ricevuta_service_interface import IRicevutaService
 from src.services.pdf.ricevuta_pdf_service import RicevutaPDFService
 from src.services.ricevute.date_utils import (
@@ -261,28 +262,7 @@ class RicevutaService(IRicevutaService):
             limit=filters.limit,
         )
 
-        items: List[RicevutaListItemSchema] = []
-        for ricevuta in rows:
-            customer = self._customer_repository.get_by_id(ricevuta.id_customer)
-            order = self._order_repository.get_by_id(ricevuta.id_order)
-            items.append(
-                RicevutaListItemSchema(
-                    id_ricevuta=ricevuta.id_ricevuta,
-                    numero=ricevuta.numero,
-                    anno=ricevuta.anno,
-                    id_order=ricevuta.id_order,
-                    data_incasso=ricevuta.data_incasso,
-                    data_emissione=ricevuta.data_emissione,
-                    stato=RicevutaStatoSchema(ricevuta.stato.value),
-                    pdf_path=ricevuta.pdf_path,
-                    pdf_generated_at=ricevuta.pdf_generated_at,
-                    customer=self._map_customer(customer),
-                    order_reference=order.reference if order else None,
-                    order_total_with_tax=_to_float(order.total_price_with_tax)
-                    if order
-                    else None,
-                )
-            )
+        items = [self._map_list_item(ricevuta) for ricevuta in rows]
 
         return RicevutaListResponseSchema(
             ricevute=items,
@@ -291,6 +271,40 @@ class RicevutaService(IRicevutaService):
             limit=filters.limit,
         )
 
+    def _map_list_item(self, ricevuta: Ricevuta) -> RicevutaListItemSchema:
+        customer = self._customer_repository.get_by_id(ricevuta.id_customer)
+        order = self._order_repository.get_by_id(ricevuta.id_order)
+        return RicevutaListItemSchema(
+            id_ricevuta=ricevuta.id_ricevuta,
+            numero=ricevuta.numero,
+            anno=ricevuta.anno,
+            id_order=ricevuta.id_order,
+            data_incasso=ricevuta.data_incasso,
+            data_emissione=ricevuta.data_emissione,
+            stato=RicevutaStatoSchema(ricevuta.stato.value),
+            pdf_path=ricevuta.pdf_path,
+            pdf_generated_at=ricevuta.pdf_generated_at,
+            customer=self._map_customer(customer),
+            order_reference=order.reference if order else None,
+            order_total_with_tax=_to_float(order.total_price_with_tax)
+            if order
+            else None,
+        )
+
+    def _iter_export_items(
+        self, filters: RicevutaFiltersSchema
+    ) -> Iterator[RicevutaListItemSchema]:
+        # A blocchi con offset: _map_list_item esegue query sulla stessa sessione
+        for batch in self._ricevuta_repository.iter_filtered(
+            id_order=filters.id_order,
+            id_customer=filters.id_customer,
+            stato=filters.stato.value if filters.stato else None,
+            data_emissione_from=filters.data_emissione_from,
+            data_emissione_to=filters.data_emissione_to,
+        ):
+            for ricevuta in batch:
+                yield self._map_list_item(ricevuta)
+
     def export_ricevuta(self, id_ricevuta: int, fmt: str) -> tuple[bytes, str, str]:
         export_fmt = self._parse_export_format(fmt)
         detail = self.get_ricevuta(id_ricevuta)
@@ -309,29 +323,38 @@ class RicevutaService(IRicevutaService):
 
     def export_ricevute(
         self, filters: RicevutaFiltersSchema, fmt: str
-    ) -> tuple[bytes, str, str]:
+    ) -> tuple[Iterator[bytes], str, str]:
         export_fmt = self._parse_export_format(fmt)
-        export_filters = filters.model_copy(
-            update={"page": 1, "limit": EXPORT_MAX_LIMIT}
+        _, total = self._ricevuta_repository.list_filtered(
+            id_order=filters.id_order,
+            id_customer=filters.id_customer,
+            stato=filters.stato.value if filters.stato else None,
+            data_emissione_from=filters.data_emissione_from,
+            data_emissione_to=filters.data_emissione_to,
+            page=1,
+            limit=1,
         )
-        listed = self.list_ricevute(export_filters)
-        if listed.total > EXPORT_MAX_LIMIT:
+        if total > EXPORT_MAX_LIMIT:
             raise ValidationException(
-                f"Troppi record per export ({listed.total}); restringere i filtri "
+                f"Troppi record per export ({total}); restringere i filtri "
                 f"(max {EXPORT_MAX_LIMIT})",
-                details={"total": listed.total, "max": EXPORT_MAX_LIMIT},
+                details={"total": total, "max": EXPORT_MAX_LIMIT},
             )
 
+        # File scritto prima della risposta (la sessione della request si chiude
+        # prima dello streaming), poi inviato a chunk
+        items = self._iter_export_items(filters)
         if export_fmt == RicevutaExportFormatSchema.CSV:
-            content = self._export_service.build_list_csv(listed.ricevute)
+            handle = self._export_service.write_list_csv(items)
             media_type = "text/csv; charset=utf-8"
             extension = "csv"
         else:
-            content = self._export_service.build_list_xlsx(listed.ricevute)
+            handle = self._export_service.write_list_xlsx(items)
             media_type = (
                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
             extension = "xlsx"
+        content = iter_file_chunks(handle)
 
         suffix = ""
         if filters.data_emissione_from and filters.data_emissione_to:
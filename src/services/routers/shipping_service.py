@@ -20,9 +20,10 @@ from src.core.exceptions import (
     InfrastructureException,
     AlreadyExistsError
 )
-from src.events.core.event import EventType
+from src.events.core.event import Event, EventType
 from src.events.decorators import emit_event_on_success
 from src.events.extractors import extract_shipping_status_changed_data
+from src.events.runtime import emit_event
 from src.models.order import Order
 from src.models.order_detail import OrderDetail
 from src.models.order_document import OrderDocument
@@ -989,6 +990,9 @@ class ShippingService(IShippingService):
         """
         Sincronizza lo stato delle spedizioni dai risultati del tracking.
         
+        Le spedizioni sono risolte e aggiornate in blocco (una query, un UPDATE, una transazione);
+        SHIPPING_STATUS_CHANGED viene emesso solo per quelle con stato effettivamente cambiato.
+        
         Args:
             tracking_results: Lista di risultati normalizzati dal tracking service.
                 Ogni risultato deve contenere:
@@ -1000,51 +1004,60 @@ class ShippingService(IShippingService):
         Returns:
             Numero di spedizioni aggiornate
         """
-        updated_count = 0
-        
+        # Un aggiornamento per tracking (l'ultimo risultato prevale), evento dall'ultimo evento ricevuto
+        updates: Dict[str, Dict[str, Any]] = {}
         for result in tracking_results:
-            try:
-                tracking_number = result.get("tracking_number")
-                if not tracking_number:
-                    continue
-                
-                state_id = result.get("current_internal_state_id")
-                if not state_id:
-                    continue
-                
-                # Estrai informazioni dall'ultimo evento (se presente)
-                event_code = None
-                event_description = None
-                events = result.get("events", [])
-                if events:
-                    # Prendi l'ultimo evento (più recente)
-                    last_event = events[-1] if events else None
-                    if last_event:
-                        event_code = last_event.get("code")
-                        event_description = last_event.get("description")
-                
-                # Aggiorna lo stato usando il repository
-                rows_updated = self._shipping_repository.update_state_by_tracking(
-                    tracking=tracking_number,
-                    state_id=state_id,
-                    carrier_type=carrier_type,
-                    event_code=event_code,
-                    event_description=event_description
-                )
-                
-                if rows_updated > 0:
-                    updated_count += 1
-                    
-            except Exception as e:
-                # Log errore ma continua con gli altri risultati
-                logger = logging.getLogger(__name__)
-                logger.error(
-                    f"Error syncing shipping state for tracking {result.get('tracking_number', 'unknown')}: {str(e)}",
-                    exc_info=True
-                )
+            tracking_number = result.get("tracking_number")
+            state_id = result.get("current_internal_state_id")
+            if not tracking_number or not state_id:
                 continue
+            
+            events = result.get("events") or []
+            last_event = events[-1] if events else {}
+            updates[tracking_number] = {
+                "tracking": tracking_number,
+                "state_id": state_id,
+                "event_code": last_event.get("code"),
+                "event_description": last_event.get("description")
+            }
+        
+        if not updates:
+            return 0
+        
+        try:
+            changes = self._shipping_repository.bulk_update_states_by_tracking(list(updates.values()))
+        except Exception as e:
+            logger.error(
+                f"Error syncing shipping states for {len(updates)} trackings ({carrier_type}): {str(e)}",
+                exc_info=True
+            )
+            return 0
+        
+        # Eventi solo per le spedizioni effettivamente cambiate
+        for change in changes:
+            if not change.get("id_order"):
+                continue
+            try:
+                emit_event(Event(
+                    event_type=EventType.SHIPPING_STATUS_CHANGED.value,
+                    data={
+                        "id_shipping": change["id_shipping"],
+                        "id_order": change["id_order"],
+                        "old_state_id": change["old_state_id"],
+                        "new_state_id": change["new_state_id"],
+                        "id_store": change["id_store"],
+                        "updated_by": None
+                    },
+                    metadata={
+                        "source": "shipping_service.sync_shipping_states_from_tracking_results",
+                        "carrier_type": carrier_type,
+                        "tracking": change["tracking"]
+                    }
+                ))
+            except Exception:
+                logger.exception(f"Failed to emit shipping status event for shipping {change['id_shipping']}")
         
-        return updated_count
+        return len(changes)
     
     def get_active_shipments_count(self, order_id: int) -> int:
         """
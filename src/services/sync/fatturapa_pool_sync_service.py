@@ -19,6 +19,7 @@ from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
 
+from src.core.http_clients import get_http_client
 from src.repository.app_configuration_repository import AppConfigurationRepository
 from src.repository.purchase_invoice_sync_repository import PurchaseInvoiceSyncRepository
 
@@ -217,13 +218,13 @@ class FatturaPAPoolSyncService:
             url = f"{self.base_url}/pool/{self.api_key}"
             logger.debug(f"Chiamata API POOL: {url}")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                
-                data = response.json()
-                logger.debug(f"Risposta POOL: {data}")
-                return data
+            client = get_http_client("fatturapa")
+            response = await client.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            
+            data = response.json()
+            logger.debug(f"Risposta POOL: {data}")
+            return data
                 
         except httpx.HTTPError as e:
             logger.error(f"Errore HTTP nella chiamata POOL: {e}")
@@ -245,13 +246,13 @@ class FatturaPAPoolSyncService:
         try:
             logger.debug(f"Download feed da SAS URL: {sas_url[:50]}...")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(sas_url)
-                response.raise_for_status()
-                
-                xml_content = response.text
-                logger.debug(f"Feed scaricato, dimensione: {len(xml_content)} caratteri")
-                return xml_content
+            client = get_http_client("fatturapa")
+            response = await client.get(sas_url, timeout=self.timeout)
+            response.raise_for_status()
+            
+            xml_content = response.text
+            logger.debug(f"Feed scaricato, dimensione: {len(xml_content)} caratteri")
+            return xml_content
                 
         except httpx.HTTPError as e:
             logger.error(f"Errore HTTP nel download feed: {e}")
@@ -411,20 +412,20 @@ class FatturaPAPoolSyncService:
         try:
             logger.debug(f"Download file: {nome_file} da {uri[:50]}...")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(uri)
-                response.raise_for_status()
-                
-                # Salva il file localmente
-                file_path = os.path.join(self.download_dir, nome_file)
-                with open(file_path, 'wb') as f:
-                    f.write(response.content)
-                
-                # Ritorna sia il contenuto che il path
-                content = response.text if nome_file.endswith('.xml') else response.content.decode('utf-8', errors='ignore')
-                
-                logger.debug(f"File scaricato: {file_path}")
-                return content, file_path
+            client = get_http_client("fatturapa")
+            response = await client.get(uri, timeout=self.timeout)
+            response.raise_for_status()
+            
+            # Salva il file localmente
+            file_path = os.path.join(self.download_dir, nome_file)
+            with open(file_path, 'wb') as f:
+                f.write(response.content)
+            
+            # Ritorna sia il contenuto che il path
+            content = response.text if nome_file.endswith('.xml') else response.content.decode('utf-8', errors='ignore')
+            
+            logger.debug(f"File scaricato: {file_path}")
+            return content, file_path
                 
         except httpx.HTTPError as e:
             logger.error(f"Errore HTTP nel download file {nome_file}: {e}")
@@ -0,0 +1,155 @@
+"""
+Avanzamento e checkpoint di una sincronizzazione e-commerce su sync_jobs.
+
+Il service di sync notifica inizio/fine entità e ogni pagina elaborata; il tracker
+aggiorna il job (fase, entità, ultimo ID, conteggi, throughput, errori) con una
+sessione DB propria, così lo stato resta consultabile e persistente anche se la
+transazione della sync fallisce. Alla ripresa di un job le entità già completate
+vengono saltate e quella interrotta riparte dagli ID successivi al checkpoint.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set, Tuple
+
+from src.models.sync_job import SyncJob
+from src.repository.sync_job_repository import SyncJobRepository
+
+logger = logging.getLogger(__name__)
+
+
+def stale_before(stale_seconds: float) -> datetime:
+    """Limite di heartbeat oltre il quale un job `running` è considerato senza processo"""
+    return datetime.now() - timedelta(seconds=stale_seconds)
+
+
+def serialize_sync_job(job: SyncJob) -> Dict[str, Any]:
+    """Rappresentazione del job per l'endpoint di stato"""
+    return {
+        "sync_id": job.id_sync_job,
+        "store_id": job.id_store,
+        "sync_type": job.sync_type,
+        "status": job.status,
+        "phase": job.phase,
+        "entity": job.entity,
+        "last_id": job.last_id,
+        "completed_entities": SyncJobTracker.parse_entities(job.completed_entities),
+        "pages": job.pages,
+        "fetched": job.fetched,
+        "processed": job.processed,
+        "rows_per_second": job.rows_per_second,
+        "errors": job.errors,
+        "last_error": job.last_error,
+        "attempts": job.attempts,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "heartbeat_at": job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+class SyncJobTracker:
+    """
+    Registra l'avanzamento di un SyncJob.
+
+    Args:
+        repository: SyncJobRepository su una sessione dedicata al tracker
+        job: Job da aggiornare (nuovo o ripreso)
+    """
+
+    def __init__(self, repository: SyncJobRepository, job: SyncJob):
+        self._repo = repository
+        self.job = job
+        self._completed: Set[str] = set(self.parse_entities(job.completed_entities))
+        self._entity_started = time.monotonic()
+        self._entity_fetched = 0
+        self._entity_pages = 0
+
+    @staticmethod
+    def parse_entities(value: Optional[str]) -> list:
+        return [entity for entity in (value or '').split(',') if entity]
+
+    @property
+    def id_sync_job(self) -> int:
+        return self.job.id_sync_job
+
+    def is_completed(self, entity: str) -> bool:
+        return entity in self._completed
+
+    def start_entity(self, phase: str, entity: str) -> None:
+        """Entità in esecuzione; il checkpoint resta solo se si riprende la stessa entità"""
+        if self.job.entity != entity:
+            self.job.last_id = None
+            self.job.checkpoint_date_upd = None
+        elif self.job.last_id is not None:
+            logger.info(f"Sync job {self.id_sync_job}: resuming {entity} after id {self.job.last_id}")
+        self.job.phase = phase
+        self.job.entity = entity
+        self.job.heartbeat_at = datetime.now()
+        self._entity_started = time.monotonic()
+        self._entity_fetched = 0
+        self._entity_pages = 0
+        self._repo.save(self.job)
+
+    def resume_checkpoint(self) -> Tuple[Optional[int], Optional[datetime]]:
+        """(ultimo ID elaborato, date_upd remoto annotato) dell'entità corrente; None se da inizio"""
+        return self.job.last_id, self.job.checkpoint_date_upd
+
+    def set_remote_mark(self, last_update: Optional[datetime]) -> None:
+        """Annota il date_upd remoto letto a inizio entità (watermark da usare anche dopo la ripresa)"""
+        self.job.checkpoint_date_upd = last_update
+        self._repo.save(self.job)
+
+    def page_done(self, last_id: Optional[int], fetched: int, processed: int) -> None:
+        """Pagina elaborata e confermata: avanza checkpoint, conteggi e throughput"""
+        if last_id is not None and (self.job.last_id is None or last_id > self.job.last_id):
+            self.job.last_id = last_id
+        self.job.pages = (self.job.pages or 0) + 1
+        self.job.fetched = (self.job.fetched or 0) + fetched
+        self.job.processed = (self.job.processed or 0) + processed
+        self._entity_fetched += fetched
+        self._entity_pages += 1
+        elapsed = time.monotonic() - self._entity_started
+        self.job.rows_per_second = round(self._entity_fetched / elapsed, 1) if elapsed else None
+        self.job.heartbeat_at = datetime.now()
+        self._repo.save(self.job)
+
+    def finish_entity(self, entity: str, processed: int = 0) -> None:
+        """Entità completata: non viene ripetuta alla ripresa del job"""
+        self._completed.add(entity)
+        self.job.completed_entities = ','.join(sorted(self._completed))
+        self.job.last_id = None
+        self.job.checkpoint_date_upd = None
+        if not self._entity_pages:
+            # Entità senza pipeline a pagine: conteggio a fine entità
+            self.job.processed = (self.job.processed or 0) + processed
+        self.job.heartbeat_at = datetime.now()
+        self._repo.save(self.job)
+
+    def record_error(self, message: str) -> None:
+        self.job.errors = (self.job.errors or 0) + 1
+        self.job.last_error = message[:2000]
+        self.job.heartbeat_at = datetime.now()
+        self._repo.save(self.job)
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        """Stato finale del job: completed, failed o interrupted"""
+        self.job.status = status
+        if error:
+            self.job.last_error = error[:2000]
+        now = datetime.now()
+        self.job.heartbeat_at = now
+        if status != 'interrupted':
+            self.job.finished_at = now
+        self._repo.save(self.job)
+
+    async def keep_alive(self, interval: float) -> None:
+        """Aggiorna l'heartbeat ogni `interval` secondi anche durante entità senza pagine"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self._repo.touch(self.id_sync_job)
+            except Exception as e:
+                logger.warning(f"Sync job {self.id_sync_job}: heartbeat failed: {e}")
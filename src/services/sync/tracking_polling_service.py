@@ -1,13 +1,18 @@
 """
 Servizio per polling periodico automatico del tracking di tutte le spedizioni
+
+Scheduler basato su Shipping.next_poll_at (persistito e indicizzato): a ogni ciclo
+vengono interrogate solo le spedizioni scadute, raggruppate per carrier e processate
+in parallelo da un pool di worker per carrier, con rate limit a token bucket.
 """
 import asyncio
 import logging
-import time
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Set
 from sqlalchemy.orm import Session
 from sqlalchemy.engine import Row
 
+from src.core.rate_limit import TokenBucket
 from src.repository.shipping_repository import ShippingRepository
 from src.services.routers.shipping_service import ShippingService
 from src.factories.services.carrier_service_factory import CarrierServiceFactory
@@ -19,323 +24,281 @@ logger = logging.getLogger(__name__)
 # Configurazione intervalli polling (in secondi)
 BRT_INITIAL_POLLING_INTERVAL = 450  # 7.5 minuti (media tra 5-10)
 BRT_POST_RESPONSE_POLLING_INTERVAL = 5400  # 1.5 ore (media tra 1-2)
-BRT_RATE_LIMIT_SECONDS = 300  # 5 minuti
+BRT_RETRY_INTERVAL = 300  # 5 minuti
 
 DEFAULT_POLLING_INTERVAL = 3600  # 1 ora
-DEFAULT_RATE_LIMIT_SECONDS = 60  # 1 minuto
+DEFAULT_RETRY_INTERVAL = 300  # 5 minuti dopo una chiamata fallita
+
+# Attesa tra due cicli: fino al primo next_poll_at, entro questi limiti
+# (il massimo garantisce che le nuove spedizioni, con next_poll_at NULL, partano presto)
+MIN_SCHEDULER_SLEEP = 30
+MAX_SCHEDULER_SLEEP = BRT_INITIAL_POLLING_INTERVAL
 
 EXCLUDED_SHIPPING_STATES = [1, 8, 11, 13]  # Stati finali esclusi dal polling
 
-# Configurazione per carrier
+# Configurazione per carrier:
+# - batch_size: tracking number per chiamata al tracking service
+# - per_parcel_requests: il carrier fa una richiesta HTTP per parcel (costo del batch in token)
+# - requests_per_second / burst: token bucket per CarrierApi
+# - workers: batch processati in parallelo per CarrierApi
 CARRIER_POLLING_CONFIG = {
     CarrierTypeEnum.BRT.value: {
         "initial_interval": BRT_INITIAL_POLLING_INTERVAL,
         "post_response_interval": BRT_POST_RESPONSE_POLLING_INTERVAL,
-        "rate_limit": BRT_RATE_LIMIT_SECONDS
+        "retry_interval": BRT_RETRY_INTERVAL,
+        "batch_size": 10,
+        "per_parcel_requests": True,
+        "requests_per_second": 5,
+        "burst": 10,
+        "workers": 2
     },
     CarrierTypeEnum.DHL.value: {
         "interval": DEFAULT_POLLING_INTERVAL,
-        "rate_limit": DEFAULT_RATE_LIMIT_SECONDS
+        "retry_interval": DEFAULT_RETRY_INTERVAL,
+        "batch_size": 20,
+        "requests_per_second": 1,
+        "burst": 3,
+        "workers": 2
     },
     CarrierTypeEnum.FEDEX.value: {
         "interval": DEFAULT_POLLING_INTERVAL,
-        "rate_limit": DEFAULT_RATE_LIMIT_SECONDS
+        "retry_interval": DEFAULT_RETRY_INTERVAL,
+        "batch_size": 30,  # massimo tracking number per richiesta FedEx Track API
+        "requests_per_second": 1,
+        "burst": 3,
+        "workers": 2
     }
 }
 
-# Rate limiting in-memory: {carrier_type: {tracking_number: last_request_timestamp}}
-_last_tracking_request: Dict[str, Dict[str, float]] = {}
+DEFAULT_CARRIER_CONFIG = {
+    "interval": DEFAULT_POLLING_INTERVAL,
+    "retry_interval": DEFAULT_RETRY_INTERVAL,
+    "batch_size": 10,
+    "requests_per_second": 1,
+    "burst": 1,
+    "workers": 1
+}
+
+# Token bucket per id_carrier_api, condivisi tra i cicli del processo
+_carrier_buckets: Dict[int, TokenBucket] = {}
+
+
+def _get_carrier_config(carrier_type: str) -> Dict[str, Any]:
+    return CARRIER_POLLING_CONFIG.get(carrier_type, DEFAULT_CARRIER_CONFIG)
+
+
+def _get_carrier_bucket(carrier_api_id: int, config: Dict[str, Any]) -> TokenBucket:
+    bucket = _carrier_buckets.get(carrier_api_id)
+    if bucket is None:
+        bucket = TokenBucket(config["requests_per_second"], config["burst"])
+        _carrier_buckets[carrier_api_id] = bucket
+    return bucket
+
+
+def _determine_polling_interval(carrier_type: str, has_events: bool) -> int:
+    """
+    Determina l'intervallo fino al prossimo polling di una spedizione.
+
+    Args:
+        carrier_type: Tipo di carrier
+        has_events: True se la spedizione ha già ricevuto eventi di tracking
+
+    Returns:
+        Intervallo in secondi
+    """
+    config = _get_carrier_config(carrier_type)
+
+    # Per BRT, usa intervalli dinamici: frequente finché non arrivano eventi
+    if carrier_type == CarrierTypeEnum.BRT.value:
+        return config["post_response_interval"] if has_events else config["initial_interval"]
+    # Per altri carrier, usa intervallo fisso
+    return config.get("interval", DEFAULT_POLLING_INTERVAL)
+
+
+async def _poll_carrier_group(
+    db: Session,
+    factory: CarrierServiceFactory,
+    shipping_service: ShippingService,
+    carrier_api_id: int,
+    carrier_type: str,
+    shipments: List[Row],
+    ids_with_events: Set[int],
+    next_poll_at_by_id: Dict[int, datetime],
+    cycle_started_at: datetime
+) -> int:
+    """
+    Interroga le spedizioni di una CarrierApi con un pool di worker e token bucket.
+    Scrive gli stati a fine di ogni batch e pianifica next_poll_at di ogni spedizione,
+    calcolato da `cycle_started_at` (un solo istante per intervallo in tutto il ciclo).
+
+    Returns:
+        Numero di spedizioni con stato aggiornato
+    """
+    config = _get_carrier_config(carrier_type)
+    tracking_service = factory.get_tracking_service(carrier_api_id, db)
+    bucket = _get_carrier_bucket(carrier_api_id, config)
+
+    batch_size = max(1, config["batch_size"])
+    batches = [shipments[i:i + batch_size] for i in range(0, len(shipments), batch_size)]
+    queue: asyncio.Queue = asyncio.Queue()
+    for batch in batches:
+        queue.put_nowait(batch)
+
+    updated = 0
+
+    async def _worker() -> None:
+        nonlocal updated
+        while True:
+            try:
+                batch = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            tracking_numbers = [s.tracking for s in batch]
+            await bucket.acquire(len(tracking_numbers) if config.get("per_parcel_requests") else 1)
+
+            try:
+                results, failed = await tracking_service.get_tracking_with_failures(
+                    tracking_numbers, carrier_api_id
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error polling tracking for carrier {carrier_type} (API ID: {carrier_api_id}), "
+                    f"batch of {len(batch)}: {str(e)}"
+                )
+                retry_at = cycle_started_at + timedelta(seconds=config["retry_interval"])
+                for shipment in batch:
+                    next_poll_at_by_id[shipment.id_shipping] = retry_at
+                continue
+
+            # Scrittura stati per batch (nessun await tra lettura e commit sulla sessione condivisa)
+            updated += await shipping_service.sync_shipping_states_from_tracking_results(
+                results,
+                carrier_type=carrier_type
+            )
+
+            responded = {
+                item.get("tracking_number") for item in results if item.get("events")
+            }
+            # Parcel con richiesta fallita (il resto del batch ha risposto): riprova a breve
+            failed = set(failed)
+            retry_at = cycle_started_at + timedelta(seconds=config["retry_interval"])
+            for shipment in batch:
+                if shipment.tracking in failed:
+                    next_poll_at_by_id[shipment.id_shipping] = retry_at
+                    continue
+                has_events = shipment.id_shipping in ids_with_events or shipment.tracking in responded
+                next_poll_at_by_id[shipment.id_shipping] = cycle_started_at + timedelta(
+                    seconds=_determine_polling_interval(carrier_type, has_events)
+                )
+
+    workers = min(max(1, config["workers"]), len(batches))
+    await asyncio.gather(*(_worker() for _ in range(workers)))
+    return updated
 
 
 async def poll_tracking_periodic(db: Session):
     """
     Funzione principale per il polling periodico del tracking.
-    
-    Recupera tutte le spedizioni con tracking, le raggruppa per carrier,
-    e chiama il tracking service appropriato per ogni gruppo.
-    
+
+    Recupera le spedizioni con next_poll_at scaduto, le raggruppa per carrier e
+    processa i gruppi in parallelo; a fine ciclo ripianifica next_poll_at in blocco.
+
     Args:
         db: Database session
     """
     try:
         logger.info("Starting periodic tracking polling")
-        
-        # Recupera tutte le spedizioni con tracking (escludendo stati finali)
+
         shipping_repo = ShippingRepository(db)
-        shipments = shipping_repo.get_shipments_with_tracking(exclude_states=EXCLUDED_SHIPPING_STATES)
-        
+        # Istante unico del ciclo: le ripianificazioni condividono pochi valori di next_poll_at
+        cycle_started_at = datetime.now()
+        shipments = shipping_repo.get_shipments_due_for_polling(
+            cycle_started_at, exclude_states=EXCLUDED_SHIPPING_STATES
+        )
+
         if not shipments:
-            logger.info("No shipments with tracking found, skipping polling")
+            logger.info("No shipments due for tracking polling")
             return
-        
-        logger.info(f"Found {len(shipments)} shipments to poll")
-        
+
+        # Presenza eventi per tutte le spedizioni in una query (niente N+1)
+        ids_with_events = shipping_repo.get_shipping_ids_with_events([s.id_shipping for s in shipments])
+
         # Raggruppa spedizioni per id_carrier_api
         shipments_by_carrier: Dict[int, List[Row]] = {}
+        carrier_types: Dict[int, str] = {}
         for shipment in shipments:
-            carrier_api_id = shipment.id_carrier_api
-            if carrier_api_id not in shipments_by_carrier:
-                shipments_by_carrier[carrier_api_id] = []
-            shipments_by_carrier[carrier_api_id].append(shipment)
-        
-        logger.info(f"Grouped shipments into {len(shipments_by_carrier)} carrier groups")
-        
-        # Crea factory per ottenere tracking services
-        carrier_repo = ApiCarrierRepository(db)
-        factory = CarrierServiceFactory(carrier_repo)
-        
-        # Processa ogni gruppo di carrier
-        for carrier_api_id, carrier_shipments in shipments_by_carrier.items():
+            shipments_by_carrier.setdefault(shipment.id_carrier_api, []).append(shipment)
+            carrier_types[shipment.id_carrier_api] = getattr(shipment.carrier_type, "value", shipment.carrier_type)
+
+        logger.info(
+            f"Polling {len(shipments)} due shipments in {len(shipments_by_carrier)} carrier groups "
+            f"({len(ids_with_events)} with events)"
+        )
+
+        factory = CarrierServiceFactory(ApiCarrierRepository(db))
+        shipping_service = ShippingService(shipping_repo)
+        next_poll_at_by_id: Dict[int, datetime] = {}
+
+        async def _run_group(carrier_api_id: int, carrier_shipments: List[Row]) -> None:
+            carrier_type = carrier_types[carrier_api_id]
             try:
-                # Ottieni il carrier per determinare il tipo
-                carrier = carrier_repo.get_by_id(carrier_api_id)
-                if not carrier or not carrier.is_active:
-                    logger.warning(f"Carrier API {carrier_api_id} not found or inactive, skipping")
-                    continue
-                
-                carrier_type = carrier.carrier_type.value
-                logger.info(f"Processing {len(carrier_shipments)} shipments for carrier {carrier_type} (API ID: {carrier_api_id})")
-                
-                # Ottieni il tracking service appropriato
-                tracking_service = factory.get_tracking_service(carrier_api_id, db)
-                
-                # Filtra spedizioni in base a rate limiting e presenza eventi
-                tracking_numbers_to_poll: List[str] = []
-                has_events_count = 0
-                no_events_count = 0
-                
-                for shipment in carrier_shipments:
-                    tracking_number = shipment.tracking
-                    if not tracking_number:
-                        continue
-                    
-                    # Verifica rate limiting
-                    if not _can_make_request(carrier_type, tracking_number):
-                        logger.debug(f"Skipping {tracking_number} due to rate limiting")
-                        continue
-                    
-                    # Verifica se ha eventi (per determinare intervallo polling)
-                    has_events = shipping_repo.has_tracking_events(tracking_number)
-                    if has_events:
-                        has_events_count += 1
-                    else:
-                        no_events_count += 1
-                    
-                    tracking_numbers_to_poll.append(tracking_number)
-                
-                if not tracking_numbers_to_poll:
-                    logger.info(f"No shipments to poll for carrier {carrier_type} (all rate limited)")
-                    continue
-                
-                logger.info(
-                    f"Polling {len(tracking_numbers_to_poll)} shipments for {carrier_type}: "
-                    f"{no_events_count} without events, {has_events_count} with events"
+                updated = await _poll_carrier_group(
+                    db, factory, shipping_service, carrier_api_id, carrier_type,
+                    carrier_shipments, ids_with_events, next_poll_at_by_id, cycle_started_at
                 )
-                
-                # Chiama il tracking service
-                try:
-                    results = await tracking_service.get_tracking(tracking_numbers_to_poll, carrier_api_id)
-                    
-                    # Aggiorna stati spedizioni usando ShippingService
-                    shipping_service = ShippingService(shipping_repo)
-                    updated_count = await shipping_service.sync_shipping_states_from_tracking_results(
-                        results,
-                        carrier_type=carrier_type
-                    )
-                    
-                    # Aggiorna timestamp rate limiting per tutti i tracking aggiornati
-                    for item in results:
-                        tn = item.get("tracking_number")
-                        if tn:
-                            _update_rate_limit_timestamp(carrier_type, tn)
-                    
-                    logger.info(f"Updated {updated_count} shipment states for carrier {carrier_type}")
-                    
-                except Exception as e:
-                    logger.error(f"Error polling tracking for carrier {carrier_type}: {str(e)}", exc_info=True)
-                    # Continua con altri carrier anche in caso di errore
-                    continue
-                    
+                logger.info(f"Updated {updated} shipment states for carrier {carrier_type} (API ID: {carrier_api_id})")
             except Exception as e:
                 logger.error(f"Error processing carrier group {carrier_api_id}: {str(e)}", exc_info=True)
-                # Continua con altri carrier anche in caso di errore
-                continue
-        
-        # Pulizia rate limiting (rimuovi entry > 24h)
-        _cleanup_rate_limit_cache()
-        
+                retry_at = cycle_started_at + timedelta(seconds=_get_carrier_config(carrier_type)["retry_interval"])
+                for shipment in carrier_shipments:
+                    next_poll_at_by_id.setdefault(shipment.id_shipping, retry_at)
+
+        await asyncio.gather(*(
+            _run_group(carrier_api_id, carrier_shipments)
+            for carrier_api_id, carrier_shipments in shipments_by_carrier.items()
+        ))
+
+        shipping_repo.schedule_next_polls(next_poll_at_by_id)
+
         logger.info("Periodic tracking polling completed")
-        
+
     except Exception as e:
         logger.error(f"Error in periodic tracking polling: {str(e)}", exc_info=True)
 
 
-def _can_make_request(carrier_type: str, tracking_number: str) -> bool:
-    """
-    Verifica se è possibile fare una richiesta per questo tracking number
-    rispettando il rate limiting.
-    
-    Args:
-        carrier_type: Tipo di carrier (BRT, DHL, FEDEX)
-        tracking_number: Numero di tracking
-        
-    Returns:
-        True se può fare la richiesta, False altrimenti
-    """
-    if carrier_type not in CARRIER_POLLING_CONFIG:
-        # Carrier sconosciuto, usa default
-        rate_limit = DEFAULT_RATE_LIMIT_SECONDS
-    else:
-        config = CARRIER_POLLING_CONFIG[carrier_type]
-        rate_limit = config.get("rate_limit", DEFAULT_RATE_LIMIT_SECONDS)
-    
-    # Inizializza dizionario per carrier se non esiste
-    if carrier_type not in _last_tracking_request:
-        _last_tracking_request[carrier_type] = {}
-    
-    last_request_time = _last_tracking_request[carrier_type].get(tracking_number, 0)
-    current_time = time.time()
-    
-    return (current_time - last_request_time) >= rate_limit
-
-
-def _update_rate_limit_timestamp(carrier_type: str, tracking_number: str) -> None:
-    """
-    Aggiorna il timestamp dell'ultima richiesta per questo tracking number.
-    
-    Args:
-        carrier_type: Tipo di carrier
-        tracking_number: Numero di tracking
-    """
-    if carrier_type not in _last_tracking_request:
-        _last_tracking_request[carrier_type] = {}
-    
-    _last_tracking_request[carrier_type][tracking_number] = time.time()
-
-
-def _cleanup_rate_limit_cache() -> None:
-    """
-    Rimuove entry dal cache di rate limiting più vecchie di 24 ore.
-    """
-    current_time = time.time()
-    max_age = 24 * 3600  # 24 ore in secondi
-    
-    for carrier_type in list(_last_tracking_request.keys()):
-        tracking_dict = _last_tracking_request[carrier_type]
-        # Rimuovi entry vecchie
-        keys_to_remove = [
-            tn for tn, timestamp in tracking_dict.items()
-            if (current_time - timestamp) > max_age
-        ]
-        for tn in keys_to_remove:
-            del tracking_dict[tn]
-        
-        # Se il dizionario è vuoto, rimuovilo
-        if not tracking_dict:
-            del _last_tracking_request[carrier_type]
-
-
-def _determine_polling_interval(
-    db: Session,
-    has_events_count: int,
-    no_events_count: int,
-    carrier_type: str
-) -> int:
-    """
-    Determina l'intervallo di polling in base allo stato delle spedizioni.
-    
-    Args:
-        db: Database session
-        has_events_count: Numero di spedizioni con eventi
-        no_events_count: Numero di spedizioni senza eventi
-        carrier_type: Tipo di carrier
-        
-    Returns:
-        Intervallo in secondi
-    """
-    if carrier_type not in CARRIER_POLLING_CONFIG:
-        return DEFAULT_POLLING_INTERVAL
-    
-    config = CARRIER_POLLING_CONFIG[carrier_type]
-    
-    # Per BRT, usa intervalli dinamici
-    if carrier_type == CarrierTypeEnum.BRT.value:
-        # Se ci sono spedizioni senza eventi, usa intervallo iniziale
-        if no_events_count > 0:
-            return config["initial_interval"]
-        else:
-            return config["post_response_interval"]
-    else:
-        # Per altri carrier, usa intervallo fisso
-        return config.get("interval", DEFAULT_POLLING_INTERVAL)
+def _seconds_until_next_poll(db: Session) -> float:
+    """Secondi fino al primo next_poll_at pianificato, entro MIN/MAX_SCHEDULER_SLEEP."""
+    next_poll_at = ShippingRepository(db).get_next_scheduled_poll(exclude_states=EXCLUDED_SHIPPING_STATES)
+    if next_poll_at is None:
+        return MAX_SCHEDULER_SLEEP
+    wait = (next_poll_at - datetime.now()).total_seconds()
+    return min(MAX_SCHEDULER_SLEEP, max(MIN_SCHEDULER_SLEEP, wait))
 
 
 async def run_tracking_polling_task(db: Session):
     """
     Task periodica che gira in loop infinito, facendo polling del tracking.
-    
-    Usa intervalli dinamici basati sullo stato delle spedizioni:
-    - BRT: 7.5 minuti se ci sono spedizioni senza eventi, 1.5 ore se tutte hanno eventi
+
+    Ogni spedizione ha il suo next_poll_at:
+    - BRT: 7.5 minuti finché non ci sono eventi, poi 1.5 ore
     - Altri carrier: 1 ora (configurabile)
-    
+    Il task esegue un ciclo sulle spedizioni scadute e dorme fino alla prossima scadenza.
+
     Args:
         db: Database session (deve essere gestita correttamente per ogni iterazione)
     """
     logger.info("Starting tracking polling periodic task")
-    
+
     while True:
         try:
-            # Determina intervallo di polling
-            # Per determinare l'intervallo, dobbiamo prima vedere lo stato delle spedizioni
-            shipping_repo = ShippingRepository(db)
-            shipments = shipping_repo.get_shipments_with_tracking(exclude_states=EXCLUDED_SHIPPING_STATES)
-            
-            if shipments:
-                # Conta spedizioni con/senza eventi per ogni carrier
-                carrier_repo = ApiCarrierRepository(db)
-                has_events_by_carrier: Dict[str, int] = {}
-                no_events_by_carrier: Dict[str, int] = {}
-                
-                for shipment in shipments:
-                    carrier = carrier_repo.get_by_id(shipment.id_carrier_api)
-                    if not carrier:
-                        continue
-                    
-                    carrier_type = carrier.carrier_type.value
-                    has_events = shipping_repo.has_tracking_events(shipment.tracking)
-                    
-                    if carrier_type not in has_events_by_carrier:
-                        has_events_by_carrier[carrier_type] = 0
-                        no_events_by_carrier[carrier_type] = 0
-                    
-                    if has_events:
-                        has_events_by_carrier[carrier_type] += 1
-                    else:
-                        no_events_by_carrier[carrier_type] += 1
-                
-                # Determina intervallo minimo (più frequente)
-                min_interval = DEFAULT_POLLING_INTERVAL
-                for carrier_type in set(list(has_events_by_carrier.keys()) + list(no_events_by_carrier.keys())):
-                    interval = _determine_polling_interval(
-                        db,
-                        has_events_by_carrier.get(carrier_type, 0),
-                        no_events_by_carrier.get(carrier_type, 0),
-                        carrier_type
-                    )
-                    min_interval = min(min_interval, interval)
-                
-                polling_interval = min_interval
-            else:
-                # Nessuna spedizione, usa intervallo default
-                polling_interval = DEFAULT_POLLING_INTERVAL
-            
-            logger.info(f"Waiting {polling_interval} seconds ({polling_interval/60:.1f} minutes) before next tracking poll")
-            await asyncio.sleep(polling_interval)
-            
-            # Esegui polling
             await poll_tracking_periodic(db)
-            
+
+            polling_interval = _seconds_until_next_poll(db)
+            logger.info(f"Waiting {polling_interval:.0f} seconds ({polling_interval/60:.1f} minutes) before next tracking poll")
+            await asyncio.sleep(polling_interval)
+
         except Exception as e:
             logger.error(f"Error in tracking polling task: {str(e)}", exc_info=True)
+            db.rollback()
             # In caso di errore, aspetta 5 minuti prima di riprovare
             await asyncio.sleep(300)
@@ -11,9 +11,10 @@ import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 # Aggiungi il path del progetto
 project_root = Path(__file__).parent.parent
@@ -21,7 +22,7 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 from src.main import app
-from src.database import Base, get_db
+from src.database import Base, get_async_db, get_db
 from src.services.routers.auth_service import get_current_user
 from src.events.runtime import set_event_bus, set_sse_fanout
 from src.events.core.event_bus import EventBus
@@ -36,8 +37,10 @@ from src.repository.interfaces.api_carrier_repository_interface import IApiCarri
 # Database Test Setup
 # ============================================================================
 
-# SQLite in-memory per i test
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///:memory:"
+# SQLite in-memory per i test (shared cache: lo stesso DB è visibile
+# sia dall'engine sincrono sia dall'engine async aiosqlite)
+SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///file:ecm_test_db?mode=memory&cache=shared&uri=true"
+ASYNC_SQLALCHEMY_TEST_DATABASE_URL = "sqlite+aiosqlite:///file:ecm_test_db?mode=memory&cache=shared&uri=true"
 
 test_engine = create_engine(
     SQLALCHEMY_TEST_DATABASE_URL,
@@ -47,6 +50,28 @@ test_engine = create_engine(
 
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
+# NullPool: ogni sessione async apre la propria connessione nel loop corrente
+async_test_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_TEST_DATABASE_URL,
+    poolclass=NullPool,
+)
+
+
+@event.listens_for(async_test_engine.sync_engine, "connect")
+def _async_test_read_uncommitted(dbapi_connection, _):
+    """Rende visibili all'engine async i dati non ancora committati dei test."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA read_uncommitted = 1")
+    cursor.close()
+
+
+AsyncTestSessionLocal = async_sessionmaker(
+    bind=async_test_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 
 @pytest.fixture(scope="function")
 def db_session() -> Generator[Session, None, None]:
@@ -69,6 +94,15 @@ def db_session() -> Generator[Session, None, None]:
         Base.metadata.drop_all(bind=test_engine)
 
 
+@pytest_asyncio.fixture(scope="function")
+async def async_db_session(db_session: Session) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Sessione async sullo stesso DB di `db_session` (tabelle create dalla fixture sincrona).
+    """
+    async with AsyncTestSessionLocal() as session:
+        yield session
+
+
 def override_get_db():
     """Override per get_db dependency"""
     db = TestSessionLocal()
@@ -78,6 +112,12 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    """Override per get_async_db dependency"""
+    async with AsyncTestSessionLocal() as session:
+        yield session
+
+
 # ============================================================================
 # EventBus Spy
 # ============================================================================
@@ -208,6 +248,7 @@ def test_app(db_session: Session, event_bus_spy: EventBusSpy):
     """
     # Override database
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     
     # Override auth (default user)
     default_user = create_test_user()
@@ -0,0 +1,81 @@
+"""
+Fake minimale di redis.asyncio per i test del CacheManager
+"""
+import fnmatch
+
+
+class FakeRedis:
+    """Sottoinsieme dei comandi redis.asyncio usati da CacheManager (senza KEYS)."""
+
+    def __init__(self):
+        self.data = {}
+        self.scan_counts = []
+        self.published = []
+
+    @staticmethod
+    def _raw(key):
+        return key.encode() if isinstance(key, str) else key
+
+    async def get(self, key):
+        return self.data.get(self._raw(key))
+
+    async def setex(self, key, ttl, value):
+        self.data[self._raw(key)] = value
+
+    async def incr(self, key):
+        raw = self._raw(key)
+        self.data[raw] = str(int(self.data.get(raw, b"0")) + 1).encode()
+        return int(self.data[raw])
+
+    async def delete(self, *keys):
+        return await self.unlink(*keys)
+
+    async def unlink(self, *keys):
+        return sum(1 for k in keys if self.data.pop(self._raw(k), None) is not None)
+
+    async def sadd(self, key, *members):
+        members_set = self.data.setdefault(self._raw(key), set())
+        before = len(members_set)
+        members_set.update(self._raw(m) for m in members)
+        return len(members_set) - before
+
+    async def smembers(self, key):
+        return set(self.data.get(self._raw(key), set()))
+
+    async def expire(self, key, ttl):
+        return self._raw(key) in self.data
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    async def scan_iter(self, match=None, count=None):
+        self.scan_counts.append(count)
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key.decode(), match):
+                yield key
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 1
+
+
+class _FakePipeline:
+    """Pipeline che accoda i comandi e li esegue in ordine su `execute`."""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        command = getattr(self._redis, name)
+        return lambda *args, **kwargs: self._commands.append((command, args, kwargs))
+
+    async def execute(self):
+        commands, self._commands = self._commands, []
+        return [await command(*args, **kwargs) for command, args, kwargs in commands]
@@ -0,0 +1,98 @@
+"""Test upsert bulk per (id_store, id_origin) di BaseRepository."""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session
+
+from src.models.customer import Customer
+from src.repository.customer_repository import CustomerRepository
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'upsert.db'}")
+    Customer.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _customer(id_origin, **values):
+    return {"id_origin": id_origin, "id_lang": 1, "firstname": "Mario", "lastname": "Rossi", "email": "m@example.com", **values}
+
+
+def test_insert_only_keeps_existing_rows_and_maps_new_ids(session):
+    repo = CustomerRepository(session)
+    first = repo.upsert_by_origin([_customer(1), _customer(2)], 1, batch_size=1)
+
+    result = repo.upsert_by_origin([_customer(2, firstname="Luigi"), _customer(3), _customer(0)], 1)
+
+    assert (first.inserted, result.inserted, result.updated) == (2, 2, 0)
+    ids = {c.id_origin: c.id_customer for c in session.query(Customer)}
+    assert first.inserted_ids == {1: ids[1], 2: ids[2]}
+    assert result.inserted_ids == {3: ids[3]}
+    assert session.query(Customer).filter_by(id_origin=2).one().firstname == "Mario"
+    assert result.rows_per_second > 0
+
+
+def test_rows_without_store_argument_are_keyed_by_their_own_store(session):
+    repo = CustomerRepository(session)
+    repo.upsert_by_origin([_customer(5, id_store=1), _customer(5, id_store=2)])
+
+    result = repo.upsert_by_origin([_customer(5, id_store=2, email="new@example.com")], update_fields=("email",))
+
+    assert (result.inserted, result.updated) == (0, 1)
+    emails = {c.id_store: c.email for c in session.query(Customer)}
+    assert emails == {1: "m@example.com", 2: "new@example.com"}
+
+
+def test_native_statement_is_multi_row_insert_on_duplicate_key_update():
+    class RecordingSession:
+        statements = []
+
+        def execute(self, statement, *args):
+            self.statements.append(statement)
+
+    repo = CustomerRepository(RecordingSession())
+    repo._upsert_native([_customer(1, id_store=1), _customer(2, id_store=1)], ("firstname", "email"))
+    repo._upsert_native([_customer(3, id_store=1)], ())
+
+    update_sql, insert_only_sql = (str(s.compile(dialect=mysql.dialect())) for s in RecordingSession.statements)
+    assert update_sql.count("(%s, %s") == 2
+    assert "ON DUPLICATE KEY UPDATE firstname = VALUES(firstname), email = VALUES(email)" in update_sql
+    assert "ON DUPLICATE KEY UPDATE id_origin = VALUES(id_origin)" in insert_only_sql
+
+
+def test_rows_without_store_use_portable_path_even_with_unique_key(session, monkeypatch):
+    repo = CustomerRepository(session)
+    monkeypatch.setattr(repo, "_has_origin_unique_key", lambda: True)
+    monkeypatch.setattr(repo, "_upsert_native", lambda *args: pytest.fail("id_store NULL non deduplicato dall'indice"))
+    repo.upsert_by_origin([_customer(7, id_store=None)])
+
+    result = repo.upsert_by_origin([_customer(7, id_store=None, email="new@example.com")], update_fields=("email",))
+
+    assert (result.inserted, result.updated) == (0, 1)
+    assert [c.email for c in session.query(Customer)] == ["new@example.com"]
+
+
+def test_only_rows_with_changed_fields_are_reported_as_updated(session):
+    repo = CustomerRepository(session)
+    repo.upsert_by_origin([_customer(1), _customer(2), _customer(3)], 1)
+
+    result = repo.upsert_by_origin(
+        [_customer(1), _customer(2, email="new@example.com"), _customer(3, firstname="Mario")],
+        1,
+        update_fields=("firstname", "email"),
+    )
+
+    assert (result.inserted, result.updated) == (0, 1)
+    assert result.updated_ids == [session.query(Customer).filter_by(id_origin=2).one().id_customer]
+
+
+def test_numeric_values_compare_by_value():
+    assert not CustomerRepository._value_changed(Decimal("12.30000"), 12.3)
+    assert not CustomerRepository._value_changed(1, True)
+    assert CustomerRepository._value_changed(Decimal("12.30000"), "12.31")
+    assert CustomerRepository._value_changed(None, 0)
@@ -0,0 +1,81 @@
+"""Unit test — coerenza L1 tra worker (invalidazioni via Redis pub/sub)."""
+import orjson
+import pytest
+from cachetools import TTLCache
+
+from src.core import cache as cache_module
+from src.core.cache import CacheManager, register_versioned_namespace
+from tests.helpers.fake_redis import FakeRedis
+
+
+def _worker(redis):
+    manager = CacheManager()
+    manager._memory_cache = TTLCache(maxsize=100, ttl=600)
+    manager._redis_client = redis
+    manager._l1_coherent = True
+    return manager
+
+
+def _deliver(published, *workers):
+    for _, message in published:
+        for worker in workers:
+            worker._apply_remote_invalidation(message)
+    published.clear()
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    monkeypatch.setattr(cache_module, "_versioned_namespaces", set())
+    redis = FakeRedis()
+    return redis, _worker(redis), _worker(redis)
+
+
+@pytest.mark.asyncio
+async def test_delete_evicts_other_workers_l1(workers):
+    redis, first, second = workers
+    await first.set("order:user_1:5", {"id": 5})
+    await second.get("order:user_1:5")
+    assert "order:user_1:5" in second._memory_cache
+
+    await first.delete("order:user_1:5")
+    _deliver(redis.published, first, second)
+
+    assert "order:user_1:5" not in second._memory_cache
+    assert await second.get("order:user_1:5") is None
+
+
+@pytest.mark.asyncio
+async def test_pattern_and_clear_are_broadcast(workers):
+    redis, first, second = workers
+    second._memory_cache["order:user_1:1"] = orjson.dumps(1)
+    second._memory_cache["customer:user_1:1"] = orjson.dumps(1)
+
+    await first.delete_pattern("order:*")
+    _deliver(redis.published, first, second)
+    assert list(second._memory_cache.keys()) == ["customer:user_1:1"]
+
+    await first.clear_memory()
+    _deliver(redis.published, first, second)
+    assert len(second._memory_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_namespace_version_propagates_without_redis_reads(workers):
+    redis, first, second = workers
+    register_versioned_namespace("orders:list")
+    assert await second.get_namespace_version("orders:list") == 0
+
+    await first.invalidate("orders:list:*")
+    _deliver(redis.published, first, second)
+    # La versione arriva dal canale: anche senza rileggere Redis il worker la conosce
+    redis.data.clear()
+
+    assert await second.get_namespace_version("orders:list") == 1
+
+
+def test_own_messages_are_ignored(workers):
+    _, first, _ = workers
+    first._memory_cache["k"] = b"1"
+    first._apply_remote_invalidation(orjson.dumps({"op": "clear", "origin": first._instance_id}))
+
+    assert "k" in first._memory_cache
@@ -0,0 +1,107 @@
+"""Unit test — invalidazione cache per namespace versionati e delete_pattern via SCAN."""
+import pytest
+from cachetools import TTLCache
+
+from src.core import cache as cache_module
+from src.core import invalidation
+from src.core.cache import CacheManager, register_versioned_namespace
+from tests.helpers.fake_redis import FakeRedis
+
+# Namespace di default, letti prima che la fixture li azzeri
+DEFAULT_NAMESPACES = cache_module.get_versioned_namespaces()
+
+
+@pytest.fixture
+def cache_manager(monkeypatch):
+    monkeypatch.setattr(cache_module, "_versioned_namespaces", set())
+    manager = CacheManager()
+    manager._memory_cache = TTLCache(maxsize=100, ttl=60)
+    manager._redis_client = FakeRedis()
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_namespace_bump_hides_previous_entries(cache_manager):
+    register_versioned_namespace("orders:list")
+    key = await cache_manager.versioned_key("orders:list:user_1:abc", "orders:list")
+    await cache_manager.set(key, {"ids": [1, 2]})
+
+    deleted = await cache_manager.invalidate("orders:list:user_1:*")
+
+    assert deleted == 0
+    new_key = await cache_manager.versioned_key("orders:list:user_1:abc", "orders:list")
+    assert new_key != key
+    assert await cache_manager.get(new_key) is None
+    assert await cache_manager.get_namespace_version("orders:list") == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_falls_back_to_scan(cache_manager):
+    for i in range(7):
+        await cache_manager.set(f"order:user_1:{i}", i)
+    await cache_manager.set("customer:user_1:1", 1)
+    cache_manager.settings.cache_scan_batch_size = 3
+
+    deleted = await cache_manager.invalidate("order:*")
+
+    assert deleted == 7
+    assert await cache_manager.get("customer:user_1:1") == 1
+    assert not any(k.startswith(b"order:") for k in cache_manager._redis_client.data)
+    assert cache_manager._redis_client.scan_counts == [3]
+
+
+@pytest.mark.asyncio
+async def test_delete_pattern_keeps_namespace_versions(cache_manager):
+    register_versioned_namespace("orders:list")
+    await cache_manager.invalidate_namespace("orders:list")
+    await cache_manager.set("orders:list:x|v1", 1)
+
+    await cache_manager.delete_pattern("*")
+
+    assert await cache_manager.get_namespace_version("orders:list") == 1
+    assert await cache_manager.get("orders:list:x|v1") is None
+
+
+def test_namespace_for_pattern_prefers_most_specific(cache_manager):
+    register_versioned_namespace("orders")
+    register_versioned_namespace("orders:list")
+
+    assert cache_manager.namespace_for_pattern("orders:list:*") == "orders:list"
+    assert cache_manager.namespace_for_pattern("orders:count:*") == "orders"
+    assert cache_manager.namespace_for_pattern("order:*:1") is None
+
+
+@pytest.mark.asyncio
+async def test_entity_pattern_deletes_tagged_keys_without_scan(cache_manager):
+    await cache_manager.set("order:user_1:42", {"id": 42})
+    await cache_manager.set("order:user_2:42", {"id": 42})
+    await cache_manager.set("order:user_1:7", {"id": 7})
+
+    deleted = await cache_manager.invalidate("order:*:42")
+
+    assert deleted == 2
+    assert await cache_manager.get("order:user_2:42") is None
+    assert await cache_manager.get("order:user_1:7") == {"id": 7}
+    assert cache_manager._redis_client.scan_counts == []
+
+
+@pytest.mark.asyncio
+async def test_order_commit_invalidation_does_not_scan(cache_manager, monkeypatch):
+    monkeypatch.setattr(cache_module, "_versioned_namespaces", set(DEFAULT_NAMESPACES))
+    monkeypatch.setattr(invalidation.CacheInvalidationManager, "_setup_sqlalchemy_events", lambda self: None)
+    manager = invalidation.CacheInvalidationManager()
+    manager._cache_manager = cache_manager
+    monkeypatch.setattr(invalidation, "_invalidation_manager", manager)
+    await cache_manager.set("order:user_1:42", {"id": 42})
+    await cache_manager.set("orders:history:user_1:42", [])
+    list_key = await cache_manager.versioned_key("orders:list:user_1:abc", "orders:list")
+    await cache_manager.set(list_key, [42])
+    session = object()
+
+    invalidation.invalidate_order_related(session, 42)
+    await manager._process_pending_invalidations(session)
+
+    assert cache_manager._redis_client.scan_counts == []
+    assert await cache_manager.get("order:user_1:42") is None
+    assert await cache_manager.get("orders:history:user_1:42") is None
+    assert await cache_manager.versioned_key("orders:list:user_1:abc", "orders:list") != list_key
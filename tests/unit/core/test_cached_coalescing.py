@@ -0,0 +1,138 @@
+"""Unit test — @cached: request coalescing e stale-while-revalidate."""
+import asyncio
+import time
+
+import pytest
+from cachetools import TTLCache
+
+from src.core import cached as cached_module
+from src.core.cache import CacheManager
+from src.core.cached import cached
+
+
+@pytest.fixture
+def cache_manager(monkeypatch):
+    manager = CacheManager()
+    manager.settings = manager.settings.model_copy(update={"cache_backend": "memory", "cache_enabled": True})
+    manager._memory_cache = TTLCache(maxsize=100, ttl=600)
+
+    async def _get_cache_manager():
+        return manager
+
+    monkeypatch.setattr(cached_module, "get_cache_manager", _get_cache_manager)
+    monkeypatch.setattr(cached_module, "get_cache_settings", lambda: manager.settings)
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load(cache_manager):
+    calls = 0
+
+    @cached(ttl=60, key="hot:key", tenant_from_user=False)
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"n": calls}
+
+    results = await asyncio.gather(*(load() for _ in range(20)))
+
+    assert calls == 1
+    assert all(r == {"n": 1} for r in results)
+    assert cache_manager._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_shared_and_not_cached(cache_manager):
+    calls = 0
+
+    @cached(ttl=60, key="failing:key", tenant_from_user=False)
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    results = await asyncio.gather(*(load() for _ in range(5)), return_exceptions=True)
+
+    assert calls == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert await cache_manager.get("failing:key") is None
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_single_refresh_runs(cache_manager):
+    calls = 0
+
+    @cached(ttl=60, stale_ttl=300, background_refresh=True, key="swr:key", tenant_from_user=False)
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    assert await load() == 1
+    # Forza la scadenza della finestra fresca
+    entry = await cache_manager.get("swr:key")
+    entry["fresh_until"] = time.time() - 1
+    await cache_manager.set("swr:key", entry, 600)
+
+    stale = await asyncio.gather(*(load() for _ in range(10)))
+    assert stale == [1] * 10
+
+    await asyncio.sleep(0.05)
+    assert calls == 2
+    assert await load() == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_locks_are_released(cache_manager):
+    @cached(ttl=60, key="sf:{n}", single_flight=True, tenant_from_user=False)
+    async def load(n):
+        return n
+
+    await asyncio.gather(*(load(i) for i in range(50)))
+
+    assert cache_manager._lock_cache == {}
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_runs_on_its_own_arguments(cache_manager):
+    from contextlib import asynccontextmanager
+
+    sessions = []
+
+    @asynccontextmanager
+    async def own_session(args, kwargs):
+        sessions.append("opened")
+        yield ("refresh-session",), kwargs
+        sessions.append("closed")
+
+    @cached(ttl=60, stale_ttl=300, background_refresh=own_session, key="swr:own", tenant_from_user=False)
+    async def load(session):
+        return session
+
+    assert await load("request-session") == "request-session"
+    entry = await cache_manager.get("swr:own")
+    entry["fresh_until"] = time.time() - 1
+    await cache_manager.set("swr:own", entry, 600)
+
+    assert await load("request-session") == "request-session"
+    await asyncio.sleep(0.01)
+    assert sessions == ["opened", "closed"]
+    assert await load("request-session") == "refresh-session"
+
+
+@pytest.mark.asyncio
+async def test_stale_window_without_background_refresh_reloads_synchronously(cache_manager):
+    calls = 0
+
+    @cached(ttl=60, stale_ttl=300, key="noswr:key", tenant_from_user=False)
+    async def load():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await load() == 1
+    # Nessun envelope SWR: la entry scade col TTL e viene ricaricata dalla richiesta
+    assert await cache_manager.get("noswr:key") == 1
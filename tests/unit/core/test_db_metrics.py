@@ -0,0 +1,70 @@
+"""Unit test — metriche pool connessioni e query DB (/metrics)."""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.core import db_metrics
+from src.core.db_metrics import (
+    Histogram,
+    InstrumentedQueuePool,
+    finish_request_tracking,
+    get_db_metrics,
+    instrument_engine,
+    start_request_tracking,
+)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(db_metrics, "_db_metrics", None)
+    eng = create_engine(
+        "sqlite://",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+        connect_args={"check_same_thread": False},
+    )
+    instrument_engine(eng, "sync")
+    yield eng
+    eng.dispose()
+
+
+def test_histogram_cumulative_buckets():
+    h = Histogram((1, 5))
+    for value in (0.5, 3, 10):
+        h.observe(value)
+
+    snap = h.snapshot()
+    assert snap["buckets"] == [(1, 1), (5, 2), (float("inf"), 3)]
+    assert snap["count"] == 3
+
+
+def test_request_tracking_counts_queries(engine):
+    stats, token = start_request_tracking()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    finish_request_tracking(stats, token)
+
+    assert stats.query_count == 2
+    metrics = get_db_metrics().get_stats()
+    assert metrics["queries_total"]["sync"] == 2
+    assert metrics["request_query_count"]["count"] == 1
+    assert metrics["checkout_wait"]["sync"]["count"] >= 1
+
+
+def test_pool_status_and_checkout_timeout(engine):
+    conn = engine.connect()
+    try:
+        assert get_db_metrics().pool_status()["sync"]["checked_out"] == 1
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    finally:
+        conn.close()
+
+    assert get_db_metrics().get_stats()["checkout_timeouts"]["sync"] == 1
+    rendered = "\n".join(get_db_metrics().render_prometheus())
+    assert 'db_pool_checked_out{engine="sync"} 0' in rendered
+    assert 'db_pool_checkout_timeouts_total{engine="sync"} 1' in rendered
+    assert 'db_pool_checkout_wait_seconds_bucket{engine="sync",le="+Inf"}' in rendered
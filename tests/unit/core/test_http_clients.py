@@ -0,0 +1,62 @@
+"""Unit test — registry dei client HTTP condivisi per integrazione."""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from src.core import http_clients
+from src.core.http_clients import close_http_clients, get_http_client
+from src.services.ecommerce.shipments.brt_client import BrtClient
+
+
+@pytest.mark.asyncio
+async def test_client_is_shared_per_integration_and_recreated_after_close():
+    fedex = get_http_client("fedex")
+    assert get_http_client("fedex") is fedex
+    assert get_http_client("brt") is not fedex
+
+    await close_http_clients()
+
+    assert fedex.is_closed
+    assert get_http_client("fedex") is not fedex
+    await close_http_clients()
+
+
+def test_clients_are_bound_to_their_event_loop():
+    async def _get():
+        client = get_http_client("dhl")
+        await close_http_clients()
+        return client
+
+    first = asyncio.run(_get())
+    second = asyncio.run(_get())
+    assert first is not second
+
+
+@pytest.mark.asyncio
+async def test_tracking_polling_reuses_the_shared_client(monkeypatch):
+    built = []
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, json={"ttParcelIdResponse": {}})
+
+    def _build_client(name):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        built.append(name)
+        return client
+
+    monkeypatch.setattr(http_clients, "_build_client", _build_client)
+    await close_http_clients()
+
+    brt = BrtClient()
+    credentials = SimpleNamespace(use_sandbox=False)
+    brt_config = SimpleNamespace(api_user="user", api_password="secret", id_carrier_api=1)
+    for parcel_id in ("P1", "P2", "P3"):
+        await brt.get_tracking(parcel_id, credentials, brt_config)
+
+    assert built == ["brt"]
+    assert len(requests) == 3
+    await close_http_clients()
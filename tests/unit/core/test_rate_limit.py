@@ -0,0 +1,34 @@
+"""Unit test — token bucket per il rate limit verso le API dei corrieri."""
+import asyncio
+import time
+
+import pytest
+
+from src.core.rate_limit import TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_burst_is_immediate_then_refill_rate_applies():
+    bucket = TokenBucket(rate=50, capacity=5)
+
+    start = time.monotonic()
+    await bucket.acquire(5)
+    assert time.monotonic() - start < 0.05
+
+    await bucket.acquire(5)
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_concurrent_acquires_share_the_bucket():
+    bucket = TokenBucket(rate=100, capacity=2)
+
+    start = time.monotonic()
+    await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+    # 2 token subito, 4 ricaricati a 100/s
+    assert time.monotonic() - start >= 0.035
+
+
+def test_invalid_parameters_are_rejected():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, capacity=1)
@@ -0,0 +1,57 @@
+"""Test CachedStaticFiles: scelta dei derivati immagine per size/Accept ed ETag forti."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core import static_files
+from src.core.settings import ImageIngestSettings
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        static_files,
+        "get_image_ingest_settings",
+        lambda: ImageIngestSettings(image_derivative_formats="avif,webp,jpeg"),
+    )
+    platform_dir = tmp_path / "product_images" / "1"
+    platform_dir.mkdir(parents=True)
+    for name in ("product_5.jpg", "product_5.list.webp", "product_5.thumb.jpg", "product_5.thumb.webp"):
+        (platform_dir / name).write_bytes(name.encode())
+
+    app = FastAPI()
+    app.mount("/media", static_files.CachedStaticFiles(directory=str(tmp_path)), name="media")
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "query, accept, expected",
+    [
+        ("", "image/jpeg", b"product_5.jpg"),
+        ("", "image/avif,image/webp,*/*", b"product_5.list.webp"),
+        ("?size=thumb", "image/jpeg", b"product_5.thumb.jpg"),
+        ("?size=thumb", "image/webp;q=0.9", b"product_5.thumb.webp"),
+        ("?size=thumb", "image/webp;q=0", b"product_5.thumb.jpg"),
+        ("?size=detail", "image/webp", b"product_5.jpg"),
+        ("?size=huge", "image/jpeg", b"product_5.jpg"),
+    ],
+)
+def test_derivative_selected_by_size_and_accept(client, query, accept, expected):
+    response = client.get(f"/media/product_images/1/product_5.jpg{query}", headers={"Accept": accept})
+
+    assert response.status_code == 200
+    assert response.content == expected
+    assert response.headers["vary"] == "Accept"
+
+
+def test_strong_etag_revalidates(client):
+    url = "/media/product_images/1/product_5.jpg?size=thumb"
+    first = client.get(url, headers={"Accept": "image/webp"})
+    etag = first.headers["etag"]
+    assert not etag.startswith("W/") and len(etag.strip('"')) == 32
+
+    second = client.get(url, headers={"Accept": "image/webp", "If-None-Match": etag})
+    assert second.status_code == 304
+
+    other = client.get(url, headers={"Accept": "image/jpeg", "If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["etag"] != etag
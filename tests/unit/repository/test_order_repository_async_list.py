@@ -0,0 +1,59 @@
+"""Unit test — lista/conteggio ordini su AsyncSession (get_all_async / get_count_async)."""
+import pytest
+
+from src.models.fiscal_document import FiscalDocument
+from src.models.order import Order
+from src.repository.order_repository import OrderRepository
+
+
+@pytest.fixture
+def order_repo(db_session):
+    return OrderRepository(db_session)
+
+
+def _add_order(db_session, reference, is_payed=False):
+    order = Order(
+        id_order_state=1,
+        is_invoice_requested=False,
+        is_payed=is_payed,
+        reference=reference,
+    )
+    db_session.add(order)
+    db_session.commit()
+    return order
+
+
+class TestOrderRepositoryAsyncList:
+    @pytest.mark.asyncio
+    async def test_async_list_matches_sync(self, order_repo, db_session, async_db_session):
+        for i in range(5):
+            _add_order(db_session, f"REF-{i}", is_payed=i % 2 == 0)
+
+        sync_ids = [o.id_order for o in order_repo.get_all(is_payed=True, limit=100, page=1)]
+        async_orders = await order_repo.get_all_async(async_db_session, is_payed=True, limit=100, page=1)
+
+        assert [o.id_order for o in async_orders] == sync_ids
+        assert await order_repo.get_count_async(async_db_session, is_payed=True) == len(sync_ids)
+
+    @pytest.mark.asyncio
+    async def test_search_filters_list_and_count(self, order_repo, db_session, async_db_session):
+        match = _add_order(db_session, "FIND-ME")
+        _add_order(db_session, "OTHER")
+
+        results = await order_repo.get_all_async(async_db_session, search="find-me", limit=100, page=1)
+
+        assert [o.id_order for o in results] == [match.id_order]
+        assert await order_repo.get_count_async(async_db_session, search="find-me") == 1
+        assert [o.id_order for o in order_repo.get_all(search="find-me", limit=100, page=1)] == [match.id_order]
+
+    @pytest.mark.asyncio
+    async def test_has_invoice_precomputed(self, order_repo, db_session, async_db_session):
+        invoiced = _add_order(db_session, "INV")
+        plain = _add_order(db_session, "PLAIN")
+        db_session.add(FiscalDocument(id_order=invoiced.id_order, document_type="invoice"))
+        db_session.commit()
+
+        results = await order_repo.get_all_async(async_db_session, limit=100, page=1)
+
+        flags = {o.id_order: o._has_invoice for o in results}
+        assert flags == {invoiced.id_order: True, plain.id_order: False}
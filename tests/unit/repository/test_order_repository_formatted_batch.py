@@ -0,0 +1,85 @@
+"""Unit test — formatted_output_batch: relazioni caricate in batch (query IN per entità)."""
+import pytest
+from sqlalchemy import event
+
+from src.models.customer import Customer
+from src.models.order import Order
+from src.models.order_package import OrderPackage
+from src.models.order_state import OrderState
+from src.models.relations.relations import orders_history
+from src.repository.order_repository import OrderRepository
+
+
+@pytest.fixture
+def order_repo(db_session):
+    return OrderRepository(db_session)
+
+
+def _seed_orders(db_session, count):
+    state = OrderState(name="In lavorazione")
+    db_session.add(state)
+    db_session.flush()
+    orders = []
+    for i in range(count):
+        customer = Customer(firstname=f"Nome{i}", lastname="Rossi", email=f"c{i}@example.com")
+        db_session.add(customer)
+        db_session.flush()
+        order = Order(
+            id_order_state=state.id_order_state,
+            id_customer=customer.id_customer,
+            is_invoice_requested=False,
+            reference=f"REF-{i}",
+        )
+        db_session.add(order)
+        db_session.flush()
+        db_session.add(OrderPackage(id_order=order.id_order, weight=1.5))
+        db_session.execute(orders_history.insert().values(
+            id_order=order.id_order, id_order_state=state.id_order_state
+        ))
+        orders.append(order)
+    db_session.commit()
+    return orders
+
+
+def _count_queries(db_session, fn):
+    statements = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+    return result, len(statements)
+
+
+class TestFormattedOutputBatch:
+    def test_batch_matches_single_output(self, order_repo, db_session):
+        orders = _seed_orders(db_session, 3)
+
+        batch = order_repo.formatted_output_batch(orders, show_details=True)
+        singles = [order_repo.formatted_output(o, show_details=True) for o in orders]
+
+        assert batch == singles
+        assert batch[0]["customer"]["firstname"] == "Nome0"
+        assert batch[0]["order_state"]["name"] == "In lavorazione"
+        assert len(batch[0]["order_packages"]) == 1
+        assert batch[0]["order_history"][0]["name"] == "In lavorazione"
+        assert batch[0]["has_invoice"] is False
+
+    def test_query_count_independent_of_page_size(self, order_repo, db_session):
+        orders = _seed_orders(db_session, 6)
+        db_session.expire_all()
+        orders = db_session.query(Order).filter(Order.id_order.in_([o.id_order for o in orders])).all()
+
+        _, small = _count_queries(
+            db_session, lambda: order_repo.formatted_output_batch(orders[:2], show_details=True)
+        )
+        _, large = _count_queries(
+            db_session, lambda: order_repo.formatted_output_batch(orders, show_details=True)
+        )
+
+        assert large == small
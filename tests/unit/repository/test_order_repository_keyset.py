@@ -0,0 +1,51 @@
+"""Unit test — paginazione keyset (after=) della lista ordini."""
+from datetime import datetime
+
+import pytest
+
+from src.models.order import Order
+from src.repository.order_repository import OrderRepository
+
+
+@pytest.fixture
+def order_repo(db_session):
+    return OrderRepository(db_session)
+
+
+@pytest.fixture
+def orders(db_session):
+    # Date duplicate e un NULL per verificare tie-breaker e gestione dei NULL
+    dates = [
+        datetime(2025, 1, 1), datetime(2025, 1, 2), datetime(2025, 1, 2),
+        datetime(2025, 1, 3), None, datetime(2025, 1, 2), datetime(2025, 1, 5),
+    ]
+    created = []
+    for d in dates:
+        order = Order(id_order_state=1, is_invoice_requested=False)
+        db_session.add(order)
+        db_session.flush()
+        order.date_add = d
+        created.append(order)
+    db_session.commit()
+    return created
+
+
+def _walk(order_repo, limit, order_by, direction):
+    seen, after = [], None
+    while True:
+        page = order_repo.get_all(limit=limit, order_by=order_by, order_direction=direction, after=after)
+        seen.extend(o.id_order for o in page)
+        after = order_repo.build_next_cursor(page, limit, order_by, direction)
+        if after is None:
+            return seen
+
+
+@pytest.mark.parametrize("order_by", ["id_order", "date_add"])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_keyset_walk_matches_offset_order(order_repo, orders, order_by, direction):
+    expected = [
+        o.id_order for o in order_repo.get_all(limit=100, order_by=order_by, order_direction=direction)
+    ]
+
+    assert _walk(order_repo, 2, order_by, direction) == expected
+    assert len(expected) == len(orders)
@@ -0,0 +1,91 @@
+"""Unit test — indice di ricerca ordini (order_search_index) e sincronizzazione al commit."""
+import pytest
+
+from src.core.order_search_sync import queue_order_search_refresh
+from src.models.customer import Customer
+from src.models.order import Order
+from src.models.order_detail import OrderDetail
+from src.models.order_search_index import OrderSearchIndex
+from src.models.product import Product
+from src.repository.order_repository import OrderRepository
+from src.repository.order_search_index_repository import OrderSearchIndexRepository
+
+
+@pytest.fixture
+def order_repo(db_session):
+    return OrderRepository(db_session)
+
+
+def _search_ids(order_repo, term):
+    return [o.id_order for o in order_repo.get_all(search=term, limit=100, page=1)]
+
+
+def _add_order(db_session, reference, **kwargs):
+    order = Order(id_order_state=1, is_invoice_requested=False, reference=reference, **kwargs)
+    db_session.add(order)
+    db_session.commit()
+    return order
+
+
+class TestOrderSearchIndex:
+    def test_commit_indexes_order_and_related_fields(self, order_repo, db_session):
+        customer = Customer(firstname="Giulia", lastname="Verdi", email="giulia@example.com")
+        product = Product(name="Lampada Tavolo")
+        db_session.add_all([customer, product])
+        db_session.commit()
+        order = _add_order(db_session, "IDX-1", id_customer=customer.id_customer)
+        db_session.add(OrderDetail(
+            id_order=order.id_order, id_product=product.id_product, product_name="x",
+            unit_price_with_tax=1, total_price_net=1, total_price_with_tax=1,
+        ))
+        db_session.commit()
+
+        assert _search_ids(order_repo, "idx-1") == [order.id_order]
+        assert _search_ids(order_repo, "GIULIA@") == [order.id_order]
+        assert _search_ids(order_repo, "lampada") == [order.id_order]
+        assert order_repo.get_count(search="verdi") == 1
+
+    def test_related_entity_update_refreshes_index(self, order_repo, db_session):
+        customer = Customer(firstname="Mario", lastname="Bianchi", email="m@example.com")
+        db_session.add(customer)
+        db_session.commit()
+        order = _add_order(db_session, "IDX-2", id_customer=customer.id_customer)
+
+        customer.lastname = "Neri"
+        db_session.commit()
+
+        assert _search_ids(order_repo, "neri") == [order.id_order]
+        assert _search_ids(order_repo, "bianchi") == []
+
+    def test_delete_and_rollback(self, order_repo, db_session):
+        order = _add_order(db_session, "IDX-3")
+        db_session.delete(order)
+        db_session.commit()
+        assert db_session.get(OrderSearchIndex, order.id_order) is None
+
+        _add_order(db_session, "KEEP")
+        db_session.add(Order(id_order_state=1, is_invoice_requested=False, reference="ROLLED"))
+        db_session.flush()
+        db_session.rollback()
+        assert "order_search_pending" not in db_session.info
+        assert _search_ids(order_repo, "rolled") == []
+
+    def test_queue_refresh_for_bulk_writes(self, db_session):
+        db_session.bulk_insert_mappings(Order, [
+            {"id_order_state": 1, "is_invoice_requested": False, "reference": "BULK-1"}
+        ])
+        id_order = db_session.query(Order.id_order).filter(Order.reference == "BULK-1").scalar()
+        queue_order_search_refresh(db_session, [id_order])
+        db_session.commit()
+
+        assert db_session.get(OrderSearchIndex, id_order).search_text == "bulk-1"
+
+    def test_rebuild_all(self, db_session):
+        order = _add_order(db_session, "IDX-4")
+        db_session.query(OrderSearchIndex).delete()
+        db_session.commit()
+
+        written = OrderSearchIndexRepository(db_session, chunk_size=1).rebuild_all()
+
+        assert written >= 1
+        assert db_session.get(OrderSearchIndex, order.id_order).search_text == "idx-4"
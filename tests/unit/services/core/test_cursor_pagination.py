@@ -0,0 +1,34 @@
+"""Unit test — cursore opaco per la paginazione keyset."""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from src.services.core.cursor_pagination import decode_cursor, encode_cursor
+
+
+def test_roundtrip_datetime_value():
+    value = datetime(2025, 3, 1, 10, 30, 15)
+    cursor = encode_cursor("date_add", "desc", value, 42)
+
+    assert decode_cursor(cursor, "date_add", "desc") == (value, 42)
+
+
+def test_roundtrip_null_value():
+    cursor = encode_cursor("date_add", "asc", None, 7)
+
+    assert decode_cursor(cursor, "date_add", "asc") == (None, 7)
+
+
+def test_malformed_cursor_raises_400():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor", "id_order", "desc")
+    assert exc.value.status_code == 400
+
+
+def test_cursor_with_different_sort_raises_400():
+    cursor = encode_cursor("id_order", "desc", 10, 10)
+
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, "date_add", "desc")
+    assert exc.value.status_code == 400
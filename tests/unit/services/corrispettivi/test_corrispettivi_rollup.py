@@ -0,0 +1,188 @@
+"""Test rollup giornaliero corrispettivi: equivalenza con le query live, invalidazione, chiusura."""
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func
+
+from src.core.exceptions import ValidationException
+from src.models.corrispettivo_rollup import CorrispettivoRollupDay
+from src.models.customer import Customer
+from src.repository.corrispettivo_repository import CorrispettivoRepository
+from src.schemas.corrispettivo_schema import CorrispettivoFiltersSchema
+from src.services.routers import corrispettivo_service
+from src.services.routers.corrispettivo_service import CorrispettivoService
+from tests.helpers.fiscal_test_helpers import (
+    seed_paid_order,
+    seed_return,
+    seed_ricevuta,
+    seed_tax,
+)
+
+
+@pytest.fixture(autouse=True)
+def sqlite_local_day(monkeypatch):
+    monkeypatch.setattr(
+        CorrispettivoRepository,
+        "_local_day_expr",
+        lambda self, column: func.date(column),
+    )
+
+
+@pytest.fixture(autouse=True)
+def today(monkeypatch):
+    current = {"value": date(2026, 8, 15)}
+    monkeypatch.setattr(corrispettivo_service, "local_today", lambda: current["value"])
+    return current
+
+
+@pytest.fixture
+def tax(db_session):
+    return seed_tax(db_session)
+
+
+@pytest.fixture
+def service(db_session):
+    return CorrispettivoService(db_session)
+
+
+@pytest.fixture
+def july_data(db_session, tax):
+    order_it, detail_it = seed_paid_order(
+        db_session, tax, reference="RU-IT", order_date=datetime(2026, 7, 3, 10, 0),
+        country_iso="IT", with_shipping=True,
+    )
+    seed_paid_order(
+        db_session, tax, reference="RU-DE", order_date=datetime(2026, 7, 3, 11, 0),
+        country_iso="DE", unit_gross=Decimal("61.00"), unit_net=Decimal("50.00"),
+    )
+    seed_paid_order(db_session, tax, reference="RU-NONE", order_date=datetime(2026, 7, 3, 12, 0))
+    deferred, _ = seed_paid_order(
+        db_session, tax, reference="RU-RIC", order_date=datetime(2026, 7, 4, 9, 0), country_iso="FR",
+    )
+    customer = db_session.query(Customer).filter(Customer.id_customer == deferred.id_customer).one()
+    seed_ricevuta(db_session, deferred, customer, emission_date=date(2026, 7, 6))
+    seed_return(db_session, tax, order_it, detail_it, return_date=datetime(2026, 7, 8, 15, 0))
+
+
+def _built_days(db_session):
+    return {row.day for row in db_session.query(CorrispettivoRollupDay).filter(CorrispettivoRollupDay.built.is_(True))}
+
+
+def _live(service, monkeypatch):
+    monkeypatch.setattr(service, "_rollup_plan", lambda *args: None)
+
+
+@pytest.mark.parametrize("country", [None, "IT", "DE"])
+def test_rollup_matches_live_queries(db_session, service, july_data, monkeypatch, country):
+    filters = CorrispettivoFiltersSchema(delivery_country_iso=country) if country else None
+
+    from_rollup = (service.get_riepilogo(2026, 7, filters), service.get_daily_summary(2026, 7, filters))
+    assert db_session.query(CorrispettivoRollupDay).count() == 31
+
+    _live(service, monkeypatch)
+    live = (service.get_riepilogo(2026, 7, filters), service.get_daily_summary(2026, 7, filters))
+
+    assert from_rollup[0].month_totals.row_total != 0
+    assert from_rollup[0].model_dump() == live[0].model_dump()
+    assert from_rollup[1].model_dump() == live[1].model_dump()
+
+
+def test_commit_invalidates_touched_day(db_session, service, tax, july_data):
+    before = service.get_daily_summary(2026, 7).days[2]
+    assert before.sales.order_count == 3
+
+    seed_paid_order(db_session, tax, reference="RU-NEW", order_date=datetime(2026, 7, 3, 18, 0))
+
+    states = _built_days(db_session)
+    assert date(2026, 7, 3) not in states
+    assert date(2026, 7, 4) in states
+    assert service.get_daily_summary(2026, 7).days[2].sales.order_count == 4
+
+
+def test_current_day_is_read_live(db_session, service, tax, today):
+    today["value"] = date(2026, 7, 10)
+    seed_paid_order(db_session, tax, reference="RU-TODAY", order_date=datetime(2026, 7, 10, 8, 0))
+
+    summary = service.get_daily_summary(2026, 7)
+
+    assert summary.days[9].sales.order_count == 1
+    days = _built_days(db_session)
+    assert days == {date(2026, 7, d) for d in range(1, 10)}
+
+
+def test_locked_month_ignores_later_changes(db_session, service, tax, july_data):
+    with pytest.raises(ValidationException):
+        service.set_period_locked(2026, 8, True)
+
+    service.set_period_locked(2026, 7, True)
+    seed_paid_order(db_session, tax, reference="RU-LATE", order_date=datetime(2026, 7, 3, 18, 0))
+    assert service.get_daily_summary(2026, 7).days[2].sales.order_count == 3
+
+    service.set_period_locked(2026, 7, False)
+    assert service.get_daily_summary(2026, 7).days[2].sales.order_count == 4
+
+
+def test_cold_month_is_built_with_month_level_queries(db_session, service, july_data, monkeypatch):
+    calls = []
+    source = service._repository
+    for name in ("fetch_movements", "fetch_daily_gross_totals", "fetch_daily_counts", "list_period_country_codes"):
+        original = getattr(source, name)
+
+        def spy(*args, _name=name, _original=original, **kwargs):
+            calls.append(_name)
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(source, name, spy)
+
+    service._rollup.ensure_days([date(2026, 7, d) for d in range(1, 32)], source)
+
+    assert db_session.query(CorrispettivoRollupDay).count() == 31
+    # Una query live per mese (più una per paese), non una per ciascuno dei 31 giorni
+    assert calls.count("fetch_movements") == 1
+    assert calls.count("list_period_country_codes") == 1
+    assert calls.count("fetch_daily_gross_totals") == calls.count("fetch_daily_counts") == 4  # tutti + IT, DE, FR
+
+
+def test_core_address_update_invalidates_days_of_delivered_orders(db_session, service, july_data):
+    from sqlalchemy import update
+
+    from src.core.corrispettivi_rollup_sync import queue_corrispettivi_rollup_refresh
+    from src.models.address import Address
+    from src.models.order import Order
+
+    service.get_daily_summary(2026, 7)
+    order = db_session.query(Order).filter(Order.reference == "RU-DE").one()
+
+    # Upsert Core (sync PrestaShop): nessun listener ORM sull'indirizzo
+    db_session.execute(
+        update(Address).where(Address.id_address == order.id_address_delivery).values(id_country=None)
+    )
+    queue_corrispettivi_rollup_refresh(db_session, address_ids=[order.id_address_delivery])
+    db_session.commit()
+
+    days = _built_days(db_session)
+    assert date(2026, 7, 3) not in days and date(2026, 7, 4) in days
+
+
+def test_day_invalidated_while_building_is_not_stored(db_session, service, july_data, monkeypatch):
+    from sqlalchemy import update
+
+    rollup = service._rollup
+    compute_days = rollup.compute_days
+
+    def compute_then_invalidate(*args, **kwargs):
+        rows = compute_days(*args, **kwargs)
+        # Invalidazione di un writer concorrente committata durante il calcolo
+        db_session.execute(
+            update(CorrispettivoRollupDay)
+            .where(CorrispettivoRollupDay.day == date(2026, 7, 3))
+            .values(version=CorrispettivoRollupDay.version + 1)
+        )
+        return rows
+
+    monkeypatch.setattr(rollup, "compute_days", compute_then_invalidate)
+    rollup.ensure_days([date(2026, 7, 3), date(2026, 7, 4)], service._repository)
+
+    assert _built_days(db_session) == {date(2026, 7, 4)}
+    assert rollup.fetch_daily_counts([date(2026, 7, 3)]) == {}
@@ -0,0 +1,93 @@
+"""Test import CSV in streaming: blocchi, tutto-o-niente con SAVEPOINT, job di avanzamento."""
+import io
+import os
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from src.models.brand import Brand
+from src.services.csv_import.csv_import_job import CSVImportJob
+from src.services.csv_import.csv_parser import CSVParser
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+
+    # pysqlite: BEGIN esplicito perché SAVEPOINT funzioni dentro la transazione esterna
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, _):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    Brand.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def _brands_csv(tmp_path, rows, duplicate_at=None):
+    lines = ["id_origin;name"]
+    for i in range(1, rows + 1):
+        origin = 10 if i == duplicate_at else i
+        lines.append(f"{origin};Marchio {i}")
+    path = tmp_path / "brands.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _brand_count(engine):
+    with Session(engine) as session:
+        return session.query(Brand).count()
+
+
+@pytest.mark.asyncio
+async def test_stream_import_inserts_all_chunks(tmp_path, engine):
+    job = CSVImportJob(_brands_csv(tmp_path, 2500), "brands", batch_size=1000)
+
+    await job.run(engine)
+
+    assert job.status == "completed", job.error_message
+    assert job.result.total_rows == 2500
+    assert job.inserted_rows == 2500 and job.progress == 100.0
+    assert _brand_count(engine) == 2500
+    assert not os.path.exists(job.file_path)
+
+
+@pytest.mark.asyncio
+async def test_invalid_row_in_later_chunk_rolls_back_everything(tmp_path, engine):
+    job = CSVImportJob(_brands_csv(tmp_path, 2500, duplicate_at=1800), "brands", batch_size=1000)
+
+    await job.run(engine)
+
+    assert job.status == "rejected"
+    assert job.inserted_rows == 0
+    assert _brand_count(engine) == 0
+    [error] = job.result.errors
+    assert (error.row_number, error.error_type) == (1800, "duplicate_in_csv")
+    assert job.result.validated_rows == 2499
+
+
+@pytest.mark.asyncio
+async def test_validate_only_never_writes(tmp_path, engine):
+    job = CSVImportJob(_brands_csv(tmp_path, 20), "brands", batch_size=100, validate_only=True)
+
+    await job.run(engine)
+
+    assert job.status == "completed"
+    assert job.result.validated_rows == 20 and job.result.inserted_rows == 0
+    assert _brand_count(engine) == 0
+
+
+def test_iter_csv_detects_latin1_and_streams_rows():
+    content = "id_origin;name\n1;Caffè\n\n2;Perché\n".encode("latin-1")
+
+    headers, rows = CSVParser.iter_csv(io.BytesIO(content), "brands", ["id_origin", "name"])
+
+    assert headers == ["id_origin", "name"]
+    first = next(rows)
+    assert first == {"id_origin": "1", "name": "Caffè", "_row_number": 1}
+    assert [row["name"] for row in rows] == ["Perché"]
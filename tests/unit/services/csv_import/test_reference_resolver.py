@@ -0,0 +1,96 @@
+"""Test risoluzione FK set-based: una query per tabella invece di una per riga."""
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from src.models.order import Order
+from src.models.order_detail import OrderDetail
+from src.models.product import Product
+from src.models.tax import Tax
+from src.services.csv_import.csv_import_service import CSVImportService
+from src.services.csv_import.reference_resolver import ReferenceResolver
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'refs.db'}")
+    for model in (Product, Tax, Order, OrderDetail):
+        model.__table__.create(engine)
+    with Session(engine) as session:
+        session.add_all([Product(id_product=100 + i, id_origin=i, id_store=1, name=f"P{i}") for i in range(1, 51)])
+        session.add(Product(id_product=900, id_origin=1, id_store=2, name="Altro store"))
+        session.add_all([
+            Tax(id_tax=1, name="IVA 22", code="22", percentage=22),
+            Tax(id_tax=2, name="IVA 10", code="10", percentage=10),
+        ])
+        session.execute(Order.__table__.insert(), [{"id_order": i, "id_store": 1} for i in range(1, 11)])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture
+def statements(session):
+    executed = []
+
+    @event.listens_for(session.get_bind(), "before_cursor_execute")
+    def _count(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    return executed
+
+
+def _detail_rows(count, product_origin=None, tax="22"):
+    return [
+        {
+            "_row_number": i + 2,
+            "id_order": str(i % 10 + 1),
+            "id_origin": str(product_origin or i % 50 + 1),
+            "product_name": f"Riga {i}",
+            "product_reference": "REF",
+            "product_qty": "1",
+            "unit_price_with_tax": "12.2",
+            "total_price_net": "10",
+            "total_price_with_tax": "12.2",
+            "tax_percentage": tax if i % 2 else "10",
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_order_details_mapping_and_validation_use_one_query_per_table(session, statements):
+    rows = _detail_rows(50)
+    service = CSVImportService(session)
+
+    resolver = ReferenceResolver(session, "order_details", 1).load(rows)
+    mapped, mapping_errors = service._map_rows(rows, "order_details", 1, resolver)
+    result = await service.validator.validate_batch(rows, "order_details", 1, resolver)
+
+    assert mapping_errors == [] and result.is_valid, result.errors
+    # orders, products, taxes, order_details (id_origin già presenti)
+    assert len(statements) == 4
+    assert mapped[0].id_product == 101 and mapped[0].id_tax == 2
+    assert mapped[1].id_product == 102 and mapped[1].id_tax == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_references_are_reported(session):
+    rows = _detail_rows(2, product_origin=77, tax="4")
+    rows[0]["id_order"] = "99"
+    service = CSVImportService(session)
+
+    _, mapping_errors = service._map_rows(rows, "order_details", 1)
+    result = await service.validator.validate_batch(rows, "order_details", 1)
+
+    assert "Prodotto con id_origin=77 e id_store=1 non trovato" in mapping_errors[0].message
+    reported = {(err.row_number, err.field_name) for err in result.errors}
+    assert reported == {(2, "id_order"), (2, "id_origin"), (3, "id_origin"), (3, "tax_percentage")}
+
+
+def test_csv_store_column_selects_product_of_that_store(session):
+    rows = [{"id_origin": "1", "id_store": "2"}, {"id_origin": "1", "id_store": ""}]
+
+    resolver = ReferenceResolver(session, "order_details", 1).load(rows)
+
+    assert [resolver.product_id(1, resolver.row_store(row)) for row in rows] == [900, 101]
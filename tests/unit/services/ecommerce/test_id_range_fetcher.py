@@ -0,0 +1,114 @@
+"""Test scheduler a intervalli di ID: parallelismo limitato, ordine, pagina adattiva, errori."""
+import asyncio
+
+import pytest
+
+from src.services.ecommerce.id_range_fetcher import IdRangeFetchAborted, IdRangeFetcher
+
+
+class ServerError(Exception):
+    status = 500
+
+
+def _shop(ids, delay=0.0, fail=lambda first, last: False, error=ServerError("Allowed memory size exhausted")):
+    state = {"calls": [], "active": 0, "max_active": 0}
+
+    async def fetch(first_id, last_id):
+        state["calls"].append((first_id, last_id))
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        try:
+            await asyncio.sleep(delay)
+            if fail(first_id, last_id):
+                raise error
+            return [{"id": i} for i in ids if first_id <= i <= last_id]
+        finally:
+            state["active"] -= 1
+
+    return fetch, state
+
+
+async def _collect(fetcher):
+    return [page async for page in fetcher.pages()]
+
+
+@pytest.mark.asyncio
+async def test_all_ids_fetched_once_in_order_with_bounded_concurrency():
+    ids = [i for i in range(1, 2001) if i % 3]
+    fetch, state = _shop(ids, delay=0.01)
+    fetcher = IdRangeFetcher(fetch, 1, 2000, concurrency=3, initial_span=100, min_span=10, max_span=100)
+
+    pages = await _collect(fetcher)
+
+    assert [row["id"] for page in pages for row in page] == ids
+    assert state["max_active"] == 3
+    assert fetcher.stats.rows == len(ids) and fetcher.stats.errors == 0
+
+
+@pytest.mark.asyncio
+async def test_fast_responses_grow_the_page():
+    fetch, state = _shop(range(1, 100001))
+    fetcher = IdRangeFetcher(fetch, 1, 100000, concurrency=1, initial_span=100, max_span=5000, target_seconds=1.0)
+
+    await _collect(fetcher)
+
+    spans = [last - first + 1 for first, last in state["calls"]]
+    assert spans[0] == 100 and max(spans) == 5000
+    assert len(state["calls"]) < 100000 / 1000
+
+
+@pytest.mark.asyncio
+async def test_failing_range_is_split_and_page_shrinks():
+    # Il webservice non regge intervalli più ampi di 250 ID
+    fetch, state = _shop(range(1, 1001), fail=lambda first, last: last - first + 1 > 250)
+    fetcher = IdRangeFetcher(fetch, 1, 1000, concurrency=2, initial_span=1000, min_span=50, max_span=1000)
+
+    pages = await _collect(fetcher)
+
+    assert [row["id"] for page in pages for row in page] == list(range(1, 1001))
+    assert fetcher.stats.errors > 0 and fetcher.span < 1000
+    assert fetcher.stats.failed_ranges == []
+
+
+@pytest.mark.asyncio
+async def test_range_failing_at_minimum_size_is_reported(monkeypatch):
+    monkeypatch.setattr(asyncio, "sleep", _no_sleep(asyncio.sleep))
+    fetch, _ = _shop(range(1, 31), fail=lambda first, last: first <= 15 <= last)
+    fetcher = IdRangeFetcher(fetch, 1, 30, concurrency=1, initial_span=10, min_span=10, max_span=10, max_attempts=2)
+
+    pages = await _collect(fetcher)
+
+    assert [row["id"] for page in pages for row in page] == list(range(1, 11)) + list(range(21, 31))
+    assert fetcher.stats.failed_ranges == [(11, 20)]
+
+
+def _no_sleep(sleep):
+    async def fake(delay, *args, **kwargs):
+        return await sleep(0)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_connection_error_retries_range_without_splitting(monkeypatch):
+    monkeypatch.setattr(asyncio, "sleep", _no_sleep(asyncio.sleep))
+    fetch, state = _shop(range(1, 101), fail=lambda first, last: first == 1, error=ConnectionError("refused"))
+    fetcher = IdRangeFetcher(fetch, 1, 100, concurrency=1, initial_span=100, min_span=10, max_span=100)
+
+    await _collect(fetcher)
+
+    assert state["calls"] == [(1, 100)] * 3
+    assert fetcher.stats.failed_ranges == [(1, 100)]
+
+
+@pytest.mark.asyncio
+async def test_shop_down_aborts_after_consecutive_errors(monkeypatch):
+    monkeypatch.setattr(asyncio, "sleep", _no_sleep(asyncio.sleep))
+    fetch, state = _shop(range(1, 10001), fail=lambda first, last: True)
+    fetcher = IdRangeFetcher(
+        fetch, 1, 10000, concurrency=2, initial_span=10000, min_span=100, max_span=10000, max_consecutive_errors=5
+    )
+
+    with pytest.raises(IdRangeFetchAborted):
+        await _collect(fetcher)
+
+    assert len(state["calls"]) <= 6
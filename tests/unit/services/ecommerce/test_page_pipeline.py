@@ -0,0 +1,84 @@
+"""Test pipeline a pagine: coda limitata, download sovrapposto all'insert, propagazione errori."""
+import asyncio
+
+import pytest
+
+from src.services.ecommerce.page_pipeline import run_page_pipeline
+
+
+@pytest.mark.asyncio
+async def test_pages_are_consumed_in_order_with_bounded_prefetch():
+    events = []
+
+    async def pages():
+        for number in range(6):
+            events.append(("fetched", number))
+            yield [{"id": number * 10 + i} for i in range(10)]
+
+    async def consume(page):
+        number = page[0]["id"] // 10
+        fetched_ahead = max(n for kind, n in events if kind == "fetched") - number
+        # In memoria al più la pagina corrente, 2 in coda e 1 in mano al produttore
+        assert fetched_ahead <= 3
+        events.append(("consumed", number))
+        await asyncio.sleep(0)
+        return len(page) - 1
+
+    stats = await run_page_pipeline(pages(), consume, max_pending=2)
+
+    assert [n for kind, n in events if kind == "consumed"] == list(range(6))
+    assert (stats.pages, stats.fetched, stats.processed) == (6, 60, 54)
+
+
+@pytest.mark.asyncio
+async def test_next_page_downloads_while_current_is_inserted():
+    async def pages():
+        for number in range(4):
+            await asyncio.sleep(0.05)  # download
+            yield [number]
+
+    async def consume(page):
+        await asyncio.sleep(0.05)  # insert
+        return 1
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    stats = await run_page_pipeline(pages(), consume)
+
+    assert stats.processed == 4
+    # Sequenziale: 8 x 0.05s; in pipeline circa 5 x 0.05s
+    assert loop.time() - started < 0.35
+
+
+@pytest.mark.asyncio
+async def test_producer_error_is_raised_after_consumed_pages():
+    consumed = []
+
+    async def pages():
+        yield [1]
+        raise RuntimeError("webservice down")
+
+    async def consume(page):
+        consumed.append(page)
+        return 1
+
+    with pytest.raises(RuntimeError, match="webservice down"):
+        await run_page_pipeline(pages(), consume)
+    assert consumed == [[1]]
+
+
+@pytest.mark.asyncio
+async def test_consumer_error_stops_producer():
+    fetched = []
+
+    async def pages():
+        for number in range(100):
+            fetched.append(number)
+            yield [number]
+
+    async def consume(page):
+        raise ValueError("insert failed")
+
+    with pytest.raises(ValueError, match="insert failed"):
+        await run_page_pipeline(pages(), consume, max_pending=1)
+    assert len(fetched) <= 3
@@ -0,0 +1,106 @@
+"""Test sync incrementale: watermark date_upd per store/entità, filtri delta, upsert per id_origin."""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.models.customer import Customer
+from src.models.sync_watermark import SyncWatermark
+from src.repository.customer_repository import CustomerRepository
+from src.repository.sync_watermark_repository import SyncWatermarkRepository
+from src.services.ecommerce.prestashop_service import PrestaShopService
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'delta.db'}")
+    for model in (SyncWatermark, Customer):
+        model.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _service(session, new_elements=True):
+    service = PrestaShopService.__new__(PrestaShopService)
+    service.db = session
+    service.store_id = 1
+    service.new_elements = new_elements
+    service.job_tracker = None
+    service._watermark_repo = SyncWatermarkRepository(session)
+    service._remote_last_updates = {}
+    service._failed_ranges = {}
+    service.requests = []
+
+    async def request(endpoint, params=None):
+        service.requests.append(params)
+        return {"customers": [{"id": "9", "date_upd": "2026-10-16 10:00:00"}]}
+
+    service._make_request_with_rate_limit = request
+    return service
+
+
+def test_watermark_only_moves_forward_per_store(session):
+    repo = SyncWatermarkRepository(session)
+
+    repo.advance(1, "orders", datetime(2026, 10, 1, 12))
+    repo.advance(1, "orders", datetime(2026, 9, 1))
+    repo.advance(2, "orders", datetime(2026, 8, 1))
+
+    assert repo.get_watermark(1, "orders") == datetime(2026, 10, 1, 12)
+    assert repo.get_all(2) == {"orders": datetime(2026, 8, 1)}
+    assert repo.get_watermark(1, "customers") is None
+
+
+@pytest.mark.asyncio
+async def test_delta_fetch_filters_by_date_upd_and_advances_watermark(session):
+    service = _service(session)
+    service._watermark_repo.advance(1, "customers", datetime(2026, 10, 1, 8, 30))
+
+    params, last_id = await service._prepare_delta_fetch("customers", {"display": "[id,date_upd]"})
+
+    assert last_id is None
+    assert params["date"] == 1
+    assert params["filter[date_upd]"].startswith("[2026-10-01 08:30:00,")
+    assert service.requests[0]["sort"] == "[date_upd_DESC]"
+
+    service._commit_delta("customers")
+    assert service._watermark_repo.get_watermark(1, "customers") == datetime(2026, 10, 16, 10)
+
+
+@pytest.mark.asyncio
+async def test_first_sync_uses_id_filter_and_failed_ranges_keep_watermark(session):
+    service = _service(session)
+
+    params, last_id = await service._prepare_delta_fetch("customers", {"display": "full"})
+    assert last_id == 0 and "filter[date_upd]" not in params
+
+    service._failed_ranges["customers"] = [(1, 100)]
+    service._commit_delta("customers")
+    assert service._watermark_repo.get_watermark(1, "customers") is None
+
+
+def test_upsert_by_origin_updates_existing_rows_of_the_same_store(session):
+    repo = CustomerRepository(session)
+    base = {"id_lang": 1, "firstname": "Mario", "lastname": "Rossi", "email": "m@example.com"}
+    repo.upsert_by_origin([{**base, "id_origin": 10}, {**base, "id_origin": 11}], 1, ("firstname", "email"))
+    repo.upsert_by_origin([{**base, "id_origin": 10}], 2, ("firstname", "email"))
+
+    result = repo.upsert_by_origin(
+        [{**base, "id_origin": 10, "firstname": "Luigi", "lastname": "Verdi"}, {**base, "id_origin": 12}],
+        1,
+        ("firstname", "email"),
+    )
+
+    assert (result.inserted, result.updated) == (1, 1)
+    rows = {
+        (c.id_store, c.id_origin): (c.firstname, c.lastname)
+        for c in session.query(Customer).all()
+    }
+    assert rows == {
+        (1, 10): ("Luigi", "Rossi"),
+        (1, 11): ("Mario", "Rossi"),
+        (1, 12): ("Mario", "Rossi"),
+        (2, 10): ("Mario", "Rossi"),
+    }
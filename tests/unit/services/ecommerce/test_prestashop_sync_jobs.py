@@ -0,0 +1,121 @@
+"""Test job di sync: claim atomico, ripresa da entità completate e checkpoint per pagina."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.models.sync_job import SyncJob
+from src.models.sync_watermark import SyncWatermark
+from src.repository.sync_job_repository import SyncJobRepository
+from src.repository.sync_watermark_repository import SyncWatermarkRepository
+from src.services.ecommerce.prestashop_service import PrestaShopService
+from src.services.sync.sync_job_tracker import SyncJobTracker, stale_before
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    for model in (SyncWatermark, SyncJob):
+        model.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _service(session, tracker):
+    service = PrestaShopService.__new__(PrestaShopService)
+    service.db = session
+    service.store_id = 1
+    service.new_elements = False
+    service.job_tracker = tracker
+    service._watermark_repo = SyncWatermarkRepository(session)
+    service._remote_last_updates = {}
+    service._failed_ranges = {}
+    service.requests = []
+
+    async def request(endpoint, params=None):
+        service.requests.append(params)
+        return {"orders": [{"id": "900", "date_upd": "2026-10-16 10:00:00"}]}
+
+    service._make_request_with_rate_limit = request
+    return service
+
+
+def test_only_latest_interrupted_or_stale_job_is_claimed_once(session):
+    repo = SyncJobRepository(session)
+    limit_time = stale_before(600)
+    old = repo.create(1, "full")
+    old.status = "interrupted"
+    live = repo.create(2, "full")
+    stale = repo.create(3, "full")
+    stale.heartbeat_at = datetime.now() - timedelta(hours=1)
+    session.commit()
+
+    assert repo.get_resumable(1, "full", limit_time).id_sync_job == old.id_sync_job
+    assert repo.get_resumable(2, "full", limit_time) is None
+    assert repo.get_running(2, limit_time).id_sync_job == live.id_sync_job
+    assert repo.claim(stale.id_sync_job, limit_time) is True
+    assert repo.claim(stale.id_sync_job, limit_time) is False
+
+    repo.create(1, "full")
+    assert repo.get_resumable(1, "full", limit_time) is None
+
+
+def test_failed_job_is_not_resumed(session):
+    repo = SyncJobRepository(session)
+    limit_time = stale_before(600)
+    failed = repo.create(1, "incremental")
+    failed.status, failed.completed_entities = "failed", "Customers,Addresses"
+    session.commit()
+
+    assert repo.get_resumable(1, "incremental", limit_time) is None
+    assert repo.claim(failed.id_sync_job, limit_time) is False
+
+
+@pytest.mark.asyncio
+async def test_resumed_job_skips_completed_entities_and_restarts_after_checkpoint(session):
+    repo = SyncJobRepository(session)
+    job = repo.create(1, "full")
+    job.status, job.entity, job.last_id = "interrupted", "Orders", 500
+    job.checkpoint_date_upd = datetime(2026, 10, 15, 9)
+    job.completed_entities = "Products"
+    session.commit()
+    service = _service(session, SyncJobTracker(repo, job))
+    fetched = {}
+
+    async def products():
+        raise AssertionError("entità già completata")
+
+    async def orders():
+        fetched["params"], fetched["last_id"] = await service._prepare_delta_fetch("orders", {"display": "full"})
+        return [{"status": "success"}]
+
+    result = await service._sync_phase_sequential("Phase 3", [("Products", products), ("Orders", orders)])
+
+    assert [f["status"] for f in result["functions"]] == ["SKIPPED", "SUCCESS"]
+    assert fetched["last_id"] == 500
+    # Watermark annotato all'avvio dell'entità, senza nuova lettura remota
+    assert service.requests == []
+    assert service._remote_last_updates["orders"] == datetime(2026, 10, 15, 9)
+    assert SyncJobTracker.parse_entities(job.completed_entities) == ["Orders", "Products"]
+    assert job.last_id is None
+
+
+@pytest.mark.asyncio
+async def test_page_checkpoint_stops_before_failed_range(session):
+    repo = SyncJobRepository(session)
+    tracker = SyncJobTracker(repo, repo.create(1, "full"))
+    tracker.start_entity("Phase 3", "Orders")
+    service = _service(session, tracker)
+
+    async def consume(page):
+        return len(page)
+
+    tracked = service._track_pages("orders", consume)
+    await tracked([{"id": str(i)} for i in range(1, 101)])
+    assert (tracker.job.last_id, tracker.job.pages, tracker.job.processed) == (100, 1, 100)
+
+    service._failed_ranges["orders"] = [(151, 200)]
+    await tracked([{"id": str(i)} for i in range(201, 251)])
+    assert (tracker.job.last_id, tracker.job.fetched) == (150, 150)
@@ -0,0 +1,101 @@
+"""Test export in streaming: ZIP voce per voce e workbook write-only."""
+from __future__ import annotations
+
+import io
+import threading
+import zipfile
+from unittest.mock import MagicMock
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from src.schemas.fiscal_document_schema import InvoiceExportFiltersSchema
+from src.services.export.fiscal_document_export_service import FiscalDocumentExportService
+from src.services.export.streaming import (
+    iter_file_chunks,
+    read_and_close,
+    save_workbook,
+    spooled_file,
+    write_only_sheet,
+)
+from src.services.export.zip_stream import ZipStreamWriter
+from src.services.routers.fiscal_document_service import FiscalDocumentService
+
+
+def test_zip_add_chunks_streams_entry_from_file():
+    handle = spooled_file()
+    handle.write(b"x" * 200_000)
+    handle.seek(0)
+
+    writer = ZipStreamWriter(duplicate_prefix="registro")
+    chunks = [writer.add("a.txt", b"primo")]
+    chunks.extend(writer.add_chunks("a.txt", iter_file_chunks(handle, chunk_size=16_384)))
+    chunks.append(writer.close())
+
+    assert handle.closed
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.namelist() == ["a.txt", "registro-2.txt"]
+        assert archive.read("registro-2.txt") == b"x" * 200_000
+
+
+def test_zip_duplicate_name_does_not_collide_with_real_entry():
+    writer = ZipStreamWriter(duplicate_prefix="DDT")
+    chunks = [writer.add("DDT-2.pdf", b"a"), writer.add("DDT-2.pdf", b"b"), writer.add("DDT-3.pdf", b"c")]
+    chunks.append(writer.close())
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.namelist() == ["DDT-2.pdf", "DDT-2-2.pdf", "DDT-3.pdf"]
+
+
+def test_xml_zip_loads_entries_lazily():
+    loaded = []
+
+    def loader(invoice_id):
+        loaded.append(invoice_id)
+        return f"<xml>{invoice_id}</xml>".encode(), f"IT{invoice_id}.xml"
+
+    chunks = FiscalDocumentExportService().iter_xml_zip([1, 2, 3], loader)
+
+    first = next(chunks)
+    assert first
+    assert loaded == [1]
+
+    with zipfile.ZipFile(io.BytesIO(first + b"".join(chunks))) as archive:
+        assert archive.namelist() == ["IT1.xml", "IT2.xml", "IT3.xml"]
+    assert loaded == [1, 2, 3]
+
+
+def test_write_only_workbook_keeps_bold_header():
+    workbook = Workbook(write_only=True)
+    sheet = write_only_sheet(workbook, "Dati", ["a", "b"])
+    for i in range(3):
+        sheet.append([i, i * 2])
+
+    content = read_and_close(save_workbook(workbook))
+
+    ws = load_workbook(io.BytesIO(content)).active
+    assert ws.title == "Dati"
+    assert ws["A1"].value == "a" and ws["A1"].font.bold
+    assert [row for row in ws.iter_rows(min_row=2, values_only=True)] == [(0, 0), (1, 2), (2, 4)]
+
+
+@pytest.mark.asyncio
+async def test_invoice_xlsx_export_is_written_off_the_event_loop(monkeypatch):
+    repository = MagicMock()
+    repository.count_invoices_for_export.return_value = 3
+    service = FiscalDocumentService(repository, MagicMock(), MagicMock())
+    threads = []
+
+    def write(filters):
+        threads.append(threading.get_ident())
+        return spooled_file()
+
+    monkeypatch.setattr(service, "_write_invoices_xlsx", write)
+
+    content, _, filename = await service.export_invoices(
+        InvoiceExportFiltersSchema(document_type="invoice"), "xlsx"
+    )
+
+    assert threads and threads[0] != threading.get_ident()
+    assert filename == "fatture-export.xlsx"
+    assert b"".join(content) == b""
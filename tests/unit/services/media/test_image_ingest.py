@@ -0,0 +1,158 @@
+"""Test pipeline asincrona immagini: richieste condizionali, manifest, derivati, scrittura atomica."""
+import io
+import json
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from PIL import Image
+
+from src.core.settings import ImageIngestSettings
+from src.services.media import image_ingest
+from src.services.media.image_ingest import ImageIngestPipeline, write_file_atomic
+from src.services.media.image_service import ImageService
+
+
+def _png(width=800, height=600) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGBA", (width, height), (200, 10, 10, 255)).save(output, format="PNG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    current = ImageIngestSettings(
+        image_ingest_workers=0,
+        image_manifest_dir=str(tmp_path / "manifest"),
+        image_derivative_sizes="thumb=150x150,detail=1200x900",
+        image_derivative_formats="webp,jpeg",
+    )
+    monkeypatch.setattr(image_ingest, "get_image_ingest_settings", lambda: current)
+    return current
+
+
+@pytest.fixture
+def image_service(tmp_path):
+    return ImageService(base_path=str(tmp_path / "product_images"))
+
+
+@pytest_asyncio.fixture
+async def origin():
+    """Server immagini con ETag: conta le richieste e risponde 304 a If-None-Match."""
+    state = {"requests": [], "body": _png(), "etag": '"v1"'}
+
+    async def handler(request):
+        state["requests"].append(dict(request.headers))
+        if request.headers.get("If-None-Match") == state["etag"]:
+            return web.Response(status=304)
+        return web.Response(body=state["body"], content_type="image/png", headers={"ETag": state["etag"]})
+
+    app = web.Application()
+    app.router.add_get("/{name:.+}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    state["url"] = lambda name: str(server.make_url(f"/{name}"))
+    yield state
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_ingest_downloads_resizes_and_records_manifest(tmp_path, settings, image_service, origin):
+    url = origin["url"]("10-small_default/tavolo.jpg")
+
+    async with ImageIngestPipeline(image_service) as pipeline:
+        result = await pipeline.ingest(url, 5, 1)
+
+    assert result.status == "downloaded"
+    assert result.img_url == "/media/product_images/1/product_5.jpg"
+    saved = Image.open(image_service.base_path / "1" / "product_5.jpg")
+    assert saved.format == "JPEG" and saved.size == (400, 300)
+
+    manifest = json.loads((tmp_path / "manifest" / "platform_1.json").read_text())
+    assert manifest[result.img_url]["url"] == url
+    assert manifest[result.img_url]["etag"] == '"v1"'
+    assert manifest[result.img_url]["derivatives"] == ["detail.jpg", "detail.webp", "thumb.jpg", "thumb.webp"]
+
+    files = sorted(p.name for p in (image_service.base_path / "1").iterdir())
+    assert files == [
+        "product_5.detail.jpg", "product_5.detail.webp", "product_5.jpg",
+        "product_5.thumb.jpg", "product_5.thumb.webp",
+    ]
+    thumb = Image.open(image_service.base_path / "1" / "product_5.thumb.webp")
+    assert thumb.format == "WEBP" and thumb.size == (150, 113)
+    # Nessun ingrandimento oltre la sorgente 800x600
+    assert Image.open(image_service.base_path / "1" / "product_5.detail.jpg").size == (800, 600)
+
+
+@pytest.mark.asyncio
+async def test_resync_skips_unchanged_without_request(settings, image_service, origin):
+    url = origin["url"]("10-small_default/tavolo.jpg")
+    async with ImageIngestPipeline(image_service) as pipeline:
+        await pipeline.ingest(url, 5, 1)
+
+    async with ImageIngestPipeline(image_service) as pipeline:
+        assert (await pipeline.ingest(url, 5, 1)).status == "unchanged"
+    assert len(origin["requests"]) == 1
+
+    async with ImageIngestPipeline(image_service, revalidate=True) as pipeline:
+        assert (await pipeline.ingest(url, 5, 1)).status == "not_modified"
+    assert origin["requests"][-1]["If-None-Match"] == '"v1"'
+
+
+@pytest.mark.asyncio
+async def test_changed_source_url_is_downloaded_again(settings, image_service, origin):
+    async with ImageIngestPipeline(image_service) as pipeline:
+        await pipeline.ingest(origin["url"]("10-small_default/tavolo.jpg"), 5, 1)
+
+    async with ImageIngestPipeline(image_service) as pipeline:
+        new_url = origin["url"]("11-small_default/tavolo.jpg")
+        assert not pipeline.is_current(new_url, 5, 1)
+        assert (await pipeline.ingest(new_url, 5, 1)).status == "downloaded"
+    assert "If-None-Match" not in origin["requests"][-1]
+
+
+@pytest.mark.asyncio
+async def test_legacy_file_without_manifest_is_adopted(settings, image_service, origin):
+    settings.image_derivatives_enabled = False
+    write_file_atomic(image_service.base_path / "1" / "product_7.jpg", b"legacy")
+
+    async with ImageIngestPipeline(image_service) as pipeline:
+        result = await pipeline.ingest(origin["url"]("12-small_default/sedia.jpg"), 7, 1)
+
+    assert result.status == "unchanged"
+    assert origin["requests"] == []
+    assert (image_service.base_path / "1" / "product_7.jpg").read_bytes() == b"legacy"
+
+
+@pytest.mark.asyncio
+async def test_missing_derivatives_trigger_download(settings, image_service, origin):
+    write_file_atomic(image_service.base_path / "1" / "product_7.jpg", b"legacy")
+
+    async with ImageIngestPipeline(image_service) as pipeline:
+        result = await pipeline.ingest(origin["url"]("12-small_default/sedia.jpg"), 7, 1)
+
+    assert result.status == "downloaded"
+    assert (image_service.base_path / "1" / "product_7.thumb.webp").exists()
+
+
+@pytest.mark.asyncio
+async def test_http_error_returns_failed_and_keeps_no_file(settings, image_service):
+    async with ImageIngestPipeline(image_service) as pipeline:
+        result = await pipeline.ingest("http://127.0.0.1:9/missing.jpg", 8, 1)
+
+    assert result.status == "failed"
+    assert not (image_service.base_path / "1" / "product_8.jpg").exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_redownload_keeps_existing_local_image(settings, image_service, origin):
+    async with ImageIngestPipeline(image_service) as pipeline:
+        first = await pipeline.ingest(origin["url"]("10-small_default/tavolo.jpg"), 5, 1)
+    saved = (image_service.base_path / "1" / "product_5.jpg").read_bytes()
+
+    async with ImageIngestPipeline(image_service) as pipeline:
+        result = await pipeline.ingest("http://127.0.0.1:9/11-small_default/tavolo.jpg", 5, 1)
+
+    assert (result.status, result.img_url) == ("failed", first.img_url)
+    assert (image_service.base_path / "1" / "product_5.jpg").read_bytes() == saved
@@ -0,0 +1,127 @@
+"""Unit test — export PDF massivo: finestra di rendering, ZIP in streaming, PDF unito."""
+import asyncio
+import zipfile
+from io import BytesIO
+
+import pytest
+from fpdf import FPDF
+from pypdf import PdfReader
+
+from src.core.exceptions import NotFoundException, ValidationException
+from src.core.settings import PdfRenderSettings
+from src.services.pdf import bulk_pdf_export, pdf_cache, render_pool
+from src.services.pdf.bulk_pdf_export import (
+    BULK_ERRORS_FILENAME,
+    build_bulk_pdf_merged,
+    iter_bulk_pdfs,
+    select_bulk_document_ids,
+    stream_bulk_pdf_zip,
+)
+from src.services.pdf.pdf_cache import PdfRenderJob
+
+
+def _render_page(number):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=12)
+    pdf.cell(0, 10, f"Documento {number}")
+    return bytes(pdf.output())
+
+
+def _prepare(document_id):
+    if document_id == 3:
+        raise ValueError("DDT non trovato")
+    return PdfRenderJob(
+        kind="ddt",
+        document_id=document_id,
+        filename="DDT-dup.pdf" if document_id in (4, 5) else f"DDT-{document_id}.pdf",
+        render_func=_render_page,
+        render_kwargs={"number": document_id},
+    )
+
+
+class _DummySession:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pdf_settings(tmp_path, monkeypatch):
+    settings = PdfRenderSettings(pdf_render_workers=0, pdf_cache_dir=str(tmp_path))
+    for module in (pdf_cache, render_pool, bulk_pdf_export):
+        monkeypatch.setattr(module, "get_pdf_render_settings", lambda: settings)
+    render_pool.shutdown_pdf_executor()
+    yield settings
+    render_pool.shutdown_pdf_executor()
+
+
+@pytest.mark.asyncio
+async def test_results_keep_order_and_render_window_is_bounded(pdf_settings, monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def fake_render(job):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # I documenti pari finiscono prima: l'ordine di uscita deve restare quello richiesto
+        await asyncio.sleep(0.01 if job.document_id % 2 else 0)
+        in_flight -= 1
+        return f"pdf-{job.document_id}".encode()
+
+    async def prepare(document_id):
+        return PdfRenderJob(kind="ddt", document_id=document_id, filename=f"{document_id}.pdf", render_func=_render_page)
+
+    monkeypatch.setattr(bulk_pdf_export, "render_pdf_job", fake_render)
+
+    results = [r async for r in iter_bulk_pdfs(list(range(1, 11)), prepare, concurrency=3)]
+
+    assert [r.document_id for r in results] == list(range(1, 11))
+    assert results[4].pdf_bytes == b"pdf-5"
+    assert peak <= 3
+
+
+@pytest.mark.asyncio
+async def test_zip_streams_one_entry_per_document_and_lists_errors(pdf_settings, monkeypatch):
+    session = _DummySession()
+    monkeypatch.setattr(bulk_pdf_export, "SessionLocal", lambda: session)
+
+    chunks = [
+        chunk
+        async for chunk in stream_bulk_pdf_zip([1, 2, 3, 4, 5], lambda db: _prepare, duplicate_prefix="DDT")
+    ]
+
+    assert len(chunks) > 2
+    with zipfile.ZipFile(BytesIO(b"".join(chunks))) as archive:
+        names = archive.namelist()
+        # Nome duplicato: prefisso + posizione della voce nello ZIP (come _build_zip)
+        assert names == ["DDT-1.pdf", "DDT-2.pdf", "DDT-dup.pdf", "DDT-4.pdf", BULK_ERRORS_FILENAME]
+        assert archive.read("DDT-1.pdf").startswith(b"%PDF")
+        assert archive.read(BULK_ERRORS_FILENAME).decode() == "3\tDDT non trovato\n"
+    assert session.closed
+
+
+@pytest.mark.asyncio
+async def test_merged_pdf_contains_every_rendered_document(pdf_settings):
+    output, errors = await build_bulk_pdf_merged([1, 2, 3, 4], _prepare)
+
+    with output:
+        reader = PdfReader(output)
+        assert len(reader.pages) == 3
+        assert [item.title for item in reader.outline] == ["DDT-1.pdf", "DDT-2.pdf", "DDT-dup.pdf"]
+    assert errors == [{"document_id": 3, "error": "DDT non trovato"}]
+
+    with pytest.raises(ValidationException):
+        await build_bulk_pdf_merged([3], _prepare)
+
+
+def test_select_bulk_document_ids():
+    assert select_bulk_document_ids([5, 2, 5], lambda limit: [], 10, entity_type="DDT") == [5, 2]
+    assert select_bulk_document_ids(None, lambda limit: [9, 8], 10, entity_type="DDT") == [9, 8]
+
+    with pytest.raises(ValidationException):
+        select_bulk_document_ids(None, lambda limit: list(range(limit)), 10, entity_type="DDT")
+    with pytest.raises(NotFoundException):
+        select_bulk_document_ids(None, lambda limit: [], 10, entity_type="DDT")
@@ -0,0 +1,80 @@
+"""Unit test — rendering PDF fuori dal loop e cache content-addressed su disco."""
+import os
+import pickle
+from datetime import date
+
+import pytest
+
+from src.core.settings import PdfRenderSettings
+from src.models.address import Address
+from src.models.country import Country
+from src.services.pdf import pdf_cache, render_pool
+from src.services.pdf.fiscal_document_pdf_service import FiscalDocumentPDFService
+from src.services.pdf.pdf_cache import render_pdf_cached
+from src.services.pdf.render_pool import TaxPercentageLookup, snapshot_address
+
+_renders = []
+
+
+def _render(**kwargs):
+    _renders.append(kwargs)
+    return f"%PDF-{kwargs['number']}".encode()
+
+
+@pytest.fixture
+def pdf_settings(tmp_path, monkeypatch):
+    settings = PdfRenderSettings(pdf_render_workers=0, pdf_cache_dir=str(tmp_path))
+    monkeypatch.setattr(pdf_cache, "get_pdf_render_settings", lambda: settings)
+    monkeypatch.setattr(render_pool, "get_pdf_render_settings", lambda: settings)
+    render_pool.shutdown_pdf_executor()
+    _renders.clear()
+    yield settings
+    render_pool.shutdown_pdf_executor()
+
+
+@pytest.mark.asyncio
+async def test_same_data_is_served_from_cache(pdf_settings):
+    first = await render_pdf_cached("ddt", 7, _render, locale="it", number=1)
+    second = await render_pdf_cached("ddt", 7, _render, locale="it", number=1)
+
+    assert first == second == b"%PDF-1"
+    assert len(_renders) == 1
+    assert len(os.listdir(os.path.join(pdf_settings.pdf_cache_dir, "ddt", "7"))) == 1
+
+
+@pytest.mark.asyncio
+async def test_changed_data_or_locale_renders_again_and_replaces_old_file(pdf_settings):
+    await render_pdf_cached("ddt", 7, _render, locale="it", number=1)
+    changed = await render_pdf_cached("ddt", 7, _render, locale="it", number=2)
+    await render_pdf_cached("ddt", 7, _render, locale="en", number=2)
+
+    assert changed == b"%PDF-2"
+    assert len(_renders) == 3
+    assert len(os.listdir(os.path.join(pdf_settings.pdf_cache_dir, "ddt", "7"))) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_disabled_always_renders(pdf_settings):
+    pdf_settings.pdf_cache_enabled = False
+    await render_pdf_cached("order", 1, _render, number=1)
+    await render_pdf_cached("order", 1, _render, number=1)
+
+    assert len(_renders) == 2
+    assert not os.path.exists(os.path.join(pdf_settings.pdf_cache_dir, "order"))
+
+
+def test_render_inputs_are_serializable_for_the_process_pool(db_session):
+    country = Country(name="Italia", iso_code="IT")
+    db_session.add(country)
+    db_session.flush()
+    address = Address(id_country=country.id_country, company="ACME Srl", city="Roma", date_add=date.today())
+    db_session.add(address)
+    db_session.commit()
+
+    snapshot = pickle.loads(pickle.dumps(snapshot_address(address)))
+    assert (snapshot.company, snapshot.city, snapshot.country.iso_code) == ("ACME Srl", "Roma", "IT")
+
+    lookup = pickle.loads(pickle.dumps(TaxPercentageLookup({1: 22.0, 2: 4.0})))
+    assert (lookup.get_percentage_by_id(2), lookup.get_percentage_by_id(99)) == (4.0, 22.0)
+
+    assert pickle.loads(pickle.dumps(FiscalDocumentPDFService.render_context)) is not None
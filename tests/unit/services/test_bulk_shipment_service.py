@@ -0,0 +1,118 @@
+"""Unit test — creazione massiva spedizioni concorrente con limiti per CarrierApi."""
+import asyncio
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from src.core.exceptions import BusinessRuleException
+from src.factories.services.carrier_service_factory import CarrierServiceFactory
+from src.models.carrier_api import CarrierApi, CarrierTypeEnum
+from src.models.order import Order
+from src.models.shipping import Shipping
+from src.services.routers import bulk_shipment_service as bulk_module
+from src.services.routers.bulk_shipment_service import BulkShipmentService, create_bulk_shipment_job
+
+
+class _FakeShipmentService:
+    def __init__(self, stats):
+        self.stats = stats
+
+    async def create_shipment(self, order_id):
+        self.stats["active"] += 1
+        self.stats["peak"] = max(self.stats["peak"], self.stats["active"])
+        await asyncio.sleep(0.01)
+        self.stats["active"] -= 1
+        if order_id in self.stats["reject"]:
+            raise BusinessRuleException(f"Order {order_id} rejected")
+        return {"awb": f"AWB{order_id}"}
+
+
+@pytest.fixture
+def bulk_service(db_session, monkeypatch):
+    stats = {"active": 0, "peak": 0, "reject": set()}
+    monkeypatch.setattr(
+        CarrierServiceFactory,
+        "get_shipment_service_for_type",
+        lambda self, carrier_type, db, id_carrier_api=None: _FakeShipmentService(stats),
+    )
+    monkeypatch.setattr(bulk_module, "emit_event", lambda event: None)
+    service = BulkShipmentService(session_factory=sessionmaker(bind=db_session.get_bind()))
+    service.settings = service.settings.model_copy(update={
+        "bulk_shipment_max_concurrency": 10,
+        "bulk_shipment_carrier_concurrency": 2,
+    })
+    return service, stats
+
+
+def _orders_with_carrier(db_session, count):
+    carrier = CarrierApi(name="BRT test", carrier_type=CarrierTypeEnum.BRT)
+    db_session.add(carrier)
+    db_session.flush()
+    order_ids = []
+    for i in range(count):
+        shipping = Shipping(id_carrier_api=carrier.id_carrier_api)
+        db_session.add(shipping)
+        db_session.flush()
+        order = Order(id_order_state=1, is_invoice_requested=False, reference=f"BULK-{i}", id_shipping=shipping.id_shipping)
+        db_session.add(order)
+        db_session.flush()
+        order_ids.append(order.id_order)
+    db_session.commit()
+    return order_ids
+
+
+@pytest.mark.asyncio
+async def test_orders_run_concurrently_within_carrier_limit(bulk_service, db_session):
+    service, stats = bulk_service
+    order_ids = _orders_with_carrier(db_session, 6)
+    stats["reject"].add(order_ids[1])
+
+    response = await service.create_shipments(order_ids)
+
+    assert stats["peak"] == 2
+    assert [s.order_id for s in response.successful] == [i for i in order_ids if i != order_ids[1]]
+    assert response.successful[0].awb == f"AWB{order_ids[0]}"
+    assert response.failed[0].order_id == order_ids[1]
+    assert response.failed[0].error_type == "BUSINESS_RULE_ERROR"
+    assert response.summary == {"total": 6, "successful_count": 5, "failed_count": 1}
+
+
+@pytest.mark.asyncio
+async def test_orders_without_shipping_or_carrier_fail_without_calls(bulk_service, db_session):
+    service, stats = bulk_service
+    no_carrier = Shipping(id_carrier_api=None)
+    db_session.add(no_carrier)
+    db_session.flush()
+    order = Order(id_order_state=1, is_invoice_requested=False, reference="NOCARRIER", id_shipping=no_carrier.id_shipping)
+    db_session.add(order)
+    db_session.commit()
+
+    response = await service.create_shipments([order.id_order, 999999])
+
+    assert {(e.order_id, e.error_type) for e in response.failed} == {
+        (order.id_order, "NO_CARRIER_API"),
+        (999999, "NOT_FOUND"),
+    }
+    assert stats["peak"] == 0
+
+
+@pytest.mark.asyncio
+async def test_job_streams_progress_until_completed(bulk_service, db_session):
+    service, _ = bulk_service
+    order_ids = _orders_with_carrier(db_session, 3)
+    job = create_bulk_shipment_job(order_ids)
+
+    chunks = []
+
+    async def _consume():
+        async for chunk in job.stream():
+            chunks.append(chunk)
+
+    consumer = asyncio.create_task(_consume())
+    await job.run(service)
+    await asyncio.wait_for(consumer, timeout=2)
+
+    assert [c.split("\n", 1)[0] for c in chunks] == ["event: progress"] * 3 + ["event: completed"]
+    snapshot = job.to_schema()
+    assert snapshot.status == "completed"
+    assert snapshot.processed == 3
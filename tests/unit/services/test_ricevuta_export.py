@@ -185,3 +185,53 @@ class TestRicevutaServiceExport:
                 "pdf",
             )
         assert "Formato export" in str(exc_info.value)
+
+    def test_export_list_csv_streams_all_batches(self, db_session, service, monkeypatch):
+        customer = Customer(id_lang=1, firstname="Anna", lastname="Bianchi", email="anna@example.com")
+        db_session.add(customer)
+        db_session.commit()
+        for numero in range(1, 4):
+            order = Order(
+                id_customer=customer.id_customer,
+                id_order_state=1,
+                reference=f"LST-{numero}",
+                date_add=datetime(2026, 7, numero, 10, 0, 0),
+                is_payed=True,
+                total_price_with_tax=Decimal("10.00"),
+                total_price_net=Decimal("8.20"),
+                products_total_price_with_tax=Decimal("10.00"),
+                products_total_price_net=Decimal("8.20"),
+            )
+            db_session.add(order)
+            db_session.commit()
+            db_session.add(
+                Ricevuta(
+                    numero=numero,
+                    anno=2026,
+                    id_order=order.id_order,
+                    id_customer=customer.id_customer,
+                    data_incasso=date(2026, 7, numero),
+                    data_emissione=datetime(2026, 7, numero, 9, 0),
+                    stato=RicevutaStato.EMESSA,
+                )
+            )
+        db_session.commit()
+
+        repository = service._ricevuta_repository
+        iter_filtered = repository.iter_filtered
+        monkeypatch.setattr(
+            repository,
+            "iter_filtered",
+            lambda **kwargs: iter_filtered(**{**kwargs, "batch_size": 2}),
+        )
+
+        content, media_type, filename = service.export_ricevute(
+            RicevutaFiltersSchema(), RicevutaExportFormatSchema.CSV.value
+        )
+
+        lines = b"".join(content).decode("utf-8-sig").splitlines()
+        assert media_type.startswith("text/csv")
+        assert filename == "ricevute-export.csv"
+        assert lines[0].startswith("id_ricevuta;numero")
+        # Ordine per data emissione decrescente, anche tra un blocco e l'altro
+        assert [line.split(";")[7] for line in lines[1:]] == ["LST-3", "LST-2", "LST-1"]
@@ -0,0 +1,76 @@
+"""Unit test — scrittura massiva degli stati spedizione dai risultati del tracking."""
+import pytest
+
+from src.events.core.event import EventType
+from src.models.order import Order
+from src.models.shipments_history import ShipmentsHistory
+from src.models.shipping import Shipping
+from src.repository.shipping_repository import ShippingRepository
+from src.services.routers import shipping_service as shipping_service_module
+from src.services.routers.shipping_service import ShippingService
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    events = []
+    monkeypatch.setattr(shipping_service_module, "emit_event", events.append)
+    return events
+
+
+def _shipping(db_session, tracking, state, with_order=True):
+    shipping = Shipping(tracking=tracking, id_shipping_state=state)
+    db_session.add(shipping)
+    db_session.flush()
+    if with_order:
+        db_session.add(Order(
+            id_order_state=1, is_invoice_requested=False, reference=f"ORD-{tracking}",
+            id_shipping=shipping.id_shipping, id_store=1
+        ))
+    return shipping
+
+
+@pytest.mark.asyncio
+async def test_only_changed_shipments_are_written_and_notified(db_session, emitted):
+    changed = _shipping(db_session, "TRK-1", 2)
+    unchanged = _shipping(db_session, "TRK-2", 3)
+    orphan = _shipping(db_session, "TRK-3", 2, with_order=False)
+    db_session.commit()
+
+    service = ShippingService(ShippingRepository(db_session))
+    updated = await service.sync_shipping_states_from_tracking_results([
+        {"tracking_number": "TRK-1", "current_internal_state_id": 4,
+         "events": [{"code": "PU"}, {"code": "OK", "description": "Consegnata"}]},
+        {"tracking_number": "TRK-2", "current_internal_state_id": 3, "events": []},
+        {"tracking_number": "TRK-3", "current_internal_state_id": 5},
+        {"tracking_number": "UNKNOWN", "current_internal_state_id": 4},
+        {"tracking_number": "TRK-4"},
+    ], carrier_type="BRT")
+
+    assert updated == 2
+    db_session.expire_all()
+    assert (changed.id_shipping_state, unchanged.id_shipping_state, orphan.id_shipping_state) == (4, 3, 5)
+
+    history = db_session.query(ShipmentsHistory).order_by(ShipmentsHistory.id_shipping).all()
+    assert [(h.id_shipping, h.id_shipping_state_previous, h.id_shipping_state) for h in history] == [
+        (changed.id_shipping, 2, 4), (orphan.id_shipping, 2, 5)
+    ]
+    assert (history[0].tracking_event_code, history[0].tracking_event_description) == ("OK", "Consegnata")
+
+    # Nessun evento per la spedizione senza ordine
+    assert len(emitted) == 1
+    assert emitted[0].event_type == EventType.SHIPPING_STATUS_CHANGED.value
+    assert emitted[0].data["id_shipping"] == changed.id_shipping
+    assert (emitted[0].data["old_state_id"], emitted[0].data["new_state_id"]) == (2, 4)
+
+
+@pytest.mark.asyncio
+async def test_repeated_sync_is_a_noop(db_session, emitted):
+    _shipping(db_session, "TRK-9", 2)
+    db_session.commit()
+    service = ShippingService(ShippingRepository(db_session))
+    results = [{"tracking_number": "TRK-9", "current_internal_state_id": 6}]
+
+    assert await service.sync_shipping_states_from_tracking_results(results) == 1
+    assert await service.sync_shipping_states_from_tracking_results(results) == 0
+    assert len(emitted) == 1
+    assert db_session.query(ShipmentsHistory).count() == 1
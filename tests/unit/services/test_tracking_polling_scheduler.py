@@ -0,0 +1,142 @@
+"""Unit test — scheduler tracking basato su next_poll_at, batch e gruppi per carrier."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.factories.services.carrier_service_factory import CarrierServiceFactory
+from src.models.carrier_api import CarrierApi, CarrierTypeEnum
+from src.models.shipments_history import ShipmentsHistory
+from src.models.shipping import Shipping
+from src.services.interfaces.tracking_service_interface import ITrackingService
+from src.services.sync import tracking_polling_service as polling
+
+
+class _FakeTrackingService(ITrackingService):
+    def __init__(self, calls, fail=False, failing_parcels=()):
+        self.calls = calls
+        self.fail = fail
+        self.failing_parcels = set(failing_parcels)
+
+    async def get_tracking(self, tracking_numbers, carrier_api_id):
+        results, _ = await self.get_tracking_with_failures(tracking_numbers, carrier_api_id)
+        return results
+
+    async def get_tracking_with_failures(self, tracking_numbers, carrier_api_id):
+        self.calls.append((carrier_api_id, list(tracking_numbers)))
+        if self.fail:
+            raise RuntimeError("carrier down")
+        results = [
+            {"tracking_number": t, "events": []}
+            for t in tracking_numbers if t not in self.failing_parcels
+        ]
+        return results, [t for t in tracking_numbers if t in self.failing_parcels]
+
+
+@pytest.fixture
+def failing_parcels():
+    return set()
+
+
+@pytest.fixture
+def tracking_calls(monkeypatch, failing_parcels):
+    calls = []
+    failing = set()
+    monkeypatch.setattr(
+        CarrierServiceFactory,
+        "get_tracking_service",
+        lambda self, carrier_api_id, db: _FakeTrackingService(
+            calls, fail=carrier_api_id in failing, failing_parcels=failing_parcels
+        ),
+    )
+    monkeypatch.setattr(polling, "_carrier_buckets", {})
+    return calls, failing
+
+
+def _carrier(db_session, carrier_type):
+    carrier = CarrierApi(name=f"{carrier_type.value} test", carrier_type=carrier_type)
+    db_session.add(carrier)
+    db_session.flush()
+    return carrier
+
+
+def _shipment(db_session, carrier, tracking, next_poll_at=None, state=2):
+    shipping = Shipping(
+        id_carrier_api=carrier.id_carrier_api,
+        tracking=tracking,
+        id_shipping_state=state,
+        next_poll_at=next_poll_at,
+    )
+    db_session.add(shipping)
+    db_session.flush()
+    return shipping
+
+
+@pytest.mark.asyncio
+async def test_only_due_shipments_are_polled_in_batches(db_session, tracking_calls):
+    calls, _ = tracking_calls
+    brt = _carrier(db_session, CarrierTypeEnum.BRT)
+    fedex = _carrier(db_session, CarrierTypeEnum.FEDEX)
+    now = datetime.now()
+    due_brt = [_shipment(db_session, brt, f"BRT{i}") for i in range(12)]
+    _shipment(db_session, brt, "BRT-FUTURE", next_poll_at=now + timedelta(hours=1))
+    _shipment(db_session, brt, "BRT-DELIVERED", state=8)
+    due_fedex = _shipment(db_session, fedex, "FDX1", next_poll_at=now - timedelta(minutes=1))
+    db_session.commit()
+
+    await polling.poll_tracking_periodic(db_session)
+
+    brt_batches = [numbers for api_id, numbers in calls if api_id == brt.id_carrier_api]
+    assert sorted(len(b) for b in brt_batches) == [2, 10]
+    assert sorted(t for b in brt_batches for t in b) == sorted(s.tracking for s in due_brt)
+    assert (fedex.id_carrier_api, ["FDX1"]) in calls
+
+    db_session.expire_all()
+    for shipment in due_brt:
+        assert shipment.next_poll_at > now
+    # Stesso intervallo nello stesso ciclo: un solo istante (un UPDATE) per tutti i batch
+    assert len({shipment.next_poll_at for shipment in due_brt}) == 1
+    assert due_fedex.next_poll_at >= now + timedelta(seconds=polling.DEFAULT_POLLING_INTERVAL - 5)
+
+
+@pytest.mark.asyncio
+async def test_brt_interval_depends_on_events_and_failures_retry_soon(db_session, tracking_calls):
+    calls, failing = tracking_calls
+    brt = _carrier(db_session, CarrierTypeEnum.BRT)
+    dhl = _carrier(db_session, CarrierTypeEnum.DHL)
+    failing.add(dhl.id_carrier_api)
+    fresh = _shipment(db_session, brt, "BRT-NEW")
+    answered = _shipment(db_session, brt, "BRT-OLD")
+    down = _shipment(db_session, dhl, "DHL1")
+    db_session.add(ShipmentsHistory(
+        id_shipping=answered.id_shipping, id_shipping_state=2, changed_at=datetime.now()
+    ))
+    db_session.commit()
+
+    start = datetime.now()
+    await polling.poll_tracking_periodic(db_session)
+
+    db_session.expire_all()
+    assert fresh.next_poll_at - start < timedelta(seconds=polling.BRT_INITIAL_POLLING_INTERVAL + 5)
+    assert answered.next_poll_at - start >= timedelta(seconds=polling.BRT_POST_RESPONSE_POLLING_INTERVAL - 5)
+    assert down.next_poll_at - start < timedelta(seconds=polling.DEFAULT_RETRY_INTERVAL + 5)
+    assert polling._seconds_until_next_poll(db_session) <= polling.DEFAULT_RETRY_INTERVAL
+
+
+@pytest.mark.asyncio
+async def test_parcels_failing_within_a_batch_retry_soon(db_session, tracking_calls, failing_parcels):
+    brt = _carrier(db_session, CarrierTypeEnum.BRT)
+    ok = _shipment(db_session, brt, "BRT-OK")
+    failed = _shipment(db_session, brt, "BRT-FAILED")
+    # Spedizione con eventi: senza il fallimento andrebbe all'intervallo lungo
+    db_session.add(ShipmentsHistory(
+        id_shipping=failed.id_shipping, id_shipping_state=2, changed_at=datetime.now()
+    ))
+    failing_parcels.add("BRT-FAILED")
+    db_session.commit()
+
+    start = datetime.now()
+    await polling.poll_tracking_periodic(db_session)
+
+    db_session.expire_all()
+    assert failed.next_poll_at - start < timedelta(seconds=polling.BRT_RETRY_INTERVAL + 5)
+    assert ok.next_poll_at - start >= timedelta(seconds=polling.BRT_INITIAL_POLLING_INTERVAL - 5)